@@ -7,17 +7,16 @@
 Application Web Flask pour la gestion des visas
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, current_app, get_template_attribute
 from flask.json.provider import DefaultJSONProvider
 # from export_endpoint import add_export_to_app  # Module supprimé lors du conflit Git
 from werkzeug.utils import secure_filename
 import os
 import sys
 from pathlib import Path
+import io
 import json
 from datetime import datetime
-import pandas as pd
-import numpy as np
 import urllib.parse
 
 # Ajouter le dossier src au path Python
@@ -26,29 +25,97 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 from database.database_manager import DatabaseManager
 from controllers.client_controller import ClientController
 from controllers.whatsapp_controller import WhatsAppController
-from utils.excel_handler import ExcelHandler
-from models.client import Client
+from models.client import Client, ClientRow
 from cache_manager import cache
+from utils.cache_manager import cache_manager, notify_client_change
+from utils.metrics import init_app_metrics, registry as metrics_registry, cache_collector
+from utils.profiling import init_profiling
+from utils.lazy import LazyObject, LazySequence, RouteRegistry
+from utils.fragment_cache import fragment_cache, init_fragment_cache
+from services.whatsapp_outbox import init_whatsapp_outbox, get_dispatcher, get_outbox
+from database.maintenance import init_db_maintenance
+from services.whatsapp_campaign import WhatsAppCampaign, campaign_collector
+from utils import search_index
+from utils.import_sources import IMPORT_EXTENSIONS
 
-# Configuration de l'application Flask
-app = Flask(__name__)
-app.secret_key = 'tca_visa_tracking_secret_key_2024'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Lire un drapeau booléen depuis l'environnement (absent ou vide: valeur par défaut)"""
+    value = os.environ.get(name, '').strip().lower()
+    if not value:
+        return default
+    return value in ('1', 'true', 'yes', 'on')
+
+def default_config() -> dict:
+    """Configuration de l'application lue depuis l'environnement"""
+    return {
+        'SECRET_KEY': 'tca_visa_tracking_secret_key_2024',
+        'UPLOAD_FOLDER': 'uploads',
+        'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+        'SLOW_QUERY_THRESHOLD_MS': float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)),
+        # Exposition de /metrics et /metrics/slow-queries (désactivée par défaut; exige METRICS_TOKEN)
+        'METRICS_ENABLED': _env_flag('METRICS_ENABLED'),
+        'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+        # Profilage (désactivé par défaut: aucun hook installé)
+        'PROFILING_ENABLED': _env_flag('PROFILING_ENABLED'),
+        'PROFILING_TOKEN': os.environ.get('PROFILING_TOKEN'),
+        'SAMPLING_PROFILER_ENABLED': _env_flag('SAMPLING_PROFILER_ENABLED'),
+        'SAMPLING_PROFILER_INTERVAL_MS': float(os.environ.get('SAMPLING_PROFILER_INTERVAL_MS', 10)),
+        'SAMPLING_PROFILER_DUMP_SECONDS': float(os.environ.get('SAMPLING_PROFILER_DUMP_SECONDS', 60)),
+        'SAMPLING_PROFILER_OUTPUT': os.environ.get('SAMPLING_PROFILER_OUTPUT', 'profiles/stacks-{pid}.collapsed'),
+        # Cache des fragments de templates (tableau des clients, widgets du tableau de bord)
+        'FRAGMENT_CACHE_ENABLED': _env_flag('FRAGMENT_CACHE_ENABLED', default=True),
+        'FRAGMENT_CACHE_TTL': int(os.environ.get('FRAGMENT_CACHE_TTL', 120)),
+        'FRAGMENT_CACHE_MAX_BYTES': int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 4 * 1024 * 1024)),
+        # Index en mémoire de /api/search-instant, construit en arrière-plan au démarrage
+        'SEARCH_INDEX_ENABLED': _env_flag('SEARCH_INDEX_ENABLED', default=True),
+        'SEARCH_INDEX_PRELOAD': _env_flag('SEARCH_INDEX_PRELOAD', default=True),
+        # Recherche des doublons parmi les lignes importées (mode incrémental)
+        'DEDUPE_ON_IMPORT': _env_flag('DEDUPE_ON_IMPORT', default=True),
+        # Outbox WhatsApp: transport (desktop, http, stub), débit et tentatives
+        'WHATSAPP_TRANSPORT': os.environ.get('WHATSAPP_TRANSPORT', 'desktop'),
+        'WHATSAPP_GATEWAY_URL': os.environ.get('WHATSAPP_GATEWAY_URL'),
+        'WHATSAPP_GATEWAY_TOKEN': os.environ.get('WHATSAPP_GATEWAY_TOKEN'),
+        'WHATSAPP_GATEWAY_TIMEOUT': float(os.environ.get('WHATSAPP_GATEWAY_TIMEOUT', 10)),
+        'WHATSAPP_RATE_PER_SECOND': float(os.environ.get('WHATSAPP_RATE_PER_SECOND', 1.0)),
+        'WHATSAPP_RATE_BURST': float(os.environ.get('WHATSAPP_RATE_BURST', 5)),
+        'WHATSAPP_MAX_ATTEMPTS': int(os.environ.get('WHATSAPP_MAX_ATTEMPTS', 5)),
+        'WHATSAPP_RETRY_BASE_SECONDS': float(os.environ.get('WHATSAPP_RETRY_BASE_SECONDS', 5)),
+        # Démarrer le dispatcher au lancement (sinon au premier message mis en file)
+        'WHATSAPP_DISPATCHER_AUTOSTART': _env_flag('WHATSAPP_DISPATCHER_AUTOSTART'),
+        # Maintenance de la base (vide-pages, statistiques, intégrité) pendant les périodes sans requêtes,
+        # par un seul processus à la fois (bail en base)
+        'DB_MAINTENANCE_ENABLED': _env_flag('DB_MAINTENANCE_ENABLED', default=True),
+        'DB_MAINTENANCE_IDLE_SECONDS': float(os.environ.get('DB_MAINTENANCE_IDLE_SECONDS', 60)),
+        # Tâches exécutées, séparées par des virgules (défaut: database.maintenance.DEFAULT_TASKS);
+        # convert_auto_vacuum et checkpoint (mode WAL) ne tournent que si elles sont listées
+        'DB_MAINTENANCE_TASKS': os.environ.get('DB_MAINTENANCE_TASKS'),
+        # Archivage des dossiers clos sans modification depuis N jours (tâche archive, active par défaut;
+        # 0: désactivé)
+        'ARCHIVE_AFTER_DAYS': float(os.environ.get('ARCHIVE_AFTER_DAYS', 180)),
+    }
+
+# Routes déclarées au niveau du module, installées par create_app()
+routes = RouteRegistry()
 
 # Fonction helper pour convertir les types numpy/pandas en types Python natifs
 def convert_to_json_serializable(obj):
     """Convertit les types numpy/pandas en types Python natifs pour JSON serialization"""
-    if isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
+    # numpy/pandas ne sont chargés que par l'import/export Excel:
+    # s'ils ne sont pas dans sys.modules, aucun objet de ces types ne peut exister
+    np = sys.modules.get('numpy')
+    pd = sys.modules.get('pandas')
+    if np is not None and isinstance(obj, np.integer):
         return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
+    elif np is not None and isinstance(obj, np.floating):
         return float(obj)
-    elif isinstance(obj, np.ndarray):
+    elif np is not None and isinstance(obj, np.ndarray):
         return obj.tolist()
-    elif isinstance(obj, pd.Timestamp):
+    elif pd is not None and isinstance(obj, pd.Timestamp):
         return obj.isoformat()
     elif isinstance(obj, dict):
         return {key: convert_to_json_serializable(value) for key, value in obj.items()}
+    elif isinstance(obj, ClientRow):
+        return obj.to_dict()
     elif isinstance(obj, list):
         return [convert_to_json_serializable(item) for item in obj]
     elif isinstance(obj, tuple):
@@ -57,40 +124,80 @@ def convert_to_json_serializable(obj):
         return obj
 
 # Ajouter la fonction min au contexte Jinja2
-@app.template_global()
+@routes.template_global()
 def min_func(a, b):
     return min(a, b)
 
-# Rendre les fonctions min et max disponibles dans les templates
-app.jinja_env.globals['min'] = min
-app.jinja_env.globals['max'] = max
-
 # Configurer un fournisseur JSON global qui gère automatiquement numpy/pandas
 class NumpyJSONProvider(DefaultJSONProvider):
     def default(self, obj):
         return convert_to_json_serializable(obj)
 
-# Activer le fournisseur JSON global pour l'application Flask
-app.json = NumpyJSONProvider(app)
+def _create_excel_handler():
+    # pandas/openpyxl ne sont importés qu'à la première route d'import/export
+    from utils.excel_handler import ExcelHandler
+    return ExcelHandler()
 
-# Créer le dossier uploads s'il n'existe pas
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+def _create_analytics_controller():
+    from src.controllers.analytics_controller import AnalyticsController
+    return AnalyticsController(db_manager)
 
-# Initialiser les contrôleurs
-db_manager = DatabaseManager()
-client_controller = ClientController(db_manager)
-whatsapp_controller = WhatsAppController(db_manager)
-excel_handler = ExcelHandler()
+# Contrôleurs créés à la première requête qui les utilise (démarrage à froid rapide)
+db_manager = LazyObject(DatabaseManager)
+client_controller = LazyObject(lambda: ClientController(db_manager))
+whatsapp_controller = LazyObject(lambda: WhatsAppController(db_manager))
+excel_handler = LazyObject(_create_excel_handler)
+analytics_controller = LazyObject(_create_analytics_controller)
 
-# Importer et initialiser le contrôleur d'analyse
-from src.controllers.analytics_controller import AnalyticsController
-analytics_controller = AnalyticsController(db_manager)
+metrics_registry.register_collector(cache_collector('app', cache_manager))
+metrics_registry.register_collector(campaign_collector)
 
 # Ajouter les routes d'export (désactivé car module supprimé)
 # add_export_to_app(app, client_controller)
 
+def create_app(config: dict = None) -> Flask:
+    """
+    Fabrique de l'application Flask.
+
+    Aucune connexion à la base ni import de pandas ici: les contrôleurs sont
+    initialisés à la première requête qui en a besoin.
+    """
+    flask_app = Flask(__name__)
+    flask_app.config.update(default_config())
+    if config:
+        flask_app.config.update(config)
+
+    # Rendre les fonctions min et max disponibles dans les templates
+    flask_app.jinja_env.globals['min'] = min
+    flask_app.jinja_env.globals['max'] = max
+
+    # Tag {% cache %} pour les fragments coûteux
+    init_fragment_cache(flask_app)
+
+    # Outbox WhatsApp et son dispatcher (base résolue au premier message)
+    init_whatsapp_outbox(flask_app, lambda: db_manager.db_path)
+
+    # Maintenance de la base: thread démarré à la première requête
+    init_db_maintenance(flask_app, lambda: db_manager.db_path)
+
+    # Index de recherche instantanée (SQL tant qu'il n'est pas construit)
+    search_index.init_search_index(flask_app, db_manager)
+
+    # Activer le fournisseur JSON global pour l'application Flask
+    flask_app.json = NumpyJSONProvider(flask_app)
+
+    # Créer le dossier uploads s'il n'existe pas
+    os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    routes.init_app(flask_app)
+
+    # Instrumentation: latence par route, requêtes SQL et cache exposés sur /metrics
+    init_app_metrics(flask_app)
+    init_profiling(flask_app)
+    return flask_app
+
 # Configuration pour les fichiers statiques RTL
-@app.context_processor
+@routes.context_processor
 def inject_rtl_support():
     """Injecter le support RTL dans tous les templates"""
     from datetime import datetime
@@ -103,7 +210,7 @@ def inject_rtl_support():
     }
 
 # Route de test pour vérifier le déploiement
-@app.route('/health')
+@routes.route('/health')
 def health_check():
     """Vérifier que l'application fonctionne"""
     try:
@@ -122,45 +229,32 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def _compute_dashboard_stats() -> dict:
+    """Statistiques du tableau de bord (dossiers actifs: les dossiers clos archivés n'y figurent pas)"""
+    recent_clients, total_count = client_controller.get_all_clients(page=1, per_page=5, view='list', tier='hot')
+    facets = client_controller.get_client_facets(tier='hot')
+    
+    return {
+        'total_clients': total_count,
+        'by_status': {status: facets['visa_status'].get(status, 0)
+                      for status in Client.VISA_STATUS_OPTIONS},
+        'by_nationality': {nationality: facets['nationality'].get(nationality, 0)
+                           for nationality in Client.NATIONALITY_OPTIONS},
+        'by_employee': {employee: facets['responsible_employee'].get(employee, 0)
+                        for employee in Client.EMPLOYEE_OPTIONS},
+        'recent_clients': recent_clients
+    }
+
 # Routes principales
-@app.route('/', endpoint='index')
+@routes.route('/', endpoint='index')
 def index():
     """Page d'accueil avec tableau de bord - Statistiques complètes et précises"""
     try:
-        # Récupérer TOUS les clients pour des statistiques précises
-        all_clients, total_count = client_controller.get_all_clients(page=1, per_page=10000)  # Récupérer tous les clients
-        
-        stats = {
-            'total_clients': total_count,
-            'by_status': {},
-            'by_nationality': {},
-            'by_employee': {},
-            'recent_clients': all_clients[:5] if all_clients else []
-        }
-        
-        # Calculer les statistiques par statut - TOUS les clients
-        for status in Client.VISA_STATUS_OPTIONS:
-            count = len([c for c in all_clients if c.get('visa_status') == status])
-            stats['by_status'][status] = count
-        
-        # Calculer les statistiques par nationalité - TOUS les clients
-        for nationality in Client.NATIONALITY_OPTIONS:
-            count = len([c for c in all_clients if c.get('nationality') == nationality])
-            stats['by_nationality'][nationality] = count
-        
-        # Calculer les statistiques par employé - TOUS les clients
-        for employee in Client.EMPLOYEE_OPTIONS:
-            count = len([c for c in all_clients if c.get('responsible_employee') == employee])
-            stats['by_employee'][employee] = count
-        
-        # Debug: afficher les statistiques calculées
-        print(f"📊 STATISTIQUES CALCULÉES:")
-        print(f"   Total clients: {total_count}")
-        print(f"   Par statut: {stats['by_status']}")
-        print(f"   Par nationalité: {stats['by_nationality']}")
-        print(f"   Par employé: {stats['by_employee']}")
+        # Statistiques calculées une fois par version des données (GROUP BY en SQL,
+        # sans charger les clients); les widgets eux-mêmes sont des fragments en cache
+        stats = fragment_cache.cached_value('dashboard_stats', _compute_dashboard_stats)
         
-        return render_template('index.html', stats=stats, clients=all_clients,
+        return render_template('index.html', stats=stats,
                                app_title='نظام تتبع التأشيرات',
                                company_name='شركة تسهيل للخدمات',
                                facebook_link='https://facebook.com/yourpage')
@@ -175,9 +269,9 @@ def index():
             'by_employee': {},
             'recent_clients': []
         }
-        return render_template('index.html', stats=default_stats, clients=[])
+        return render_template('index.html', stats=default_stats, fragment_cache_bypass=True)
 
-@app.route('/readable-clients')
+@routes.route('/readable-clients')
 def readable_clients():
     """Page des clients avec template lisible"""
     try:
@@ -204,9 +298,9 @@ def readable_clients():
         
         # Récupérer les clients avec pagination (optimisé)
         if filters:
-            clients, total = client_controller.get_filtered_clients(filters, page, per_page)
+            clients, total = client_controller.get_filtered_clients(filters, page, per_page, view='list')
         else:
-            clients, total = client_controller.get_all_clients(page, min(per_page, 100))
+            clients, total = client_controller.get_all_clients(page, min(per_page, 100), view='list')
         
         # Calculer les informations de pagination
         total_pages = (total + per_page - 1) // per_page
@@ -239,12 +333,12 @@ def readable_clients():
         print(f"Erreur dans readable_clients: {e}")
         return f"Erreur: {e}", 500
 
-@app.route('/test-clients')
+@routes.route('/test-clients')
 def test_clients():
     """Page de test des clients avec template non-minifié"""
     try:
         # Récupérer les clients
-        clients, total = client_controller.get_all_clients(1, 10)
+        clients, total = client_controller.get_all_clients(1, 10, view='list')
         
         pagination = {
             'page': 1,
@@ -257,11 +351,6 @@ def test_clients():
             'next_num': 2 if total > 10 else None
         }
         
-        # Debug: afficher les informations
-        print(f"TEST DEBUG: Nombre de clients récupérés: {len(clients)}")
-        print(f"TEST DEBUG: Total: {total}")
-        print(f"TEST DEBUG: Premiers clients: {[c.get('client_id', 'N/A') for c in clients[:3]]}")
-        
         return render_template('test_clients.html', 
                              clients=clients,
                              pagination=pagination)
@@ -270,24 +359,15 @@ def test_clients():
         print(f"Erreur dans test_clients: {e}")
         return f"Erreur: {e}", 500
 
-@app.route('/clients/all')
+@routes.route('/clients/all')
 def all_clients():
-    """Affiche TOUS les clients sans pagination"""
-    try:
-        # Récupérer tous les clients sans limite
-        clients, total = client_controller.get_all_clients(1, 10000)
-        
-        return render_template('all_clients.html', 
-                             clients=clients,
-                             total=total,
-                             app_title='نظام تتبع التأشيرات - جميع العملاء',
-                             company_name='شركة تسهيل للخدمات')
-        
-    except Exception as e:
-        flash(f'خطأ في تحميل قائمة العملاء: {str(e)}', 'error')
-        return render_template('all_clients.html', clients=[], total=0)
+    """Affiche TOUS les clients (lignes chargées par /api/clients/query et virtualisées)"""
+    return render_template('all_clients.html',
+                         total=None,
+                         app_title='نظام تتبع التأشيرات - جميع العملاء',
+                         company_name='شركة تسهيل للخدمات')
 
-@app.route('/clients/complete')
+@routes.route('/clients/complete')
 def complete_clients():
     """Affiche TOUS les clients avec TOUTES les colonnes"""
     try:
@@ -304,7 +384,7 @@ def complete_clients():
         flash(f'خطأ في تحميل قائمة العملاء الكاملة: {str(e)}', 'error')
         return render_template('complete_clients.html', clients=[], total=0)
 
-@app.route('/api/clients/all')
+@routes.route('/api/clients/all')
 def api_all_clients():
     """API qui retourne TOUS les clients au format JSON"""
     try:
@@ -338,7 +418,7 @@ def api_all_clients():
             'total': 0
         }), 500
 
-@app.route('/api/clients/complete')
+@routes.route('/api/clients/complete')
 def api_complete_clients():
     """API qui retourne TOUS les clients avec TOUTES les colonnes au format JSON"""
     try:
@@ -491,17 +571,58 @@ def api_complete_clients():
             'columns': []
         }), 500
 
-@app.route('/render-clients')
+@routes.route('/api/clients/query')
+def api_query_clients():
+    """
+    API de consultation côté serveur: filtres, tri, projection, pagination par curseur.
+
+    Paramètres: q, status, nationality, employee, sort, order (asc|desc), limit,
+    cursor (page suivante) ou offset (accès direct), fields (colonnes séparées
+    par des virgules), facets=1 (comptes par statut/nationalité/employé),
+    tier (all: dossiers actifs et archivés, par défaut; hot: dossiers actifs).
+    """
+    try:
+        filters = {
+            'search': request.args.get('q', '').strip(),
+            'visa_status': request.args.get('status', ''),
+            'nationality': request.args.get('nationality', ''),
+            'responsible_employee': request.args.get('employee', '')
+        }
+        cursor = request.args.get('cursor') or None
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        offset = request.args.get('offset', type=int)
+        tier = request.args.get('tier', 'all')
+
+        result = client_controller.query_clients(
+            filters,
+            sort=request.args.get('sort', 'client_id'),
+            order=request.args.get('order', 'desc'),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=cursor,
+            offset=max(0, offset) if offset else None,
+            columns=fields or None,
+            # Le total n'est calculé que pour la première page (ou à la demande)
+            with_total=request.args.get('total', '0' if cursor else '1') == '1',
+            tier=tier
+        )
+        result['success'] = True
+        if request.args.get('facets') == '1':
+            result['facets'] = client_controller.get_client_facets(filters, tier)
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@routes.route('/render-clients')
 def render_clients():
     """Page spéciale pour Render qui affiche tous les clients"""
     return render_template('remote_clients.html')
 
-@app.route('/clients', endpoint='clients_list')
+@routes.route('/clients', endpoint='clients_list')
 def clients_list():
     """Page de liste des clients avec pagination et cache"""
-    print(f"🎯 ROUTE /clients APPELÉE - DÉBUT DU TRAITEMENT")
-    print(f"🎯 URL: {request.url}")
-    print(f"🎯 ARGS: {dict(request.args)}")
     try:
         # Paramètres de pagination optimisés
         page = int(request.args.get('page', 1))
@@ -518,6 +639,7 @@ def clients_list():
         status_filter = request.args.get('status', '')
         nationality_filter = request.args.get('nationality', '')
         employee_filter = request.args.get('employee', '')
+        archive_filter = '1' if request.args.get('archive') == '1' else None
         
         # Construire les filtres
         filters = {}
@@ -530,24 +652,25 @@ def clients_list():
         if employee_filter and employee_filter in Client.EMPLOYEE_OPTIONS:
             filters['responsible_employee'] = employee_filter
         
-        # Récupérer les clients avec pagination (optimisé)
-        print(f"🎯 AVANT APPEL CONTRÔLEUR - page: {page}, per_page: {per_page}, filters: {filters}")
-        if filters:
-            clients, total = client_controller.get_filtered_clients(filters, page, per_page)
-        else:
+        # Dossiers actifs par défaut; la recherche et archive=1 couvrent aussi les dossiers archivés
+        tier = 'all' if search_term or archive_filter else 'hot'
+        
+        def load_page():
+            if filters:
+                return client_controller.get_filtered_clients(filters, page, per_page, view='list', tier=tier)
             # Permettre l'affichage de tous les clients avec pagination
-            clients, total = client_controller.get_all_clients(page, per_page)
-        print(f"🎯 APRÈS APPEL CONTRÔLEUR - clients: {len(clients)}, total: {total}")
-        print(f"🎯 PREMIERS CLIENTS: {[c.get('client_id', 'N/A') for c in clients[:3]]}")
-        print(f"🎯 TOUS LES CLIENTS: {[c.get('client_id', 'N/A') for c in clients]}")  # DEBUG: afficher tous les clients
-        
-        # Écrire dans un fichier log pour débogage
-        with open('debug_route.log', 'w', encoding='utf-8') as f:
-            f.write(f"Page: {page}, Per page: {per_page}\n")
-            f.write(f"Total clients: {total}\n")
-            f.write(f"Clients returned: {len(clients)}\n")
-            f.write(f"Client IDs: {[c.get('client_id', 'N/A') for c in clients]}\n")
-            f.write(f"CLI1000 present: {'CLI1000' in [c.get('client_id', 'N/A') for c in clients]}\n")
+            return client_controller.get_all_clients(page, per_page, view='list', tier=tier)
+        
+        # Le fragment 'clients_table' a la même clé: si le total de cette page est
+        # en cache pour la version courante, les lignes ne sont lues que si le
+        # fragment doit être rendu à nouveau
+        fragment_key = (page, per_page, search_term, status_filter, nationality_filter, employee_filter, tier)
+        total = fragment_cache.get_value('clients_total', *fragment_key)
+        if total is None:
+            clients, total = load_page()
+            fragment_cache.set_value('clients_total', total, *fragment_key)
+        else:
+            clients = LazySequence(lambda: load_page()[0])
         
         # Calculer les informations de pagination
         total_pages = (total + per_page - 1) // per_page
@@ -568,20 +691,15 @@ def clients_list():
         # Les données sont déjà dans le bon format pour visa_system.db
         mapped_clients = clients
         
-        # Debug: afficher les informations CRITIQUES
-        print(f"🐛 DEBUG CRITIQUE: Nombre de clients récupérés: {len(clients)}")
-        print(f"🐛 DEBUG CRITIQUE: Total: {total}")
-        print(f"🐛 DEBUG CRITIQUE: Premiers clients: {[c.get('client_id', 'N/A') for c in clients[:3]]}")
-        print(f"🐛 DEBUG CRITIQUE: Base de données: {db_manager.db_path}")
-        print(f"🐛 DEBUG CRITIQUE: Type de contrôleur: {type(client_controller)}")
-        
         return render_template('clients.html', 
                              clients=mapped_clients,
+                             fragment_key=fragment_key,
                              pagination=pagination,
                              search_term=search_term,
                              status_filter=status_filter,
                              nationality_filter=nationality_filter,
                              employee_filter=employee_filter,
+                             archive_filter=archive_filter,
                              visa_statuses=Client.VISA_STATUS_OPTIONS,
                              nationalities=Client.NATIONALITY_OPTIONS,
                              employees=Client.EMPLOYEE_OPTIONS,
@@ -591,9 +709,10 @@ def clients_list():
         
     except Exception as e:
         flash(f'خطأ في تحميل قائمة العملاء: {str(e)}', 'error')
-        return render_template('clients.html', clients=[], pagination={'page': 1, 'total': 0, 'total_pages': 0})
+        return render_template('clients.html', clients=[], pagination={'page': 1, 'total': 0, 'total_pages': 0},
+                               fragment_cache_bypass=True)
 
-@app.route('/client/add', methods=['GET', 'POST'], endpoint='add_client')
+@routes.route('/client/add', methods=['GET', 'POST'], endpoint='add_client')
 def add_client():
     """Ajouter un nouveau client"""
     if request.method == 'POST':
@@ -664,7 +783,7 @@ def add_client():
                          visa_statuses=Client.VISA_STATUS_OPTIONS,
                          employees=Client.EMPLOYEE_OPTIONS)
 
-@app.route('/client/edit/<client_id>', methods=['GET', 'POST'])
+@routes.route('/client/edit/<client_id>', methods=['GET', 'POST'])
 def edit_client(client_id):
     """Modifier un client existant"""
     try:
@@ -702,14 +821,8 @@ def edit_client(client_id):
                 
                 # Envoyer notification WhatsApp si le statut a changé
                 new_status = client_data.get('visa_status')
-                if (old_status != new_status and 
-                    whatsapp_controller.is_whatsapp_enabled() and 
-                    client_data.get('whatsapp_number')):
-                    whatsapp_controller.send_status_notification(
-                        client_data['client_id'], 
-                        new_status, 
-                        client_data['whatsapp_number']
-                    )
+                if old_status != new_status and whatsapp_controller.is_whatsapp_enabled():
+                    client_controller.notify_status_changes([(client_data, old_status, new_status)])
                 
                 return redirect(url_for('clients_list'))
             else:
@@ -726,7 +839,7 @@ def edit_client(client_id):
         flash(f'خطأ في تحديث العميل: {str(e)}', 'error')
         return redirect(url_for('clients_list'))
 
-@app.route('/client/delete/<client_id>', methods=['POST'])
+@routes.route('/client/delete/<client_id>', methods=['POST'])
 def delete_client(client_id):
     """Supprimer un client avec confirmation et feedback"""
     try:
@@ -750,7 +863,20 @@ def delete_client(client_id):
     
     return redirect(url_for('clients_list'))
 
-@app.route('/import-excel-raw', methods=['POST'])
+def import_duplicates_report(client_ids):
+    """Doublons probables impliquant les clients importés (None si désactivé ou rien à signaler)"""
+    if not client_ids or not current_app.config.get('DEDUPE_ON_IMPORT', True):
+        return None
+    try:
+        report = client_controller.find_duplicates(client_ids, limit=50)
+    except Exception as e:
+        print(f"⚠️ Recherche des doublons après import impossible: {e}")
+        return None
+    if not report['clusters']:
+        return None
+    return {'count': report['stats']['clusters'], 'clusters': report['clusters'], 'stats': report['stats']}
+
+@routes.route('/import-excel-raw', methods=['POST'])
 def import_excel_raw():
     """Importer TOUS les clients depuis le fichier Excel spécifique sans validation"""
     try:
@@ -769,65 +895,12 @@ def import_excel_raw():
         if not result['success']:
             return jsonify(result), 400
         
-        # Importer TOUTES les données dans la base sans validation
-        imported_data = result['imported_data']
-        success_count = 0
-        error_count = 0
-        errors_details = []
-        
-        for row_data in imported_data:
-            try:
-                # Fonction pour convertir toutes les valeurs en string
-                def safe_str(value):
-                    if pd.isna(value) or value is None:
-                        return ''
-                    return str(value).strip()
-                
-                # Fonction pour normaliser les valeurs selon les options valides
-                def normalize_value(value, valid_options, default):
-                    if not value or value == '':
-                        return default
-                    # Chercher une correspondance exacte ou partielle
-                    for option in valid_options:
-                        if value == option or option in value or value in option:
-                            return option
-                    return default
-                
-                # Créer un client même avec des données incomplètes
-                client_data = {
-                    'client_id': safe_str(row_data.get('client_id')) or f'AUTO_{success_count + error_count + 1}',
-                    'full_name': safe_str(row_data.get('full_name')) or 'غير محدد',
-                    'whatsapp_number': safe_str(row_data.get('whatsapp_number')),
-                    'application_date': safe_str(row_data.get('file_date')),
-                    'receipt_date': safe_str(row_data.get('reception_date')),
-                    'passport_number': safe_str(row_data.get('passport_number')),
-                    'passport_status': normalize_value(safe_str(row_data.get('passport_status')), ['موجود', 'غير موجود'], 'غير موجود'),
-                    'nationality': normalize_value(safe_str(row_data.get('nationality')), ['ليبي', 'تونسي', 'أخرى'], 'أخرى'),
-                    'visa_status': normalize_value(safe_str(row_data.get('visa_status')), ['التقديم', 'جواز في السفارة', 'استلام الجواز', 'تمت الموافقة على التأشيرة', 'التأشيرة غير موافق عليها', 'اكتملت العملية'], 'التقديم'),
-                    'handled_by': safe_str(row_data.get('handled_by')),
-                    'summary': safe_str(row_data.get('summary')),
-                    'notes': safe_str(row_data.get('notes')),
-                    'responsible_employee': normalize_value(safe_str(row_data.get('responsible_employee')), ['اميرة', 'محمد', 'سفيان', 'اميمة', 'ايلاف', 'انيس', 'وليد'], 'اميرة')
-                }
-                
-                # Ajouter les données supplémentaires comme notes
-                extra_data = []
-                for key, value in row_data.items():
-                    if key.startswith('extra_') and value:
-                        extra_data.append(f"{key}: {value}")
-                
-                if extra_data:
-                    if client_data['notes']:
-                        client_data['notes'] += ' | ' + ' | '.join(extra_data)
-                    else:
-                        client_data['notes'] = ' | '.join(extra_data)
-                
-                client_controller.add_client_raw(client_data)
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors_details.append(f"Ligne {success_count + error_count}: {str(e)}")
+        # Importer TOUTES les données dans la base sans validation (valeurs déjà normalisées par colonne)
+        outcome = client_controller.import_clients_raw(result['clients'])
+        success_count = outcome['success_count']
+        error_count = outcome['error_count']
+        errors_details = outcome['errors']
+        imported_ids = outcome['imported_ids']
         
         return jsonify({
             'success': True,
@@ -836,7 +909,8 @@ def import_excel_raw():
             'error_count': error_count,
             'message': f'Import terminé: {success_count} clients importés, {error_count} erreurs',
             'errors': errors_details[:10],  # Limiter à 10 erreurs
-            'original_columns': result['original_columns']
+            'original_columns': result['original_columns'],
+            'possible_duplicates': import_duplicates_report(imported_ids)
         })
         
     except Exception as e:
@@ -845,7 +919,7 @@ def import_excel_raw():
             'error': f'Erreur lors de l\'import: {str(e)}'
         }), 500
 
-@app.route('/import-excel', methods=['GET', 'POST'])
+@routes.route('/import-excel', methods=['GET', 'POST'])
 def import_excel():
     """Importer des clients depuis un fichier Excel"""
     if request.method == 'POST':
@@ -859,40 +933,37 @@ def import_excel():
                 flash('لم يتم اختيار ملف', 'error')
                 return redirect(request.url)
             
-            if file and file.filename.lower().endswith(('.xlsx', '.xls')):
+            if file and file.filename.lower().endswith(IMPORT_EXTENSIONS):
                 # Sauvegarder le fichier temporairement
                 filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
                 file.save(filepath)
                 
-                # Importer les données
-                imported_clients = excel_handler.import_from_excel(filepath)
-                
-                success_count = 0
-                error_count = 0
-                
-                for client_data in imported_clients:
-                    try:
-                        client_controller.add_client(client_data)
-                        success_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        print(f"Erreur import client {client_data.get('client_id', 'N/A')}: {e}")
-                
-                # Supprimer le fichier temporaire
-                os.remove(filepath)
+                # Importer les données par lots (CSV et Parquet lus par morceaux)
+                try:
+                    outcome = client_controller.import_client_batches(excel_handler.iter_client_batches(filepath))
+                finally:
+                    # Supprimer le fichier temporaire
+                    os.remove(filepath)
+                for error in outcome['errors'][:20]:
+                    print(f"Erreur import client: {error}")
+                success_count = outcome['success_count']
+                error_count = outcome['error_count']
                 
                 flash(f'تم استيراد {success_count} عميل بنجاح! ❌ فشل في استيراد {error_count} عميل', 'success')
+                duplicates = import_duplicates_report(outcome['imported_ids'])
+                if duplicates:
+                    flash(f"⚠️ {duplicates['count']} مجموعة من العملاء المكررين المحتملين", 'warning')
                 return redirect(url_for('clients_list'))
             else:
-                flash('يرجى اختيار ملف Excel صحيح (.xlsx أو .xls)', 'error')
+                flash('يرجى اختيار ملف Excel أو CSV أو Parquet صحيح (.xlsx أو .xls أو .csv أو .parquet)', 'error')
                 
         except Exception as e:
             flash(f'خطأ في استيراد الملف: {str(e)}', 'error')
     
     return render_template('import_excel.html')
 
-@app.route('/api/update-status', methods=['POST'])
+@routes.route('/api/update-status', methods=['POST'])
 def update_status_api():
     """API optimisée pour mettre à jour le statut d'un client"""
     try:
@@ -925,19 +996,10 @@ def update_status_api():
         success = client_controller.update_client_status(client_id, new_status)
         
         if success:
-            # Envoyer notification WhatsApp seulement si nécessaire
+            # Notification WhatsApp mise en file (envoyée par le dispatcher de l'outbox)
             notification_sent = False
-            if (whatsapp_controller.is_whatsapp_enabled() and 
-                client.get('whatsapp_number')):
-                try:
-                    whatsapp_controller.send_status_notification(
-                        client_id, 
-                        new_status, 
-                        client.get('whatsapp_number')
-                    )
-                    notification_sent = True
-                except Exception as e:
-                    print(f"⚠️ Erreur notification WhatsApp: {e}")
+            if whatsapp_controller.is_whatsapp_enabled():
+                notification_sent = client_controller.notify_status_changes([(client, old_status, new_status)]) > 0
             
             return jsonify({
                 'success': True, 
@@ -951,7 +1013,135 @@ def update_status_api():
     except Exception as e:
         return jsonify({'success': False, 'message': f'خطأ: {str(e)}'}), 500
 
-@app.route('/api/client/<client_id>/update-field', methods=['POST'])
+@routes.route('/api/clients/bulk-status', methods=['POST'])
+def bulk_update_status_api():
+    """Changer le statut de plusieurs clients en une transaction (ex: lot de passeports à l'ambassade)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        client_ids = data.get('client_ids')
+        new_status = data.get('status')
+
+        if not isinstance(client_ids, list) or not new_status:
+            return jsonify({'success': False, 'message': 'قائمة العملاء والحالة مطلوبة'}), 400
+
+        try:
+            outcome = client_controller.bulk_update_status(client_ids, new_status,
+                                                           notify=bool(data.get('notify', True)))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        response = {
+            'success': True,
+            'message': f"تم تحديث {len(outcome['updated'])} عميل",
+            'new_status': new_status,
+            **outcome
+        }
+        # Lignes à jour du tableau (une requête IN), pour remplacer les <tr> sans recharger la liste
+        if data.get('render') == 'row' and outcome['updated']:
+            clients = db_manager.get_clients_by_ids(outcome['updated'])
+            response['rows'] = {client_id: render_client_row(dict(client))
+                                for client_id, client in clients.items()}
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'خطأ: {str(e)}'}), 500
+
+@routes.route('/api/client/<client_id>/status-history')
+def client_status_history_api(client_id):
+    """Historique des changements de statut d'un client"""
+    return jsonify({'success': True, 'client_id': client_id,
+                    'history': client_controller.get_status_history(client_id)})
+
+@routes.route('/api/clients/duplicates')
+def client_duplicates_api():
+    """Grappes de clients probablement en double (toute la base ou ?client_id=...)"""
+    try:
+        threshold = float(request.args.get('threshold', 0.85))
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        client_ids = request.args.getlist('client_id') or None
+        report = client_controller.find_duplicates(client_ids, threshold=threshold, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **report})
+
+@routes.route('/api/clients/merge', methods=['POST'])
+def merge_clients_api():
+    """Fusionner des doublons dans un client conservé"""
+    data = request.get_json(silent=True) or {}
+    try:
+        outcome = client_controller.merge_clients(data.get('primary_id'), data.get('duplicate_ids') or [])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'خطأ: {str(e)}'}), 500
+    return jsonify({'success': True, 'message': f"تم دمج {len(outcome['merged'])} عميل", **outcome})
+
+@routes.route('/api/whatsapp/outbox')
+def whatsapp_outbox_api():
+    """Suivi de l'outbox WhatsApp: compteurs par statut et derniers messages"""
+    dispatcher = get_dispatcher()
+    if dispatcher is None:
+        return jsonify({'success': False, 'message': 'صندوق رسائل واتساب غير مفعل'}), 404
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify({
+        'success': True,
+        'running': dispatcher.is_running,
+        'transport': dispatcher.transport.name,
+        'stats': dispatcher.outbox.stats(),
+        'dispatched': dispatcher.counters,
+        'messages': dispatcher.outbox.list_messages(status=request.args.get('status') or None,
+                                                    client_id=request.args.get('client_id') or None,
+                                                    limit=limit)
+    })
+
+@routes.route('/api/whatsapp/outbox/<int:message_id>/retry', methods=['POST'])
+def whatsapp_outbox_retry_api(message_id):
+    """Remettre en file un message WhatsApp en échec"""
+    dispatcher = get_dispatcher()
+    if dispatcher is None:
+        return jsonify({'success': False, 'message': 'صندوق رسائل واتساب غير مفعل'}), 404
+    if not dispatcher.outbox.retry(message_id):
+        return jsonify({'success': False, 'message': 'الرسالة غير موجودة أو ليست في حالة فشل'}), 404
+    return jsonify({'success': True, 'message': 'تمت إعادة الرسالة إلى قائمة الانتظار'})
+
+@routes.route('/api/whatsapp/campaigns', methods=['POST'])
+def whatsapp_campaign_api():
+    """
+    Campagne WhatsApp sur un segment de clients
+    
+    Corps JSON: {'segment': {'visa_status': [...], 'nationality': [...], 'responsible_employee': [...]},
+                 'message': texte à variables (optionnel: notification du statut actuel),
+                 'campaign_id': optionnel, 'dry_run': bool}
+    En dry_run, la liste des messages est renvoyée en CSV sans envoi.
+    """
+    data = request.get_json(silent=True) or {}
+    requested = data.get('segment') if isinstance(data.get('segment'), dict) else {}
+    segment = {}
+    for field in DatabaseManager.CAMPAIGN_SEGMENT_FIELDS:
+        values = requested.get(field)
+        if values:
+            segment[field] = [str(v) for v in values] if isinstance(values, list) else [str(values)]
+    if not segment:
+        return jsonify({'success': False, 'message': 'يجب تحديد شريحة العملاء (الحالة، الجنسية أو الموظف)'}), 400
+    
+    campaign = WhatsAppCampaign(db_manager, outbox=get_outbox())
+    try:
+        if data.get('dry_run'):
+            output = io.StringIO()
+            summary = campaign.dry_run(segment, output, message=data.get('message'))
+            response = make_response('\ufeff' + output.getvalue())
+            response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+            response.headers['Content-Disposition'] = f'attachment; filename=campaign_preview_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            response.headers['X-Campaign-Messages'] = str(summary['rendered'])
+            return response
+        summary = campaign.run(segment, message=data.get('message'), campaign_id=data.get('campaign_id'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    return jsonify({'success': True, **summary})
+
+@routes.route('/api/client/<client_id>/update-field', methods=['POST'])
 def update_client_field_api(client_id):
     """API pour mise à jour en ligne des champs client"""
     try:
@@ -963,23 +1153,69 @@ def update_client_field_api(client_id):
             return jsonify({'success': False, 'message': 'Champ et valeur requis'}), 400
         
         # Champs autorisés pour l'édition en ligne
-        allowed_fields = ['visa_status', 'responsible_employee', 'application_date', 'transaction_date']
-        
-        if field not in allowed_fields:
+        if field not in client_controller.INLINE_EDIT_FIELDS:
             return jsonify({'success': False, 'message': 'Champ non autorisé'}), 400
         
         # Mettre à jour le champ
         success = client_controller.update_client_field(client_id, field, value)
         
         if success:
-            return jsonify({'success': True, 'message': 'Champ mis à jour avec succès'})
+            response = {'success': True, 'message': 'Champ mis à jour avec succès'}
+            # render=row: renvoyer la ligne <tr> à jour (pas de rechargement de la liste)
+            if data.get('render') == 'row':
+                client = client_controller.get_client_by_id(client_id)
+                if client:
+                    response['row_html'] = render_client_row(client)
+            return jsonify(response)
         else:
             return jsonify({'success': False, 'message': 'Erreur lors de la mise à jour'}), 500
             
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erreur: {str(e)}'}), 500
 
-@app.route('/api/client/<client_id>/send-whatsapp', methods=['POST'])
+def render_client_row(client: dict) -> str:
+    """Rendre la ligne <tr> d'un client (même macro que le tableau de clients.html)"""
+    client_row = get_template_attribute('_client_row.html', 'client_row')
+    return str(client_row(client, Client.VISA_STATUS_OPTIONS, Client.EMPLOYEE_OPTIONS))
+
+@routes.route('/api/client/<client_id>/row', endpoint='client_row_fragment')
+def client_row_fragment(client_id):
+    """Fragment HTML: la ligne du tableau des clients pour un client"""
+    client = client_controller.get_client_by_id(client_id)
+    if not client:
+        return jsonify({'success': False, 'message': 'Client non trouvé'}), 404
+    return render_client_row(client)
+
+@routes.route('/api/clients/batch-update-fields', methods=['POST'])
+def batch_update_client_fields_api():
+    """Enregistrer plusieurs modifications en ligne en une transaction et renvoyer les lignes à jour"""
+    try:
+        data = request.get_json(silent=True) or {}
+        edits = data.get('edits')
+        
+        if not isinstance(edits, list) or not edits:
+            return jsonify({'success': False, 'message': 'Liste de modifications requise'}), 400
+        if len(edits) > client_controller.MAX_BATCH_EDITS:
+            return jsonify({'success': False,
+                            'message': f'Maximum {client_controller.MAX_BATCH_EDITS} modifications par lot'}), 400
+        if not all(isinstance(edit, dict) for edit in edits):
+            return jsonify({'success': False, 'message': 'Format de modification invalide'}), 400
+        
+        outcome = client_controller.update_client_fields_batch(edits)
+        response = {
+            'success': all(result['success'] for result in outcome['results']),
+            'updated': outcome['updated'],
+            'results': outcome['results']
+        }
+        if data.get('render', 'row') == 'row':
+            response['rows'] = {client_id: render_client_row(client)
+                                for client_id, client in outcome['clients'].items()}
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erreur: {str(e)}'}), 500
+
+@routes.route('/api/client/<client_id>/send-whatsapp', methods=['POST'])
 def send_whatsapp_test_api(client_id):
     """API pour envoyer un message WhatsApp de test"""
     try:
@@ -1018,7 +1254,7 @@ def send_whatsapp_test_api(client_id):
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erreur: {str(e)}'}), 500
 
-@app.route('/api/check-passport-unique', methods=['POST'])
+@routes.route('/api/check-passport-unique', methods=['POST'])
 def check_passport_unique():
     """Vérifier si un numéro de passeport est unique"""
     try:
@@ -1042,7 +1278,7 @@ def check_passport_unique():
             'message': f'Erreur lors de la vérification: {str(e)}'
         }), 500
 
-@app.route('/api/search-instant', methods=['GET'])
+@routes.route('/api/search-instant', methods=['GET'])
 def search_instant_api():
     """API pour la recherche instantanée"""
     try:
@@ -1050,20 +1286,25 @@ def search_instant_api():
         if not search_term or len(search_term) < 2:
             return jsonify({'results': [], 'total': 0})
         
-        # Recherche instantanée avec limite pour les performances
-        clients, total = client_controller.search_clients(search_term, page=1, per_page=20)
-        
-        # Formater les résultats pour l'affichage instantané
-        results = []
-        for client in clients:
-            results.append({
-                'client_id': client.get('client_id', ''),
-                'full_name': client.get('full_name', ''),
-                'whatsapp_number': client.get('whatsapp_number', ''),
-                'visa_status': client.get('visa_status', ''),
-                'nationality': client.get('nationality', ''),
-                'passport_number': client.get('passport_number', '')
-            })
+        # Index en mémoire si prêt, sinon recherche SQL limitée
+        index = search_index.client_search_index
+        indexed = index.search(search_term, limit=20) if index is not None else None
+        if indexed is not None:
+            results, total = indexed
+        else:
+            clients, total = client_controller.search_clients(search_term, page=1, per_page=20, view='search')
+            
+            # Formater les résultats pour l'affichage instantané
+            results = []
+            for client in clients:
+                results.append({
+                    'client_id': client.get('client_id', ''),
+                    'full_name': client.get('full_name', ''),
+                    'whatsapp_number': client.get('whatsapp_number', ''),
+                    'visa_status': client.get('visa_status', ''),
+                    'nationality': client.get('nationality', ''),
+                    'passport_number': client.get('passport_number', '')
+                })
         
         return jsonify({
             'results': results,
@@ -1074,19 +1315,17 @@ def search_instant_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/stats')
+@routes.route('/api/stats')
 def get_stats_api():
     """API optimisée pour récupérer les statistiques avec cache"""
     try:
-        from src.utils.cache_manager import cache_manager
-        
         # Vérifier le cache d'abord
         cached_stats = cache_manager.get('dashboard_stats')
         if cached_stats is not None:
             return jsonify(cached_stats)
         
         # Calculer les statistiques si pas en cache
-        all_clients, total_clients = client_controller.get_all_clients(1, 10000)  # Récupérer tous les clients
+        all_clients, total_clients = client_controller.get_all_clients(1, 10000, view='analytics')
         
         stats = {
             'total_clients': convert_to_json_serializable(total_clients),  # Utiliser le total retourné par la base de données
@@ -1134,19 +1373,17 @@ def get_stats_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/chart-data')
+@routes.route('/api/chart-data')
 def get_chart_data_api():
     """API optimisée pour récupérer les données du graphique avec cache"""
     try:
-        from src.utils.cache_manager import cache_manager
-        
         # Vérifier le cache d'abord
         cached_chart_data = cache_manager.get('chart_data')
         if cached_chart_data is not None:
             return jsonify(cached_chart_data)
         
         # Calculer les données si pas en cache
-        all_clients, _ = client_controller.get_all_clients(1, 10000)  # Récupérer tous les clients
+        all_clients, _ = client_controller.get_all_clients(1, 10000, view='analytics')
         
         # Calculer les données pour le graphique de manière optimisée
         chart_data = {
@@ -1177,7 +1414,7 @@ def get_chart_data_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/unrestricted-import', methods=['POST'])
+@routes.route('/api/unrestricted-import', methods=['POST'])
 def unrestricted_import_api():
     """API pour l'analyse et l'import sans restrictions"""
     try:
@@ -1198,17 +1435,17 @@ def unrestricted_import_api():
                 'error': 'لم يتم اختيار ملف صحيح'
             }), 400
         
-        if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        if not file.filename.lower().endswith(IMPORT_EXTENSIONS):
             return jsonify({
                 'success': False,
-                'error': 'يرجى اختيار ملف Excel صحيح (.xlsx أو .xls)'
+                'error': 'يرجى اختيار ملف Excel أو CSV أو Parquet صحيح (.xlsx أو .xls أو .csv أو .parquet)'
             }), 400
         
         # Sauvegarder le fichier temporairement avec timestamp unique
         import time
         timestamp = str(int(time.time()))
         filename = f"{timestamp}_{secure_filename(file.filename)}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         try:
@@ -1217,6 +1454,8 @@ def unrestricted_import_api():
             
             # Effectuer l'import complet
             result = importer.perform_unrestricted_import(filepath)
+            # L'importeur écrit directement dans la base: caches et index de recherche
+            notify_client_change(None)
             
             # Supprimer le fichier temporaire
             os.remove(filepath)
@@ -1227,7 +1466,8 @@ def unrestricted_import_api():
                     'message': result['message'],
                     'analysis_report': result['analysis_report'],
                     'import_stats': result['import_stats'],
-                    'final_report_html': result['final_report']
+                    'final_report_html': result['final_report'],
+                    'possible_duplicates': import_duplicates_report(importer.imported_client_ids)
                 })
             else:
                 return jsonify({
@@ -1248,12 +1488,12 @@ def unrestricted_import_api():
             'error': f'خطأ في المعالجة: {str(e)}'
         }), 500
 
-@app.route('/unrestricted-import', endpoint='unrestricted_import_page')
+@routes.route('/unrestricted-import', endpoint='unrestricted_import_page')
 def unrestricted_import_page():
     """صفحة الاستيراد الشامل بدون قيود"""
     return render_template('unrestricted_import.html')
 
-@app.route('/delete-all-clients', methods=['GET', 'POST'])
+@routes.route('/delete-all-clients', methods=['GET', 'POST'])
 def delete_all_clients():
     """Supprimer tous les clients avec confirmation"""
     if request.method == 'POST':
@@ -1265,7 +1505,8 @@ def delete_all_clients():
                 return render_template('delete_all_clients.html')
             
             # Compter les clients avant suppression
-            clients_before_list, clients_before_total = client_controller.get_all_clients(page=1, per_page=5000)
+            # Seul le total est affiché
+            clients_before_list, clients_before_total = client_controller.get_all_clients(page=1, per_page=1, view='search')
             clients_before = clients_before_total
             
             # Supprimer tous les clients
@@ -1278,15 +1519,16 @@ def delete_all_clients():
             flash(f'خطأ في حذف العملاء: {str(e)}', 'error')
     
     # GET request - afficher la page de confirmation
-    clients_list, total_clients = client_controller.get_all_clients(page=1, per_page=5000)
+    clients_list, total_clients = client_controller.get_all_clients(page=1, per_page=1, view='search')
     return render_template('delete_all_clients.html', total_clients=total_clients)
 
-@app.route('/delete-all-clients-direct', methods=['POST'])
+@routes.route('/delete-all-clients-direct', methods=['POST'])
 def delete_all_clients_direct():
     """Supprimer tous les clients sans confirmation - MODE DANGEREUX"""
     try:
         # Compter les clients avant suppression
-        clients_before_list, clients_before_total = client_controller.get_all_clients(page=1, per_page=5000)
+        # Seul le total est affiché
+        clients_before_list, clients_before_total = client_controller.get_all_clients(page=1, per_page=1, view='search')
         clients_before = clients_before_total
         
         # Supprimer tous les clients immédiatement
@@ -1299,7 +1541,7 @@ def delete_all_clients_direct():
         flash(f'خطأ في الحذف المباشر: {str(e)}', 'error')
         return redirect(url_for('clients_list'))
 
-@app.route('/send_whatsapp/<client_id>')
+@routes.route('/send_whatsapp/<client_id>')
 def send_whatsapp(client_id):
     """Page d'envoi de message WhatsApp pour un client"""
     try:
@@ -1332,7 +1574,7 @@ def send_whatsapp(client_id):
         flash(f'خطأ في إنشاء رسالة WhatsApp: {str(e)}', 'error')
         return redirect(url_for('clients_list'))
 
-@app.route('/settings', methods=['GET', 'POST'])
+@routes.route('/settings', methods=['GET', 'POST'])
 def settings():
     """Page des paramètres"""
     if request.method == 'POST':
@@ -1359,7 +1601,7 @@ def settings():
     return render_template('settings.html', settings=current_settings)
 
 # Routes pour l'analyse avancée
-@app.route('/analytics')
+@routes.route('/analytics')
 def analytics_dashboard():
     """Tableau de bord d'analyse avancée"""
     try:
@@ -1372,7 +1614,7 @@ def analytics_dashboard():
         flash(f'خطأ في تحميل التحليل المتقدم: {str(e)}', 'error')
         return render_template('analytics.html', analysis={})
 
-@app.route('/api/analytics/comprehensive')
+@routes.route('/api/analytics/comprehensive')
 def get_comprehensive_analytics_api():
     """API pour obtenir l'analyse complète"""
     try:
@@ -1381,7 +1623,7 @@ def get_comprehensive_analytics_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analytics/executive-report')
+@routes.route('/api/analytics/executive-report')
 def get_executive_report_api():
     """API pour obtenir le rapport exécutif"""
     try:
@@ -1390,7 +1632,7 @@ def get_executive_report_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analytics/operational-dashboard')
+@routes.route('/api/analytics/operational-dashboard')
 def get_operational_dashboard_api():
     """API pour obtenir le tableau de bord opérationnel"""
     try:
@@ -1399,7 +1641,7 @@ def get_operational_dashboard_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analytics/real-time-stats')
+@routes.route('/api/analytics/real-time-stats')
 def get_real_time_stats_api():
     """API pour obtenir les statistiques en temps réel"""
     try:
@@ -1408,7 +1650,7 @@ def get_real_time_stats_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analytics/chart-data/<chart_type>')
+@routes.route('/api/analytics/chart-data/<chart_type>')
 def get_analytics_chart_data_api(chart_type):
     """API pour obtenir les données des graphiques"""
     try:
@@ -1417,20 +1659,16 @@ def get_analytics_chart_data_api(chart_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/export/excel')
+@routes.route('/export/excel')
 def export_clients_excel():
     """Exporter la liste des clients vers Excel"""
     try:
-        print(f"🎯 EXPORT EXCEL: Début de l'export")
-        
         # Récupérer les paramètres de filtrage
         search = request.args.get('search', '')
         status = request.args.get('status', '')
         nationality = request.args.get('nationality', '')
         employee = request.args.get('employee', '')
         
-        print(f"🎯 EXPORT EXCEL: Filtres - search: '{search}', status: '{status}', nationality: '{nationality}', employee: '{employee}'")
-        
         # Obtenir tous les clients avec les filtres
         page = 1
         per_page = 10000  # Récupérer beaucoup de clients pour l'export
@@ -1446,19 +1684,15 @@ def export_clients_excel():
         if employee:
             filters['employee'] = employee
         
-        print(f"🎯 EXPORT EXCEL: Appel du contrôleur avec filtres: {filters}")
-        
         # Récupérer les clients filtrés
         clients_data, total_clients = client_controller.get_filtered_clients(
             filters=filters,
             page=page, 
-            per_page=per_page
+            per_page=per_page,
+            view='export'
         )
         
-        print(f"🎯 EXPORT EXCEL: Clients récupérés: {len(clients_data)}, Total: {total_clients}")
-        
         if not clients_data:
-            print("🎯 EXPORT EXCEL: Aucun client à exporter")
             return jsonify({'error': 'Aucun client à exporter'}), 404
         
         # Préparer les données pour l'export
@@ -1482,9 +1716,8 @@ def export_clients_excel():
                 'تاريخ التحديث': client.get('updated_at', '')
             })
         
-        print(f"🎯 EXPORT EXCEL: Données préparées pour l'export: {len(export_data)} lignes")
-        
         # Créer le fichier Excel
+        from utils.excel_handler import ExcelHandler
         excel_handler = ExcelHandler()
         
         # Générer un nom de fichier unique
@@ -1494,31 +1727,24 @@ def export_clients_excel():
         # S'assurer que le dossier uploads existe
         os.makedirs('uploads', exist_ok=True)
         
-        print(f"🎯 EXPORT EXCEL: Export vers fichier: {filepath}")
-        
         # Exporter vers Excel
         success = excel_handler.export_to_excel(export_data, filepath)
         
-        print(f"🎯 EXPORT EXCEL: Succès de l'export: {success}")
-        
         if success and os.path.exists(filepath):
-            print(f"🎯 EXPORT EXCEL: Envoi du fichier à l'utilisateur")
             # Envoyer le fichier à l'utilisateur
             response = send_file(filepath, 
                                as_attachment=True, 
                                download_name=filename,
                                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            print(f"🎯 EXPORT EXCEL: Fichier envoyé avec succès")
             return response
         else:
-            print(f"🎯 EXPORT EXCEL: Erreur - fichier non créé")
             return jsonify({'error': 'Erreur lors de la création du fichier Excel'}), 500
             
     except Exception as e:
         print(f"🎯 EXPORT EXCEL: Exception capturée: {str(e)}")
         return jsonify({'error': f'Erreur lors de l\'export: {str(e)}'}), 500
 
-@app.route('/api/analytics/export/<report_type>')
+@routes.route('/api/analytics/export/<report_type>')
 def export_analysis_report_api(report_type):
     """API pour exporter un rapport d'analyse"""
     try:
@@ -1533,6 +1759,9 @@ def export_analysis_report_api(report_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Instance utilisée par gunicorn (app:app), vercel_app.py et render_app.py
+app = create_app()
+
 if __name__ == '__main__':
     print("🛂 نظام تتبع التأشيرات الذكي - TCA")
     print("شركة تونس للاستشارات والخدمات")
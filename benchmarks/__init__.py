@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de performance pour le système de suivi des visas TCA
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Mêmes chemins d'import que app.py
+for _path in (ROOT_DIR, ROOT_DIR / 'src'):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
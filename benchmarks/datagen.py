@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Générateur de clients synthétiques (données arabes réalistes) pour les benchmarks
+
+Les distributions reproduisent la forme des données de production:
+- statuts dominés par les dossiers clôturés (اكتملت العملية / refusés)
+- nationalités majoritairement libyennes puis tunisiennes
+- charge très inégale entre employés
+- numéros WhatsApp dans des formats hétérogènes (+218, 00216, sans préfixe, espaces)
+- colonnes supplémentaires du schéma déployé (excel_col_*, original_data JSON)
+
+Usage:
+    python -m benchmarks.datagen --size 10k --output benchmarks/.data/clients_10k.db
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from benchmarks import ROOT_DIR
+
+from database.database_manager import DatabaseManager
+from models.client import Client
+from utils.phone_numbers import phone_columns
+
+SIZES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1M': 1_000_000,
+}
+
+DATA_DIR = ROOT_DIR / 'benchmarks' / '.data'
+
+FIRST_NAMES = [
+    'محمد', 'أحمد', 'علي', 'عبد الله', 'خالد', 'عمر', 'يوسف', 'إبراهيم', 'مصطفى', 'حسن',
+    'سالم', 'عبد الرحمن', 'فاطمة', 'مريم', 'عائشة', 'خديجة', 'سارة', 'نور', 'أسماء', 'هدى',
+    'آمنة', 'زينب', 'ليلى', 'سلمى', 'منى', 'أنيس', 'وليد', 'سفيان', 'أميرة', 'أميمة',
+]
+FAMILY_NAMES = [
+    'الطرابلسي', 'المصراتي', 'الزنتاني', 'البنغازي', 'الورفلي', 'القذافي', 'الشريف', 'السعيدي',
+    'بن علي', 'التونسي', 'الصفاقسي', 'القيرواني', 'الجربي', 'المنستيري', 'الهمامي', 'الدريدي',
+    'الفيتوري', 'المقريف', 'الككلي', 'بن سعيد', 'العبيدي', 'الترهوني', 'الغرياني', 'الشامي',
+]
+
+# Poids inspirés de la production (la majorité des dossiers sont clôturés)
+VISA_STATUS_WEIGHTS = {
+    'اكتملت العملية': 0.46,
+    'التأشيرة غير موافق عليها': 0.14,
+    'تم التقديم في السيستام': 0.16,
+    'تم التقديم إلى السفارة': 0.15,
+    'تمت الموافقة على التأشيرة': 0.09,
+}
+NATIONALITY_WEIGHTS = {
+    'ليبي': 0.64, 'تونسي': 0.27, 'مصري': 0.025, 'جزائري': 0.02, 'مغربي': 0.015,
+    'سوداني': 0.01, 'سوري': 0.008, 'فلسطيني': 0.006, 'عراقي': 0.003, 'أردني': 0.002, 'لبناني': 0.001,
+}
+# Répartition de charge de type Zipf entre employés
+EMPLOYEE_WEIGHTS = {
+    employee: 1.0 / (rank + 1) ** 1.1 for rank, employee in enumerate(Client.EMPLOYEE_OPTIONS)
+}
+PASSPORT_STATUS_WEIGHTS = {
+    'موجود': 0.62, 'غير موجود': 0.3, 'منتهي الصلاحية': 0.04, 'قيد التجديد': 0.03, 'مفقود': 0.01,
+}
+PROCESSED_BY = ['فيسبوك', 'المكتب', 'صديق', 'واتساب', 'إعلان', '']
+SUMMARIES = ['', '', 'ملف كامل', 'ينقصه كشف حساب', 'موعد السفارة محدد', 'في انتظار الجواز']
+NOTES = ['', '', '', 'اتصل مرتين', 'يرغب في تأشيرة سياحية', 'العميل مستعجل', 'ملاحظة: تم الدفع']
+
+# Colonnes ajoutées par les imports successifs sur la base déployée
+LIVE_EXTRA_COLUMNS = ['has_empty_fields BOOLEAN DEFAULT 0', 'has_errors BOOLEAN DEFAULT 0',
+                      'original_data TEXT'] + [f'excel_col_{i} TEXT' for i in range(13)]
+
+INSERT_COLUMNS = [
+    'client_id', 'full_name', 'whatsapp_number', 'whatsapp_number_clean', 'whatsapp_number_rev', 'application_date',
+    'transaction_date', 'passport_number', 'passport_status', 'passport_status_normalized',
+    'nationality', 'visa_status', 'visa_status_normalized', 'processed_by', 'summary', 'notes',
+    'responsible_employee', 'original_row_number', 'import_timestamp', 'created_at', 'updated_at',
+]
+
+
+def parse_size(size: str) -> int:
+    """Convertir '10k' / '1M' / '2500' en nombre de lignes"""
+    if size in SIZES:
+        return SIZES[size]
+    size = size.strip().lower()
+    if size.endswith('k'):
+        return int(float(size[:-1]) * 1_000)
+    if size.endswith('m'):
+        return int(float(size[:-1]) * 1_000_000)
+    return int(size)
+
+
+class _WeightedChoice:
+    """Tirage pondéré précalculé (plus rapide que random.choices appelé ligne par ligne)"""
+
+    def __init__(self, rng: random.Random, weights: Dict[str, float], pool_size: int = 4096):
+        self.pool = rng.choices(list(weights.keys()), weights=list(weights.values()), k=pool_size)
+        self.rng = rng
+
+    def __call__(self) -> str:
+        return self.pool[self.rng.randrange(len(self.pool))]
+
+
+class ClientGenerator:
+    """Générateur déterministe de clients synthétiques"""
+
+    def __init__(self, seed: int = 42, start_date: Optional[datetime] = None):
+        self.rng = random.Random(seed)
+        self.start_date = start_date or datetime(2023, 1, 1)
+        self._status = _WeightedChoice(self.rng, VISA_STATUS_WEIGHTS)
+        self._nationality = _WeightedChoice(self.rng, NATIONALITY_WEIGHTS)
+        self._employee = _WeightedChoice(self.rng, EMPLOYEE_WEIGHTS)
+        self._passport_status = _WeightedChoice(self.rng, PASSPORT_STATUS_WEIGHTS)
+        # passport_number est UNIQUE dans le schéma: pas de doublon à partir de ~10k lignes
+        self._passports = set()
+
+    def _phone(self, nationality: str) -> str:
+        rng = self.rng
+        if nationality == 'تونسي':
+            local = f"{rng.choice('2459')}{rng.randrange(10**6, 10**7)}"
+            prefix = rng.choice(['+216', '00216', '216', ''])
+        else:
+            local = f"9{rng.choice('1234')}{rng.randrange(10**6, 10**7)}"
+            prefix = rng.choice(['+218', '00218', '218', '0', ''])
+        number = prefix + local
+        if rng.random() < 0.15:
+            number = ' '.join([number[:4], number[4:7], number[7:]])
+        if rng.random() < 0.03:
+            return ''
+        return number
+
+    def _passport(self) -> str:
+        rng = self.rng
+        while True:
+            letters = ''.join(rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ') for _ in range(rng.choice((1, 2))))
+            passport = f'{letters}{rng.randrange(100000, 999999)}'
+            if passport not in self._passports:
+                self._passports.add(passport)
+                return passport
+
+    def generate(self, count: int, start_index: int = 1) -> Iterator[Dict[str, Any]]:
+        """Produire `count` clients sous forme de dictionnaires"""
+        rng = self.rng
+        span_days = 730
+        for index in range(start_index, start_index + count):
+            nationality = self._nationality()
+            status = self._status()
+            passport_status = self._passport_status()
+            application = self.start_date + timedelta(days=rng.randrange(span_days), minutes=rng.randrange(1440))
+            transaction = application + timedelta(days=rng.randrange(1, 60))
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}'
+            phone = self._phone(nationality)
+            phone_clean, phone_rev = phone_columns(phone)
+            timestamp = application.strftime('%Y-%m-%d %H:%M:%S')
+            yield {
+                'client_id': f'CLI{index:04d}',
+                'full_name': name,
+                'whatsapp_number': phone,
+                'whatsapp_number_clean': phone_clean,
+                'whatsapp_number_rev': phone_rev,
+                'application_date': application.strftime('%Y-%m-%d'),
+                'transaction_date': transaction.strftime('%Y-%m-%d'),
+                'passport_number': self._passport(),
+                'passport_status': passport_status,
+                'passport_status_normalized': passport_status,
+                'nationality': nationality,
+                'visa_status': status,
+                'visa_status_normalized': status,
+                'processed_by': rng.choice(PROCESSED_BY),
+                'summary': rng.choice(SUMMARIES),
+                'notes': rng.choice(NOTES),
+                'responsible_employee': self._employee(),
+                'original_row_number': index,
+                'import_timestamp': timestamp,
+                'created_at': timestamp,
+                'updated_at': timestamp,
+            }
+
+
+def _ensure_live_columns(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(clients)')}
+    for definition in LIVE_EXTRA_COLUMNS:
+        if definition.split()[0] not in existing:
+            conn.execute(f'ALTER TABLE clients ADD COLUMN {definition}')
+
+
+def generate_database(db_path: str, count: int, seed: int = 42, live_schema: bool = True,
+                      batch_size: int = 10_000, verbose: bool = True) -> str:
+    """
+    Créer une base SQLite remplie de `count` clients synthétiques.
+
+    Args:
+        db_path: Chemin du fichier à créer (écrasé s'il existe)
+        count: Nombre de clients
+        seed: Graine du générateur (même graine = même base)
+        live_schema: Ajouter les colonnes du schéma déployé (excel_col_*, original_data)
+        batch_size: Taille des lots d'insertion
+
+    Returns:
+        Chemin de la base générée
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    DatabaseManager(db_path)  # crée la table clients avec le schéma applicatif
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        columns = list(INSERT_COLUMNS)
+        if live_schema:
+            _ensure_live_columns(conn)
+            columns += ['original_data'] + [f'excel_col_{i}' for i in range(13)]
+        placeholders = ', '.join('?' * len(columns))
+        query = f"INSERT INTO clients ({', '.join(columns)}) VALUES ({placeholders})"
+
+        generator = ClientGenerator(seed=seed)
+        batch: List[tuple] = []
+        inserted = 0
+        for record in generator.generate(count):
+            values = [record[col] for col in INSERT_COLUMNS]
+            if live_schema:
+                values.append(json.dumps(record, ensure_ascii=False))
+                values.extend([record['full_name'], record['whatsapp_number']] + [None] * 11)
+            batch.append(tuple(values))
+            if len(batch) >= batch_size:
+                conn.executemany(query, batch)
+                inserted += len(batch)
+                batch.clear()
+                if verbose and inserted % (batch_size * 10) == 0:
+                    print(f"   … {inserted:,} clients insérés")
+        if batch:
+            conn.executemany(query, batch)
+            inserted += len(batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if verbose:
+        print(f"✅ {inserted:,} clients générés dans {db_path} en {time.perf_counter() - started:.1f}s")
+    return db_path
+
+
+def dataset_path(size: str, seed: int = 42) -> str:
+    """Chemin de cache d'un jeu de données pour une taille donnée"""
+    return str(DATA_DIR / f'clients_{size}_seed{seed}.db')
+
+
+def ensure_dataset(size: str, seed: int = 42, verbose: bool = True) -> str:
+    """Retourner le chemin d'un jeu de données, en le générant si nécessaire"""
+    path = dataset_path(size, seed)
+    if not os.path.exists(path):
+        try:
+            generate_database(path, parse_size(size), seed=seed, verbose=verbose)
+        except BaseException:
+            # Ne pas laisser une base partielle qui serait réutilisée au prochain lancement
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+    return path
+
+
+def generate_excel(output_path: str, count: int, seed: int = 42) -> str:
+    """Écrire des clients synthétiques dans un classeur avec les en-têtes arabes du fichier réel"""
+    import pandas as pd
+
+    headers = {
+        'client_id': 'معرف العميل', 'full_name': 'الاسم الكامل', 'whatsapp_number': 'رقم الواتساب',
+        'application_date': 'تاريخ التقديم', 'transaction_date': 'تاريخ استلام للسفارة',
+        'passport_number': 'رقم جواز السفر', 'passport_status': 'حالة جواز السفر',
+        'nationality': 'الجنسية', 'visa_status': 'حالة تتبع التأشيرة',
+        'responsible_employee': 'اختيار الموظف', 'processed_by': 'من طرف',
+        'summary': 'الخلاصة', 'notes': 'ملاحظة',
+    }
+    generator = ClientGenerator(seed=seed)
+    rows = [{header: record[field] for field, header in headers.items()} for record in generator.generate(count)]
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    pd.DataFrame(rows).to_excel(output_path, index=False, engine='openpyxl')
+    return output_path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Générer une base de clients synthétiques')
+    parser.add_argument('--size', default='10k', help='1k, 10k, 100k, 1M ou un nombre')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Fichier SQLite de sortie (défaut: benchmarks/.data/)')
+    parser.add_argument('--app-schema', action='store_true',
+                        help='Schéma applicatif seul, sans les colonnes excel_col_*/original_data')
+    parser.add_argument('--excel', help='Écrire aussi un classeur .xlsx de même contenu')
+    args = parser.parse_args(argv)
+
+    count = parse_size(args.size)
+    output = args.output or dataset_path(args.size, args.seed)
+    generate_database(output, count, seed=args.seed, live_schema=not args.app_schema)
+    if args.excel:
+        generate_excel(args.excel, count, seed=args.seed)
+        print(f"✅ Classeur écrit: {args.excel}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
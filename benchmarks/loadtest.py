@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de charge HTTP du système de suivi des visas TCA
+
+Démarre l'application dans le processus sous un serveur WSGI de production
+(waitress, requirements-bench.txt), rejoue un mélange réaliste de requêtes du
+personnel à une concurrence donnée et rapporte p50/p95/p99 et le débit par
+route. Tout fonctionne hors ligne sur une base générée.
+
+Le serveur threadé de werkzeug (serveur de développement) ne sert que sur
+demande explicite (--server werkzeug); le serveur utilisé figure dans chaque
+palier du rapport.
+
+Usage:
+    python -m benchmarks.loadtest --size 10k --concurrency 1,4,8,16 --duration 20
+    python -m benchmarks.loadtest --mix write-heavy --concurrency 8
+    python -m benchmarks.loadtest --mix "list=5,update_field=5" --server werkzeug
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.datagen import ensure_dataset, parse_size, FIRST_NAMES, FAMILY_NAMES
+from models.client import Client
+
+# Mélanges prédéfinis: poids relatifs de chaque action
+MIXES = {
+    # Journée type: beaucoup de consultation, un tableau de bord qui interroge /api/stats
+    'default': {'list': 25, 'filter': 15, 'search': 25, 'update_field': 10,
+                'update_status': 8, 'stats': 12, 'chart_data': 5},
+    'read-heavy': {'list': 35, 'filter': 20, 'search': 30, 'stats': 15},
+    # Campagne de mise à jour: met en évidence le verrou d'écriture SQLite
+    'write-heavy': {'list': 10, 'search': 10, 'update_field': 40, 'update_status': 35, 'stats': 5},
+}
+
+
+class Scenario:
+    """Générateur de requêtes: choisit une action pondérée et construit la requête HTTP"""
+
+    def __init__(self, weights: Dict[str, int], total_clients: int, seed: int = 0):
+        unknown = set(weights) - set(self.actions())
+        if unknown:
+            raise ValueError(f"Actions inconnues: {', '.join(sorted(unknown))}")
+        self.names = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.names]
+        self.total_clients = max(1, total_clients)
+        self.seed = seed
+
+    @staticmethod
+    def actions() -> Dict[str, str]:
+        return {
+            'list': 'GET /clients',
+            'filter': 'GET /clients?status&nationality',
+            'search': 'GET /api/search-instant',
+            'update_field': 'POST /api/client/<id>/update-field',
+            'update_status': 'POST /api/update-status',
+            'stats': 'GET /api/stats',
+            'chart_data': 'GET /api/chart-data',
+        }
+
+    def _client_id(self, rng: random.Random) -> str:
+        return f'CLI{rng.randint(1, self.total_clients):04d}'
+
+    def build(self, rng: random.Random) -> Tuple[str, str, str, Optional[bytes]]:
+        """Retourner (action, méthode, chemin, corps JSON)"""
+        action = rng.choices(self.names, weights=self.weights)[0]
+        pages = max(1, self.total_clients // 50)
+
+        if action == 'list':
+            # Le personnel consulte surtout les premières pages
+            page = min(pages, int(rng.paretovariate(1.2)))
+            return action, 'GET', f'/clients?page={page}', None
+        if action == 'filter':
+            params = {'status': rng.choice(Client.VISA_STATUS_OPTIONS),
+                      'nationality': rng.choice(Client.NATIONALITY_OPTIONS)}
+            return action, 'GET', '/clients?' + urllib.parse.urlencode(params), None
+        if action == 'search':
+            term = rng.choice([rng.choice(FIRST_NAMES), rng.choice(FAMILY_NAMES),
+                               self._client_id(rng), f'{rng.randint(0, 9999):04d}'])
+            return action, 'GET', '/api/search-instant?' + urllib.parse.urlencode({'q': term}), None
+        if action == 'update_field':
+            body = {'field': 'responsible_employee', 'value': rng.choice(Client.EMPLOYEE_OPTIONS)}
+            return action, 'POST', f'/api/client/{self._client_id(rng)}/update-field', json.dumps(body).encode('utf-8')
+        if action == 'update_status':
+            body = {'client_id': self._client_id(rng), 'status': rng.choice(Client.VISA_STATUS_OPTIONS)}
+            return action, 'POST', '/api/update-status', json.dumps(body).encode('utf-8')
+        if action == 'stats':
+            return action, 'GET', '/api/stats', None
+        return action, 'GET', '/api/chart-data', None
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Nom d'un mélange prédéfini ou liste « action=poids,... »"""
+    if value in MIXES:
+        return dict(MIXES[value])
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def load_app(target: str):
+    """Importer l'application WSGI (« module » ou « module:attribut »)"""
+    import importlib
+
+    module_name, _, attribute = target.partition(':')
+    module = importlib.import_module(module_name)
+    app = getattr(module, attribute or 'app')
+    # Aucun envoi réel pendant le test de charge
+    whatsapp = getattr(module, 'whatsapp_controller', None)
+    if whatsapp is not None:
+        whatsapp.disable_whatsapp()
+    return app
+
+
+class ServerThread:
+    """Serveur WSGI exécuté dans un thread du processus courant"""
+
+    def __init__(self, app, host: str = '127.0.0.1', port: int = 0, kind: str = 'waitress', threads: int = 8):
+        """
+        Raises:
+            ImportError: waitress absent (pas de repli silencieux sur le serveur de développement)
+            ValueError: Serveur inconnu
+        """
+        self.kind = kind
+        if kind == 'waitress':
+            from waitress.server import create_server
+            self.server = create_server(app, host=host, port=port, threads=threads)
+            self.port = self.server.effective_port
+            self._serve = self.server.run
+            self._shutdown = self._close_waitress
+        elif kind == 'werkzeug':
+            import logging
+            from werkzeug.serving import make_server
+
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            self.server = make_server(host, port, app, threaded=True)
+            self.port = self.server.server_port
+            self._serve = self.server.serve_forever
+            self._shutdown = self.server.shutdown
+        else:
+            raise ValueError(f'Serveur inconnu: {kind}')
+        self.host = host
+        self._thread = threading.Thread(target=self._serve, name='tca-loadtest-server', daemon=True)
+
+    def _close_waitress(self) -> None:
+        # Threads de requêtes d'abord (une réponse terminée réveille la boucle par son trigger),
+        # puis fermeture des sockets dans le thread de la boucle, jamais pendant son select().
+        # Le trigger exécute ses fonctions sous son verrou: il est fermé après la fin de la boucle
+        server = self.server
+
+        def close_sockets():
+            for dispatcher in list(server._map.values()):
+                if dispatcher is not server.trigger:
+                    dispatcher.close()
+            server._map.clear()
+
+        server.task_dispatcher.shutdown()
+        server.trigger.pull_trigger(close_sockets)
+        self._thread.join(timeout=5)
+        server.trigger.close()
+
+    def start(self) -> 'ServerThread':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        try:
+            self._shutdown()
+        except Exception:
+            pass
+        self._thread.join(timeout=5)
+
+
+class RouteStats:
+    """Latences et codes HTTP collectés pour une action"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        values = sorted(self.latencies)
+        if not values:
+            return {'requests': 0, 'errors': self.errors}
+
+        def percentile(p: float) -> float:
+            index = min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))
+            return round(values[index], 2)
+
+        failed = sum(count for status, count in self.statuses.items() if status >= 500) + self.errors
+        return {
+            'requests': len(values),
+            'throughput_rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'max_ms': round(values[-1], 2),
+            'mean_ms': round(statistics.fmean(values), 2),
+            'errors': failed,
+            'statuses': {str(k): v for k, v in sorted(self.statuses.items())},
+        }
+
+
+def run_load(host: str, port: int, scenario: Scenario, concurrency: int, duration: float,
+             warmup: float = 2.0, think_time: float = 0.0, timeout: float = 30.0) -> Dict[str, Any]:
+    """Boucle fermée: chaque utilisateur virtuel enchaîne les requêtes sur une connexion keep-alive"""
+    stats: Dict[str, RouteStats] = defaultdict(RouteStats)
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    state = {'measure_from': 0.0, 'stop_at': 0.0}
+
+    def worker(index: int) -> None:
+        rng = random.Random(scenario.seed * 1000 + index)
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        local: Dict[str, RouteStats] = defaultdict(RouteStats)
+        start_barrier.wait()
+        while True:
+            now = time.perf_counter()
+            if now >= state['stop_at']:
+                break
+            action, method, path, body = scenario.build(rng)
+            headers = {'Content-Type': 'application/json'} if body else {}
+            started = time.perf_counter()
+            status = None
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except Exception:
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=timeout)
+            latency = (time.perf_counter() - started) * 1000
+            if started >= state['measure_from']:
+                route = local[action]
+                if status is None:
+                    route.errors += 1
+                else:
+                    route.latencies.append(latency)
+                    route.statuses[status] += 1
+            if think_time:
+                time.sleep(rng.expovariate(1.0 / think_time))
+        connection.close()
+        with lock:
+            for action, route in local.items():
+                merged = stats[action]
+                merged.latencies.extend(route.latencies)
+                merged.errors += route.errors
+                for status, count in route.statuses.items():
+                    merged.statuses[status] += count
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    now = time.perf_counter()
+    state['measure_from'] = now + warmup
+    state['stop_at'] = now + warmup + duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    total = RouteStats()
+    for route in stats.values():
+        total.latencies.extend(route.latencies)
+        total.errors += route.errors
+        for status, count in route.statuses.items():
+            total.statuses[status] += count
+
+    return {
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'routes': {action: stats[action].summary(duration) for action in sorted(stats)},
+        'total': total.summary(duration),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    total = result['total']
+    print(f"\n👥 Concurrence {result['concurrency']} ({result.get('server', '?')}) — {total.get('requests', 0):,} requêtes, "
+          f"{total.get('throughput_rps', 0):.1f} req/s, erreurs: {total.get('errors', 0)}")
+    print(f"   {'action':<15}{'req':>8}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'err':>6}")
+    for action, route in list(result['routes'].items()) + [('TOTAL', total)]:
+        if not route.get('requests'):
+            print(f"   {action:<15}{0:>8}{'':>9}{'':>10}{'':>10}{'':>10}{'':>10}{route.get('errors', 0):>6}")
+            continue
+        print(f"   {action:<15}{route['requests']:>8}{route['throughput_rps']:>9.1f}"
+              f"{route['p50_ms']:>10.1f}{route['p95_ms']:>10.1f}{route['p99_ms']:>10.1f}"
+              f"{route['max_ms']:>10.1f}{route['errors']:>6}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Test de charge HTTP TCA (hors ligne)')
+    parser.add_argument('--size', default='10k', help='Taille du jeu de données: 1k, 10k, 100k, 1M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--app', default='app', help="Application WSGI (« app » ou « module:attribut »)")
+    parser.add_argument('--server', choices=['waitress', 'werkzeug'], default='waitress',
+                        help='werkzeug: serveur de développement, percentiles non représentatifs de la production')
+    parser.add_argument('--server-threads', type=int, default=16, help='Threads du serveur waitress')
+    parser.add_argument('--mix', default='default',
+                        help=f"Mélange: {', '.join(MIXES)} ou « action=poids,... » "
+                             f"(actions: {', '.join(Scenario.actions())})")
+    parser.add_argument('--concurrency', default='1,4,8',
+                        help='Utilisateurs virtuels; plusieurs valeurs séparées par des virgules')
+    parser.add_argument('--duration', type=float, default=15.0, help='Durée mesurée par palier (s)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Échauffement non mesuré par palier (s)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Pause moyenne entre requêtes (s)')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args(argv)
+
+    total_clients = parse_size(args.size)
+    levels = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    scenario = Scenario(parse_mix(args.mix), total_clients, seed=args.seed)
+
+    # Copie de travail: les écritures du test ne touchent pas le jeu de données en cache
+    workdir = tempfile.mkdtemp(prefix='tca_load_')
+    db_path = os.path.join(workdir, 'clients.db')
+    shutil.copyfile(ensure_dataset(args.size, seed=args.seed), db_path)
+    os.environ['TCA_DB_PATH'] = db_path
+
+    app = load_app(args.app)
+    try:
+        server = ServerThread(app, kind=args.server, threads=args.server_threads).start()
+    except ImportError:
+        print("❌ waitress absent: pip install -r requirements-bench.txt "
+              "(ou --server werkzeug, serveur de développement)")
+        shutil.rmtree(workdir, ignore_errors=True)
+        return 1
+    print(f"🚀 {args.app} servi par {server.kind} sur http://{server.host}:{server.port} "
+          f"({total_clients:,} clients, mélange {args.mix})")
+
+    results = []
+    try:
+        for concurrency in levels:
+            result = run_load(server.host, server.port, scenario, concurrency, args.duration,
+                              warmup=args.warmup, think_time=args.think_time)
+            result['server'] = server.kind
+            print_report(result)
+            results.append(result)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        report = {
+            'meta': {
+                'size': args.size,
+                'app': args.app,
+                'server': server.kind,
+                'mix': scenario.names and dict(zip(scenario.names, scenario.weights)),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+            },
+            'levels': results,
+        }
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Résultats: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
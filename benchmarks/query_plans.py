@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Contrôle des plans d'exécution des requêtes chaudes de DatabaseManager
+
+Les requêtes chaudes (database/query_plans.py) sont exécutées sur une copie
+du jeu de données synthétique, statistiques de l'optimiseur à jour (ANALYZE,
+comme la base déployée). La commande échoue (code 1) si un plan parcourt
+toute une table ou trie toutes les lignes sans que la requête le tolère, par
+exemple après la suppression d'un index ou une réécriture de requête.
+run_benchmarks exécute le même contrôle (groupe plans.) et échoue de même.
+
+Usage:
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --size 100k --verbose
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from typing import List, Optional
+
+from benchmarks.datagen import ensure_dataset
+
+from database.database_manager import DatabaseManager
+from database.query_plans import capture_plans, check_plans, index_report, print_index_report, print_plans
+
+
+def run_plan_check(source_db: str, verbose: bool = False) -> List[str]:
+    """
+    Expliquer les requêtes chaudes sur une copie de `source_db` (ANALYZE à jour)
+
+    Returns:
+        Régressions de plan (liste vide si tous les plans sont conformes)
+    """
+    workdir = tempfile.mkdtemp(prefix='tca_plans_')
+    db_path = os.path.join(workdir, 'clients.db')
+    shutil.copyfile(source_db, db_path)
+    # TCA_DB_PATH primerait sur le chemin de la copie
+    explicit_path = os.environ.pop('TCA_DB_PATH', None)
+    try:
+        manager = DatabaseManager(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute('ANALYZE')
+            conn.commit()
+        finally:
+            conn.close()
+
+        plans = capture_plans(manager)
+        regressions = check_plans(plans)
+        statements = sum(len(query_plans) for query_plans in plans.values())
+        print(f"🔎 {len(plans)} requêtes chaudes, {statements} instructions expliquées")
+        if verbose:
+            print_plans(plans)
+            conn = sqlite3.connect(db_path)
+            try:
+                print_index_report(index_report(conn, plans))
+            finally:
+                conn.close()
+    finally:
+        if explicit_path is not None:
+            os.environ['TCA_DB_PATH'] = explicit_path
+        shutil.rmtree(workdir, ignore_errors=True)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Plans des requêtes chaudes TCA')
+    parser.add_argument('--size', default='10k', help='Jeu de données (1k, 10k, 100k, 1M)')
+    parser.add_argument('--verbose', action='store_true', help='Afficher les plans et le rapport des index')
+    args = parser.parse_args(argv)
+
+    regressions = run_plan_check(ensure_dataset(args.size, verbose=False), verbose=args.verbose)
+    if regressions:
+        for regression in regressions:
+            print(f"❌ {regression}")
+        return 1
+    print("✅ Plans des requêtes chaudes conformes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,703 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks reproductible
+
+Mesure les chemins critiques sur un jeu de données synthétique:
+- DatabaseManager: pages profondes, recherche, filtres, statistiques
+- Lignes des listes: SELECT * en dict contre projections ClientRow (temps et mémoire)
+- AnalyticsService.get_comprehensive_analysis
+- Index de recherche instantanée en mémoire (temps et mémoire)
+- Détection des doublons (complète et incrémentale)
+- Sauvegardes (complète, incrémentale) et restauration
+- Import / export Excel, import CSV/Parquet par lots, profil du fichier (exact ou échantillonné)
+- Toutes les API JSON de app.py (client de test Flask)
+- Archivage: chemins des dossiers actifs avec 90% des dossiers archivés, contre
+  la même base non archivée, et lectures sur les deux tiers
+
+Les résultats sont écrits en JSON; comparés à une baseline, toute régression
+au-delà de la tolérance fait échouer la commande (code de sortie 1), de même
+qu'un plan d'exécution de requête chaude non conforme (groupe plans., voir
+benchmarks/query_plans.py) ou un benchmark en erreur; --save-baseline
+n'enregistre rien tant qu'un benchmark est en erreur.
+Les baselines versionnées (benchmarks/baselines/<taille>.json, 1k et 10k) sont
+mesurées sur une seule machine, dont le champ meta garde la trace; sur une autre
+machine, enregistrer d'abord sa propre baseline, ou élargir --tolerance si
+l'hôte est bruité.
+
+Usage:
+    python -m benchmarks.run_benchmarks --size 10k
+    python -m benchmarks.run_benchmarks --size 10k --save-baseline
+    python -m benchmarks.run_benchmarks --size 10k --only db. --repeat 10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import ROOT_DIR
+from benchmarks.datagen import ensure_dataset, generate_excel, parse_size
+
+BASELINE_DIR = ROOT_DIR / 'benchmarks' / 'baselines'
+RESULTS_DIR = ROOT_DIR / 'benchmarks' / 'results'
+
+
+class Benchmark:
+    """Un cas de benchmark: fonction mesurée, préparation non mesurée, nombre de répétitions"""
+
+    def __init__(self, name: str, func: Callable[[], Any], setup: Optional[Callable[[], None]] = None,
+                 repeat: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.repeat = repeat
+
+
+def measure(benchmark: Benchmark, repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Exécuter un benchmark et retourner les statistiques en millisecondes"""
+    repeat = benchmark.repeat or repeat
+    timings = []
+    # Les messages du code mesuré restent inclus dans le temps, mais hors du rapport
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(warmup):
+            if benchmark.setup:
+                benchmark.setup()
+            benchmark.func()
+
+        for _ in range(repeat):
+            if benchmark.setup:
+                benchmark.setup()
+            start = time.perf_counter()
+            benchmark.func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95_index = min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))
+    return {
+        'repeat': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p95_ms': round(timings[p95_index], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def build_database_benchmarks(db_path: str, total: int) -> List[Benchmark]:
+    import sqlite3
+
+    from database.database_manager import DatabaseManager
+
+    db = DatabaseManager(db_path)
+    per_page = 50
+    last_page = max(1, (total + per_page - 1) // per_page)
+    # Numéro existant au format national: un terme sans correspondance indexée repasserait aux LIKE
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT whatsapp_number FROM clients WHERE whatsapp_number LIKE '09%' "
+                           "ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    national_number = row[0] if row else '0912345678'
+    return [
+        Benchmark('db.get_all_clients.first_page', lambda: db.get_all_clients(1, per_page)),
+        Benchmark('db.get_all_clients.middle_page', lambda: db.get_all_clients(max(1, last_page // 2), per_page)),
+        Benchmark('db.get_all_clients.deep_page', lambda: db.get_all_clients(last_page, per_page)),
+        Benchmark('db.get_all_clients.per_page_10000', lambda: db.get_all_clients(1, 10000), repeat=3),
+        Benchmark('db.search_clients.common_name', lambda: db.search_clients('محمد', 1, 20)),
+        Benchmark('db.search_clients.client_id', lambda: db.search_clients(f'CLI{total // 2:04d}', 1, 20)),
+        Benchmark('db.search_clients.phone_suffix', lambda: db.search_clients('4567', 1, 20)),
+        Benchmark('db.search_clients.phone_last7', lambda: db.search_clients(national_number[-7:], 1, 20)),
+        Benchmark('db.search_clients.phone_national', lambda: db.search_clients(national_number, 1, 20)),
+        Benchmark('db.search_clients.no_match', lambda: db.search_clients('zzzz-introuvable', 1, 20)),
+        Benchmark('db.get_filtered_clients.status_nationality', lambda: db.get_filtered_clients(
+            {'visa_status': 'تم التقديم إلى السفارة', 'nationality': 'تونسي'}, 1, per_page)),
+        Benchmark('db.get_filtered_clients.employee_deep_page', lambda: db.get_filtered_clients(
+            {'responsible_employee': 'اميرة'}, 20, per_page)),
+        Benchmark('db.get_client_by_id', lambda: db.get_client_by_id(f'CLI{total // 3:04d}')),
+        Benchmark('db.is_passport_number_unique', lambda: db.is_passport_number_unique('AB123456')),
+        Benchmark('db.get_statistics', lambda: db.get_statistics()),
+    ]
+
+
+def build_row_benchmarks(db_path: str) -> List[Benchmark]:
+    """Lignes des listes: SELECT * copié en dict (ancien chemin) contre projections par vue en ClientRow"""
+    import tracemalloc
+    from database.database_manager import DatabaseManager
+
+    db = DatabaseManager(db_path)
+    rows = 10000
+
+    def full_dicts():
+        return [dict(client) for client in db.get_all_clients(1, rows)[0]]
+
+    def view(name: str) -> Callable[[], Any]:
+        return lambda: db.get_all_clients(1, rows, view=name)[0]
+
+    loaders = [('SELECT * + dict', full_dicts)] + [(f"vue {name}", view(name)) for name in ('list', 'analytics', 'search')]
+    sizes = []
+    for label, loader in loaders:
+        tracemalloc.start()
+        loaded = loader()
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sizes.append(f"{label} {allocated / (1024 * 1024):.1f} Mo")
+        del loaded
+    print(f"   🧠 {rows:,} lignes: " + ', '.join(sizes))
+
+    return [
+        Benchmark('rows.full_dict_10k', full_dicts),
+        Benchmark('rows.list_view_10k', view('list')),
+        Benchmark('rows.analytics_view_10k', view('analytics')),
+        Benchmark('rows.search_view_10k', view('search')),
+    ]
+
+
+def build_analytics_benchmarks(db_path: str) -> List[Benchmark]:
+    from database.database_manager import DatabaseManager
+    from services.analytics_service import AnalyticsService
+
+    service = AnalyticsService(DatabaseManager(db_path))
+    return [
+        Benchmark('analytics.get_comprehensive_analysis', service.get_comprehensive_analysis, repeat=3),
+    ]
+
+
+def build_campaign_benchmarks(db_path: str) -> List[Benchmark]:
+    """Campagnes WhatsApp: sélection du segment, rendu des modèles et dédoublonnage (dry run CSV)"""
+    import io
+    from database.database_manager import DatabaseManager
+    from services.whatsapp_campaign import WhatsAppCampaign
+
+    campaign = WhatsAppCampaign(DatabaseManager(db_path))
+
+    def dry_run(segment: Dict[str, List[str]], message: Optional[str] = None) -> Callable[[], Any]:
+        return lambda: campaign.dry_run(segment, io.StringIO(), message=message)
+
+    return [
+        Benchmark('campaign.dry_run.status_segment', dry_run({'visa_status': ['تم التقديم إلى السفارة']})),
+        Benchmark('campaign.dry_run.custom_message', dry_run(
+            {'visa_status': ['تم التقديم إلى السفارة'], 'nationality': ['ليبي', 'تونسي']},
+            'مرحبا {client_name}، ملفكم {client_id}: {status}')),
+    ]
+
+
+def build_search_benchmarks(db_path: str, total: int) -> List[Benchmark]:
+    """Index de recherche instantanée en mémoire: construction, requêtes et mémoire occupée"""
+    import tracemalloc
+    from database.database_manager import DatabaseManager
+    from utils.search_index import ClientSearchIndex
+
+    index = ClientSearchIndex(DatabaseManager(db_path))
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        index.build()
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    per_100k = allocated / max(1, total) * 100_000 / (1024 * 1024)
+    print(f"   🧠 index de recherche: {allocated / (1024 * 1024):.1f} Mo pour {total:,} clients "
+          f"({per_100k:.1f} Mo / 100k clients)")
+
+    def query(term: str) -> Callable[[], Any]:
+        return lambda: index.search(term, limit=20)
+
+    return [
+        Benchmark('search.index.build', lambda: index.build(), repeat=3),
+        Benchmark('search.index.common_name', query('محمد')),
+        Benchmark('search.index.client_id', query(f'CLI{total // 2:04d}')),
+        Benchmark('search.index.two_chars', query('مح')),
+        Benchmark('search.index.phone_last7', query('1234567')),
+        Benchmark('search.index.phone_national', query('0912345678')),
+        Benchmark('search.index.no_match', query('zzzz-introuvable')),
+    ]
+
+
+def build_dedupe_benchmarks(db_path: str, total: int) -> List[Benchmark]:
+    """Détection des doublons: toute la base (blocage) et mode incrémental (lignes d'un import)"""
+    from database.database_manager import DatabaseManager
+    from services.dedupe_service import DuplicateFinder
+
+    finder = DuplicateFinder(DatabaseManager(db_path))
+    recent_ids = [f'CLI{index:04d}' for index in range(max(1, total - 199), total + 1)]
+    return [
+        Benchmark('dedupe.full_scan', lambda: finder.find_duplicates(), repeat=3),
+        Benchmark('dedupe.incremental_200', lambda: finder.find_duplicates(recent_ids)),
+    ]
+
+
+def build_backup_benchmarks(workdir: str, db_path: str) -> List[Benchmark]:
+    """Sauvegardes: complète, incrémentale après 100 modifications, restauration de la dernière"""
+    import sqlite3
+    from database.backup_manager import BackupManager
+
+    source = os.path.join(workdir, 'backup_source.db')
+    shutil.copyfile(db_path, source)
+    manager = BackupManager(source, os.path.join(workdir, 'backups'))
+    restored = os.path.join(workdir, 'restored.db')
+    counter = [0]
+
+    def modify_clients():
+        counter[0] += 1
+        conn = sqlite3.connect(source)
+        conn.execute("UPDATE clients SET notes = ? WHERE id IN (SELECT id FROM clients ORDER BY RANDOM() LIMIT 100)",
+                     (f'bench {counter[0]}',))
+        conn.commit()
+        conn.close()
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        full = manager.backup(full=True)
+        modify_clients()
+        delta = manager.backup()
+    database_mb = full['page_size'] * full['page_count'] / (1024 * 1024)
+    print(f"   🗜️ base {database_mb:.1f} Mo, complète {full['bytes'] / (1024 * 1024):.1f} Mo ({full['codec']}), "
+          f"incrémentale (100 clients modifiés) {delta['pages_written']} pages / {delta['bytes'] / 1024:.0f} Ko")
+
+    return [
+        Benchmark('backup.full', lambda: manager.backup(full=True), repeat=3),
+        Benchmark('backup.incremental_100_updates', lambda: manager.backup(), setup=modify_clients),
+        Benchmark('backup.restore_latest', lambda: manager.restore(output=restored), repeat=3),
+    ]
+
+
+def build_excel_benchmarks(workdir: str, db_path: str, total: int) -> List[Benchmark]:
+    import sqlite3
+    import pandas as pd
+    from database.database_manager import DatabaseManager
+    from utils.advanced_excel_analyzer import AdvancedExcelAnalyzer
+    from utils.excel_handler import ExcelHandler
+    from utils.import_sources import read_import_frame
+    from utils.value_normalizer import OptionNormalizer
+    from models.client import Client, ClientValidator
+    from utils.unrestricted_importer import UnrestrictedImporter
+    from controllers.client_controller import ClientController
+
+    handler = ExcelHandler()
+    excel_rows = min(total, 5000)
+    source_xlsx = os.path.join(workdir, f'import_{excel_rows}.xlsx')
+    generate_excel(source_xlsx, excel_rows)
+
+    db = DatabaseManager(db_path)
+    export_rows = [dict(row) for row in db.get_all_clients(1, min(total, 10000))[0]]
+    export_path = os.path.join(workdir, 'export.xlsx')
+
+    import_db = os.path.join(workdir, 'import_target.db')
+
+    def reset_import_db():
+        # Base vide à chaque itération: l'import mesure des insertions, pas des conflits
+        if os.path.exists(import_db):
+            os.remove(import_db)
+        DatabaseManager(import_db)
+
+    def unrestricted_import():
+        UnrestrictedImporter(import_db).perform_unrestricted_import(source_xlsx)
+
+    # Même fichier en CSV (et Parquet si pyarrow est installé): lecture par morceaux + insertions groupées
+    sources = {'xlsx': source_xlsx}
+    sources['csv'] = os.path.join(workdir, f'import_{excel_rows}.csv')
+    source_frame = pd.read_excel(source_xlsx, dtype=str)
+    source_frame.to_csv(sources['csv'], index=False)
+    try:
+        import pyarrow  # noqa: F401
+        sources['parquet'] = os.path.join(workdir, f'import_{excel_rows}.parquet')
+        source_frame.to_parquet(sources['parquet'], index=False)
+    except ImportError:  # environnement installé sans requirements.txt
+        print("⏭️  pyarrow absent: benchmarks Parquet ignorés")
+
+    def batch_import(path):
+        controller = ClientController(DatabaseManager(import_db))
+        return controller.import_client_batches(handler.iter_client_batches(path))
+
+    # Profil d'un DataFrame déjà chargé: exact contre échantillon + HyperLogLog
+    frame_rows = min(total, 100000)
+    conn = sqlite3.connect(db_path)
+    frame = pd.read_sql_query(f"SELECT {', '.join(DatabaseManager.VIEW_COLUMNS['export'])} FROM clients LIMIT {frame_rows}",
+                              conn)
+    conn.close()
+
+    def raw_import():
+        result = handler.import_clients_raw(source_xlsx)
+        return ClientController(DatabaseManager(import_db)).import_clients_raw(result['clients'])
+
+    # Colonnes à options de l'import brut: boucle par ligne (ancienne route) contre normalisation par colonne
+    norm_rows = 50000
+    option_fields = list(ExcelHandler.RAW_IMPORT_OPTIONS)
+    option_frame = frame[option_fields].fillna('')
+    option_frame = pd.concat([option_frame] * -(-norm_rows // max(1, len(option_frame))),
+                             ignore_index=True).head(norm_rows)
+    option_rows = option_frame.to_dict('records')
+    option_columns = {field: option_frame[field].tolist() for field in option_fields}
+
+    def normalize_rows_legacy():
+        normalized = []
+        for row_data in option_rows:
+            def safe_str(value):
+                if pd.isna(value) or value is None:
+                    return ''
+                return str(value).strip()
+
+            def normalize_value(value, valid_options, default):
+                if not value or value == '':
+                    return default
+                for option in valid_options:
+                    if value == option or option in value or value in option:
+                        return option
+                return default
+
+            normalized.append({field: normalize_value(safe_str(row_data.get(field)), options, default)
+                               for field, (options, default) in ExcelHandler.RAW_IMPORT_OPTIONS.items()})
+        return normalized
+
+    def normalize_columns():
+        # Normaliseurs neufs: mesure sans le cache des exécutions précédentes
+        return {field: OptionNormalizer(options, default).normalize_column(option_columns[field])
+                for field, (options, default) in ExcelHandler.RAW_IMPORT_OPTIONS.items()}
+
+    # Validation d'un lot: Client + requête de passeport par ligne contre validation en colonnes
+    validate_records = frame.head(10000).to_dict('records')
+
+    def validate_rows():
+        errors = 0
+        for record in validate_records:
+            errors += bool(Client.from_dict(record).validate())
+            errors += not db.is_passport_number_unique(record['passport_number'] or '')
+        return errors
+
+    benchmarks = [
+        Benchmark(f'excel.validate_bulk.rows.{len(validate_records)}_rows', validate_rows, repeat=3),
+        Benchmark(f'excel.validate_bulk.columns.{len(validate_records)}_rows',
+                  lambda: ClientValidator.validate_bulk_data(validate_records, db_manager=db), repeat=3),
+        Benchmark(f'excel.normalize_options.rows.{norm_rows}_rows', normalize_rows_legacy, repeat=3),
+        Benchmark(f'excel.normalize_options.columns.{norm_rows}_rows', normalize_columns, repeat=3),
+        Benchmark(f'excel.raw_import.{excel_rows}_rows', raw_import, setup=reset_import_db, repeat=1),
+        Benchmark(f'excel.export_to_excel.{len(export_rows)}_rows',
+                  lambda: handler.export_to_excel(export_rows, export_path), repeat=3),
+        Benchmark(f'excel.read_and_extract.{excel_rows}_rows',
+                  lambda: handler.extract_client_data(source_xlsx), repeat=3),
+        Benchmark(f'excel.unrestricted_import.{excel_rows}_rows', unrestricted_import,
+                  setup=reset_import_db, repeat=1),
+    ]
+    for kind, path in sources.items():
+        benchmarks += [
+            Benchmark(f'excel.read_import_frame.{kind}.{excel_rows}_rows',
+                      lambda path=path: read_import_frame(path), repeat=3),
+            Benchmark(f'excel.batch_import.{kind}.{excel_rows}_rows',
+                      lambda path=path: batch_import(path), setup=reset_import_db, repeat=1),
+        ]
+    return benchmarks + [
+        Benchmark(f'excel.analyze_frame.full.{frame_rows}_rows',
+                  lambda: AdvancedExcelAnalyzer().analyze_frame(frame, db_path, mode='full'), repeat=3),
+        Benchmark(f'excel.analyze_frame.sample.{frame_rows}_rows',
+                  lambda: AdvancedExcelAnalyzer().analyze_frame(frame, db_path, mode='sample'), repeat=3),
+    ]
+
+
+def build_api_benchmarks(db_path: str, total: int) -> List[Benchmark]:
+    """Toutes les API JSON de app.py, exécutées via le client de test Flask"""
+    os.environ['TCA_DB_PATH'] = db_path
+    # /metrics n'est exposé qu'avec METRICS_ENABLED et un jeton
+    metrics_token = os.environ.setdefault('METRICS_TOKEN', 'benchmark')
+    os.environ['METRICS_ENABLED'] = '1'
+    import app as app_module
+    from utils.cache_manager import cache_manager
+
+    client = app_module.app.test_client()
+    # /api/search-instant mesuré sur l'index en mémoire, pas sur le repli SQL
+    if app_module.search_index.client_search_index is not None:
+        app_module.search_index.client_search_index.wait_ready()
+    sample_id = f'CLI{max(1, total // 4):04d}'
+    statuses = app_module.Client.VISA_STATUS_OPTIONS
+    toggle = {'index': 0}
+
+    def get(url: str, headers: Optional[Dict[str, str]] = None) -> Callable[[], Any]:
+        def call():
+            response = client.get(url, headers=headers)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{url} -> {response.status_code}')
+        return call
+
+    def post(url: str, payload_factory: Callable[[], Dict[str, Any]]) -> Callable[[], Any]:
+        def call():
+            response = client.post(url, json=payload_factory())
+            if response.status_code >= 500:
+                raise RuntimeError(f'{url} -> {response.status_code}')
+        return call
+
+    def next_status() -> Dict[str, Any]:
+        toggle['index'] += 1
+        return {'client_id': sample_id, 'status': statuses[toggle['index'] % len(statuses)]}
+
+    def next_field() -> Dict[str, Any]:
+        toggle['index'] += 1
+        return {'field': 'responsible_employee',
+                'value': app_module.Client.EMPLOYEE_OPTIONS[toggle['index'] % len(app_module.Client.EMPLOYEE_OPTIONS)]}
+
+    cold_cache = cache_manager.clear
+    heavy = 3 if total > 10000 else None
+    return [
+        Benchmark('api.health', get('/health')),
+        Benchmark('api.clients.all', get('/api/clients/all'), repeat=heavy),
+        Benchmark('api.clients.complete', get('/api/clients/complete'), repeat=heavy),
+        Benchmark('api.clients.query.first_page', get('/api/clients/query?limit=100&facets=1')),
+        Benchmark('api.clients.query.deep_offset', get(f'/api/clients/query?limit=100&total=0&offset={max(0, total - 100)}')),
+        # Pages HTML: rendu complet (cold) puis fragments servis depuis le cache (warm)
+        Benchmark('api.page.index.cold', get('/'), setup=cold_cache, repeat=heavy),
+        Benchmark('api.page.index.warm', get('/')),
+        Benchmark('api.page.clients.cold', get('/clients?per_page=100'), setup=cold_cache, repeat=heavy),
+        Benchmark('api.page.clients.warm', get('/clients?per_page=100')),
+        Benchmark('api.search_instant', get('/api/search-instant?q=%D9%85%D8%AD%D9%85%D8%AF')),
+        Benchmark('api.stats.cold', get('/api/stats'), setup=cold_cache, repeat=heavy),
+        Benchmark('api.stats.warm', get('/api/stats')),
+        Benchmark('api.chart_data.cold', get('/api/chart-data'), setup=cold_cache, repeat=heavy),
+        Benchmark('api.analytics.comprehensive', get('/api/analytics/comprehensive'), repeat=3),
+        Benchmark('api.analytics.executive_report', get('/api/analytics/executive-report'), repeat=3),
+        Benchmark('api.analytics.operational_dashboard', get('/api/analytics/operational-dashboard'), repeat=3),
+        Benchmark('api.analytics.real_time_stats', get('/api/analytics/real-time-stats'), repeat=3),
+        Benchmark('api.analytics.chart_data.status', get('/api/analytics/chart-data/status_distribution'), repeat=3),
+        Benchmark('api.analytics.export.comprehensive', get('/api/analytics/export/comprehensive'), repeat=3),
+        Benchmark('api.check_passport_unique', post('/api/check-passport-unique',
+                                                    lambda: {'passport_number': 'AB123456'})),
+        Benchmark('api.update_status', post('/api/update-status', next_status)),
+        Benchmark('api.update_field', post(f'/api/client/{sample_id}/update-field', next_field)),
+        Benchmark('api.metrics', get('/metrics', {'X-Metrics-Token': metrics_token})),
+    ]
+
+
+def build_archive_benchmarks(workdir: str, db_path: str, total: int) -> List[Benchmark]:
+    """
+    Même base, 90% des dossiers clos: sans archivage (flat) et archivés (tiered)
+
+    Les chemins des dossiers actifs (/clients, tableau de bord) lisent la table
+    clients (tier 'hot'); recherche et consultation paginée lisent les deux tiers.
+    """
+    import sqlite3
+
+    from database.archive import CLOSED_STATUSES, archive_closed_clients
+    from database.database_manager import DatabaseManager
+
+    managers = {}
+    # TCA_DB_PATH (posé par le groupe api.) primerait sur les chemins des deux copies
+    explicit_path = os.environ.pop('TCA_DB_PATH', None)
+    for kind in ('flat', 'tiered'):
+        path = os.path.join(workdir, f'archive_{kind}.db')
+        shutil.copyfile(db_path, path)
+        manager = DatabaseManager(path)
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.execute("UPDATE clients SET visa_status = CASE WHEN id % 2 THEN ? ELSE ? END, "
+                         "updated_at = '2020-01-01T00:00:00' WHERE id % 10 != 0", CLOSED_STATUSES)
+            if kind == 'tiered':
+                archive_closed_clients(conn)
+            conn.execute('ANALYZE')
+        finally:
+            conn.close()
+        managers[kind] = manager
+    if explicit_path is not None:
+        os.environ['TCA_DB_PATH'] = explicit_path
+
+    conn = sqlite3.connect(managers['tiered'].db_path)
+    try:
+        active_status = conn.execute(
+            f"SELECT visa_status FROM clients WHERE visa_status NOT IN ({', '.join('?' * len(CLOSED_STATUSES))}) "
+            "GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1", CLOSED_STATUSES).fetchone()[0]
+        # Numéro d'un dossier archivé: la recherche par fin de numéro le trouve via les deux tiers
+        archived_phone = conn.execute('SELECT whatsapp_number FROM clients_archive ORDER BY id LIMIT 1').fetchone()[0]
+    finally:
+        conn.close()
+
+    def dashboard(db) -> Callable[[], Any]:
+        # Mêmes lectures que app._compute_dashboard_stats
+        def call():
+            db.get_all_clients(1, 5, view='list', tier='hot')
+            db.get_client_facets(tier='hot')
+        return call
+
+    benchmarks = []
+    for kind, db in managers.items():
+        hot_total = db.get_all_clients(1, 1, view='list', tier='hot')[1]
+        last_page = max(1, (hot_total + 49) // 50)
+        benchmarks += [
+            Benchmark(f'archive.{kind}.list.first_page', lambda db=db: db.get_all_clients(1, 50, view='list', tier='hot')),
+            Benchmark(f'archive.{kind}.list.last_page',
+                      lambda db=db, page=last_page: db.get_all_clients(page, 50, view='list', tier='hot')),
+            Benchmark(f'archive.{kind}.list.filter_active_status', lambda db=db: db.get_filtered_clients(
+                {'visa_status': active_status}, 1, 50, view='list', tier='hot')),
+            Benchmark(f'archive.{kind}.dashboard', dashboard(db)),
+            Benchmark(f'archive.{kind}.statistics', lambda db=db: db.get_statistics(tier='hot')),
+            Benchmark(f'archive.{kind}.all.search_client_id',
+                      lambda db=db: db.search_clients(f'CLI{total // 2:04d}', 1, 20, view='list')),
+            Benchmark(f'archive.{kind}.all.search_phone', lambda db=db: db.search_clients(archived_phone[-7:], 1, 20, view='list')),
+            Benchmark(f'archive.{kind}.all.query_first_page', lambda db=db: db.query_clients(limit=100, with_total=True)),
+            Benchmark(f'archive.{kind}.all.statistics', lambda db=db: db.get_statistics(), repeat=3),
+        ]
+    return benchmarks
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                          min_delta_ms: float) -> List[str]:
+    """Retourner la liste des régressions (médiane au-delà de la tolérance)"""
+    regressions = []
+    for name, current in results['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or 'median_ms' not in current:
+            continue
+        allowed = reference['median_ms'] * (1 + tolerance)
+        delta = current['median_ms'] - reference['median_ms']
+        if current['median_ms'] > allowed and delta > min_delta_ms:
+            regressions.append(
+                f"{name}: {reference['median_ms']:.2f} ms -> {current['median_ms']:.2f} ms "
+                f"(+{delta / reference['median_ms'] * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks de performance TCA')
+    parser.add_argument('--size', default='10k', help='Taille du jeu de données: 1k, 10k, 100k, 1M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', action='append', default=[],
+                        help='Préfixe de benchmarks à exécuter (plans., db., rows., analytics., campaign., search., dedupe., backup., '
+                             'excel., api., archive.)')
+    parser.add_argument('--skip', action='append', default=[], help='Préfixe de benchmarks à ignorer')
+    parser.add_argument('--output', help='Fichier JSON de résultats (défaut: benchmarks/results/)')
+    parser.add_argument('--baseline', help='Baseline JSON (défaut: benchmarks/baselines/<size>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer les résultats comme baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Régression tolérée (0.25 = +25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Écart absolu minimal pour signaler une régression')
+    args = parser.parse_args(argv)
+
+    total = parse_size(args.size)
+    print(f"🏁 Benchmarks TCA — jeu de données {args.size} ({total:,} clients)")
+    source_db = ensure_dataset(args.size, seed=args.seed)
+
+    workdir = tempfile.mkdtemp(prefix='tca_bench_')
+    # Copie de travail: les API d'écriture ne doivent pas modifier le jeu de données en cache
+    db_path = os.path.join(workdir, 'clients.db')
+    shutil.copyfile(source_db, db_path)
+
+    def selected(name: str) -> bool:
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            return False
+        return not any(name.startswith(prefix) for prefix in args.skip)
+
+    def group_selected(prefix: str) -> bool:
+        if args.only and not any(p.startswith(prefix) or prefix.startswith(p) for p in args.only):
+            return False
+        return not any(prefix.startswith(p) for p in args.skip)
+
+    groups = [
+        ('db.', lambda: build_database_benchmarks(db_path, total)),
+        ('rows.', lambda: build_row_benchmarks(db_path)),
+        ('analytics.', lambda: build_analytics_benchmarks(db_path)),
+        ('campaign.', lambda: build_campaign_benchmarks(db_path)),
+        ('search.', lambda: build_search_benchmarks(db_path, total)),
+        ('dedupe.', lambda: build_dedupe_benchmarks(db_path, total)),
+        ('backup.', lambda: build_backup_benchmarks(workdir, db_path)),
+        ('excel.', lambda: build_excel_benchmarks(workdir, db_path, total)),
+        ('api.', lambda: build_api_benchmarks(db_path, total)),
+        ('archive.', lambda: build_archive_benchmarks(workdir, db_path, total)),
+    ]
+
+    results: Dict[str, Any] = {
+        'meta': {
+            'size': args.size,
+            'rows': total,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'git_revision': _git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': {},
+    }
+
+    plan_regressions: List[str] = []
+    if group_selected('plans.'):
+        from benchmarks.query_plans import run_plan_check
+
+        # Avant le groupe api. (qui fixe TCA_DB_PATH): plans de la base de référence
+        plan_regressions = run_plan_check(source_db)
+        results['plan_regressions'] = plan_regressions
+        for regression in plan_regressions:
+            print(f"   plans.                                           ❌ {regression}")
+
+    errored = []
+    try:
+        for prefix, factory in groups:
+            if not group_selected(prefix):
+                continue
+            for benchmark in factory():
+                if not selected(benchmark.name):
+                    continue
+                try:
+                    stats = measure(benchmark, args.repeat)
+                    print(f"   {benchmark.name:<48} médiane {stats['median_ms']:>10.2f} ms   p95 {stats['p95_ms']:>10.2f} ms")
+                except Exception as e:
+                    stats = {'error': str(e)}
+                    errored.append(benchmark.name)
+                    print(f"   {benchmark.name:<48} ❌ {e}")
+                results['results'][benchmark.name] = stats
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or str(RESULTS_DIR / f"{args.size}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats: {output}")
+
+    baseline_path = args.baseline or str(BASELINE_DIR / f'{args.size}.json')
+    if errored:
+        # Un benchmark en échec n'a pas de médiane: la comparaison l'ignorerait
+        print(f"❌ {len(errored)} benchmark(s) en erreur: {', '.join(errored)}")
+        if args.save_baseline:
+            print(f"❌ Baseline non enregistrée: {baseline_path}")
+            return 1
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📌 Baseline enregistrée: {baseline_path}")
+        return 1 if plan_regressions else 0
+
+    status = 1 if errored else 0
+    if plan_regressions:
+        print(f"❌ {len(plan_regressions)} plan(s) de requêtes chaudes non conforme(s)")
+        status = 1
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) par rapport à {baseline_path}:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print(f"✅ Aucune régression par rapport à {baseline_path}")
+    else:
+        print(f"ℹ️ Pas de baseline ({baseline_path}); utilisez --save-baseline pour en créer une")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
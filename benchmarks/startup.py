@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du démarrage à froid (Vercel / Render)
+
+Chaque mesure lance un interpréteur neuf, importe le point d'entrée puis sert
+une première requête /health. La commande échoue (code 1) si la médiane du
+temps d'import dépasse le budget, ou si un module lourd (pandas, numpy,
+openpyxl) est chargé avant la première route d'import/export.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --entry vercel_app --budget-ms 400 --runs 7
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import List, Optional
+
+from benchmarks import ROOT_DIR
+from benchmarks.datagen import ensure_dataset
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+# Script exécuté dans l'interpréteur neuf: une ligne JSON sur stdout
+_PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import importlib
+module = importlib.import_module({entry!r})
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+client = module.app.test_client()
+response = client.get('/health')
+served = time.perf_counter()
+sys.__stdout__.write('\n' + json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'heavy_modules': heavy,
+}}) + '\n')
+'''
+
+
+def probe(entry: str, db_path: str, workdir: str) -> dict:
+    """Mesurer un démarrage à froid dans un sous-processus"""
+    env = dict(os.environ)
+    env['TCA_DB_PATH'] = db_path
+    env['PYTHONPATH'] = os.pathsep.join([str(ROOT_DIR), str(ROOT_DIR / 'src')])
+    env.pop('RENDER', None)
+    env.pop('VERCEL', None)
+    code = _PROBE.format(entry=entry, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    # Des threads d'arrière-plan (index de recherche) peuvent écrire après la mesure
+    return json.loads([line for line in output.splitlines() if line.startswith('{')][-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Temps de démarrage à froid TCA')
+    parser.add_argument('--entry', action='append', default=[],
+                        help='Module à importer (défaut: app); option répétable')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 400)),
+                        help="Budget de la médiane du temps d'import (ms)")
+    parser.add_argument('--size', default='1k', help='Jeu de données utilisé pour la première requête')
+    args = parser.parse_args(argv)
+
+    entries = args.entry or ['app']
+    workdir = tempfile.mkdtemp(prefix='tca_startup_')
+    db_path = os.path.join(workdir, 'clients.db')
+    shutil.copyfile(ensure_dataset(args.size, verbose=False), db_path)
+
+    failures = []
+    try:
+        for entry in entries:
+            samples = [probe(entry, db_path, workdir) for _ in range(args.runs)]
+            import_ms = statistics.median(s['import_ms'] for s in samples)
+            request_ms = statistics.median(s['first_request_ms'] for s in samples)
+            heavy = sorted({name for s in samples for name in s['heavy_modules']})
+            statuses = sorted({s['status'] for s in samples})
+            print(f"⏱️ {entry}: import {import_ms:.0f} ms (budget {args.budget_ms:.0f} ms), "
+                  f"première requête {request_ms:.0f} ms, /health {statuses}")
+            if import_ms > args.budget_ms:
+                failures.append(f"{entry}: import {import_ms:.0f} ms > {args.budget_ms:.0f} ms")
+            if heavy:
+                failures.append(f"{entry}: modules lourds chargés au démarrage: {', '.join(heavy)}")
+            if statuses != [200]:
+                failures.append(f"{entry}: /health a retourné {statuses}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Démarrage à froid dans le budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
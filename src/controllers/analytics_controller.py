@@ -81,10 +81,7 @@ class AnalyticsController:
         
         try:
             # Récupérer les données récentes
-            all_clients, total_count = self.db_manager.get_all_clients(page=1, per_page=10000)
-            
-            # Convertir les Row objects en dictionnaires
-            all_clients = [dict(client) for client in all_clients]
+            all_clients, total_count = self.db_manager.get_all_clients(page=1, per_page=10000, view='analytics')
             
             # Calculer les stats en temps réel
             real_time_stats = {
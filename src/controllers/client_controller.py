@@ -5,20 +5,32 @@ Contrôleur pour la gestion des clients dans le système de suivi des visas TCA
 """
 
 import sys
+import uuid
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional
 
 # Ajouter le chemin parent pour les imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from models.client import Client, ClientValidator
 from database.database_manager import DatabaseManager
-from utils.cache_manager import cache_client_data, cache_statistics, invalidate_client_cache
+from utils.cache_manager import cache_client_data, cache_statistics
+from services.dedupe_service import DEFAULT_THRESHOLD, DuplicateFinder
 
 class ClientController:
     """Contrôleur pour la gestion des clients"""
     
+    # Taille de page maximale de l'API de consultation
+    MAX_QUERY_LIMIT = 500
+    
+    # Champs modifiables depuis le tableau des clients (édition en ligne)
+    INLINE_EDIT_FIELDS = ('visa_status', 'responsible_employee', 'application_date', 'transaction_date')
+    # Nombre maximal de modifications par enregistrement groupé
+    MAX_BATCH_EDITS = 200
+    # Nombre maximal de clients par changement de statut groupé
+    MAX_BULK_STATUS = 500
+    
     def __init__(self, db_manager: DatabaseManager):
         """Initialiser le contrôleur"""
         self.db_manager = db_manager
@@ -65,11 +77,9 @@ class ClientController:
                 raise ValueError(f"Un client avec l'ID '{client.client_id}' existe déjà")
             
             # Ajouter le client à la base de données
+            # Caches invalidés par DatabaseManager (notify_client_change)
             client_id = self.db_manager.add_client(client.to_dict())
             
-            # Invalider le cache après ajout
-            invalidate_client_cache()
-            
             return client_id
             
         except Exception as e:
@@ -101,10 +111,6 @@ class ClientController:
             # Mettre à jour le client
             success = self.db_manager.update_client(client_id, client.to_dict())
             
-            # Invalider le cache après mise à jour
-            if success:
-                invalidate_client_cache()
-            
             return success
             
         except Exception as e:
@@ -147,10 +153,6 @@ class ClientController:
             # Supprimer le client
             success = self.db_manager.delete_client(client_id)
             
-            # Invalider le cache après suppression
-            if success:
-                invalidate_client_cache()
-            
             return success
             
         except Exception as e:
@@ -167,39 +169,64 @@ class ClientController:
             print(f"Erreur lors de la récupération du client: {e}")
             return None
             
-    def get_all_clients(self, page: int = 1, per_page: int = 50) -> tuple[List[Dict[str, Any]], int]:
-        """Récupérer tous les clients avec pagination"""
+    def get_all_clients(self, page: int = 1, per_page: int = 50, view: Optional[str] = None,
+                        tier: str = 'all') -> tuple[List[Any], int]:
+        """
+        Récupérer tous les clients avec pagination
+        
+        Avec une vue (DatabaseManager.VIEW_COLUMNS), les lignes ClientRow sont
+        retournées telles quelles, en lecture seule; sans vue, des dicts complets.
+        tier: 'hot' (dossiers actifs) ou 'all' (avec les dossiers archivés).
+        """
         try:
-            clients, total = self.db_manager.get_all_clients(page, per_page)
-            return [dict(client) for client in clients], total
+            clients, total = self.db_manager.get_all_clients(page, per_page, view, tier)
+            return clients if view else [dict(client) for client in clients], total
             
         except Exception as e:
             print(f"Erreur lors de la récupération des clients: {e}")
             return [], 0
             
-    def search_clients(self, search_term: str, page: int = 1, per_page: int = 50) -> tuple[List[Dict[str, Any]], int]:
-        """Rechercher des clients avec pagination"""
+    def search_clients(self, search_term: str, page: int = 1, per_page: int = 50,
+                       view: Optional[str] = None, tier: str = 'all') -> tuple[List[Any], int]:
+        """Rechercher des clients avec pagination (view, tier: voir get_all_clients)"""
         try:
             if not search_term or not search_term.strip():
-                return self.get_all_clients(page, per_page)
+                return self.get_all_clients(page, per_page, view, tier)
                 
-            clients, total = self.db_manager.search_clients(search_term.strip(), page, per_page)
-            return [dict(client) for client in clients], total
+            clients, total = self.db_manager.search_clients(search_term.strip(), page, per_page, view, tier)
+            return clients if view else [dict(client) for client in clients], total
             
         except Exception as e:
             print(f"Erreur lors de la recherche: {e}")
             return [], 0
     
-    def get_filtered_clients(self, filters: Dict[str, str] = None, page: int = 1, per_page: int = 50) -> tuple[List[Dict[str, Any]], int]:
-        """Récupérer les clients avec filtres et pagination"""
+    def get_filtered_clients(self, filters: Dict[str, str] = None, page: int = 1, per_page: int = 50,
+                             view: Optional[str] = None, tier: str = 'all') -> tuple[List[Any], int]:
+        """Récupérer les clients avec filtres et pagination (view, tier: voir get_all_clients)"""
         try:
-            clients, total = self.db_manager.get_filtered_clients(filters, page, per_page)
-            return [dict(client) for client in clients], total
+            clients, total = self.db_manager.get_filtered_clients(filters, page, per_page, view, tier)
+            return clients if view else [dict(client) for client in clients], total
             
         except Exception as e:
             print(f"Erreur lors de la récupération filtrée: {e}")
             return [], 0
             
+    def query_clients(self, filters: Dict[str, str] = None, sort: str = 'client_id', order: str = 'desc',
+                      limit: int = 50, cursor: str = None, offset: int = None,
+                      columns: List[str] = None, with_total: bool = False, tier: str = 'all') -> Dict[str, Any]:
+        """Consultation paginée par curseur (ValueError si tri, colonnes, curseur ou tier invalides)"""
+        limit = max(1, min(int(limit), self.MAX_QUERY_LIMIT))
+        return self.db_manager.query_clients(filters, sort, order, limit, cursor, offset, columns, with_total, tier)
+
+    def get_client_facets(self, filters: Dict[str, str] = None, tier: str = 'all') -> Dict[str, Dict[str, int]]:
+        """Comptes par statut, nationalité et employé pour les filtres donnés (tier: voir get_all_clients)"""
+        try:
+            return self.db_manager.get_client_facets(filters, tier)
+
+        except Exception as e:
+            print(f"Erreur lors du calcul des facettes: {e}")
+            return {}
+
     def get_clients_by_status(self, status: str) -> List[Dict[str, Any]]:
         """Récupérer les clients par statut"""
         try:
@@ -252,14 +279,8 @@ class ClientController:
                 return False
             
             # Valider le champ et la valeur
-            if field == 'visa_status' and value not in Client.VISA_STATUS_OPTIONS:
-                return False
-            elif field == 'responsible_employee' and value not in Client.EMPLOYEE_OPTIONS:
+            if not self.is_valid_inline_value(field, value):
                 return False
-            elif field in ['application_date', 'transaction_date']:
-                # Validation basique pour les dates
-                if not value or len(value) < 8:
-                    return False
             
             # Sauvegarder l'ancien statut pour les notifications WhatsApp
             old_status = None
@@ -270,27 +291,9 @@ class ClientController:
             success = self.db_manager.update_client_field(client_id, field, value)
             
             if success:
-                # Invalider le cache si nécessaire
-                try:
-                    from utils.cache_manager import invalidate_client_cache
-                    invalidate_client_cache()
-                except ImportError:
-                    pass  # Cache non disponible, continuer sans
-                
                 # Envoyer notification WhatsApp si le statut de visa a changé
                 if field == 'visa_status' and old_status != value:
-                    try:
-                        from services.whatsapp_service import whatsapp_service
-                        whatsapp_result = whatsapp_service.send_visa_status_notification(
-                            client, old_status, value
-                        )
-                        if whatsapp_result.get('success'):
-                            print(f"✅ Notification WhatsApp envoyée pour {client.get('full_name', 'Client')}")
-                        else:
-                            print(f"⚠️ Échec envoi WhatsApp: {whatsapp_result.get('error', 'Erreur inconnue')}")
-                    except Exception as whatsapp_error:
-                        print(f"⚠️ Erreur notification WhatsApp: {whatsapp_error}")
-                        # Ne pas faire échouer la mise à jour à cause de WhatsApp
+                    self._notify_status_change(client, old_status, value)
             
             return success
             
@@ -298,6 +301,131 @@ class ClientController:
             print(f"Erreur lors de la mise à jour du champ {field}: {e}")
             return False
 
+    def is_valid_inline_value(self, field: str, value: str) -> bool:
+        """Valider une valeur saisie dans le tableau (édition en ligne)"""
+        if field not in self.INLINE_EDIT_FIELDS:
+            return False
+        if field == 'visa_status':
+            return value in Client.VISA_STATUS_OPTIONS
+        if field == 'responsible_employee':
+            return value in Client.EMPLOYEE_OPTIONS
+        # Validation basique pour les dates
+        return bool(value) and len(value) >= 8
+
+    def _notify_status_change(self, client: Dict[str, Any], old_status: str, new_status: str) -> None:
+        """Notification WhatsApp d'un changement de statut (sans faire échouer la mise à jour)"""
+        self.notify_status_changes([(client, old_status, new_status)])
+
+    def update_client_fields_batch(self, edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Enregistrer plusieurs modifications en ligne en une seule transaction
+        
+        Args:
+            edits: Liste de {'client_id', 'field', 'value'}
+            
+        Returns:
+            {'results': [{'client_id', 'field', 'success', 'message'}], 'updated': n,
+             'clients': {client_id: client modifié}}
+        """
+        clients_before = {client_id: dict(row) for client_id, row in
+                          self.db_manager.get_clients_by_ids([e.get('client_id') for e in edits]).items()}
+        
+        results = []
+        valid_edits = []
+        for edit in edits:
+            client_id, field, value = edit.get('client_id'), edit.get('field'), edit.get('value')
+            result = {'client_id': client_id, 'field': field, 'success': False}
+            if client_id not in clients_before:
+                result['message'] = 'Client non trouvé'
+            elif value is None or not self.is_valid_inline_value(field, value):
+                result['message'] = 'Champ ou valeur non valide'
+            else:
+                valid_edits.append({'client_id': client_id, 'field': field, 'value': value})
+                result['message'] = None
+            results.append(result)
+        
+        applied = self.db_manager.update_client_fields_batch(valid_edits) if valid_edits else []
+        applied_iter = iter(applied)
+        for result in results:
+            if result['message'] is None:
+                result['success'] = next(applied_iter)
+                result['message'] = 'Champ mis à jour avec succès' if result['success'] else 'Erreur lors de la mise à jour'
+        
+        updated = sum(applied)
+        
+        # Relire les clients modifiés (une requête) pour le rendu des lignes
+        touched = [r['client_id'] for r in results if r['success']]
+        clients_after = {client_id: dict(row) for client_id, row in
+                         self.db_manager.get_clients_by_ids(touched).items()}
+        
+        # Notifications: un changement de statut par client (dernière valeur du lot)
+        changes = []
+        for client_id, client in clients_after.items():
+            old_status = clients_before[client_id].get('visa_status', '')
+            if client.get('visa_status') != old_status:
+                changes.append((clients_before[client_id], old_status, client['visa_status']))
+        self.notify_status_changes(changes)
+        
+        return {'results': results, 'updated': updated, 'clients': clients_after}
+
+    def bulk_update_status(self, client_ids: List[str], new_status: str, notify: bool = True) -> Dict[str, Any]:
+        """
+        Passer un lot de clients (ex: un envoi à l'ambassade) au même statut
+
+        Une transaction, un historique commun (batch_id), une seule invalidation
+        du cache (par DatabaseManager) et un seul lot de notifications.
+
+        Raises:
+            ValueError: Statut invalide ou liste vide / trop longue
+        """
+        if new_status not in Client.VISA_STATUS_OPTIONS:
+            raise ValueError(f"Statut invalide: {new_status}")
+        client_ids = [str(cid).strip() for cid in client_ids if cid is not None and str(cid).strip()]
+        if not client_ids:
+            raise ValueError("Aucun client sélectionné")
+        if len(client_ids) > self.MAX_BULK_STATUS:
+            raise ValueError(f"Maximum {self.MAX_BULK_STATUS} clients par lot")
+
+        batch_id = uuid.uuid4().hex
+        outcome = self.db_manager.bulk_update_status(client_ids, new_status, batch_id=batch_id)
+
+        notifications = 0
+        if notify:
+            notifications = self.notify_status_changes(
+                [(client, client.get('visa_status', ''), new_status) for client in outcome['changed']]
+            )
+
+        return {
+            'batch_id': batch_id,
+            'updated': [client['client_id'] for client in outcome['changed']],
+            'unchanged': outcome['unchanged'],
+            'missing': outcome['missing'],
+            'conflicts': outcome['conflicts'],
+            'notifications_queued': notifications
+        }
+
+    def notify_status_changes(self, changes: List[tuple]) -> int:
+        """
+        Mettre en file (outbox WhatsApp) les notifications d'un lot de changements de statut
+
+        L'envoi est assuré par le dispatcher de l'outbox: la requête n'attend pas.
+
+        Args:
+            changes: Liste de (client, ancien statut, nouveau statut)
+
+        Returns:
+            Nombre de notifications mises en file
+        """
+        changes = [change for change in changes if change[0].get('whatsapp_number') and change[1] != change[2]]
+        if not changes:
+            return 0
+        try:
+            from services.whatsapp_service import whatsapp_service
+            return whatsapp_service.queue_visa_status_notifications(changes)
+        except Exception as whatsapp_error:
+            print(f"⚠️ Erreur notification WhatsApp: {whatsapp_error}")
+            return 0
+
     def get_status_history(self, client_id: str) -> List[Dict[str, Any]]:
         """Récupérer l'historique des statuts d'un client"""
         try:
@@ -308,46 +436,61 @@ class ClientController:
             print(f"Erreur lors de la récupération de l'historique: {e}")
             return []
             
-    def import_clients_bulk(self, clients_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Importer plusieurs clients en lot"""
+    def find_duplicates(self, client_ids: Optional[List[str]] = None, threshold: float = DEFAULT_THRESHOLD,
+                        limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Grappes de clients probablement en double
+        
+        Args:
+            client_ids: Clients à vérifier (ex: lignes importées); None pour toute la base
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("Le seuil doit être compris entre 0 et 1")
+        return DuplicateFinder(self.db_manager, threshold=threshold).find_duplicates(client_ids, limit=limit)
+
+    def merge_clients(self, primary_id: str, duplicate_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fusionner des doublons dans le client conservé
+        
+        Raises:
+            ValueError: Client conservé introuvable ou aucun doublon indiqué
+        """
+        primary_id = str(primary_id or '').strip()
+        duplicate_ids = [str(cid).strip() for cid in duplicate_ids or [] if cid is not None and str(cid).strip()]
+        if not primary_id or not duplicate_ids:
+            raise ValueError("Le client conservé et les doublons sont requis")
+        return self.db_manager.merge_clients(primary_id, duplicate_ids)
+
+    def import_clients_bulk(self, clients_data: List[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, Any]:
+        """Importer plusieurs clients en lot (validation en colonnes, insertions groupées)"""
         try:
-            # Valider les données en lot
-            validation_result = ClientValidator.validate_bulk_data(clients_data)
+            # Valider les données en lot (passeports comparés à la base en une requête)
+            validation_result = ClientValidator.validate_bulk_data(clients_data, db_manager=self.db_manager)
+            valid_clients = validation_result['valid_clients']
             
-            # Compter les résultats
-            valid_count = len(validation_result['valid_clients'])
-            invalid_count = len(validation_result['invalid_clients'])
+            # Identifiants déjà présents: une requête par lot au lieu d'une par client
+            existing = self.db_manager.get_existing_client_ids([client.get('client_id') for client in valid_clients])
+            errors = [f"Client '{client['client_id']}' existe déjà" for client in valid_clients
+                      if client.get('client_id') in existing]
+            to_add = [client for client in valid_clients if client.get('client_id') not in existing]
             
-            # Ajouter les clients valides
             added_count = 0
-            errors = []
-            
-            for client in validation_result['valid_clients']:
-                try:
-                    # Vérifier si l'ID existe déjà
-                    existing = self.db_manager.get_client_by_id(client.client_id)
-                    if existing:
-                        errors.append(f"Client '{client.client_id}' existe déjà")
-                        continue
-                        
-                    # Ajouter le client
-                    client_id = self.db_manager.add_client(client.to_dict())
-                    if client_id:
-                        added_count += 1
-                    else:
-                        errors.append(f"Échec de l'ajout du client '{client.client_id}'")
-                        
-                except Exception as e:
-                    errors.append(f"Erreur pour le client '{client.client_id}': {str(e)}")
+            for start in range(0, len(to_add), batch_size):
+                batch = to_add[start:start + batch_size]
+                inserted, failures = self.db_manager.add_clients_bulk(batch)
+                added_count += len(inserted)
+                errors.extend(f"Erreur pour le client '{batch[position].get('client_id')}': {message}"
+                              for position, message in failures)
             
             return {
                 'success': True,
                 'total_processed': len(clients_data),
-                'valid_clients': valid_count,
-                'invalid_clients': invalid_count,
+                'valid_clients': len(valid_clients),
+                'invalid_clients': len(validation_result['invalid_clients']),
                 'added_clients': added_count,
                 'errors': errors + validation_result['errors'],
-                'invalid_details': validation_result['invalid_clients']
+                'invalid_details': validation_result['invalid_clients'],
+                'warnings': validation_result['warnings']
             }
             
         except Exception as e:
@@ -358,10 +501,86 @@ class ClientController:
                 'added_clients': 0
             }
             
-    def get_statistics(self) -> Dict[str, Any]:
-        """Récupérer les statistiques des clients"""
+    def import_client_batches(self, batches: Iterable[List[Dict[str, Any]]], max_errors: int = 100) -> Dict[str, Any]:
+        """
+        Importer des clients lot par lot (ExcelHandler.iter_client_batches)
+        
+        Chaque lot est validé en colonnes (ClientValidator.validate_bulk_data)
+        puis inséré en une transaction. Les identifiants manquants sont attribués
+        à la suite du plus grand CLIxxxx existant (une seule lecture de la table
+        pour tout l'import).
+        
+        Returns:
+            {'success_count', 'error_count', 'imported_ids', 'errors' (au plus max_errors)}
+        """
+        summary = {'success_count': 0, 'error_count': 0, 'imported_ids': [], 'errors': []}
+        
+        def record_error(client_data: Dict[str, Any], message: str) -> None:
+            summary['error_count'] += 1
+            if len(summary['errors']) < max_errors:
+                summary['errors'].append(f"Ligne {client_data.get('original_row_number', '?')}: {message}")
+        
+        next_number = None
+        for batch in batches:
+            for client_data in batch:
+                if not str(client_data.get('client_id') or '').strip():
+                    if next_number is None:
+                        next_number = int(self.generate_client_id()[3:])
+                    client_data['client_id'] = f"CLI{next_number:04d}"
+                    next_number += 1
+            
+            validation = ClientValidator.validate_bulk_data(batch, db_manager=self.db_manager)
+            for invalid in validation['invalid_clients']:
+                record_error(batch[invalid['index']], ', '.join(invalid['errors']))
+            valid = validation['valid_clients']
+            
+            inserted, failures = self.db_manager.add_clients_bulk(valid)
+            summary['success_count'] += len(inserted)
+            summary['imported_ids'].extend(inserted)
+            for position, message in failures:
+                record_error(valid[position], message)
+        return summary
+    
+    def import_clients_raw(self, clients: List[Dict[str, Any]], batch_size: int = 1000,
+                           max_errors: int = 100) -> Dict[str, Any]:
+        """
+        Importer des clients SANS validation (ExcelHandler.import_clients_raw)
+        
+        Comme add_client_raw, un identifiant vide ou déjà présent est remplacé par
+        un nouveau CLIxxxx; l'existence est vérifiée en une requête par lot et les
+        lots sont insérés en une transaction (add_clients_bulk).
+        
+        Returns:
+            {'success_count', 'error_count', 'imported_ids', 'errors' (au plus max_errors)}
+        """
+        summary = {'success_count': 0, 'error_count': 0, 'imported_ids': [], 'errors': []}
+        next_number = None
+        seen = set()
+        for start in range(0, len(clients), batch_size):
+            batch = clients[start:start + batch_size]
+            existing = self.db_manager.get_existing_client_ids([client['client_id'] for client in batch])
+            for client_data in batch:
+                client_id = str(client_data.get('client_id') or '').strip()
+                if not client_id or client_id in existing or client_id in seen:
+                    if next_number is None:
+                        next_number = int(self.generate_client_id()[3:])
+                    client_id = f"CLI{next_number:04d}"
+                    next_number += 1
+                client_data['client_id'] = client_id
+                seen.add(client_id)
+            
+            inserted, failures = self.db_manager.add_clients_bulk(batch)
+            summary['success_count'] += len(inserted)
+            summary['imported_ids'].extend(inserted)
+            summary['error_count'] += len(failures)
+            for position, message in failures[:max(0, max_errors - len(summary['errors']))]:
+                summary['errors'].append(f"Ligne {start + position + 1}: {message}")
+        return summary
+    
+    def get_statistics(self, tier: str = 'all') -> Dict[str, Any]:
+        """Récupérer les statistiques des clients (tier: voir get_all_clients)"""
         try:
-            return self.db_manager.get_statistics()
+            return self.db_manager.get_statistics(tier)
             
         except Exception as e:
             print(f"Erreur lors de la récupération des statistiques: {e}")
@@ -384,11 +603,12 @@ class ClientController:
     def generate_client_id(self, prefix: str = "CLI") -> str:
         """Générer un ID client unique avec format officiel CLI0001, CLI0002, etc. (4 chiffres)"""
         try:
-            # Requête directe à la base de données pour obtenir tous les client_id
+            # Requête directe à la base de données pour obtenir tous les client_id (archivés compris)
             conn = self.db_manager.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("SELECT client_id FROM clients WHERE client_id LIKE ?", (f"{prefix}%",))
+            cursor.execute(f"SELECT client_id FROM {DatabaseManager.CLIENT_TIERS['all']} WHERE client_id LIKE ?",
+                           (f"{prefix}%",))
             all_client_ids = [row[0] for row in cursor.fetchall()]
             
             conn.close()
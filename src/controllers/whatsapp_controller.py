@@ -7,6 +7,8 @@ Contrôleur WhatsApp pour le système de suivi des visas TCA
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from utils.phone_numbers import normalize_phone
+
 class WhatsAppController:
     """Contrôleur pour les fonctionnalités WhatsApp"""
     
@@ -96,15 +98,5 @@ class WhatsAppController:
         return 8 <= len(clean_number) <= 15
     
     def format_whatsapp_number(self, number: str) -> str:
-        """Formater un numéro WhatsApp"""
-        if not number:
-            return ''
-        
-        # Nettoyer le numéro
-        clean_number = ''.join(filter(str.isdigit, number))
-        
-        # Ajouter le préfixe international si nécessaire
-        if not clean_number.startswith('218') and len(clean_number) == 9:
-            clean_number = '218' + clean_number
-        
-        return clean_number
\ No newline at end of file
+        """Formater un numéro WhatsApp (chiffres E.164 sans le +)"""
+        return normalize_phone(number).lstrip('+')
\ No newline at end of file
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivage des dossiers clos: table clients (dossiers actifs) et clients_archive
+
+Les dossiers clos (CLOSED_STATUSES) sans activité depuis ARCHIVE_AFTER_DAYS
+jours (dernière modification, sinon création) sont déplacés par lots de la
+table clients vers clients_archive, avec leur id d'origine (AUTOINCREMENT:
+jamais réattribué) et la date d'archivage, par la tâche archive de la
+maintenance de la base (database/maintenance.py, active par défaut;
+ARCHIVE_AFTER_DAYS = 0 la désactive). Les listes du quotidien (/clients,
+tableau de bord) ne lisent que la table clients, dont la taille et les index
+ne dépendent plus de l'historique.
+
+La vue clients_all (UNION ALL des deux tables) sert les lectures qui couvrent
+tout l'historique: recherche, export, analyses, lecture par identifiant,
+contrôles d'unicité. Une modification d'un dossier archivé le ramène d'abord
+dans la table clients (restore_archived_clients, dans la transaction de
+l'écriture).
+
+Un dossier archivé dont l'identifiant ou le passeport a été repris par un
+dossier actif n'est pas restauré (signalé, l'écriture ne le modifie pas).
+
+Le lanceur de migrations (database/migrations.py) appelle sync_archive_schema
+après chaque lot de migrations appliqué: une colonne ajoutée à clients existe
+aussi dans la table d'archive et dans la vue.
+
+Exécution directe:
+    python src/database/archive.py [--db chemin] status [--days 180]
+    python src/database/archive.py [--db chemin] run [--days 180]
+    python src/database/archive.py [--db chemin] restore CLI0001 [CLI0002 ...]
+"""
+
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ARCHIVE_TABLE = 'clients_archive'
+ALL_CLIENTS_VIEW = 'clients_all'
+# Statuts d'un dossier clos (mêmes valeurs que services/analytics_service.py)
+CLOSED_STATUSES = ('اكتملت العملية', 'التأشيرة غير موافق عليها')
+# Ancienneté minimale (jours sans modification) d'un dossier clos archivé
+DEFAULT_ARCHIVE_AFTER_DAYS = 180
+# Dossiers déplacés par transaction (l'application écrit entre deux lots)
+ARCHIVE_BATCH_SIZE = 500
+# Dernière activité d'un dossier (dates ISO: comparaison de chaînes)
+LAST_ACTIVITY_SQL = "COALESCE(NULLIF(updated_at, ''), NULLIF(created_at, ''))"
+
+
+def client_columns(conn: sqlite3.Connection) -> List[str]:
+    """Colonnes de la table clients, dans l'ordre de la table"""
+    return [row[1] for row in conn.execute('PRAGMA table_info(clients)')]
+
+
+def sync_archive_schema(conn: sqlite3.Connection) -> None:
+    """Créer ou compléter la table d'archive, ses index et la vue clients_all (idempotent)"""
+    columns = conn.execute('PRAGMA table_info(clients)').fetchall()
+    definitions = ', '.join(f'{name} {declared_type}'.strip()
+                            for _, name, declared_type, _, _, _ in columns if name != 'id')
+    # id: clé de la ligne d'origine (pas d'AUTOINCREMENT, les lignes arrivent avec leur id)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} (id INTEGER PRIMARY KEY, {definitions}, archived_at TEXT)')
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({ARCHIVE_TABLE})')}
+    for _, name, declared_type, _, _, _ in columns:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN {name} {declared_type}'.strip())
+
+    # Chemins d'accès des lectures par identifiant, passeport et fin de numéro WhatsApp (vue clients_all)
+    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_archive_client_id ON {ARCHIVE_TABLE}(client_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_clients_archive_passport ON {ARCHIVE_TABLE}(passport_number)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_clients_archive_phone_rev ON {ARCHIVE_TABLE}(whatsapp_number_rev)')
+    # Comptes par statut, nationalité et employé (statistiques et facettes, une requête par table)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_clients_archive_status ON {ARCHIVE_TABLE}(visa_status, nationality)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_clients_archive_nationality ON {ARCHIVE_TABLE}(nationality)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_clients_archive_employee ON {ARCHIVE_TABLE}(responsible_employee, visa_status)')
+    # Tris des listes et de query_clients (mêmes expressions que les index de clients,
+    # migration 7): les pages de chaque table sont fusionnées sans trier l'union
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_clients_archive_list_order ON {ARCHIVE_TABLE}(
+            (CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END),
+            CAST(SUBSTR(client_id, 4) AS INTEGER) DESC
+        )
+    ''')
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_clients_archive_client_number
+        ON {ARCHIVE_TABLE}(COALESCE(CAST(SUBSTR(client_id, 4) AS INTEGER), -1))
+    ''')
+
+    # Liste explicite: la vue suit les colonnes de clients, pas celles propres à l'archive
+    projection = ', '.join(row[1] for row in columns)
+    view_sql = (f'CREATE VIEW {ALL_CLIENTS_VIEW} AS SELECT {projection} FROM clients '
+                f'UNION ALL SELECT {projection} FROM {ARCHIVE_TABLE}')
+    current = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?",
+                           (ALL_CLIENTS_VIEW,)).fetchone()
+    if current is None or current[0] != view_sql:
+        conn.execute(f'DROP VIEW IF EXISTS {ALL_CLIENTS_VIEW}')
+        conn.execute(view_sql)
+
+
+def archive_cutoff(older_than_days: float, now: Optional[datetime] = None) -> str:
+    """Jour (YYYY-MM-DD) avant lequel la dernière activité d'un dossier clos le rend archivable"""
+    return ((now or datetime.now()) - timedelta(days=older_than_days)).date().isoformat()
+
+
+def _eligible_condition(statuses: Iterable[str]) -> tuple[str, List[str]]:
+    statuses = list(statuses)
+    return (f"visa_status IN ({', '.join('?' * len(statuses))}) AND {LAST_ACTIVITY_SQL} < ?", statuses)
+
+
+def archive_closed_clients(conn: sqlite3.Connection, older_than_days: float = DEFAULT_ARCHIVE_AFTER_DAYS,
+                           batch_size: int = ARCHIVE_BATCH_SIZE, statuses: Iterable[str] = CLOSED_STATUSES,
+                           should_continue: Callable[[], bool] = lambda: True,
+                           now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Déplacer les dossiers clos anciens vers la table d'archive, par lots
+
+    Args:
+        conn: Connexion en mode autocommit (isolation_level=None): une transaction par lot
+        older_than_days: Jours sans modification avant archivage
+        should_continue: Interrompt la série entre deux lots (maintenance pendant l'inactivité)
+
+    Returns:
+        {'archived': lignes déplacées, 'cutoff': jour limite, 'archive_rows': lignes archivées}
+    """
+    sync_archive_schema(conn)
+    cutoff = archive_cutoff(older_than_days, now)
+    condition, params = _eligible_condition(statuses)
+    columns = ', '.join(client_columns(conn))
+    archived_at = (now or datetime.now()).isoformat(timespec='seconds')
+    archived = 0
+    while should_continue():
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Statut: premier champ de idx_status_nationality
+            ids = [row[0] for row in conn.execute(
+                f'SELECT id FROM clients WHERE {condition} ORDER BY id LIMIT ?', params + [cutoff, batch_size])]
+            if ids:
+                id_list = ', '.join('?' * len(ids))
+                conn.execute(f'INSERT INTO {ARCHIVE_TABLE} ({columns}, archived_at) '
+                             f'SELECT {columns}, ? FROM clients WHERE id IN ({id_list})', [archived_at] + ids)
+                conn.execute(f'DELETE FROM clients WHERE id IN ({id_list})', ids)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        archived += len(ids)
+        if len(ids) < batch_size:
+            break
+    archive_rows = conn.execute(f'SELECT COUNT(*) FROM {ARCHIVE_TABLE}').fetchone()[0]
+    return {'archived': archived, 'cutoff': cutoff, 'archive_rows': archive_rows}
+
+
+def restore_archived_clients(conn: sqlite3.Connection, values: Iterable[Any],
+                             column: str = 'client_id') -> Dict[str, Any]:
+    """
+    Ramener dans la table clients les dossiers archivés donnés
+
+    Exécuté dans la transaction de l'appelant, avant l'écriture qui vise ces
+    dossiers; sans dossier archivé concerné, une seule lecture indexée par lot.
+
+    Un dossier archivé dont le client_id ou le passport_number (UNIQUE dans
+    clients) est repris entre-temps par un dossier actif reste dans l'archive:
+    il est signalé dans 'conflicts' et l'écriture de l'appelant ne le touche pas.
+
+    Args:
+        values: Valeurs de `column` ('client_id' ou 'id')
+
+    Returns:
+        {'restored': dossiers restaurés, 'conflicts': valeurs de `column` restées archivées}
+    """
+    if column not in ('client_id', 'id'):
+        raise ValueError(f'Colonne de restauration non autorisée: {column}')
+    values = [value for value in dict.fromkeys(values) if value is not None]
+    restored = 0
+    conflicts = []
+    columns = None
+    for start in range(0, len(values), 500):
+        chunk = values[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        archived = conn.execute(f'SELECT {column}, client_id, passport_number FROM {ARCHIVE_TABLE} '
+                                f'WHERE {column} IN ({placeholders}) ORDER BY id', chunk).fetchall()
+        if not archived:
+            continue
+
+        # Valeurs UNIQUE déjà prises dans clients (NULL n'entre jamais en conflit)
+        client_ids = [row[1] for row in archived if row[1] is not None]
+        passports = [row[2] for row in archived if row[2] is not None]
+        taken_ids, taken_passports = set(), set()
+        if client_ids:
+            taken_ids.update(row[0] for row in conn.execute(
+                f"SELECT client_id FROM clients WHERE client_id IN ({', '.join('?' * len(client_ids))})",
+                client_ids))
+        if passports:
+            taken_passports.update(row[0] for row in conn.execute(
+                f"SELECT passport_number FROM clients WHERE passport_number IN ({', '.join('?' * len(passports))})",
+                passports))
+        restorable = []
+        for value, client_id, passport in archived:
+            if client_id in taken_ids or passport in taken_passports:
+                conflicts.append(value)
+                continue
+            # Deux dossiers archivés au même passeport: seul le plus ancien revient
+            if client_id is not None:
+                taken_ids.add(client_id)
+            if passport is not None:
+                taken_passports.add(passport)
+            restorable.append(value)
+
+        if restorable:
+            if columns is None:
+                columns = ', '.join(client_columns(conn))
+            restorable_list = ', '.join('?' * len(restorable))
+            restored += conn.execute(f'INSERT INTO clients ({columns}) SELECT {columns} FROM {ARCHIVE_TABLE} '
+                                     f'WHERE {column} IN ({restorable_list})', restorable).rowcount
+            conn.execute(f'DELETE FROM {ARCHIVE_TABLE} WHERE {column} IN ({restorable_list})', restorable)
+    if conflicts:
+        print(f"⚠️ Dossiers archivés non restaurés (identifiant ou passeport déjà utilisé): "
+              f"{', '.join(str(value) for value in conflicts)}")
+    return {'restored': restored, 'conflicts': conflicts}
+
+
+def archive_status(conn: sqlite3.Connection, older_than_days: float = DEFAULT_ARCHIVE_AFTER_DAYS,
+                   statuses: Iterable[str] = CLOSED_STATUSES) -> Dict[str, Any]:
+    """Lignes de chaque tier et dossiers actuellement archivables"""
+    condition, params = _eligible_condition(statuses)
+    cutoff = archive_cutoff(older_than_days)
+    return {
+        'hot_rows': conn.execute('SELECT COUNT(*) FROM clients').fetchone()[0],
+        'archive_rows': conn.execute(f'SELECT COUNT(*) FROM {ARCHIVE_TABLE}').fetchone()[0],
+        'eligible': conn.execute(f'SELECT COUNT(*) FROM clients WHERE {condition}', params + [cutoff]).fetchone()[0],
+        'cutoff': cutoff,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from database.database_manager import DatabaseManager, resolve_db_path
+
+    parser = argparse.ArgumentParser(description='Archivage des dossiers clos')
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('status', 'Lignes actives, archivées et archivables'),
+                            ('run', 'Archiver les dossiers clos anciens')):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument('--days', type=float, default=DEFAULT_ARCHIVE_AFTER_DAYS,
+                                    help='Jours sans modification avant archivage')
+    restore_parser = commands.add_parser('restore', help='Ramener des dossiers archivés dans la table clients')
+    restore_parser.add_argument('client_ids', nargs='+')
+    args = parser.parse_args()
+
+    # Schéma à jour (migration de la table d'archive) avant toute opération
+    path = DatabaseManager(resolve_db_path(args.db)).db_path
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        if args.command == 'status':
+            for key, value in archive_status(connection, args.days).items():
+                print(f"   {key}: {value}")
+        elif args.command == 'run':
+            outcome = archive_closed_clients(connection, args.days)
+            print(f"🗃️ {outcome['archived']} dossiers archivés (activité avant le {outcome['cutoff']}), "
+                  f"{outcome['archive_rows']} dans l'archive")
+        else:
+            connection.execute('BEGIN IMMEDIATE')
+            outcome = restore_archived_clients(connection, args.client_ids)
+            connection.execute('COMMIT')
+            print(f"✅ {outcome['restored']} dossiers restaurés")
+            if outcome['conflicts']:
+                sys.exit(1)
+    except sqlite3.OperationalError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sauvegardes en ligne, incrémentales et compressées de la base SQLite
+
+Instantané: API de sauvegarde en ligne de SQLite (sqlite3.Connection.backup),
+copiée par étapes de quelques centaines de pages; le verrou de lecture est
+relâché entre deux étapes, les écritures de l'application ne sont pas bloquées
+pendant toute la copie.
+
+Stockage: l'instantané est découpé en pages. Une sauvegarde complète écrit
+toutes les pages, une sauvegarde incrémentale seulement les pages dont
+l'empreinte (blake2b) a changé depuis la sauvegarde précédente. Les pages sont
+compressées en flux (zstd si le module zstandard est installé, gzip sinon).
+manifest.json décrit la chaîne (parent de chaque sauvegarde).
+
+Restauration à un instant donné: dernière sauvegarde antérieure à l'instant
+demandé, reconstruite en écrivant les pages de sa chaîne (complète puis
+incrémentales) directement dans un fichier, vérifiée (empreintes des pages et
+PRAGMA quick_check), puis recopiée dans la base par l'API de sauvegarde.
+
+Exécution directe:
+    python src/database/backup_manager.py backup [--full]
+    python src/database/backup_manager.py list
+    python src/database/backup_manager.py restore [--at "2025-09-26 14:00:00"] [--output copie.db]
+    python src/database/backup_manager.py verify [--id ID]
+    python src/database/backup_manager.py prune [--keep-full 2]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # dépendance optionnelle: gzip sinon
+    zstandard = None
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+# Numéro de page (big-endian) devant chaque page d'un fichier de sauvegarde
+PAGE_HEADER = struct.Struct('>I')
+DIGEST_SIZE = 16
+# Une sauvegarde complète toutes les N sauvegardes: chaîne de restauration bornée
+DEFAULT_FULL_EVERY = 24
+# Pages copiées par étape de l'API de sauvegarde (verrou relâché entre deux étapes)
+BACKUP_STEP_PAGES = 512
+GZIP_LEVEL = 3
+ZSTD_LEVEL = 3
+
+
+def default_backup_dir(db_path: str) -> str:
+    """Répertoire des sauvegardes: TCA_BACKUP_DIR, sinon backups/ à côté de la base"""
+    return os.environ.get('TCA_BACKUP_DIR') or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'backups')
+
+
+def _parse_point_in_time(value: Union[str, datetime, None]) -> Optional[str]:
+    if value is None or isinstance(value, str) and not value.strip():
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    return value.isoformat(sep=' ', timespec='seconds')
+
+
+def _open_pages(path: str, codec: str, mode: str) -> BinaryIO:
+    """Fichier de pages compressé en flux (mode 'rb' ou 'wb')"""
+    if codec == 'gzip':
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Sauvegarde compressée en zstd: installer le module zstandard")
+        raw = open(path, mode)
+        if mode == 'wb':
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    raise ValueError(f"Compression inconnue: {codec}")
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    # Les lecteurs zstd peuvent retourner moins d'octets que demandé
+    data = stream.read(size)
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _iter_page_records(path: str, codec: str, page_size: int) -> Iterator[Tuple[int, bytes]]:
+    with _open_pages(path, codec, 'rb') as stream:
+        while True:
+            header = _read_exact(stream, PAGE_HEADER.size)
+            if not header:
+                return
+            page = _read_exact(stream, page_size)
+            if len(header) != PAGE_HEADER.size or len(page) != page_size:
+                raise RuntimeError(f"Fichier de sauvegarde tronqué: {os.path.basename(path)}")
+            yield PAGE_HEADER.unpack(header)[0], page
+
+
+def _page_digests(db_file: str, page_size: int) -> Iterator[Tuple[int, bytes, bytes]]:
+    """(numéro de page à partir de 1, page, empreinte) d'un fichier de base"""
+    with open(db_file, 'rb') as handle:
+        number = 0
+        while True:
+            page = handle.read(page_size)
+            if not page:
+                return
+            number += 1
+            yield number, page, hashlib.blake2b(page, digest_size=DIGEST_SIZE).digest()
+
+
+class BackupManager:
+    """Sauvegardes incrémentales d'une base SQLite et restauration à un instant donné"""
+
+    def __init__(self, db_path: str, backup_dir: Optional[str] = None, full_every: int = DEFAULT_FULL_EVERY,
+                 codec: Optional[str] = None):
+        self.db_path = db_path
+        self.backup_dir = backup_dir or default_backup_dir(db_path)
+        self.full_every = full_every
+        self.codec = codec or ('zstd' if zstandard is not None else 'gzip')
+        self._lock = threading.Lock()
+
+    # --- Manifeste -------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.backup_dir, MANIFEST_NAME)
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Sauvegardes de la plus ancienne à la plus récente"""
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, 'r', encoding='utf-8') as handle:
+            return json.load(handle).get('backups', [])
+
+    def _write_manifest(self, backups: List[Dict[str, Any]]) -> None:
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'format': MANIFEST_FORMAT, 'backups': backups}, handle, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.backup_dir, name)
+
+    def _load_digests(self, entry: Dict[str, Any]) -> List[bytes]:
+        with open(self._path(entry['digests']), 'rb') as handle:
+            data = handle.read()
+        return [data[i:i + DIGEST_SIZE] for i in range(0, len(data), DIGEST_SIZE)]
+
+    def _chain(self, entry: Dict[str, Any], backups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sauvegardes à appliquer pour reconstruire `entry` (complète d'abord)"""
+        by_id = {backup['id']: backup for backup in backups}
+        chain = [entry]
+        while chain[-1]['kind'] != 'full':
+            parent = by_id.get(chain[-1]['parent'])
+            if parent is None:
+                raise RuntimeError(f"Chaîne de sauvegarde incomplète: parent {chain[-1]['parent']} introuvable")
+            chain.append(parent)
+        return chain[::-1]
+
+    # --- Sauvegarde ------------------------------------------------------
+
+    def _snapshot(self, target_path: str) -> int:
+        """Instantané cohérent de la base par l'API de sauvegarde; retourne la taille de page"""
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=BACKUP_STEP_PAGES, sleep=0.005)
+            return target.execute('PRAGMA page_size').fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+
+    def backup(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Sauvegarder la base (incrémentale si possible)
+
+        Args:
+            full: Forcer une sauvegarde complète
+
+        Returns:
+            Entrée du manifeste (id, kind, pages écrites, octets) et durée
+        """
+        with self._lock:
+            started = time.perf_counter()
+            os.makedirs(self.backup_dir, exist_ok=True)
+            backups = self.list_backups()
+            created = datetime.now()
+            backup_id = created.strftime('%Y%m%d-%H%M%S-%f')
+
+            fd, snapshot_path = tempfile.mkstemp(prefix='snapshot-', suffix='.db', dir=self.backup_dir)
+            os.close(fd)
+            try:
+                page_size = self._snapshot(snapshot_path)
+                parent = backups[-1] if backups else None
+                since_full = 0
+                for entry in reversed(backups):
+                    if entry['kind'] == 'full':
+                        break
+                    since_full += 1
+                if parent is None or parent['page_size'] != page_size or since_full + 1 >= self.full_every:
+                    full = True
+                previous = [] if full else self._load_digests(parent)
+
+                extension = 'zst' if self.codec == 'zstd' else 'gz'
+                pages_name = f'{backup_id}.pages.{extension}'
+                digests_name = f'{backup_id}.digests'
+                digests = bytearray()
+                written = page_count = 0
+                with _open_pages(self._path(pages_name), self.codec, 'wb') as stream:
+                    for number, page, digest in _page_digests(snapshot_path, page_size):
+                        page_count = number
+                        digests += digest
+                        if full or number > len(previous) or previous[number - 1] != digest:
+                            stream.write(PAGE_HEADER.pack(number))
+                            stream.write(page)
+                            written += 1
+                with open(self._path(digests_name), 'wb') as handle:
+                    handle.write(digests)
+            finally:
+                os.remove(snapshot_path)
+
+            entry = {
+                'id': backup_id,
+                'kind': 'full' if full else 'delta',
+                'parent': None if full else parent['id'],
+                'created_at': created.isoformat(sep=' ', timespec='seconds'),
+                'codec': self.codec,
+                'page_size': page_size,
+                'page_count': page_count,
+                'pages_written': written,
+                'bytes': os.path.getsize(self._path(pages_name)),
+                'file': pages_name,
+                'digests': digests_name,
+            }
+            backups.append(entry)
+            self._write_manifest(backups)
+
+        elapsed = time.perf_counter() - started
+        database_bytes = page_size * page_count
+        result = dict(entry, elapsed_ms=round(elapsed * 1000, 1),
+                      mb_per_second=round(database_bytes / (1024 * 1024) / elapsed, 1) if elapsed > 0 else 0.0)
+        print(f"💾 Sauvegarde {entry['kind']} {backup_id}: {written}/{page_count} page(s), "
+              f"{entry['bytes'] / 1024:.0f} Ko en {elapsed:.2f}s")
+        return result
+
+    # --- Restauration ----------------------------------------------------
+
+    def find_backup(self, at: Union[str, datetime, None] = None, backup_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Sauvegarde correspondant à un identifiant ou à un instant
+
+        Raises:
+            ValueError: Aucune sauvegarde ne correspond
+        """
+        backups = self.list_backups()
+        if backup_id:
+            for entry in backups:
+                if entry['id'] == backup_id:
+                    return entry
+            raise ValueError(f"Sauvegarde introuvable: {backup_id}")
+        point = _parse_point_in_time(at)
+        candidates = [entry for entry in backups if point is None or entry['created_at'] <= point]
+        if not candidates:
+            raise ValueError(f"Aucune sauvegarde antérieure à {point}" if point else "Aucune sauvegarde disponible")
+        return candidates[-1]
+
+    def _materialize(self, entry: Dict[str, Any], target_path: str) -> None:
+        """Reconstruire le fichier de base d'une sauvegarde puis le vérifier"""
+        chain = self._chain(entry, self.list_backups())
+        page_size = entry['page_size']
+        with open(target_path, 'wb') as handle:
+            for link in chain:
+                for number, page in _iter_page_records(self._path(link['file']), link['codec'], page_size):
+                    handle.seek((number - 1) * page_size)
+                    handle.write(page)
+            handle.truncate(entry['page_count'] * page_size)
+
+        expected = self._load_digests(entry)
+        for number, _page, digest in _page_digests(target_path, page_size):
+            if number > len(expected) or expected[number - 1] != digest:
+                raise RuntimeError(f"Sauvegarde {entry['id']} corrompue: page {number} différente")
+        conn = sqlite3.connect(target_path)
+        try:
+            check = conn.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            conn.close()
+        if check != 'ok':
+            raise RuntimeError(f"Sauvegarde {entry['id']} invalide: {check}")
+
+    def restore(self, at: Union[str, datetime, None] = None, backup_id: Optional[str] = None,
+                output: Optional[str] = None, safety_backup: bool = True) -> Dict[str, Any]:
+        """
+        Restaurer la base telle qu'elle était à un instant donné
+
+        Args:
+            at: Instant visé (ISO 8601); None pour la dernière sauvegarde
+            backup_id: Sauvegarde précise (prioritaire sur `at`)
+            output: Écrire la base restaurée dans ce fichier au lieu de remplacer la base
+            safety_backup: Sauvegarder l'état actuel avant de le remplacer (restauration réversible)
+
+        Raises:
+            ValueError: Aucune sauvegarde ne correspond
+            RuntimeError: Chaîne incomplète ou sauvegarde corrompue
+        """
+        started = time.perf_counter()
+        entry = self.find_backup(at, backup_id)
+        target_dir = os.path.dirname(os.path.abspath(output or self.db_path))
+        fd, restored_path = tempfile.mkstemp(prefix='restore-', suffix='.db', dir=target_dir)
+        os.close(fd)
+        try:
+            self._materialize(entry, restored_path)
+            if output:
+                os.replace(restored_path, output)
+            else:
+                if safety_backup and os.path.exists(self.db_path):
+                    self.backup()
+                # Copie par l'API de sauvegarde: la base reste cohérente pour les autres connexions
+                source = sqlite3.connect(restored_path)
+                target = sqlite3.connect(self.db_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+                from utils.cache_manager import notify_client_change
+                notify_client_change(None)
+        finally:
+            if os.path.exists(restored_path):
+                os.remove(restored_path)
+
+        elapsed = time.perf_counter() - started
+        database_bytes = entry['page_size'] * entry['page_count']
+        print(f"♻️ Base restaurée depuis {entry['id']} ({entry['created_at']}) en {elapsed:.2f}s")
+        return {'backup_id': entry['id'], 'created_at': entry['created_at'], 'output': output or self.db_path,
+                'elapsed_ms': round(elapsed * 1000, 1),
+                'mb_per_second': round(database_bytes / (1024 * 1024) / elapsed, 1) if elapsed > 0 else 0.0}
+
+    def verify(self, backup_id: Optional[str] = None) -> Dict[str, Any]:
+        """Reconstruire une sauvegarde (la dernière par défaut) dans un fichier temporaire et la vérifier"""
+        entry = self.find_backup(backup_id=backup_id)
+        workdir = tempfile.mkdtemp(prefix='tca_verify_')
+        try:
+            self._materialize(entry, os.path.join(workdir, 'verify.db'))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return {'backup_id': entry['id'], 'ok': True}
+
+    def prune(self, keep_full: int = 2) -> int:
+        """Supprimer les chaînes antérieures aux `keep_full` dernières sauvegardes complètes"""
+        with self._lock:
+            backups = self.list_backups()
+            full_positions = [index for index, entry in enumerate(backups) if entry['kind'] == 'full']
+            if len(full_positions) <= keep_full:
+                return 0
+            cutoff = full_positions[-keep_full] if keep_full > 0 else len(backups)
+            removed, kept = backups[:cutoff], backups[cutoff:]
+            self._write_manifest(kept)
+            for entry in removed:
+                for name in (entry['file'], entry['digests']):
+                    if os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+        return len(removed)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    # Chemin seul: la base n'est ni créée ni migrée avant une restauration
+    from database.database_manager import resolve_db_path
+
+    parser = argparse.ArgumentParser(description='Sauvegardes incrémentales et restauration de la base')
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    parser.add_argument('--dir', default=None, help='Répertoire des sauvegardes (défaut: TCA_BACKUP_DIR ou backups/)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    backup_parser = commands.add_parser('backup', help='Sauvegarder (incrémentale si possible)')
+    backup_parser.add_argument('--full', action='store_true', help='Forcer une sauvegarde complète')
+    commands.add_parser('list', help='Lister les sauvegardes')
+    restore_parser = commands.add_parser('restore', help='Restaurer à un instant donné')
+    restore_parser.add_argument('--at', default=None, help='Instant visé, ex. "2025-09-26 14:00:00"')
+    restore_parser.add_argument('--id', default=None, help='Identifiant de sauvegarde')
+    restore_parser.add_argument('--output', default=None, help='Écrire dans ce fichier au lieu de remplacer la base')
+    verify_parser = commands.add_parser('verify', help='Vérifier une sauvegarde (la dernière par défaut)')
+    verify_parser.add_argument('--id', default=None)
+    prune_parser = commands.add_parser('prune', help='Supprimer les anciennes chaînes')
+    prune_parser.add_argument('--keep-full', type=int, default=2)
+    args = parser.parse_args()
+
+    manager = BackupManager(resolve_db_path(args.db), args.dir)
+    try:
+        if args.command == 'backup':
+            manager.backup(full=args.full)
+        elif args.command == 'list':
+            for item in manager.list_backups():
+                print(f"{item['id']}  {item['created_at']}  {item['kind']:<5}  {item['pages_written']:>6}/"
+                      f"{item['page_count']} pages  {item['bytes'] / 1024:>8.0f} Ko  {item['codec']}")
+        elif args.command == 'restore':
+            manager.restore(at=args.at, backup_id=args.id, output=args.output)
+        elif args.command == 'verify':
+            print(f"✅ Sauvegarde {manager.verify(args.id)['backup_id']} valide")
+        elif args.command == 'prune':
+            print(f"🗑️ {manager.prune(args.keep_full)} sauvegarde(s) supprimée(s)")
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -6,69 +6,128 @@ Gestionnaire de base de données pour le système de suivi des visas TCA
 
 import sqlite3
 import os
-from typing import List, Dict, Any, Optional
+import sys
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Sequence
 from datetime import datetime
 import json
+import base64
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+
+# Ajouter le chemin parent pour les imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database.archive import ALL_CLIENTS_VIEW, ARCHIVE_TABLE, restore_archived_clients
+from database.migrations import migrate
+from models.client import ClientRow
+from utils.cache_manager import notify_client_change
+from utils.metrics import instrumented_connect
+from utils.phone_numbers import phone_columns, phone_search_digits, suffix_range
+
+# Fichiers dont le schéma a déjà été initialisé dans ce processus
+_initialized_paths = set()
+
+def resolve_db_path(db_path: str = None) -> str:
+    """Résoudre le chemin de la base selon l'environnement (résultat mis en cache)"""
+    return _resolve_db_path(db_path, os.environ.get('TCA_DB_PATH'),
+                            bool(os.environ.get('RENDER')), bool(os.environ.get('VERCEL')))
+
+@lru_cache(maxsize=32)
+def _resolve_db_path(db_path: Optional[str], explicit_path: Optional[str], on_render: bool, on_vercel: bool) -> str:
+    if explicit_path:
+        # Chemin explicite (benchmarks, tests de charge, environnements dédiés)
+        resolved = explicit_path
+    elif on_render:
+        # Pour Render : utiliser un chemin persistant qui contient tous les clients
+        render_data_dir = '/opt/render/project/data'
+        os.makedirs(render_data_dir, exist_ok=True)
+        resolved = os.path.join(render_data_dir, 'visa_system.db')
+    elif on_vercel:
+        # Pour Vercel : utiliser un fichier temporaire
+        import tempfile
+        resolved = os.path.join(tempfile.gettempdir(), 'visa_system_render.db')
+    else:
+        # En local : utiliser le fichier local
+        resolved = db_path or 'visa_system.db'
+    print(f"📊 Base de données utilisée: {resolved}")
+    return resolved
 
 class DatabaseManager:
     """Gestionnaire de base de données SQLite"""
     
+    # Colonnes consultables via query_clients (les colonnes techniques restent privées)
+    QUERY_COLUMNS = (
+        'client_id', 'full_name', 'whatsapp_number', 'application_date', 'transaction_date',
+        'passport_number', 'passport_status', 'nationality', 'visa_status', 'processed_by',
+        'summary', 'notes', 'responsible_employee', 'created_at', 'updated_at'
+    )
+    QUERY_DEFAULT_COLUMNS = (
+        'client_id', 'full_name', 'whatsapp_number', 'nationality', 'visa_status',
+        'responsible_employee', 'application_date', 'transaction_date', 'notes'
+    )
+    # Expressions de tri sans NULL (comparaisons de curseur fiables)
+    QUERY_SORT_EXPRESSIONS = {
+        'client_id': "COALESCE(CAST(SUBSTR(client_id, 4) AS INTEGER), -1)",
+        'full_name': "COALESCE(full_name, '')",
+        'application_date': "COALESCE(application_date, '')",
+        'transaction_date': "COALESCE(transaction_date, '')",
+        'nationality': "COALESCE(nationality, '')",
+        'visa_status': "COALESCE(visa_status, '')",
+        'responsible_employee': "COALESCE(responsible_employee, '')",
+        'updated_at': "COALESCE(updated_at, '')",
+    }
+    FACET_COLUMNS = ('visa_status', 'nationality', 'responsible_employee')
+    # Tri des listes: identifiants vides en dernier, puis numérique décroissant (CLI1000 avant
+    # CLI976); mêmes expressions que l'index idx_clients_list_order (migration 7)
+    LIST_ORDER_KEYS = ("CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END",
+                       "CAST(SUBSTR(client_id, 4) AS INTEGER)")
+    LIST_ORDER_BY = f"{LIST_ORDER_KEYS[0]} ASC, {LIST_ORDER_KEYS[1]} DESC"
+    # Source des listes (database/archive.py): 'hot' = dossiers actifs (table clients,
+    # servie par ses index), 'all' = actifs et archivés (vue UNION ALL clients_all)
+    CLIENT_TIERS = {'hot': 'clients', 'all': ALL_CLIENTS_VIEW}
+    
+    # Projections par vue des listes (au lieu de SELECT *: la table importée porte
+    # des dizaines de colonnes excel_col_* et le JSON original_data)
+    VIEW_COLUMNS = {
+        # Tableau des clients (_client_row.html) et tableau de bord
+        'list': ('client_id', 'full_name', 'whatsapp_number', 'application_date', 'transaction_date',
+                 'passport_number', 'passport_status', 'nationality', 'visa_status',
+                 'responsible_employee', 'processed_by', 'summary', 'notes', 'created_at'),
+        # Recherche instantanée
+        'search': ('client_id', 'full_name', 'whatsapp_number', 'visa_status', 'nationality', 'passport_number'),
+        # Export Excel
+        'export': ('client_id', 'full_name', 'whatsapp_number', 'application_date', 'transaction_date',
+                   'passport_number', 'passport_status', 'nationality', 'visa_status', 'processed_by',
+                   'summary', 'notes', 'responsible_employee', 'created_at', 'updated_at'),
+        # Statistiques et analyses
+        'analytics': ('client_id', 'full_name', 'whatsapp_number', 'passport_number', 'nationality',
+                      'visa_status', 'responsible_employee', 'created_at'),
+    }
+    
+    # Champs modifiables en ligne: colonnes écrites pour chaque champ
+    INLINE_FIELD_UPDATES = {
+        'visa_status': 'visa_status = ?, visa_status_normalized = ?',
+        'responsible_employee': 'responsible_employee = ?',
+        'application_date': 'application_date = ?',
+        'transaction_date': 'transaction_date = ?',
+    }
+    
     def __init__(self, db_path: str = None):
         """Initialiser le gestionnaire de base de données"""
-        # Pour Render : utiliser la base de données principale qui contient tous les clients
-        import os
-        if os.environ.get('RENDER'):
-            # Utiliser un chemin persistant sur Render
-            render_data_dir = '/opt/render/project/data'
-            os.makedirs(render_data_dir, exist_ok=True)
-            self.db_path = os.path.join(render_data_dir, 'visa_system.db')
-        elif os.environ.get('VERCEL'):
-            # Pour Vercel : utiliser un fichier temporaire
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            self.db_path = os.path.join(temp_dir, 'visa_system_render.db')
-        else:
-            # En local : utiliser le fichier local
-            self.db_path = db_path or 'visa_system.db'
-        
-        print(f"📊 Base de données utilisée: {self.db_path}")
-        self.init_database()
+        self.db_path = resolve_db_path(db_path)
+        # Le schéma n'est vérifié qu'une fois par processus et par fichier
+        if self.db_path not in _initialized_paths or not os.path.exists(self.db_path):
+            self.init_database()
+            _initialized_paths.add(self.db_path)
     
     def init_database(self):
-        """Initialiser la base de données et créer les tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Initialiser la base de données: migrations du schéma en attente (voir database/migrations.py)"""
+        migrate(self.db_path)
         
-        # Créer la table clients si elle n'existe pas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS clients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_id TEXT UNIQUE,
-                full_name TEXT,
-                whatsapp_number TEXT,
-                whatsapp_number_clean TEXT,
-                application_date TEXT,
-                transaction_date TEXT,
-                passport_number TEXT UNIQUE,
-                passport_status TEXT,
-                passport_status_normalized TEXT,
-                nationality TEXT,
-                visa_status TEXT,
-                visa_status_normalized TEXT,
-                processed_by TEXT,
-                summary TEXT,
-                notes TEXT,
-                responsible_employee TEXT,
-                original_row_number INTEGER,
-                import_timestamp TEXT,
-                is_duplicate BOOLEAN DEFAULT FALSE,
-                auto_generated_id BOOLEAN DEFAULT FALSE,
-                empty_name_accepted BOOLEAN DEFAULT FALSE,
-                extra_data TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP
-            )
-        ''')
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
         # Ne pas ajouter de données de test sur Render - utiliser les données réelles existantes
         # Les données de test ne sont ajoutées que pour Vercel
@@ -108,8 +167,47 @@ class DatabaseManager:
         conn.close()
     
     def get_connection(self):
-        """Obtenir une connexion à la base de données"""
-        return sqlite3.connect(self.db_path)
+        """Obtenir une connexion à la base de données (requêtes chronométrées pour /metrics)"""
+        return instrumented_connect(self.db_path)
+    
+    CLIENT_INSERT_SQL = '''
+        INSERT INTO clients (
+            client_id, full_name, whatsapp_number, whatsapp_number_clean, whatsapp_number_rev,
+            application_date, transaction_date, passport_number, passport_status,
+            passport_status_normalized, nationality, visa_status, visa_status_normalized,
+            processed_by, summary, notes, responsible_employee, original_row_number,
+            import_timestamp, is_duplicate, auto_generated_id, empty_name_accepted,
+            extra_data, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    @staticmethod
+    def _client_insert_params(client_data: Dict[str, Any]) -> tuple:
+        return (
+            client_data.get('client_id'),
+            client_data.get('full_name'),
+            client_data.get('whatsapp_number'),
+            *phone_columns(client_data.get('whatsapp_number')),
+            client_data.get('application_date'),
+            client_data.get('transaction_date'),
+            client_data.get('passport_number'),
+            client_data.get('passport_status'),
+            client_data.get('passport_status_normalized'),
+            client_data.get('nationality'),
+            client_data.get('visa_status'),
+            client_data.get('visa_status_normalized'),
+            client_data.get('processed_by'),
+            client_data.get('summary'),
+            client_data.get('notes'),
+            client_data.get('responsible_employee'),
+            client_data.get('original_row_number'),
+            client_data.get('import_timestamp'),
+            client_data.get('is_duplicate', False),
+            client_data.get('auto_generated_id', False),
+            client_data.get('empty_name_accepted', False),
+            client_data.get('extra_data'),
+            client_data.get('created_at', datetime.now().isoformat())
+        )
     
     def add_client(self, client_data: Dict[str, Any]) -> Optional[int]:
         """Ajouter un nouveau client"""
@@ -117,43 +215,11 @@ class DatabaseManager:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO clients (
-                    client_id, full_name, whatsapp_number, whatsapp_number_clean,
-                    application_date, transaction_date, passport_number, passport_status,
-                    passport_status_normalized, nationality, visa_status, visa_status_normalized,
-                    processed_by, summary, notes, responsible_employee, original_row_number,
-                    import_timestamp, is_duplicate, auto_generated_id, empty_name_accepted,
-                    extra_data, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                client_data.get('client_id'),
-                client_data.get('full_name'),
-                client_data.get('whatsapp_number'),
-                client_data.get('whatsapp_number_clean'),
-                client_data.get('application_date'),
-                client_data.get('transaction_date'),
-                client_data.get('passport_number'),
-                client_data.get('passport_status'),
-                client_data.get('passport_status_normalized'),
-                client_data.get('nationality'),
-                client_data.get('visa_status'),
-                client_data.get('visa_status_normalized'),
-                client_data.get('processed_by'),
-                client_data.get('summary'),
-                client_data.get('notes'),
-                client_data.get('responsible_employee'),
-                client_data.get('original_row_number'),
-                client_data.get('import_timestamp'),
-                client_data.get('is_duplicate', False),
-                client_data.get('auto_generated_id', False),
-                client_data.get('empty_name_accepted', False),
-                client_data.get('extra_data'),
-                client_data.get('created_at', datetime.now().isoformat())
-            ))
+            cursor.execute(self.CLIENT_INSERT_SQL, self._client_insert_params(client_data))
             
             client_id = cursor.lastrowid
             conn.commit()
+            notify_client_change([client_data.get('client_id')])
             return client_data.get('client_id')
             
         except Exception as e:
@@ -162,21 +228,64 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def add_clients_bulk(self, clients: List[Dict[str, Any]]) -> tuple[List[str], List[tuple[int, str]]]:
+        """
+        Ajouter un lot de clients en une transaction (imports)
+        
+        Un executemany insère le lot; si une ligne viole une contrainte
+        (identifiant ou passeport déjà présent), le lot est rejoué ligne par
+        ligne dans la même transaction et seules les lignes fautives sont écartées.
+        
+        Returns:
+            (client_id insérés, [(position dans le lot, message d'erreur)])
+        """
+        if not clients:
+            return [], []
+        params = [self._client_insert_params(client_data) for client_data in clients]
+        conn = self.get_connection()
+        failures = []
+        try:
+            conn.execute('BEGIN')
+            try:
+                conn.executemany(self.CLIENT_INSERT_SQL, params)
+                inserted = [client_data.get('client_id') for client_data in clients]
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                conn.execute('BEGIN')
+                inserted = []
+                for position, (client_data, values) in enumerate(zip(clients, params)):
+                    try:
+                        conn.execute(self.CLIENT_INSERT_SQL, values)
+                        inserted.append(client_data.get('client_id'))
+                    except sqlite3.IntegrityError as e:
+                        failures.append((position, str(e)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if inserted:
+            notify_client_change(inserted)
+        return inserted, failures
+    
     def delete_all_clients(self) -> int:
         """Supprimer tous les clients - retourne le nombre de clients supprimés"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Compter les clients avant suppression
-            cursor.execute('SELECT COUNT(*) FROM clients')
+            # Compter les clients avant suppression (actifs et archivés)
+            cursor.execute(f'SELECT COUNT(*) FROM {ALL_CLIENTS_VIEW}')
             count_before = cursor.fetchone()[0]
             
             # Supprimer tous les clients
             cursor.execute('DELETE FROM clients')
+            cursor.execute(f'DELETE FROM {ARCHIVE_TABLE}')
             
             # Valider la transaction
             conn.commit()
+            notify_client_change(None)
             
             return count_before
             
@@ -186,27 +295,108 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def get_all_clients(self, page: int = 1, per_page: int = 50) -> tuple[List[sqlite3.Row], int]:
-        """Récupérer tous les clients avec pagination"""
+    def _list_connection(self, view: Optional[str]) -> tuple[sqlite3.Connection, str]:
+        """
+        Connexion et liste SELECT d'une vue de VIEW_COLUMNS
+        
+        Avec une vue, les lignes sont des ClientRow (pas de copie en dict);
+        sans vue, SELECT * et sqlite3.Row comme auparavant.
+        """
+        if view is not None and view not in self.VIEW_COLUMNS:
+            raise ValueError(f'Vue inconnue: {view}')
         conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
+        if view is None:
+            conn.row_factory = sqlite3.Row
+            return conn, '*'
+        conn.row_factory = ClientRow.row_factory()
+        return conn, ', '.join(self.VIEW_COLUMNS[view])
+    
+    def _client_source(self, tier: str) -> str:
+        """Table ou vue lue pour un tier de CLIENT_TIERS"""
+        if tier not in self.CLIENT_TIERS:
+            raise ValueError(f'Tier inconnu: {tier}')
+        return self.CLIENT_TIERS[tier]
+    
+    def _tier_tables(self, tier: str) -> tuple:
+        """
+        Tables d'un tier, pour les comptes et agrégats
+        
+        Une requête par table puis somme en Python: chaque table est comptée par
+        ses index, là où la vue UNION ALL relirait toutes les lignes des deux.
+        """
+        return ('clients',) if self._client_source(tier) == 'clients' else ('clients', ARCHIVE_TABLE)
+    
+    @staticmethod
+    def _count_rows(cursor: sqlite3.Cursor, tables: tuple, where_clause: str = '', params: List[Any] = ()) -> int:
+        return sum(cursor.execute(f'SELECT COUNT(*) FROM {table} {where_clause}', params).fetchone()[0]
+                   for table in tables)
+    
+    @staticmethod
+    def _count_by(cursor: sqlite3.Cursor, tables: tuple, expression: str, where_clause: str = '',
+                  params: List[Any] = ()) -> Dict[Any, int]:
+        counts = {}
+        for table in tables:
+            for value, count in cursor.execute(
+                    f'SELECT {expression}, COUNT(*) FROM {table} {where_clause} GROUP BY 1', params):
+                counts[value] = counts.get(value, 0) + count
+        return counts
+    
+    @staticmethod
+    def _list_order_key(row: tuple) -> tuple:
+        """Clé Python de LIST_ORDER_BY pour (rang, numéro, id): NULL en dernier comme en SQL (DESC)"""
+        return (row[0], row[1] is None, -(row[1] or 0))
+    
+    @staticmethod
+    def _merge_page_keys(conn: sqlite3.Connection, tables: tuple, key_sql: str, where_clause: str,
+                         params: List[Any], order_sql: str, key, skip: int, limit: int,
+                         reverse: bool = False) -> List[tuple]:
+        """
+        Clés de tri (… , id) d'une page répartie sur plusieurs tables
+        
+        Chaque table fournit ses skip + limit premières clés dans l'ordre de son
+        index (lecture de l'index seul), fusionnées en Python: l'union n'est
+        jamais triée en entier. Les lignes de la page sont ensuite lues par id.
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        parts = [cursor.execute(f'SELECT {key_sql}, id FROM {table} {where_clause} ORDER BY {order_sql} LIMIT ?',
+                                list(params) + [skip + limit]).fetchall()
+                 for table in tables]
+        return list(islice(merge(*parts, key=key, reverse=reverse), skip, skip + limit))
+    
+    def get_all_clients(self, page: int = 1, per_page: int = 50, view: Optional[str] = None,
+                        tier: str = 'all') -> tuple[List[Any], int]:
+        """Récupérer tous les clients avec pagination (view: projection de VIEW_COLUMNS, tier: CLIENT_TIERS)"""
+        source = self._client_source(tier)
+        conn, projection = self._list_connection(view)
         cursor = conn.cursor()
         
         try:
             # Compter le total
-            cursor.execute('SELECT COUNT(*) FROM clients')
-            total = cursor.fetchone()[0]
+            tables = self._tier_tables(tier)
+            total = self._count_rows(cursor, tables)
             
             # Calculer l'offset
             offset = (page - 1) * per_page
             
+            if len(tables) > 1:
+                # Actifs et archivés: page fusionnée depuis l'index de tri de chaque table
+                keys = self._merge_page_keys(conn, tables, ', '.join(self.LIST_ORDER_KEYS), '', [],
+                                             self.LIST_ORDER_BY, self._list_order_key, offset, per_page)
+                if not keys:
+                    return [], total
+                cursor.execute(f"""
+                    SELECT {projection} FROM {source} 
+                    WHERE id IN ({', '.join('?' * len(keys))})
+                    ORDER BY {self.LIST_ORDER_BY}
+                """, [key[-1] for key in keys])
+                return cursor.fetchall(), total
+            
             # Récupérer les clients paginés avec tri décroissant par client_id (plus récent en premier)
             # Tri numérique pour que CLI1000 soit avant CLI976
-            cursor.execute("""
-                SELECT * FROM clients 
-                ORDER BY 
-                    CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END ASC,
-                    CAST(SUBSTR(client_id, 4) AS INTEGER) DESC 
+            cursor.execute(f"""
+                SELECT {projection} FROM {source} 
+                ORDER BY {self.LIST_ORDER_BY}
                 LIMIT ? OFFSET ?
             """, (per_page, offset))
             clients = cursor.fetchall()
@@ -221,7 +411,7 @@ class DatabaseManager:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('SELECT * FROM clients WHERE client_id = ?', (client_id,))
+            cursor.execute(f'SELECT * FROM {ALL_CLIENTS_VIEW} WHERE client_id = ?', (client_id,))
             client = cursor.fetchone()
             return client
         finally:
@@ -239,12 +429,12 @@ class DatabaseManager:
         try:
             if exclude_client_id:
                 cursor.execute(
-                    'SELECT COUNT(*) as count FROM clients WHERE passport_number = ? AND client_id != ?', 
+                    f'SELECT COUNT(*) as count FROM {ALL_CLIENTS_VIEW} WHERE passport_number = ? AND client_id != ?', 
                     (passport_number.strip(), exclude_client_id)
                 )
             else:
                 cursor.execute(
-                    'SELECT COUNT(*) as count FROM clients WHERE passport_number = ?', 
+                    f'SELECT COUNT(*) as count FROM {ALL_CLIENTS_VIEW} WHERE passport_number = ?', 
                     (passport_number.strip(),)
                 )
             
@@ -253,77 +443,139 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def search_clients(self, search_term: str, page: int = 1, per_page: int = 50) -> tuple[List[sqlite3.Row], int]:
-        """Rechercher des clients avec pagination"""
+    def get_existing_passport_numbers(self, passport_numbers: List[str]) -> set:
+        """
+        Numéros de passeport déjà enregistrés parmi ceux donnés
+        
+        Une seule requête quel que soit le nombre de numéros: la liste est passée
+        en un paramètre JSON (json_each) et jointe à l'index du passeport.
+        """
+        passport_numbers = list(dict.fromkeys(number for number in passport_numbers if number))
+        if not passport_numbers:
+            return set()
         conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
+        try:
+            # Sans DISTINCT: la condition est poussée dans chaque table de la vue (index du passeport)
+            rows = conn.execute(
+                f'SELECT passport_number FROM {ALL_CLIENTS_VIEW} '
+                'WHERE passport_number IN (SELECT value FROM json_each(?))',
+                (json.dumps(passport_numbers, ensure_ascii=False),))
+            return {row[0] for row in rows}
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _prefix_range(prefix: str) -> List[str]:
+        """Bornes [bas, haut) des valeurs commençant par `prefix` (parcours d'index)"""
+        return [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+    
+    @classmethod
+    def _search_condition(cls, search_term: str, cursor=None,
+                          tables: Sequence[str] = ('clients',)) -> tuple[str, List[Any]]:
+        """
+        Condition WHERE de la recherche libre
+        
+        Un terme numérique de 6 chiffres ou plus est cherché en fin de numéro
+        WhatsApp via l'index whatsapp_number_rev, et en début de client_id
+        (avec ou sans CLI) / passport_number par leurs index, au lieu de quatre
+        LIKE '%...%' qui parcourent toute la table. Avec `cursor`, si ces
+        conditions indexées ne trouvent rien dans `tables`, la recherche revient
+        aux LIKE (fragment au milieu d'un numéro ou d'un passeport).
+        
+        Restriction voulue: dès qu'une correspondance ancrée existe, les
+        correspondances LIKE seules (nom, milieu d'un numéro ou d'un passeport)
+        ne sont pas retournées. L'index de /api/search-instant applique la même
+        règle (utils/search_index.py), pour des résultats identiques.
+        """
+        phone_digits = phone_search_digits(search_term)
+        if phone_digits:
+            term = search_term.strip()
+            condition = ("((whatsapp_number_rev >= ? AND whatsapp_number_rev < ?) "
+                         "OR (client_id >= ? AND client_id < ?) OR (client_id >= ? AND client_id < ?) "
+                         "OR (passport_number >= ? AND passport_number < ?))")
+            params = (list(suffix_range(phone_digits)) + cls._prefix_range(term)
+                      + cls._prefix_range(f'CLI{term}') + cls._prefix_range(term))
+            if cursor is None or any(
+                    cursor.execute(f'SELECT EXISTS(SELECT 1 FROM {table} WHERE {condition})', params).fetchone()[0]
+                    for table in tables):
+                return condition, params
+        # Numéro saisi et numéro E.164 (sans espaces, avec indicatif): mêmes champs que l'index en mémoire
+        search_pattern = f'%{search_term}%'
+        condition = ("full_name LIKE ? OR client_id LIKE ? OR whatsapp_number LIKE ? "
+                     "OR whatsapp_number_clean LIKE ? OR passport_number LIKE ?")
+        params = [search_pattern] * 5
+        if phone_digits:
+            condition += " OR whatsapp_number_clean LIKE ?"
+            params.append(f'%{phone_digits}%')
+        return f'({condition})', params
+    
+    def search_clients(self, search_term: str, page: int = 1, per_page: int = 50,
+                       view: Optional[str] = None, tier: str = 'all') -> tuple[List[Any], int]:
+        """Rechercher des clients avec pagination (view: projection de VIEW_COLUMNS, tier: CLIENT_TIERS)"""
+        source = self._client_source(tier)
+        conn, projection = self._list_connection(view)
         cursor = conn.cursor()
         
         try:
-            search_pattern = f'%{search_term}%'
+            search_condition, params = self._search_condition(search_term, cursor, self._tier_tables(tier))
             
             # Compter le total des résultats
-            cursor.execute('''
-                SELECT COUNT(*) FROM clients 
-                WHERE full_name LIKE ? 
-                   OR client_id LIKE ? 
-                   OR whatsapp_number LIKE ? 
-                   OR passport_number LIKE ?
-            ''', (search_pattern, search_pattern, search_pattern, search_pattern))
-            total = cursor.fetchone()[0]
+            total = self._count_rows(cursor, self._tier_tables(tier), f'WHERE {search_condition}', params)
             
             # Calculer l'offset
             offset = (page - 1) * per_page
             
             # Récupérer les clients paginés avec tri chronologique par client_id
             # Tri numérique pour que CLI1000 soit avant CLI976
-            cursor.execute('''
-                SELECT * FROM clients 
-                WHERE full_name LIKE ? 
-                   OR client_id LIKE ? 
-                   OR whatsapp_number LIKE ? 
-                   OR passport_number LIKE ?
-                ORDER BY 
-                   CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END ASC,
-                   CAST(SUBSTR(client_id, 4) AS INTEGER) DESC
+            cursor.execute(f'''
+                SELECT {projection} FROM {source} 
+                WHERE {search_condition}
+                ORDER BY {self.LIST_ORDER_BY}
                 LIMIT ? OFFSET ?
-            ''', (search_pattern, search_pattern, search_pattern, search_pattern, per_page, offset))
+            ''', params + [per_page, offset])
             
             clients = cursor.fetchall()
             return clients, total
         finally:
             conn.close()
     
-    def get_filtered_clients(self, filters: Dict[str, str] = None, page: int = 1, per_page: int = 50) -> tuple[List[sqlite3.Row], int]:
-        """Récupérer les clients avec filtres et pagination"""
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
+    def _client_filter_conditions(self, filters: Dict[str, str] = None, exclude: str = None, cursor=None,
+                                  tables: Sequence[str] = ('clients',)) -> tuple[List[str], List[Any]]:
+        """
+        Construire les conditions WHERE des filtres clients
+        
+        Args:
+            exclude: Filtre ignoré (facettes)
+            cursor, tables: Recherche numérique sans résultat indexé -> repli LIKE (voir _search_condition)
+        """
+        where_conditions = []
+        params = []
+        if not filters:
+            return where_conditions, params
+        
+        if filters.get('search'):
+            search_condition, search_params = self._search_condition(filters['search'], cursor, tables)
+            where_conditions.append(search_condition)
+            params.extend(search_params)
+        
+        for column in self.FACET_COLUMNS:
+            if column != exclude and filters.get(column):
+                where_conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        
+        return where_conditions, params
+    
+    def get_filtered_clients(self, filters: Dict[str, str] = None, page: int = 1, per_page: int = 50,
+                             view: Optional[str] = None, tier: str = 'all') -> tuple[List[Any], int]:
+        """Récupérer les clients avec filtres et pagination (view: projection de VIEW_COLUMNS, tier: CLIENT_TIERS)"""
+        source = self._client_source(tier)
+        conn, projection = self._list_connection(view)
         cursor = conn.cursor()
         
         try:
             # Construire la requête WHERE dynamiquement
-            where_conditions = []
-            params = []
-            
-            if filters:
-                if filters.get('search'):
-                    search_pattern = f"%{filters['search']}%"
-                    where_conditions.append(
-                        "(full_name LIKE ? OR client_id LIKE ? OR whatsapp_number LIKE ? OR passport_number LIKE ?)"
-                    )
-                    params.extend([search_pattern, search_pattern, search_pattern, search_pattern])
-                
-                if filters.get('visa_status'):
-                    where_conditions.append("visa_status = ?")
-                    params.append(filters['visa_status'])
-                
-                if filters.get('nationality'):
-                    where_conditions.append("nationality = ?")
-                    params.append(filters['nationality'])
-                
-                if filters.get('responsible_employee'):
-                    where_conditions.append("responsible_employee = ?")
-                    params.append(filters['responsible_employee'])
+            where_conditions, params = self._client_filter_conditions(filters, cursor=cursor,
+                                                                      tables=self._tier_tables(tier))
             
             # Construire la clause WHERE
             where_clause = ""
@@ -331,9 +583,7 @@ class DatabaseManager:
                 where_clause = "WHERE " + " AND ".join(where_conditions)
             
             # Compter le total
-            count_query = f"SELECT COUNT(*) FROM clients {where_clause}"
-            cursor.execute(count_query, params)
-            total = cursor.fetchone()[0]
+            total = self._count_rows(cursor, self._tier_tables(tier), where_clause, params)
             
             # Calculer l'offset
             offset = (page - 1) * per_page
@@ -341,10 +591,8 @@ class DatabaseManager:
             # Récupérer les clients paginés avec tri chronologique par client_id
             # Tri numérique pour que CLI1000 soit avant CLI976
             select_query = (
-                f"SELECT * FROM clients {where_clause} "
-                "ORDER BY "
-                "CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END ASC, "
-                "CAST(SUBSTR(client_id, 4) AS INTEGER) DESC "
+                f"SELECT {projection} FROM {source} {where_clause} "
+                f"ORDER BY {self.LIST_ORDER_BY} "
                 "LIMIT ? OFFSET ?"
             )
             cursor.execute(select_query, params + [per_page, offset])
@@ -354,6 +602,119 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    @staticmethod
+    def encode_cursor(sort_value: Any, row_id: int) -> str:
+        """Encoder la position (valeur de tri, id) d'une ligne en curseur opaque"""
+        payload = json.dumps([sort_value, row_id], ensure_ascii=False, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(token: str) -> tuple[Any, int]:
+        """Décoder un curseur produit par encode_cursor (ValueError si invalide)"""
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        except Exception:
+            raise ValueError('Curseur invalide')
+        if not isinstance(row_id, int) or not isinstance(sort_value, (str, int, float)):
+            raise ValueError('Curseur invalide')
+        return sort_value, row_id
+    
+    def query_clients(self, filters: Dict[str, str] = None, sort: str = 'client_id', order: str = 'desc',
+                      limit: int = 50, cursor: str = None, offset: int = None,
+                      columns: List[str] = None, with_total: bool = False, tier: str = 'all') -> Dict[str, Any]:
+        """
+        Consultation paginée par curseur (keyset) avec projection de colonnes.
+        
+        Le curseur évite le coût des OFFSET profonds pour le parcours séquentiel;
+        offset reste disponible pour l'accès direct (défilement virtualisé).
+        Avec tier='all', les pages des deux tables sont fusionnées (_merge_page_keys;
+        l'id d'une ligne archivée est conservé, le curseur reste valable).
+        
+        Returns:
+            {'columns', 'rows' (listes de valeurs), 'next_cursor', 'total'}
+        """
+        if sort not in self.QUERY_SORT_EXPRESSIONS:
+            raise ValueError(f'Tri non autorisé: {sort}')
+        columns = [c for c in (columns or self.QUERY_DEFAULT_COLUMNS) if c in self.QUERY_COLUMNS]
+        if not columns:
+            raise ValueError('Aucune colonne valide demandée')
+        descending = order != 'asc'
+        sort_expr = self.QUERY_SORT_EXPRESSIONS[sort]
+        tables = self._tier_tables(tier)
+        
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+        
+        try:
+            where_conditions, params = self._client_filter_conditions(filters, cursor=db_cursor, tables=tables)
+            total = None
+            if with_total:
+                where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ''
+                total = self._count_rows(db_cursor, tables, where_clause, params)
+            
+            page_conditions = list(where_conditions)
+            page_params = list(params)
+            if cursor:
+                sort_value, row_id = self.decode_cursor(cursor)
+                comparison = '<' if descending else '>'
+                page_conditions.append(f"({sort_expr} {comparison} ? OR ({sort_expr} = ? AND id {comparison} ?))")
+                page_params.extend([sort_value, sort_value, row_id])
+            where_clause = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ''
+            direction = 'DESC' if descending else 'ASC'
+            
+            if len(tables) > 1:
+                # Actifs et archivés: page fusionnée depuis l'index de tri de chaque table, lignes lues par id
+                keys = self._merge_page_keys(conn, tables, f'{sort_expr} AS sort_key', where_clause, page_params,
+                                             f'sort_key {direction}, id {direction}', lambda row: (row[0], row[1]),
+                                             offset if offset and not cursor else 0, limit, reverse=descending)
+                by_id = {}
+                if keys:
+                    db_cursor.execute(
+                        f"SELECT {', '.join(columns)}, {sort_expr} AS sort_key, id AS row_id FROM {ALL_CLIENTS_VIEW} "
+                        f"WHERE id IN ({', '.join('?' * len(keys))})", [key[-1] for key in keys])
+                    by_id = {row[-1]: row for row in db_cursor.fetchall()}
+                fetched = [by_id[key[-1]] for key in keys if key[-1] in by_id]
+            else:
+                query = (
+                    f"SELECT {', '.join(columns)}, {sort_expr} AS sort_key, id AS row_id FROM clients {where_clause} "
+                    f"ORDER BY sort_key {direction}, id {direction} LIMIT ?"
+                )
+                page_params.append(limit)
+                if offset and not cursor:
+                    query += " OFFSET ?"
+                    page_params.append(offset)
+                db_cursor.execute(query, page_params)
+                fetched = db_cursor.fetchall()
+            
+            rows = [list(row[:-2]) for row in fetched]
+            next_cursor = None
+            if len(fetched) == limit:
+                next_cursor = self.encode_cursor(fetched[-1][-2], fetched[-1][-1])
+            
+            return {'columns': columns, 'rows': rows, 'next_cursor': next_cursor, 'total': total}
+        finally:
+            conn.close()
+    
+    def get_client_facets(self, filters: Dict[str, str] = None, tier: str = 'all') -> Dict[str, Dict[str, int]]:
+        """Compter les valeurs de chaque facette (chaque facette ignore son propre filtre; tier: CLIENT_TIERS)"""
+        tables = self._tier_tables(tier)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            facets = {}
+            for column in self.FACET_COLUMNS:
+                where_conditions, params = self._client_filter_conditions(filters, exclude=column, cursor=cursor,
+                                                                          tables=tables)
+                where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ''
+                counts = self._count_by(cursor, tables, f"COALESCE({column}, '')", where_clause, params)
+                # Valeurs les plus fréquentes d'abord
+                facets[column] = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+            return facets
+        finally:
+            conn.close()
+    
     def update_client(self, client_id: str, client_data: Dict[str, Any]) -> bool:
         """Mettre à jour un client"""
         conn = self.get_connection()
@@ -362,10 +723,12 @@ class DatabaseManager:
         try:
             # Ajouter la date de mise à jour automatiquement
             current_timestamp = datetime.now().isoformat()
+            # Un dossier archivé modifié redevient actif
+            restore_archived_clients(conn, [client_id])
             
             cursor.execute('''
                 UPDATE clients SET
-                    full_name = ?, whatsapp_number = ?, whatsapp_number_clean = ?,
+                    full_name = ?, whatsapp_number = ?, whatsapp_number_clean = ?, whatsapp_number_rev = ?,
                     application_date = ?, transaction_date = ?, passport_number = ?,
                     passport_status = ?, passport_status_normalized = ?, nationality = ?,
                     visa_status = ?, visa_status_normalized = ?, processed_by = ?,
@@ -374,7 +737,7 @@ class DatabaseManager:
             ''', (
                 client_data.get('full_name'),
                 client_data.get('whatsapp_number'),
-                client_data.get('whatsapp_number_clean'),
+                *phone_columns(client_data.get('whatsapp_number')),
                 client_data.get('application_date'),
                 client_data.get('transaction_date'),
                 client_data.get('passport_number'),
@@ -393,6 +756,8 @@ class DatabaseManager:
             
             success = cursor.rowcount > 0
             conn.commit()
+            if success:
+                notify_client_change([client_id])
             return success
             
         except Exception as e:
@@ -401,45 +766,33 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def _inline_field_params(self, field: str, value: str) -> tuple:
+        """Valeurs des colonnes écrites par INLINE_FIELD_UPDATES[field]"""
+        if field == 'visa_status':
+            return (value, value.lower().replace(' ', '_'))
+        return (value,)
+    
     def update_client_field(self, client_id: str, field: str, value: str) -> bool:
         """Mettre à jour un champ spécifique d'un client"""
+        if field not in self.INLINE_FIELD_UPDATES:
+            return False
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Vérifier que le client existe
-            cursor.execute('SELECT id FROM clients WHERE client_id = ?', (client_id,))
-            if not cursor.fetchone():
-                return False
-            
-            # Mettre à jour le champ spécifique
+            # Mettre à jour le champ spécifique (rowcount = 0 si le client n'existe pas)
             current_timestamp = datetime.now().isoformat()
-            
-            if field == 'visa_status':
-                cursor.execute('''
-                    UPDATE clients SET visa_status = ?, visa_status_normalized = ?, updated_at = ?
-                    WHERE client_id = ?
-                ''', (value, value.lower().replace(' ', '_'), current_timestamp, client_id))
-            elif field == 'responsible_employee':
-                cursor.execute('''
-                    UPDATE clients SET responsible_employee = ?, updated_at = ?
-                    WHERE client_id = ?
-                ''', (value, current_timestamp, client_id))
-            elif field == 'application_date':
-                cursor.execute('''
-                    UPDATE clients SET application_date = ?, updated_at = ?
-                    WHERE client_id = ?
-                ''', (value, current_timestamp, client_id))
-            elif field == 'transaction_date':
-                cursor.execute('''
-                    UPDATE clients SET transaction_date = ?, updated_at = ?
-                    WHERE client_id = ?
-                ''', (value, current_timestamp, client_id))
-            else:
-                return False
+            restore_archived_clients(conn, [client_id])
+            cursor.execute(
+                f"UPDATE clients SET {self.INLINE_FIELD_UPDATES[field]}, updated_at = ? WHERE client_id = ?",
+                self._inline_field_params(field, value) + (current_timestamp, client_id)
+            )
             
             success = cursor.rowcount > 0
             conn.commit()
+            if success:
+                notify_client_change([client_id])
             return success
             
         except Exception as e:
@@ -449,6 +802,339 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def update_client_fields_batch(self, edits: List[Dict[str, str]]) -> List[bool]:
+        """
+        Appliquer plusieurs modifications de champs dans une seule transaction
+        
+        Args:
+            edits: Liste de {'client_id', 'field', 'value'} (champs de INLINE_FIELD_UPDATES)
+            
+        Returns:
+            Pour chaque modification, True si une ligne a été mise à jour
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            current_timestamp = datetime.now().isoformat()
+            # Un seul verrou d'écriture pour tout le lot
+            cursor.execute('BEGIN IMMEDIATE')
+            restore_archived_clients(conn, [edit['client_id'] for edit in edits
+                                            if edit['field'] in self.INLINE_FIELD_UPDATES])
+            results = []
+            for edit in edits:
+                field = edit['field']
+                if field not in self.INLINE_FIELD_UPDATES:
+                    results.append(False)
+                    continue
+                cursor.execute(
+                    f"UPDATE clients SET {self.INLINE_FIELD_UPDATES[field]}, updated_at = ? WHERE client_id = ?",
+                    self._inline_field_params(field, edit['value']) + (current_timestamp, edit['client_id'])
+                )
+                results.append(cursor.rowcount > 0)
+            conn.commit()
+            notify_client_change([edit['client_id'] for edit, ok in zip(edits, results) if ok])
+            return results
+            
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def bulk_update_status(self, client_ids: List[str], new_status: str,
+                           batch_id: str = None, source: str = 'bulk') -> Dict[str, List[Any]]:
+        """
+        Passer plusieurs clients au même statut dans une seule transaction (avec historique)
+
+        Args:
+            client_ids: Identifiants des clients
+            new_status: Statut cible
+            batch_id: Identifiant commun des lignes d'historique du lot
+            source: Origine de la modification (enregistrée dans l'historique)
+
+        Returns:
+            {'changed': [clients avant modification], 'unchanged': [ids], 'missing': [ids],
+             'conflicts': [ids archivés non restaurés]}
+        """
+        client_ids = list(dict.fromkeys(client_ids))
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        try:
+            current_timestamp = datetime.now().isoformat()
+            # Lecture et écriture sous le même verrou: aucun statut modifié entre les deux
+            cursor.execute('BEGIN IMMEDIATE')
+            existing = {}
+            for start in range(0, len(client_ids), 500):
+                chunk = client_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'SELECT * FROM {ALL_CLIENTS_VIEW} WHERE client_id IN ({placeholders})', chunk)
+                for row in cursor.fetchall():
+                    existing[row['client_id']] = dict(row)
+
+            changed = [existing[cid] for cid in client_ids
+                       if cid in existing and existing[cid].get('visa_status') != new_status]
+            # Dossiers archivés non restaurables (passeport repris): ni modifiés ni historisés
+            conflicts = restore_archived_clients(conn, [client['client_id'] for client in changed])['conflicts']
+            changed = [client for client in changed if client['client_id'] not in conflicts]
+            changed_ids = [client['client_id'] for client in changed]
+
+            for start in range(0, len(changed_ids), 500):
+                chunk = changed_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(
+                    f"UPDATE clients SET visa_status = ?, visa_status_normalized = ?, updated_at = ? "
+                    f"WHERE client_id IN ({placeholders})",
+                    [new_status, new_status.lower().replace(' ', '_'), current_timestamp] + chunk
+                )
+
+            cursor.executemany('''
+                INSERT INTO status_history (client_id, old_status, new_status, changed_at, batch_id, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(client['client_id'], client.get('visa_status'), new_status, current_timestamp, batch_id, source)
+                  for client in changed])
+
+            conn.commit()
+            notify_client_change(changed_ids)
+            return {
+                'changed': changed,
+                'unchanged': [cid for cid in client_ids
+                              if cid in existing and existing[cid].get('visa_status') == new_status],
+                'missing': [cid for cid in client_ids if cid not in existing],
+                'conflicts': conflicts
+            }
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get_status_history(self, client_id: str) -> List[sqlite3.Row]:
+        """Historique des changements de statut d'un client (du plus récent au plus ancien)"""
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+                SELECT client_id, old_status, new_status, changed_at, batch_id, source
+                FROM status_history WHERE client_id = ?
+                ORDER BY changed_at DESC, id DESC
+            ''', (client_id,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def get_clients_by_ids(self, client_ids: List[str]) -> Dict[str, sqlite3.Row]:
+        """Récupérer plusieurs clients en une requête (clé = client_id)"""
+        client_ids = list(dict.fromkeys(client_ids))
+        if not client_ids:
+            return {}
+        
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            clients = {}
+            # Limite de variables SQLite: lots de 500 identifiants
+            for start in range(0, len(client_ids), 500):
+                chunk = client_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'SELECT * FROM {ALL_CLIENTS_VIEW} WHERE client_id IN ({placeholders})', chunk)
+                for row in cursor.fetchall():
+                    clients[row['client_id']] = row
+            return clients
+        finally:
+            conn.close()
+    
+    def get_existing_client_ids(self, client_ids: List[str]) -> set:
+        """Identifiants déjà présents parmi ceux donnés (une requête par lot de 500)"""
+        client_ids = list(dict.fromkeys(client_id for client_id in client_ids if client_id))
+        existing = set()
+        if not client_ids:
+            return existing
+        conn = self.get_connection()
+        try:
+            for start in range(0, len(client_ids), 500):
+                chunk = client_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                existing.update(row[0] for row in conn.execute(
+                    f'SELECT client_id FROM {ALL_CLIENTS_VIEW} WHERE client_id IN ({placeholders})', chunk))
+            return existing
+        finally:
+            conn.close()
+    
+    # Champs du client conservé complétés par ceux des doublons fusionnés (s'ils sont vides)
+    MERGE_FILL_FIELDS = ('full_name', 'whatsapp_number', 'whatsapp_number_clean', 'whatsapp_number_rev',
+                         'application_date', 'transaction_date', 'passport_number', 'passport_status',
+                         'passport_status_normalized', 'nationality', 'processed_by', 'summary',
+                         'responsible_employee')
+
+    def merge_clients(self, primary_id: str, duplicate_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fusionner des doublons dans un client conservé (une transaction)
+        
+        Les champs vides du client conservé sont complétés, les notes sont
+        concaténées, l'historique des statuts est rattaché au client conservé
+        et les doublons sont supprimés (table clients et archive). Les doublons
+        sont supprimés avant la restauration d'un client conservé archivé: un
+        doublon actif au même passeport ne bloque pas la fusion.
+        
+        Returns:
+            {'primary': id, 'merged': [ids], 'missing': [ids], 'filled_fields': [champs]}
+        
+        Raises:
+            ValueError: Client conservé introuvable, ou archivé et non restaurable
+        """
+        duplicate_ids = [cid for cid in dict.fromkeys(duplicate_ids) if cid and cid != primary_id]
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            placeholders = ', '.join('?' * (len(duplicate_ids) + 1))
+            cursor.execute(f'SELECT * FROM {ALL_CLIENTS_VIEW} WHERE client_id IN ({placeholders})',
+                           [primary_id] + duplicate_ids)
+            rows = {}
+            for row in cursor.fetchall():
+                # Ligne active d'abord (UNION ALL: clients puis archive)
+                rows.setdefault(row['client_id'], dict(row))
+            primary = rows.get(primary_id)
+            if primary is None:
+                raise ValueError(f"Client {primary_id} introuvable")
+            merged = [cid for cid in duplicate_ids if cid in rows]
+            
+            updates = {}
+            notes = [primary.get('notes')] if primary.get('notes') else []
+            for cid in merged:
+                duplicate = rows[cid]
+                for field in self.MERGE_FILL_FIELDS:
+                    if not (updates.get(field) or primary.get(field)) and duplicate.get(field):
+                        updates[field] = duplicate[field]
+                if duplicate.get('notes') and duplicate['notes'] not in notes:
+                    notes.append(duplicate['notes'])
+            if merged:
+                notes.append(f"دمج: {', '.join(merged)}")
+                updates['notes'] = ' | '.join(notes)
+                updates['updated_at'] = datetime.now().isoformat()
+                
+                merged_placeholders = ', '.join('?' * len(merged))
+                # Suppression d'abord: passport_number est UNIQUE
+                cursor.execute(f'DELETE FROM clients WHERE client_id IN ({merged_placeholders})', merged)
+                cursor.execute(f'DELETE FROM {ARCHIVE_TABLE} WHERE client_id IN ({merged_placeholders})', merged)
+                cursor.execute(f'UPDATE status_history SET client_id = ? WHERE client_id IN ({merged_placeholders})',
+                               [primary_id] + merged)
+                if restore_archived_clients(conn, [primary_id])['conflicts']:
+                    raise ValueError(f"Client {primary_id} archivé: identifiant ou passeport déjà utilisé")
+                assignments = ', '.join(f'{field} = ?' for field in updates)
+                cursor.execute(f'UPDATE clients SET {assignments} WHERE client_id = ?',
+                               list(updates.values()) + [primary_id])
+            conn.commit()
+            if merged:
+                notify_client_change([primary_id] + merged)
+            return {
+                'primary': primary_id,
+                'merged': merged,
+                'missing': [cid for cid in duplicate_ids if cid not in rows],
+                'filled_fields': [field for field in updates if field not in ('notes', 'updated_at')],
+            }
+            
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    # Colonnes nécessaires au rendu des messages de campagne
+    CAMPAIGN_COLUMNS = ('client_id', 'full_name', 'whatsapp_number', 'whatsapp_number_clean',
+                        'visa_status', 'nationality', 'responsible_employee')
+    CAMPAIGN_SEGMENT_FIELDS = ('visa_status', 'nationality', 'responsible_employee')
+
+    def iter_campaign_recipients(self, segment: Dict[str, List[str]], batch_size: int = 500) -> Iterator[List[sqlite3.Row]]:
+        """
+        Parcourir par lots les clients d'un segment (campagnes WhatsApp)
+        
+        Args:
+            segment: {'visa_status': [...], 'nationality': [...], 'responsible_employee': [...]};
+                     les valeurs d'un champ sont combinées en OU, les champs en ET
+            batch_size: Nombre de lignes par lot
+        """
+        where_conditions, params = [], []
+        for field in self.CAMPAIGN_SEGMENT_FIELDS:
+            values = [v for v in (segment.get(field) or []) if v]
+            if values:
+                # visa_status / nationality: servis par idx_status_nationality
+                where_conditions.append(f"{field} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        # Pagination par clé (id > dernier id): aucune lecture ne reste ouverte
+        # entre deux lots, l'appelant peut écrire (outbox) pendant le parcours.
+        # Dossiers actifs puis archivés: chaque table est parcourue dans l'ordre de sa clé
+        where_conditions.append('id > ?')
+        for source in ('clients', ARCHIVE_TABLE):
+            query = (f"SELECT id, {', '.join(self.CAMPAIGN_COLUMNS)} FROM {source} "
+                     f"WHERE {' AND '.join(where_conditions)} ORDER BY id LIMIT ?")
+            
+            last_id = 0
+            while True:
+                conn = self.get_connection()
+                conn.row_factory = sqlite3.Row
+                try:
+                    rows = conn.execute(query, params + [last_id, batch_size]).fetchall()
+                finally:
+                    conn.close()
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                yield rows
+                if len(rows) < batch_size:
+                    break
+    
+    # Colonnes de l'index de recherche instantanée (utils/search_index.py)
+    SEARCH_INDEX_COLUMNS = ('client_id', 'full_name', 'whatsapp_number', 'whatsapp_number_clean',
+                            'visa_status', 'nationality', 'passport_number')
+
+    def iter_search_index_rows(self, client_ids: Optional[List[str]] = None,
+                               batch_size: int = 5000) -> Iterator[List[tuple]]:
+        """
+        Lire par lots les colonnes de l'index de recherche (tuples dans l'ordre de SEARCH_INDEX_COLUMNS)
+        
+        Args:
+            client_ids: Clients à relire (None: dossiers actifs et archivés, par pagination sur id)
+        """
+        columns = ', '.join(self.SEARCH_INDEX_COLUMNS)
+        
+        def fetch(query: str, params: List[Any]) -> List[tuple]:
+            # Une connexion par lot: aucune lecture ne reste ouverte entre deux lots
+            conn = self.get_connection()
+            try:
+                return conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+        
+        if client_ids is not None:
+            client_ids = list(dict.fromkeys(client_ids))
+            for start in range(0, len(client_ids), 500):
+                chunk = client_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                yield fetch(f'SELECT {columns} FROM {ALL_CLIENTS_VIEW} WHERE client_id IN ({placeholders})', chunk)
+            return
+        
+        # Chaque table dans l'ordre de sa clé (un ORDER BY id sur la vue trierait toute l'union à chaque lot)
+        for source in ('clients', ARCHIVE_TABLE):
+            last_id = 0
+            while True:
+                rows = fetch(f'SELECT id, {columns} FROM {source} WHERE id > ? ORDER BY id LIMIT ?',
+                             [last_id, batch_size])
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                yield [row[1:] for row in rows]
+    
     def update_client_by_db_id(self, db_id: int, client_data: Dict[str, Any]) -> bool:
         """Mettre à jour un client par son ID de base de données (clé primaire)"""
         conn = self.get_connection()
@@ -458,9 +1144,15 @@ class DatabaseManager:
             # Ajouter la date de mise à jour automatiquement
             current_timestamp = datetime.now().isoformat()
             
+            # Identifiant avant modification (client_id peut changer)
+            restore_archived_clients(conn, [db_id], column='id')
+            cursor.execute('SELECT client_id FROM clients WHERE id = ?', (db_id,))
+            previous = cursor.fetchone()
+            
             cursor.execute('''
                 UPDATE clients SET
                     client_id = ?, full_name = ?, whatsapp_number = ?, whatsapp_number_clean = ?,
+                    whatsapp_number_rev = ?,
                     application_date = ?, transaction_date = ?, passport_number = ?,
                     passport_status = ?, passport_status_normalized = ?, nationality = ?,
                     visa_status = ?, visa_status_normalized = ?, processed_by = ?,
@@ -470,7 +1162,7 @@ class DatabaseManager:
                 client_data.get('client_id'),
                 client_data.get('full_name'),
                 client_data.get('whatsapp_number'),
-                client_data.get('whatsapp_number_clean'),
+                *phone_columns(client_data.get('whatsapp_number')),
                 client_data.get('application_date'),
                 client_data.get('transaction_date'),
                 client_data.get('passport_number'),
@@ -489,6 +1181,8 @@ class DatabaseManager:
             
             success = cursor.rowcount > 0
             conn.commit()
+            if success:
+                notify_client_change([previous[0] if previous else None, client_data.get('client_id')])
             return success
             
         except Exception as e:
@@ -504,8 +1198,12 @@ class DatabaseManager:
         
         try:
             cursor.execute('DELETE FROM clients WHERE client_id = ?', (client_id,))
-            success = cursor.rowcount > 0
+            deleted = cursor.rowcount
+            cursor.execute(f'DELETE FROM {ARCHIVE_TABLE} WHERE client_id = ?', (client_id,))
+            success = deleted + cursor.rowcount > 0
             conn.commit()
+            if success:
+                notify_client_change([client_id])
             return success
             
         except Exception as e:
@@ -514,39 +1212,20 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def get_statistics(self) -> Dict[str, Any]:
-        """Récupérer les statistiques"""
+    def get_statistics(self, tier: str = 'all') -> Dict[str, Any]:
+        """Récupérer les statistiques (tier: CLIENT_TIERS)"""
+        tables = self._tier_tables(tier)
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             # Compter le total
-            cursor.execute('SELECT COUNT(*) FROM clients')
-            total = cursor.fetchone()[0]
-            
-            # Statistiques par statut
-            cursor.execute('''
-                SELECT visa_status, COUNT(*) 
-                FROM clients 
-                GROUP BY visa_status
-            ''')
-            by_status = dict(cursor.fetchall())
+            total = self._count_rows(cursor, tables)
             
-            # Statistiques par nationalité
-            cursor.execute('''
-                SELECT nationality, COUNT(*) 
-                FROM clients 
-                GROUP BY nationality
-            ''')
-            by_nationality = dict(cursor.fetchall())
-            
-            # Statistiques par employé
-            cursor.execute('''
-                SELECT responsible_employee, COUNT(*) 
-                FROM clients 
-                GROUP BY responsible_employee
-            ''')
-            by_employee = dict(cursor.fetchall())
+            # Statistiques par statut, nationalité et employé
+            by_status = self._count_by(cursor, tables, 'visa_status')
+            by_nationality = self._count_by(cursor, tables, 'nationality')
+            by_employee = self._count_by(cursor, tables, 'responsible_employee')
             
             return {
                 'total': total,
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Maintenance de la base SQLite: statistiques, vide-pages, checkpoints, intégrité
+
+Tâches (chacune courte, relancée à son intervalle):
+- archive: déplace les dossiers clos anciens vers la table d'archive, par lots
+  (voir database/archive.py); active par défaut, ARCHIVE_AFTER_DAYS = 0 la
+  désactive
+- optimize: PRAGMA optimize (analysis_limit borné), ANALYZE des index sans
+  statistiques dans sqlite_stat1 (index créés par une migration)
+- incremental_vacuum: rend au système les pages libres par lots de
+  VACUUM_STEP_PAGES, dans une tranche de temps bornée. Sans effet tant que
+  la base n'est pas en auto_vacuum=INCREMENTAL: c'est le cas des bases créées
+  par les migrations; un fichier existant (dont la base déployée, en
+  auto_vacuum=none) doit d'abord être converti une fois (commande `vacuum`,
+  ou tâche convert_auto_vacuum)
+- convert_auto_vacuum: passage unique en auto_vacuum=INCREMENTAL (VACUUM
+  complet, qui défragmente aussi), seulement pour un fichier de moins de
+  FULL_VACUUM_MAX_BYTES; au-delà, commande manuelle `vacuum`
+- checkpoint: PRAGMA wal_checkpoint(TRUNCATE), uniquement pour une base
+  passée en mode WAL hors de l'application (elle reste en journal_mode=delete)
+- integrity: PRAGMA quick_check et mesure de la fragmentation (dbstat)
+
+Seules les tâches de DEFAULT_TASKS tournent par défaut dans l'application;
+convert_auto_vacuum (VACUUM complet) et checkpoint s'activent par
+DB_MAINTENANCE_TASKS. Plusieurs processus web
+partagent la base: un bail (table maintenance_lease, LEASE_SECONDS) désigne
+le seul processus qui exécute la maintenance; il est repris par un autre
+processus s'il n'est pas renouvelé.
+
+Dans l'application, MaintenanceScheduler exécute les tâches dues dans un
+thread, uniquement quand aucune requête HTTP n'est en cours ni n'a été servie
+depuis DB_MAINTENANCE_IDLE_SECONDS; une requête qui arrive interrompt la
+série entre deux tâches (et entre deux lots du vide-pages). Une base occupée
+(verrou tenu par l'application) fait reporter la tâche au passage suivant.
+Taille du fichier, pages libres et fragmentation sont exposées sur /metrics.
+
+Exécution directe:
+    python src/database/maintenance.py [--db chemin] status
+    python src/database/maintenance.py [--db chemin] run [--task optimize]
+    python src/database/maintenance.py [--db chemin] vacuum
+"""
+
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Attente maximale d'un verrou tenu par l'application avant de reporter une tâche (secondes)
+MAINTENANCE_BUSY_TIMEOUT = 1.0
+# Durée maximale d'une tranche de vide-pages (secondes)
+MAINTENANCE_SLICE_SECONDS = 0.5
+# Pages libérées par PRAGMA incremental_vacuum
+VACUUM_STEP_PAGES = 256
+# Lignes examinées par index lors d'un ANALYZE (PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 10000
+# Taille maximale pour un VACUUM complet automatique (conversion en auto_vacuum incrémental)
+FULL_VACUUM_MAX_BYTES = 64 * 1024 * 1024
+
+# Tâche -> intervalle minimal entre deux exécutions (secondes)
+TASK_INTERVALS = {
+    'archive': 86400,
+    'checkpoint': 300,
+    'incremental_vacuum': 600,
+    'convert_auto_vacuum': 86400,
+    'optimize': 3600,
+    'integrity': 86400,
+}
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+# Tâches du thread de l'application sans configuration (lectures et écritures bornées:
+# archive par lots interrompus par une requête, optimize limité par ANALYSIS_LIMIT)
+DEFAULT_TASKS = ('archive', 'incremental_vacuum', 'optimize', 'integrity')
+# Bail de maintenance: nom de la ligne et durée de validité sans renouvellement (secondes)
+LEASE_NAME = 'db_maintenance'
+LEASE_SECONDS = 600
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # Connexion non instrumentée: VACUUM et quick_check ne doivent pas remplir le journal des requêtes lentes
+    return sqlite3.connect(db_path, timeout=MAINTENANCE_BUSY_TIMEOUT, isolation_level=None)
+
+
+def database_metrics(conn: sqlite3.Connection, db_path: str) -> Dict[str, Any]:
+    """Taille du fichier et du WAL, pages, pages libres, modes auto_vacuum et journal"""
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    wal_path = db_path + '-wal'
+    return {
+        'file_bytes': os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+        'wal_bytes': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_pages': freelist,
+        'freelist_ratio': round(freelist / page_count, 4) if page_count else 0.0,
+        'auto_vacuum': AUTO_VACUUM_MODES.get(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 'none'),
+        'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+    }
+
+
+def measure_fragmentation(conn: sqlite3.Connection) -> Optional[float]:
+    """
+    Part des pages feuilles de B-tree non contiguës à la précédente dans l'ordre de parcours
+
+    0 juste après un VACUUM; None si la table virtuelle dbstat n'est pas compilée.
+    Lit toutes les pages: réservé à la tâche integrity.
+    """
+    try:
+        rows = conn.execute("SELECT name, pageno FROM dbstat WHERE pagetype = 'leaf' ORDER BY name, path").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    jumps = total = 0
+    previous_name, previous_page = None, None
+    for name, pageno in rows:
+        if name == previous_name:
+            total += 1
+            if pageno != previous_page + 1:
+                jumps += 1
+        previous_name, previous_page = name, pageno
+    return round(jumps / total, 4) if total else 0.0
+
+
+def acquire_lease(conn: sqlite3.Connection, owner: str, lease_seconds: float = LEASE_SECONDS,
+                  now: Optional[float] = None) -> bool:
+    """
+    Prendre ou renouveler le bail de maintenance (connexion en autocommit)
+
+    Returns:
+        True si `owner` détient le bail; False s'il est tenu par un autre processus
+    """
+    now = time.time() if now is None else now
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT owner, expires_at FROM maintenance_lease WHERE name = ?', (LEASE_NAME,)).fetchone()
+        acquired = row is None or row[0] == owner or row[1] <= now
+        if acquired:
+            conn.execute('INSERT OR REPLACE INTO maintenance_lease (name, owner, expires_at) VALUES (?, ?, ?)',
+                         (LEASE_NAME, owner, now + lease_seconds))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return acquired
+
+
+def release_lease(conn: sqlite3.Connection, owner: str) -> None:
+    """Rendre le bail s'il est détenu par `owner`"""
+    conn.execute('DELETE FROM maintenance_lease WHERE name = ? AND owner = ?', (LEASE_NAME, owner))
+
+
+def run_optimize(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """PRAGMA optimize puis ANALYZE des index sans statistiques"""
+    conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    conn.execute('PRAGMA optimize').fetchall()
+    try:
+        analyzed = {row[0] for row in conn.execute('SELECT idx FROM sqlite_stat1')}
+    except sqlite3.OperationalError:
+        analyzed = set()
+    # Une table vide n'a pas de statistiques: seuls les index des tables remplies comptent
+    missing = [name for name, table in conn.execute(
+        "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex_%' "
+        "ORDER BY name") if name not in analyzed and conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone()]
+    for name in missing:
+        conn.execute(f'ANALYZE "{name}"')
+    return {'analyzed': missing}
+
+
+def run_incremental_vacuum(conn: sqlite3.Connection, deadline: Optional[float] = None,
+                           should_continue: Callable[[], bool] = lambda: True) -> Dict[str, Any]:
+    """Libérer les pages libres par lots (auto_vacuum=INCREMENTAL uniquement)"""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return {'skipped': 'auto_vacuum différent de incremental (conversion unique: commande vacuum)',
+                'freed_pages': 0}
+    freed = 0
+    while should_continue() and (deadline is None or time.monotonic() < deadline):
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not before:
+            break
+        # Chaque PRAGMA est sa propre transaction: l'application écrit entre deux lots.
+        # executescript exécute l'instruction jusqu'au bout (execute() ne libère qu'une page)
+        conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})')
+        freed += before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return {'freed_pages': freed, 'freelist_pages': conn.execute('PRAGMA freelist_count').fetchone()[0]}
+
+
+def run_full_vacuum(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """VACUUM complet en passant en auto_vacuum=INCREMENTAL (réécrit tout le fichier)"""
+    before = conn.execute('PRAGMA page_count').fetchone()[0]
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return {'pages_before': before, 'pages_after': conn.execute('PRAGMA page_count').fetchone()[0]}
+
+
+def run_checkpoint(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Checkpoint du WAL et remise à zéro du fichier -wal (sans effet hors mode WAL)"""
+    if conn.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+        return {'skipped': 'journal_mode différent de wal'}
+    busy, log_frames, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    return {'busy': bool(busy), 'log_frames': log_frames, 'checkpointed_frames': checkpointed}
+
+
+def run_integrity_check(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """PRAGMA quick_check (structure des pages et index) et fragmentation"""
+    messages = [row[0] for row in conn.execute('PRAGMA quick_check(20)')]
+    return {'ok': messages == ['ok'], 'errors': [] if messages == ['ok'] else messages,
+            'fragmentation': measure_fragmentation(conn)}
+
+
+class MaintenanceScheduler:
+    """Thread qui exécute les tâches de maintenance dues pendant les périodes sans requêtes"""
+
+    # archive avant incremental_vacuum: les pages libérées dans clients sont rendues au même passage
+    TASKS = ('archive', 'checkpoint', 'incremental_vacuum', 'convert_auto_vacuum', 'optimize', 'integrity')
+
+    def __init__(self, db_path_provider: Callable[[], str], idle_seconds: float = 60.0,
+                 poll_interval: float = 30.0, intervals: Optional[Dict[str, float]] = None,
+                 archive_after_days: Optional[float] = None, tasks: Optional[Iterable[str]] = None):
+        self._db_path_provider = db_path_provider
+        tasks = DEFAULT_TASKS if tasks is None else tuple(tasks)
+        unknown = [task for task in tasks if task not in self.TASKS]
+        if unknown:
+            raise ValueError(f"Tâche de maintenance inconnue: {', '.join(unknown)}")
+        # Tâches activées, dans l'ordre de TASKS
+        self.tasks = tuple(task for task in self.TASKS if task in tasks)
+        # Identifiant du détenteur du bail (un planificateur par processus)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self.has_lease = False
+        # None: DEFAULT_ARCHIVE_AFTER_DAYS; 0: pas d'archivage
+        self.archive_after_days = archive_after_days
+        self.idle_seconds = idle_seconds
+        self.poll_interval = poll_interval
+        self.intervals = dict(TASK_INTERVALS, **(intervals or {}))
+        self.last_runs: Dict[str, float] = {}            # tâche -> time.time() de la dernière exécution
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+        self.counters = {task: 0 for task in self.TASKS}
+        self.integrity_ok: Optional[bool] = None
+        self.fragmentation: Optional[float] = None
+        self._last_activity = time.monotonic()
+        self._active_requests = 0
+        self._activity_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path_provider()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Démarrer le thread (sans effet s'il tourne déjà)"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='db-maintenance', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.has_lease and os.path.exists(self.db_path):
+            # Un autre processus peut reprendre la maintenance sans attendre l'expiration
+            conn = _connect(self.db_path)
+            try:
+                release_lease(conn, self.owner)
+            except sqlite3.Error:
+                pass
+            finally:
+                conn.close()
+            self.has_lease = False
+
+    def request_started(self) -> None:
+        with self._activity_lock:
+            self._active_requests += 1
+            self._last_activity = time.monotonic()
+
+    def request_finished(self) -> None:
+        with self._activity_lock:
+            self._active_requests = max(0, self._active_requests - 1)
+            self._last_activity = time.monotonic()
+
+    def is_idle(self) -> bool:
+        """Aucune requête en cours ni servie depuis idle_seconds"""
+        with self._activity_lock:
+            return (not self._active_requests and not self._stop.is_set()
+                    and time.monotonic() - self._last_activity >= self.idle_seconds)
+
+    def due_tasks(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        return [task for task in self.tasks
+                if now - self.last_runs.get(task, 0) >= self.intervals[task]]
+
+    def run_task(self, task: str, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """Exécuter une tâche sur une connexion ouverte et noter son résultat"""
+        started = time.perf_counter()
+        if task == 'archive':
+            # Import différé: le module s'exécute aussi directement (src/ ajouté au chemin dans __main__)
+            from database.archive import DEFAULT_ARCHIVE_AFTER_DAYS, archive_closed_clients
+
+            days = DEFAULT_ARCHIVE_AFTER_DAYS if self.archive_after_days is None else self.archive_after_days
+            if days <= 0:
+                result = {'skipped': 'archivage désactivé'}
+            else:
+                result = archive_closed_clients(conn, days, should_continue=self.is_idle)
+                if result['archived']:
+                    # Listes et tableau de bord des dossiers actifs en cache
+                    from utils.cache_manager import invalidate_client_cache
+                    invalidate_client_cache()
+        elif task == 'optimize':
+            result = run_optimize(conn)
+        elif task == 'incremental_vacuum':
+            result = run_incremental_vacuum(conn, time.monotonic() + MAINTENANCE_SLICE_SECONDS, self.is_idle)
+        elif task == 'convert_auto_vacuum':
+            metrics = database_metrics(conn, self.db_path)
+            if metrics['auto_vacuum'] == 'incremental':
+                result = {'skipped': 'déjà en auto_vacuum incremental'}
+            elif metrics['file_bytes'] > FULL_VACUUM_MAX_BYTES:
+                result = {'skipped': f"fichier de {metrics['file_bytes']} octets: VACUUM manuel requis"}
+            else:
+                result = run_full_vacuum(conn)
+        elif task == 'checkpoint':
+            result = run_checkpoint(conn)
+        elif task == 'integrity':
+            result = run_integrity_check(conn)
+            self.integrity_ok = result['ok']
+            self.fragmentation = result['fragmentation']
+            if not result['ok']:
+                print(f"❌ Intégrité de la base: {'; '.join(result['errors'])}")
+        else:
+            raise ValueError(f'Tâche de maintenance inconnue: {task}')
+        result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self.last_runs[task] = time.time()
+        self.last_results[task] = result
+        self.counters[task] += 1
+        return result
+
+    def run_due(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Exécuter les tâches dues tant que l'application reste inactive
+
+        Une base verrouillée par l'application interrompt la série: les tâches
+        non exécutées restent dues pour le passage suivant. Sans le bail de
+        maintenance (tenu par un autre processus), rien n'est exécuté.
+        """
+        done = {}
+        tasks = self.due_tasks()
+        if not tasks or not os.path.exists(self.db_path):
+            return done
+        conn = _connect(self.db_path)
+        try:
+            try:
+                self.has_lease = acquire_lease(conn, self.owner)
+            except sqlite3.OperationalError:
+                # Base occupée, ou table du bail pas encore créée par les migrations
+                self.has_lease = False
+            if not self.has_lease:
+                return done
+            for task in tasks:
+                if not self.is_idle():
+                    break
+                try:
+                    done[task] = self.run_task(task, conn)
+                except sqlite3.OperationalError as e:
+                    if 'locked' in str(e) or 'busy' in str(e):
+                        break
+                    # Tâche en échec: reportée à son intervalle suivant, pas au prochain passage
+                    self.last_runs[task] = time.time()
+                    print(f"❌ Maintenance de la base ({task}): {e}")
+        finally:
+            conn.close()
+        return done
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if not self.is_idle():
+                continue
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"❌ Erreur de maintenance de la base: {e}")
+
+
+def maintenance_collector(scheduler: MaintenanceScheduler) -> Callable:
+    """Collecteur /metrics: taille, pages libres et fragmentation de la base, tâches exécutées"""
+    def collect():
+        if not os.path.exists(scheduler.db_path):
+            return []
+        conn = _connect(scheduler.db_path)
+        try:
+            metrics = database_metrics(conn, scheduler.db_path)
+        finally:
+            conn.close()
+        families = [
+            ('tca_db_file_bytes', 'gauge', 'Taille du fichier de la base', [({}, metrics['file_bytes'])]),
+            ('tca_db_wal_bytes', 'gauge', 'Taille du fichier WAL', [({}, metrics['wal_bytes'])]),
+            ('tca_db_pages', 'gauge', 'Pages du fichier de la base', [({}, metrics['page_count'])]),
+            ('tca_db_freelist_pages', 'gauge', 'Pages libres (récupérables par le vide-pages)',
+             [({}, metrics['freelist_pages'])]),
+            ('tca_db_freelist_ratio', 'gauge', 'Part des pages libres', [({}, metrics['freelist_ratio'])]),
+            ('tca_db_maintenance_runs_total', 'counter', 'Tâches de maintenance exécutées',
+             [({'task': task}, count) for task, count in scheduler.counters.items()]),
+            ('tca_db_maintenance_lease', 'gauge', 'Ce processus détient le bail de maintenance',
+             [({}, 1 if scheduler.has_lease else 0)]),
+        ]
+        if scheduler.fragmentation is not None:
+            families.append(('tca_db_fragmentation_ratio', 'gauge',
+                             'Part des pages non contiguës (dernière vérification d\'intégrité)',
+                             [({}, scheduler.fragmentation)]))
+        archive = scheduler.last_results.get('archive', {})
+        if 'archive_rows' in archive:
+            families.append(('tca_clients_archived', 'gauge', 'Dossiers dans la table d\'archive (dernier archivage)',
+                             [({}, archive['archive_rows'])]))
+        if scheduler.integrity_ok is not None:
+            families.append(('tca_db_integrity_ok', 'gauge', 'Dernière vérification d\'intégrité réussie',
+                             [({}, 1 if scheduler.integrity_ok else 0)]))
+        return families
+    return collect
+
+
+# Planificateur de l'application (configuré par init_db_maintenance)
+_scheduler: Optional[MaintenanceScheduler] = None
+
+
+def get_maintenance_scheduler() -> Optional[MaintenanceScheduler]:
+    return _scheduler
+
+
+def init_db_maintenance(app, db_path_provider: Callable[[], str]) -> None:
+    """
+    Configurer la maintenance de la base pour l'application
+
+    Le thread démarre à la première requête (aucun thread ni accès à la base
+    au démarrage); les hooks de requête mesurent l'activité.
+    """
+    global _scheduler
+    from flask import g
+    from utils.metrics import registry as metrics_registry
+
+    config = app.config
+    if not config.get('DB_MAINTENANCE_ENABLED', True):
+        return
+    if _scheduler is not None:
+        _scheduler.stop(timeout=1.0)
+    tasks = config.get('DB_MAINTENANCE_TASKS')
+    if isinstance(tasks, str):
+        tasks = [task.strip() for task in tasks.split(',') if task.strip()]
+    scheduler = MaintenanceScheduler(db_path_provider, idle_seconds=float(config.get('DB_MAINTENANCE_IDLE_SECONDS', 60)),
+                                     archive_after_days=config.get('ARCHIVE_AFTER_DAYS'), tasks=tasks)
+    _scheduler = scheduler
+    metrics_registry.register_collector(maintenance_collector(scheduler), name='db_maintenance')
+
+    @app.before_request
+    def _maintenance_request_started():
+        scheduler.request_started()
+        g._maintenance_tracked = True
+        if not scheduler.is_running:
+            scheduler.start()
+
+    @app.teardown_request
+    def _maintenance_request_finished(_error=None):
+        if g.pop('_maintenance_tracked', False):
+            scheduler.request_finished()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from database.database_manager import DatabaseManager, resolve_db_path
+
+    parser = argparse.ArgumentParser(description='Maintenance de la base SQLite')
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='Taille, pages libres, fragmentation et intégrité')
+    run_parser = commands.add_parser('run', help='Exécuter les tâches de maintenance')
+    run_parser.add_argument('--task', action='append', choices=MaintenanceScheduler.TASKS,
+                            help='Tâche à exécuter (défaut: toutes); option répétable')
+    commands.add_parser('vacuum', help='VACUUM complet et passage en auto_vacuum incremental')
+    args = parser.parse_args()
+
+    path = resolve_db_path(args.db)
+    if args.command == 'run':
+        # Migrations en attente d'abord: la tâche archive suppose le schéma à jour
+        DatabaseManager(path)
+    connection = _connect(path)
+    try:
+        if args.command == 'status':
+            for key, value in database_metrics(connection, path).items():
+                print(f"   {key}: {value}")
+            print(f"   fragmentation: {measure_fragmentation(connection)}")
+        elif args.command == 'vacuum':
+            outcome = run_full_vacuum(connection)
+            print(f"✅ VACUUM: {outcome['pages_before']} -> {outcome['pages_after']} pages")
+        else:
+            runner = MaintenanceScheduler(lambda: path, idle_seconds=0, tasks=MaintenanceScheduler.TASKS)
+            if not acquire_lease(connection, runner.owner):
+                print("⏳ Maintenance en cours dans un autre processus (bail maintenance_lease)")
+                sys.exit(1)
+            try:
+                for name in args.task or MaintenanceScheduler.TASKS:
+                    outcome = runner.run_task(name, connection)
+                    print(f"🧹 {name}: {outcome}")
+            finally:
+                release_lease(connection, runner.owner)
+    except sqlite3.OperationalError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrations versionnées du schéma SQLite
+
+La table schema_version enregistre les migrations appliquées. Au démarrage
+(première ouverture d'une base par DatabaseManager), les migrations en attente
+sont appliquées dans l'ordre, toutes dans une seule transaction (BEGIN
+IMMEDIATE: un seul processus migre, les autres attendent puis ne trouvent plus
+rien à faire). Le DDL de SQLite est transactionnel: une erreur annule tout.
+
+Les migrations qui doivent remplir une colonne sur des tables existantes
+déclarent un backfill, exécuté après la transaction par petits lots (une
+transaction courte par lot): les écritures de l'application passent entre deux
+lots. Un backfill interrompu reprend au démarrage suivant (schema_version.
+backfilled_at reste vide tant qu'il n'est pas terminé).
+
+Une migration qui modifie les colonnes de clients n'a rien à faire pour
+l'archive des dossiers clos: le lot se termine par sync_archive_schema
+(database/archive.py), dans la même transaction.
+
+Les premières migrations reprennent le schéma historique d'init_database;
+elles sont idempotentes (IF NOT EXISTS, colonnes ajoutées si absentes) pour
+les bases créées avant ce module, dont la base déployée.
+
+Exécution directe:
+    python src/database/migrations.py status [--db chemin]
+    python src/database/migrations.py migrate [--db chemin]
+"""
+
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Attente maximale du verrou d'écriture pendant une migration (secondes)
+MIGRATION_LOCK_TIMEOUT = 30
+
+
+class Migration:
+    """Migration numérotée: DDL appliqué en transaction, backfill optionnel par lots"""
+
+    __slots__ = ('version', 'name', 'apply', 'backfill')
+
+    def __init__(self, version: int, name: str, apply: Callable[[sqlite3.Connection], None],
+                 backfill: Optional[Callable[[str], Dict[str, int]]] = None):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.backfill = backfill
+
+
+def add_missing_columns(conn: sqlite3.Connection, table: str, definitions: List[str]) -> List[str]:
+    """Ajouter les colonnes absentes d'une table (ALTER TABLE ADD COLUMN ne réécrit pas la table)"""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    added = []
+    for definition in definitions:
+        column = definition.split()[0]
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {definition}')
+            added.append(column)
+    return added
+
+
+def _create_clients(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT UNIQUE,
+            full_name TEXT,
+            whatsapp_number TEXT,
+            whatsapp_number_clean TEXT,
+            whatsapp_number_rev TEXT,
+            application_date TEXT,
+            transaction_date TEXT,
+            passport_number TEXT UNIQUE,
+            passport_status TEXT,
+            passport_status_normalized TEXT,
+            nationality TEXT,
+            visa_status TEXT,
+            visa_status_normalized TEXT,
+            processed_by TEXT,
+            summary TEXT,
+            notes TEXT,
+            responsible_employee TEXT,
+            original_row_number INTEGER,
+            import_timestamp TEXT,
+            is_duplicate BOOLEAN DEFAULT FALSE,
+            auto_generated_id BOOLEAN DEFAULT FALSE,
+            empty_name_accepted BOOLEAN DEFAULT FALSE,
+            extra_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    ''')
+
+
+def _phone_search_columns(conn: sqlite3.Connection) -> None:
+    # Numéro normalisé (E.164) et ses chiffres à l'envers: recherche par fin de numéro indexée
+    add_missing_columns(conn, 'clients', ['whatsapp_number_clean TEXT', 'whatsapp_number_rev TEXT'])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clients_phone_clean ON clients(whatsapp_number_clean)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clients_phone_rev ON clients(whatsapp_number_rev)')
+
+
+def _backfill_phone_numbers(db_path: str) -> Dict[str, int]:
+    from utils.phone_numbers import backfill_phone_numbers
+
+    result = backfill_phone_numbers(db_path)
+    if result['scanned']:
+        print(f"📱 Numéros WhatsApp normalisés: {result['updated']}/{result['scanned']}")
+    return result
+
+
+def _status_history(conn: sqlite3.Connection) -> None:
+    # Historique des changements de statut (transitions groupées: batch_id commun)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS status_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT NOT NULL,
+            old_status TEXT,
+            new_status TEXT NOT NULL,
+            changed_at TEXT NOT NULL,
+            batch_id TEXT,
+            source TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_status_history_client ON status_history(client_id, changed_at)')
+
+
+def _segment_indexes(conn: sqlite3.Connection) -> None:
+    # Sélection des segments (filtres, campagnes WhatsApp)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_status_nationality ON clients(visa_status, nationality)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_employee_status ON clients(responsible_employee, visa_status)')
+
+
+def _whatsapp_outbox(conn: sqlite3.Connection) -> None:
+    # Outbox WhatsApp (voir services/whatsapp_outbox.py); next_attempt_at en secondes epoch
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS whatsapp_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT,
+            phone_number TEXT NOT NULL,
+            message TEXT NOT NULL,
+            dedup_key TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            transport TEXT,
+            provider_message_id TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_whatsapp_outbox_due ON whatsapp_outbox(status, next_attempt_at)')
+    # Un seul message identique en attente à la fois
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_whatsapp_outbox_dedup ON whatsapp_outbox(dedup_key)
+        WHERE status IN ('pending', 'sending')
+    ''')
+
+
+def _import_audit_columns(conn: sqlite3.Connection) -> None:
+    # Colonnes écrites par l'import sans restrictions, présentes sur la base déployée
+    # mais pas sur les bases créées par l'application: même jeu de colonnes partout
+    add_missing_columns(conn, 'clients', [
+        'original_row_number INTEGER', 'import_timestamp TEXT', 'is_duplicate BOOLEAN DEFAULT FALSE',
+        'auto_generated_id BOOLEAN DEFAULT FALSE', 'empty_name_accepted BOOLEAN DEFAULT FALSE',
+        'extra_data TEXT', 'has_empty_fields BOOLEAN DEFAULT 0', 'has_errors BOOLEAN DEFAULT 0',
+        'original_data TEXT', 'created_at TIMESTAMP', 'updated_at TIMESTAMP',
+    ])
+
+
+# Index historiques remplacés par consolidate_indexes: doublons exacts, préfixes
+# d'un index composite, colonnes seulement cherchées par LIKE '%...%' ou jamais filtrées
+_REDUNDANT_INDEXES = (
+    'idx_client_id', 'idx_clients_client_id',                  # contrainte UNIQUE de client_id
+    'idx_visa_status', 'idx_clients_visa_status',              # préfixe de idx_status_nationality
+    'idx_employee', 'idx_clients_responsible_employee',        # préfixe de idx_employee_status
+    'idx_nationality',                                         # doublon de idx_clients_nationality
+    'idx_full_name', 'idx_clients_full_name',                  # recherche LIKE '%...%'
+    'idx_whatsapp', 'idx_clients_whatsapp_number',             # recherche par whatsapp_number_rev
+    'idx_clients_phone_clean',
+    'idx_created_at', 'idx_clients_created_at', 'idx_clients_updated_at',
+    'idx_clients_application_date', 'idx_clients_transaction_date',
+    'idx_clients_passport_status', 'idx_clients_processed_by',
+    'idx_clients_original_row_number', 'idx_clients_import_timestamp',
+)
+
+
+def _leading_columns(conn: sqlite3.Connection, table: str) -> set:
+    """Première colonne de chaque index d'une table"""
+    leading = set()
+    for index in conn.execute(f'PRAGMA index_list({table})').fetchall():
+        columns = conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall()
+        if columns:
+            leading.add(columns[0][2])
+    return leading
+
+
+def _consolidate_indexes(conn: sqlite3.Connection) -> None:
+    # Chaque index coûte à chaque écriture: ne garder que les chemins d'accès réels
+    # (voir database/query_plans.py pour les plans des requêtes de DatabaseManager)
+    for name in _REDUNDANT_INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    leading = _leading_columns(conn, 'clients')
+    # Contrôle d'unicité et recherche exacte (UNIQUE sur les bases créées par l'application)
+    if 'passport_number' not in leading:
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_clients_passport_number ON clients(passport_number)')
+    # Filtre et statistiques par nationalité seule
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clients_nationality ON clients(nationality)')
+    # Tri des listes (DatabaseManager.LIST_ORDER_BY): pages servies dans l'ordre de l'index
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_clients_list_order ON clients(
+            (CASE WHEN client_id IS NULL OR client_id = '' THEN 1 ELSE 0 END),
+            CAST(SUBSTR(client_id, 4) AS INTEGER) DESC
+        )
+    ''')
+    # Tri par numéro client de query_clients (QUERY_SORT_EXPRESSIONS['client_id'], puis id)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_clients_client_number
+        ON clients(COALESCE(CAST(SUBSTR(client_id, 4) AS INTEGER), -1))
+    ''')
+
+
+def _client_archive(conn: sqlite3.Connection) -> None:
+    # Table des dossiers clos archivés et vue clients_all (voir database/archive.py)
+    from database.archive import sync_archive_schema
+
+    sync_archive_schema(conn)
+
+
+def _maintenance_lease(conn: sqlite3.Connection) -> None:
+    # Bail du processus qui exécute la maintenance (voir database/maintenance.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_lease (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+
+
+# Ordre d'application; ne jamais renuméroter ni modifier une migration publiée
+MIGRATIONS = [
+    Migration(1, 'clients_table', _create_clients),
+    Migration(2, 'phone_search_columns', _phone_search_columns, backfill=_backfill_phone_numbers),
+    Migration(3, 'status_history', _status_history),
+    Migration(4, 'segment_indexes', _segment_indexes),
+    Migration(5, 'whatsapp_outbox', _whatsapp_outbox),
+    Migration(6, 'import_audit_columns', _import_audit_columns),
+    Migration(7, 'consolidate_indexes', _consolidate_indexes),
+    Migration(8, 'client_archive', _client_archive),
+    Migration(9, 'maintenance_lease', _maintenance_lease),
+]
+
+
+def _connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    # Import différé: le module s'exécute aussi directement (src/ ajouté au chemin dans __main__)
+    from utils.metrics import instrumented_connect
+
+    return instrumented_connect(db_path, **kwargs)
+
+
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms REAL,
+            backfilled_at TEXT
+        )
+    ''')
+
+
+def _applied_versions(conn: sqlite3.Connection) -> Dict[int, Optional[str]]:
+    """version -> backfilled_at (vide si la table n'existe pas encore)"""
+    try:
+        return dict(conn.execute('SELECT version, backfilled_at FROM schema_version'))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def schema_status(db_path: str, migrations: List[Migration] = MIGRATIONS) -> Dict[str, Any]:
+    """Version courante, migrations en attente et backfills inachevés (sans rien modifier)"""
+    conn = _connect(db_path)
+    try:
+        applied = _applied_versions(conn)
+    finally:
+        conn.close()
+    return {
+        'version': max(applied, default=0),
+        'latest': max((migration.version for migration in migrations), default=0),
+        'pending': [migration.name for migration in migrations if migration.version not in applied],
+        'pending_backfills': [migration.name for migration in migrations
+                              if migration.backfill and migration.version in applied and not applied[migration.version]],
+    }
+
+
+def _sync_archive(conn: sqlite3.Connection) -> None:
+    """Aligner la table d'archive et la vue clients_all sur clients (après chaque lot, même transaction)"""
+    from database.archive import ARCHIVE_TABLE, sync_archive_schema
+
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ARCHIVE_TABLE,)).fetchone():
+        sync_archive_schema(conn)
+
+
+def migrate(db_path: str, migrations: List[Migration] = MIGRATIONS, run_backfills: bool = True) -> Dict[str, Any]:
+    """
+    Appliquer les migrations en attente puis les backfills inachevés
+
+    Returns:
+        {'version', 'applied': [noms], 'backfilled': {nom: statistiques}}
+
+    Raises:
+        sqlite3.Error: Migration en échec (aucune des migrations du lot n'est appliquée)
+    """
+    result = {'applied': [], 'backfilled': {}}
+    conn = _connect(db_path, timeout=MIGRATION_LOCK_TIMEOUT, isolation_level=None)
+    try:
+        applied = _applied_versions(conn)
+        if any(migration.version not in applied for migration in migrations):
+            if not conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone():
+                # Base neuve: pages libres récupérables par lots (database/maintenance.py);
+                # le mode ne peut être choisi qu'avant la première table
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                _ensure_version_table(conn)
+                # Relu sous verrou: un autre processus a pu migrer entre-temps
+                applied = _applied_versions(conn)
+                for migration in sorted(migrations, key=lambda item: item.version):
+                    if migration.version in applied:
+                        continue
+                    started = time.perf_counter()
+                    migration.apply(conn)
+                    conn.execute(
+                        'INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)',
+                        (migration.version, migration.name, datetime.now().isoformat(timespec='seconds'),
+                         round((time.perf_counter() - started) * 1000, 1)))
+                    applied[migration.version] = None
+                    result['applied'].append(migration.name)
+                _sync_archive(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            if result['applied']:
+                print(f"🗄️ Migrations appliquées: {', '.join(result['applied'])}")
+
+        if run_backfills:
+            for migration in migrations:
+                if migration.backfill is None or applied.get(migration.version, 'absent') is not None:
+                    continue
+                # Hors transaction: le backfill valide ses lots un par un
+                result['backfilled'][migration.name] = migration.backfill(db_path)
+                conn.execute('UPDATE schema_version SET backfilled_at = ? WHERE version = ?',
+                              (datetime.now().isoformat(timespec='seconds'), migration.version))
+        result['version'] = max(applied, default=0)
+        return result
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from database.database_manager import resolve_db_path
+
+    parser = argparse.ArgumentParser(description='Migrations du schéma de la base')
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    parser.add_argument('command', choices=('status', 'migrate'))
+    args = parser.parse_args()
+
+    db_path = resolve_db_path(args.db)
+    if args.command == 'migrate':
+        outcome = migrate(db_path)
+        print(f"✅ Schéma en version {outcome['version']}")
+    else:
+        status = schema_status(db_path)
+        print(f"🗄️ Version {status['version']}/{status['latest']}")
+        for name in status['pending']:
+            print(f"   ⏳ migration en attente: {name}")
+        for name in status['pending_backfills']:
+            print(f"   ⏳ backfill inachevé: {name}")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plans d'exécution des requêtes de DatabaseManager et rapport des index
+
+Les requêtes chaudes (HOT_QUERIES) sont exécutées par les vraies méthodes de
+DatabaseManager sur une connexion qui enregistre chaque instruction SQL et ses
+paramètres; chaque instruction est ensuite passée à EXPLAIN QUERY PLAN.
+Signalés:
+- parcours complet d'une table (SCAN sans index)
+- B-tree temporaire pour ORDER BY / GROUP BY / DISTINCT (tri de toutes les lignes)
+
+Chaque requête chaude déclare les signaux qu'elle tolère (une recherche
+LIKE '%...%' parcourt forcément la table); tout autre signal est une
+régression. Le rapport des index croise index_list/index_xinfo, sqlite_stat1
+(rempli par ANALYZE) et les index utilisés par les plans: index inutilisés,
+redondants (clé préfixe d'un autre index) et peu sélectifs.
+
+Les requêtes chaudes sont en lecture seule: la commande peut tourner sur la
+base déployée.
+
+Exécution directe:
+    python src/database/query_plans.py report [--db chemin]
+    python src/database/query_plans.py check [--db chemin]
+"""
+
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Un index dont une clé regroupe en moyenne plus de cette part des lignes filtre mal
+LOW_SELECTIVITY_RATIO = 0.5
+
+_EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)')
+_INDEX_USED = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+_TABLE_READ = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+_SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)$')
+
+
+def _connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    # Import différé: le module s'exécute aussi directement (src/ ajouté au chemin dans __main__)
+    from utils.metrics import instrumented_connect
+
+    return instrumented_connect(db_path, **kwargs)
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any = ()) -> List[str]:
+    """Lignes de EXPLAIN QUERY PLAN d'une instruction (détail de chaque étape)"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def plan_flags(details: List[str]) -> List[str]:
+    """Signaux d'un plan: 'full_scan:<table>' et 'temp_btree:<clause>'"""
+    flags = []
+    # Parcours du résultat d'une vue ou sous-requête: ses propres tables sont signalées séparément
+    subqueries = {match.group(1) for match in map(_SUBQUERY.match, (detail.strip() for detail in details)) if match}
+    for detail in details:
+        scan = _FULL_SCAN.match(detail.strip())
+        if scan and scan.group(1) not in subqueries:
+            flags.append(f'full_scan:{scan.group(1)}')
+        temp = _TEMP_BTREE.search(detail)
+        if temp:
+            flags.append(f'temp_btree:{temp.group(1)}')
+    return flags
+
+
+class QueryPlan:
+    """Plan d'une instruction émise par une requête chaude"""
+
+    __slots__ = ('query', 'sql', 'details', 'flags', 'indexes', 'tables')
+
+    def __init__(self, query: str, sql: str, details: List[str]):
+        self.query = query
+        self.sql = ' '.join(sql.split())
+        self.details = details
+        self.flags = plan_flags(details)
+        self.indexes = sorted({match for detail in details for match in _INDEX_USED.findall(detail)})
+        self.tables = sorted({match.group(1) for match in map(_TABLE_READ.match, details) if match})
+
+
+class HotQuery:
+    """Requête chaude: appel de DatabaseManager et signaux de plan tolérés"""
+
+    __slots__ = ('name', 'run', 'allowed')
+
+    def __init__(self, name: str, run: Callable[[Any, Dict[str, Any]], Any], allowed: Tuple[str, ...] = ()):
+        self.name = name
+        self.run = run
+        self.allowed = allowed
+
+
+def _sample_values(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Valeurs réelles pour paramétrer les requêtes chaudes (les plus fréquentes)"""
+    def most_common(column: str) -> str:
+        row = conn.execute(f"SELECT {column} FROM clients WHERE COALESCE({column}, '') != '' "
+                           f"GROUP BY {column} ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+        return row[0] if row else ''
+
+    row = conn.execute("SELECT client_id, passport_number, whatsapp_number FROM clients "
+                       "WHERE client_id IS NOT NULL ORDER BY id DESC LIMIT 1").fetchone()
+    client_id, passport_number, phone = row or ('CLI0001', '', '')
+    digits = re.sub(r'\D', '', phone or '')
+    return {
+        'client_id': client_id,
+        'passport_number': passport_number or 'A0000000',
+        'phone_suffix': digits[-8:] if len(digits) >= 8 else '21612345678',
+        'visa_status': most_common('visa_status'),
+        'nationality': most_common('nationality'),
+        'responsible_employee': most_common('responsible_employee'),
+    }
+
+
+# Requêtes servies à chaque affichage de liste, recherche, import ou campagne.
+# Listes et tableau de bord: dossiers actifs (tier 'hot'); recherche, export,
+# analyses et lectures par identifiant: actifs et archivés (vue clients_all)
+HOT_QUERIES = [
+    HotQuery('list.first_page', lambda db, v: db.get_all_clients(page=1, per_page=50, view='list', tier='hot')),
+    HotQuery('list.deep_page', lambda db, v: db.get_all_clients(page=40, per_page=50, view='list', tier='hot')),
+    # Listes filtrées: l'index du filtre réduit les lignes, seul ce sous-ensemble est trié
+    HotQuery('list.filter_status', lambda db, v: db.get_filtered_clients(
+        {'visa_status': v['visa_status']}, page=1, view='list', tier='hot'), allowed=('temp_btree:ORDER BY',)),
+    HotQuery('list.filter_status_nationality', lambda db, v: db.get_filtered_clients(
+        {'visa_status': v['visa_status'], 'nationality': v['nationality']}, page=1, view='list', tier='hot'),
+        allowed=('temp_btree:ORDER BY',)),
+    HotQuery('list.filter_employee', lambda db, v: db.get_filtered_clients(
+        {'responsible_employee': v['responsible_employee']}, page=1, view='list', tier='hot'),
+        allowed=('temp_btree:ORDER BY',)),
+    # Recherche libre: LIKE '%...%' parcourt les deux tables (l'index en mémoire sert la recherche instantanée)
+    HotQuery('search.text', lambda db, v: db.search_clients('محمد', view='list'),
+             allowed=('full_scan:clients', 'full_scan:clients_archive', 'temp_btree:ORDER BY')),
+    HotQuery('search.phone_suffix', lambda db, v: db.search_clients(v['phone_suffix'], view='list'),
+             allowed=('temp_btree:ORDER BY',)),
+    # Pages de chaque table dans l'ordre de son index, fusionnées (tier 'all')
+    HotQuery('query.client_number', lambda db, v: db.query_clients(limit=50, with_total=True)),
+    HotQuery('query.client_number_cursor', lambda db, v: db.query_clients(
+        limit=50, cursor=db.query_clients(limit=50)['next_cursor'])),
+    HotQuery('client.by_id', lambda db, v: db.get_client_by_id(v['client_id'])),
+    HotQuery('client.passport_unique', lambda db, v: db.is_passport_number_unique(v['passport_number'], 'CLI0000')),
+    HotQuery('import.existing_passports', lambda db, v: db.get_existing_passport_numbers([v['passport_number']])),
+    HotQuery('import.existing_ids', lambda db, v: db.get_existing_client_ids([v['client_id'], 'CLI0000'])),
+    HotQuery('client.status_history', lambda db, v: db.get_status_history(v['client_id'])),
+    # Facettes: tri des comptes (ORDER BY COUNT(*)) sur quelques groupes seulement
+    HotQuery('list.facets', lambda db, v: db.get_client_facets({'visa_status': v['visa_status']}, tier='hot'),
+             allowed=('temp_btree:GROUP BY', 'temp_btree:ORDER BY')),
+    HotQuery('stats.summary', lambda db, v: db.get_statistics(tier='hot')),
+    HotQuery('campaign.segment', lambda db, v: list(db.iter_campaign_recipients(
+        {'visa_status': [v['visa_status']], 'nationality': [v['nationality']]}, batch_size=200))),
+    # Analyses et export sur tout l'historique: lecture complète des deux tables attendue
+    HotQuery('archive.list_all', lambda db, v: db.get_all_clients(page=1, per_page=50, view='analytics'),
+             allowed=('full_scan:clients', 'full_scan:clients_archive', 'temp_btree:ORDER BY')),
+    HotQuery('archive.stats_all', lambda db, v: db.get_statistics(),
+             allowed=('full_scan:clients', 'full_scan:clients_archive', 'temp_btree:GROUP BY')),
+    HotQuery('archive.facets_all', lambda db, v: db.get_client_facets({'visa_status': v['visa_status']}),
+             allowed=('full_scan:clients', 'full_scan:clients_archive', 'temp_btree:GROUP BY', 'temp_btree:ORDER BY')),
+]
+
+
+def _recording_connection(statements: List[Tuple[str, Any]]):
+    """Classe de connexion instrumentée qui note (sql, paramètres) de chaque instruction"""
+    from utils.metrics import InstrumentedConnection, InstrumentedCursor
+
+    class RecordingCursor(InstrumentedCursor):
+        def execute(self, sql, parameters=()):
+            statements.append((sql, parameters))
+            return super().execute(sql, parameters)
+
+        def executemany(self, sql, seq_of_parameters):
+            seq_of_parameters = list(seq_of_parameters)
+            if seq_of_parameters:
+                statements.append((sql, seq_of_parameters[0]))
+            return super().executemany(sql, seq_of_parameters)
+
+    class RecordingConnection(InstrumentedConnection):
+        def cursor(self, factory=RecordingCursor):
+            return super().cursor(factory)
+
+    return RecordingConnection
+
+
+def capture_plans(db_manager, queries: List[HotQuery] = HOT_QUERIES) -> Dict[str, List[QueryPlan]]:
+    """
+    Exécuter les requêtes chaudes et expliquer chaque instruction émise
+
+    Returns:
+        {nom de la requête chaude: [QueryPlan par instruction distincte]}
+    """
+    statements: List[Tuple[str, Any]] = []
+    factory = _recording_connection(statements)
+    # Les méthodes de l'instance passent par get_connection: seule cette instance est enregistrée
+    db_manager.get_connection = lambda: _connect(db_manager.db_path, factory=factory)
+
+    conn = _connect(db_manager.db_path)
+    try:
+        values = _sample_values(conn)
+        plans: Dict[str, List[QueryPlan]] = {}
+        for query in queries:
+            del statements[:]
+            query.run(db_manager, values)
+            seen = set()
+            plans[query.name] = []
+            for sql, params in statements:
+                if sql in seen or not sql.lstrip().upper().startswith(_EXPLAINED_STATEMENTS):
+                    continue
+                seen.add(sql)
+                plans[query.name].append(QueryPlan(query.name, sql, explain(conn, sql, params)))
+        return plans
+    finally:
+        conn.close()
+        del db_manager.get_connection
+
+
+def check_plans(plans: Dict[str, List[QueryPlan]], queries: List[HotQuery] = HOT_QUERIES) -> List[str]:
+    """Régressions: signaux de plan non tolérés par la requête chaude"""
+    allowed = {query.name: set(query.allowed) for query in queries}
+    regressions = []
+    for name, query_plans in plans.items():
+        for plan in query_plans:
+            for flag in plan.flags:
+                if flag not in allowed.get(name, ()):
+                    regressions.append(f"{name}: {flag} — {plan.sql[:140]}")
+    return regressions
+
+
+def _index_keys(conn: sqlite3.Connection, index: str) -> Tuple[str, ...]:
+    """Colonnes clés d'un index ('<expr>' pour une expression, suffixe ' DESC' si décroissant)"""
+    keys = []
+    for row in conn.execute(f'PRAGMA index_xinfo("{index}")').fetchall():
+        seqno, cid, name, desc, _coll, is_key = row
+        if not is_key:
+            continue
+        key = name if cid >= 0 else '<expr>'
+        keys.append(f'{key} DESC' if desc else key)
+    return tuple(keys)
+
+
+def index_report(conn: sqlite3.Connection, plans: Optional[Dict[str, List[QueryPlan]]] = None) -> List[Dict[str, Any]]:
+    """
+    Index des tables de la base avec statistiques et diagnostics
+
+    Args:
+        plans: Plans capturés (capture_plans); un index d'une table lue par ces plans
+               mais absent de tous est signalé inutilisé
+
+    Returns:
+        [{'table', 'name', 'keys', 'unique', 'partial', 'stat', 'issues': [...]}]
+    """
+    try:
+        stats = {name: stat for _table, name, stat in conn.execute('SELECT tbl, idx, stat FROM sqlite_stat1')}
+    except sqlite3.OperationalError:
+        stats = {}
+
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    used, read_tables = set(), set()
+    for query_plans in (plans or {}).values():
+        for plan in query_plans:
+            used.update(plan.indexes)
+            read_tables.update(plan.tables)
+
+    report = []
+    for table in tables:
+        indexes = []
+        for _seq, name, unique, origin, partial in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+            indexes.append({'table': table, 'name': name, 'keys': _index_keys(conn, name), 'unique': bool(unique),
+                            'origin': origin, 'partial': bool(partial), 'stat': stats.get(name), 'issues': []})
+
+        for index in indexes:
+            keys = index['keys']
+            if index['stat']:
+                numbers = [int(part) for part in index['stat'].split() if part.isdigit()]
+                if len(numbers) >= 2 and numbers[0] and not index['unique'] \
+                        and numbers[-1] > numbers[0] * LOW_SELECTIVITY_RATIO:
+                    index['issues'].append(f"peu sélectif (~{numbers[-1]} lignes par clé sur {numbers[0]})")
+            # Les index UNIQUE et partiels portent une contrainte ou un filtre: jamais redondants
+            if not index['unique'] and not index['partial'] and '<expr>' not in keys:
+                for other in indexes:
+                    if other is index or other['partial'] or other['keys'][:len(keys)] != keys:
+                        continue
+                    # Doublon exact: le premier déclaré (ou l'index UNIQUE) est conservé
+                    if len(other['keys']) > len(keys) or other['unique'] or \
+                            indexes.index(other) > indexes.index(index):
+                        index['issues'].append(f"redondant avec {other['name']}")
+                        break
+            if table in read_tables and index['origin'] == 'c' and index['name'] not in used:
+                index['issues'].append('inutilisé par les requêtes chaudes')
+            report.append(index)
+    return report
+
+
+def print_plans(plans: Dict[str, List[QueryPlan]]) -> None:
+    for name, query_plans in plans.items():
+        print(f"🔎 {name}")
+        for plan in query_plans:
+            print(f"   {plan.sql[:110]}")
+            for detail in plan.details:
+                print(f"      {detail}")
+
+
+def print_index_report(report: List[Dict[str, Any]]) -> None:
+    for index in report:
+        keys = ', '.join(index['keys'])
+        stat = f" [stat1: {index['stat']}]" if index['stat'] else ''
+        marker = '⚠️ ' if index['issues'] else '   '
+        print(f"{marker}{index['table']}.{index['name']} ({keys}){stat}")
+        for issue in index['issues']:
+            print(f"      - {issue}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from database.database_manager import DatabaseManager, resolve_db_path
+
+    parser = argparse.ArgumentParser(description="Plans d'exécution des requêtes et rapport des index")
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    parser.add_argument('command', choices=('report', 'check'))
+    args = parser.parse_args()
+
+    manager = DatabaseManager(resolve_db_path(args.db))
+    captured = capture_plans(manager)
+    problems = check_plans(captured)
+    if args.command == 'report':
+        print_plans(captured)
+        connection = _connect(manager.db_path)
+        try:
+            print_index_report(index_report(connection, captured))
+        finally:
+            connection.close()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Plans des requêtes chaudes conformes")
+    sys.exit(1 if problems and args.command == 'check' else 0)
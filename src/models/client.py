@@ -4,10 +4,16 @@
 Modèle Client pour le système de suivi des visas TCA
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 from datetime import datetime
 import re
 
+from utils.phone_numbers import normalize_phone
+from utils.value_normalizer import option_normalizer
+
+# Caractères retirés d'un numéro WhatsApp avant le contrôle de longueur
+_WHATSAPP_JUNK = re.compile(r'[^0-9+]')
+
 class Client:
     """Modèle représentant un client dans le système de suivi des visas"""
     
@@ -113,7 +119,7 @@ class Client:
             return True  # Optionnel
         
         # Nettoyer le numéro
-        clean_number = re.sub(r'[^0-9+]', '', number)
+        clean_number = _WHATSAPP_JUNK.sub('', number)
         
         # Vérifier la longueur (entre 8 et 15 chiffres)
         if len(clean_number) < 8 or len(clean_number) > 15:
@@ -129,9 +135,215 @@ class Client:
         """Représentation pour debug"""
         return self.__str__()
 
+class ClientRow:
+    """
+    Ligne de la table clients lue sans copie en dictionnaire
+    
+    Les valeurs restent dans le tuple produit par sqlite3; l'index
+    colonne -> position est partagé par toutes les lignes d'une requête.
+    Lecture comme un dict (row['x'], row.get('x', défaut), dict(row), 'x' in row)
+    ou comme un objet dans les templates ({{ client.full_name }}). Une colonne
+    absente de la projection se comporte comme une clé absente d'un dict.
+    """
+    
+    __slots__ = ('_columns', '_values')
+    
+    def __init__(self, columns: Dict[str, int], values: tuple):
+        self._columns = columns
+        self._values = values
+    
+    @classmethod
+    def row_factory(cls) -> Callable[[Any, tuple], 'ClientRow']:
+        """
+        row_factory sqlite3 à installer sur une connexion
+        
+        L'index des colonnes est reconstruit seulement quand la description du
+        curseur change (nouvelle requête); la référence gardée sur la
+        description empêche toute confusion avec une requête précédente.
+        """
+        state = [None, None]
+        
+        def factory(cursor, values: tuple) -> 'ClientRow':
+            description = cursor.description
+            if description is not state[0]:
+                state[0] = description
+                state[1] = {column[0]: position for position, column in enumerate(description)}
+            return cls(state[1], values)
+        
+        return factory
+    
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._values[key]
+        return self._values[self._columns[key]]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._columns.get(key)
+        return default if position is None else self._values[position]
+    
+    def __getattr__(self, name: str) -> Any:
+        position = self._columns.get(name)
+        if position is None:
+            raise AttributeError(name)
+        return self._values[position]
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._columns
+    
+    def __iter__(self):
+        return iter(self._columns)
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    def keys(self):
+        return self._columns.keys()
+    
+    def values(self) -> tuple:
+        return self._values
+    
+    def items(self):
+        return zip(self._columns, self._values)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._columns, self._values))
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ClientRow):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"ClientRow({self.get('client_id')!r})"
+
+def _cell_text(value: Any) -> str:
+    if value is None or value != value:
+        return ''
+    return str(value).strip()
+
+
 class ClientValidator:
     """Validateur pour les données client"""
     
+    # Codes d'erreur de validate_bulk_data -> message
+    BULK_ERROR_MESSAGES = {
+        'client_id_required': 'معرف العميل مطلوب',
+        'full_name_required': 'الاسم الكامل مطلوب',
+        'client_id_duplicate': 'معرف العميل مكرر في الملف',
+        'passport_duplicate': 'رقم جواز السفر مكرر في الملف',
+        'passport_exists': 'رقم جواز السفر موجود مسبقاً',
+        'whatsapp_invalid': 'رقم الواتساب غير صحيح',
+        'passport_status_invalid': 'حالة جواز السفر غير معروفة',
+        'nationality_invalid': 'الجنسية غير معروفة',
+        'visa_status_invalid': 'حالة التأشيرة غير معروفة',
+        'responsible_employee_invalid': 'الموظف غير معروف',
+    }
+    # Codes qui écartent une ligne même hors mode strict (les autres sont des avertissements)
+    BLOCKING_CODES = frozenset({'client_id_required', 'full_name_required', 'client_id_duplicate',
+                                'passport_duplicate', 'passport_exists'})
+    # Champ -> options acceptées (valeur comparée après normalisation)
+    ENUM_FIELDS = {
+        'passport_status': Client.PASSPORT_STATUS_OPTIONS,
+        'nationality': Client.NATIONALITY_OPTIONS,
+        'visa_status': Client.VISA_STATUS_OPTIONS,
+        'responsible_employee': Client.EMPLOYEE_OPTIONS,
+    }
+    
+    @staticmethod
+    def validate_bulk_data(clients_data: Union[List[Dict[str, Any]], Dict[str, List[Any]]], db_manager=None,
+                           strict: bool = False) -> Dict[str, Any]:
+        """
+        Valider un lot de clients colonne par colonne (sans objet Client par ligne)
+        
+        Contrôles: champs requis (sauf auto_generated_id / empty_name_accepted),
+        identifiants et passeports en double dans le lot, passeports déjà en base
+        (une requête pour tout le lot si db_manager est fourni), longueur du
+        numéro WhatsApp et appartenance des statuts, nationalités et employés aux
+        options. Ces deux derniers contrôles ne sont bloquants qu'en mode strict.
+        
+        Args:
+            clients_data: Liste de dictionnaires ou colonnes (champ -> valeurs)
+        
+        Returns:
+            {'valid_clients': [dict], 'invalid_clients': [{'index', 'client_id', 'codes', 'errors'}],
+             'warnings': [{'index', 'client_id', 'codes'}], 'codes': codes par ligne, 'errors': [str]}
+        """
+        if isinstance(clients_data, dict):
+            columns = clients_data
+            count = len(next(iter(columns.values()), []))
+            rows = None
+        else:
+            rows = clients_data
+            count = len(rows)
+            columns = {}
+        
+        def column(field: str) -> List[Any]:
+            if field not in columns:
+                columns[field] = [row.get(field) for row in rows] if rows is not None else [None] * count
+            return columns[field]
+        
+        codes: List[List[str]] = [[] for _ in range(count)]
+        client_ids = [_cell_text(value) for value in column('client_id')]
+        names = [_cell_text(value) for value in column('full_name')]
+        auto_ids = column('auto_generated_id')
+        empty_names = column('empty_name_accepted')
+        
+        for index in range(count):
+            if not client_ids[index] and not auto_ids[index]:
+                codes[index].append('client_id_required')
+            if not names[index] and not empty_names[index]:
+                codes[index].append('full_name_required')
+        
+        # Doublons dans le lot: la première occurrence est gardée
+        seen_ids = set()
+        for index, client_id in enumerate(client_ids):
+            if client_id:
+                if client_id in seen_ids:
+                    codes[index].append('client_id_duplicate')
+                seen_ids.add(client_id)
+        passports = [_cell_text(value) for value in column('passport_number')]
+        seen_passports = set()
+        for index, passport in enumerate(passports):
+            if passport:
+                if passport in seen_passports:
+                    codes[index].append('passport_duplicate')
+                seen_passports.add(passport)
+        if db_manager is not None and seen_passports:
+            existing = db_manager.get_existing_passport_numbers(list(seen_passports))
+            for index, passport in enumerate(passports):
+                if passport in existing:
+                    codes[index].append('passport_exists')
+        
+        for index, number in enumerate(column('whatsapp_number')):
+            number = _cell_text(number)
+            if number and not 8 <= len(_WHATSAPP_JUNK.sub('', number)) <= 15:
+                codes[index].append('whatsapp_invalid')
+        
+        for field, options in ClientValidator.ENUM_FIELDS.items():
+            accepted = set(options)
+            code = f'{field}_invalid'
+            for index, value in enumerate(option_normalizer(tuple(options)).normalize_column(column(field))):
+                if value and value not in accepted:
+                    codes[index].append(code)
+        
+        blocking = None if strict else ClientValidator.BLOCKING_CODES
+        result = {'valid_clients': [], 'invalid_clients': [], 'warnings': [], 'codes': codes, 'errors': []}
+        fields = list(columns)
+        for index, row_codes in enumerate(codes):
+            client_data = rows[index] if rows is not None else {field: columns[field][index] for field in fields}
+            if row_codes and (blocking is None or not blocking.isdisjoint(row_codes)):
+                messages = [ClientValidator.BULK_ERROR_MESSAGES[code] for code in row_codes]
+                result['invalid_clients'].append({'index': index, 'client_id': client_ids[index],
+                                                  'codes': row_codes, 'errors': messages})
+                result['errors'].append(f"Ligne {index + 1} ({client_ids[index] or '?'}): {', '.join(messages)}")
+                continue
+            if row_codes:
+                result['warnings'].append({'index': index, 'client_id': client_ids[index], 'codes': row_codes})
+            result['valid_clients'].append(client_data)
+        return result
+    
     @staticmethod
     def validate_client_data(data: Dict[str, Any], strict: bool = True) -> List[str]:
         """Valider les données d'un client"""
@@ -159,7 +371,7 @@ class ClientValidator:
         if not number:
             return True
         
-        clean_number = re.sub(r'[^0-9+]', '', number)
+        clean_number = _WHATSAPP_JUNK.sub('', number)
         return 8 <= len(clean_number) <= 15
     
     @staticmethod
@@ -174,8 +386,7 @@ class ClientValidator:
         
         # Normaliser le numéro WhatsApp
         if normalized.get('whatsapp_number'):
-            clean_whatsapp = re.sub(r'[^0-9+]', '', normalized['whatsapp_number'])
-            normalized['whatsapp_number_clean'] = clean_whatsapp
+            normalized['whatsapp_number_clean'] = normalize_phone(normalized['whatsapp_number'])
         
         # Normaliser les statuts
         if normalized.get('passport_status'):
@@ -192,20 +403,19 @@ class ClientValidator:
     
     @staticmethod
     def _normalize_status(status: str, options: List[str]) -> str:
-        """Normaliser un statut selon les options disponibles"""
-        if not status:
-            return ''
-        
-        status_clean = status.strip()
-        
-        # Recherche exacte
-        if status_clean in options:
-            return status_clean
-        
-        # Recherche approximative
-        for option in options:
-            if status_clean in option or option in status_clean:
-                return option
-        
-        # Retourner tel quel si pas de correspondance
-        return status_clean
\ No newline at end of file
+        """Normaliser un statut selon les options disponibles (la valeur nettoyée si rien ne correspond)"""
+        return option_normalizer(tuple(options)).normalize(status)
+    
+    # Champ -> options de sa colonne normalisée (imports par lots)
+    NORMALIZED_COLUMNS = {
+        'passport_status_normalized': ('passport_status', Client.PASSPORT_STATUS_OPTIONS),
+        'visa_status_normalized': ('visa_status', Client.VISA_STATUS_OPTIONS),
+    }
+    
+    @staticmethod
+    def normalize_columns(columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        """Ajouter les colonnes de statuts normalisés à un lot en colonnes (champ -> valeurs)"""
+        for target, (field, options) in ClientValidator.NORMALIZED_COLUMNS.items():
+            if field in columns:
+                columns[target] = option_normalizer(tuple(options)).normalize_column(columns[field])
+        return columns
@@ -19,10 +19,8 @@ class AnalyticsService:
         """Obtenir une analyse complète de toutes les données"""
         
         # Récupérer tous les clients
-        all_clients, total_count = self.db_manager.get_all_clients(page=1, per_page=10000)
-        
-        # Convertir les Row objects en dictionnaires
-        all_clients = [dict(client) for client in all_clients]
+        # Colonnes utiles aux analyses uniquement (ClientRow: lecture par .get, sans copie)
+        all_clients, total_count = self.db_manager.get_all_clients(page=1, per_page=10000, view='analytics')
         
         analysis = {
             'overview': self._get_overview_stats(all_clients, total_count),
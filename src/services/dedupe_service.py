@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Détection des clients en double (même personne sous plusieurs identifiants)
+
+Les paires candidates viennent de clés de blocage au lieu d'une comparaison
+de toutes les paires (O(n²)):
+- t: numéro WhatsApp normalisé (E.164)
+- p: numéro de passeport sans espaces ni tirets, en majuscules
+- n: nom normalisé, mots triés (« علي محمد » = « محمد علي »)
+
+Chaque paire est notée (0 à 1) par une moyenne pondérée des champs présents
+des deux côtés: similarité du nom, du numéro et du passeport. Deux passeports
+différents font baisser la note (membres d'une famille partageant un numéro).
+Les paires au-dessus du seuil sont regroupées en grappes (union-find).
+
+Mode incrémental: seuls les blocs des clients indiqués (lignes importées)
+sont comparés, en un parcours de la table.
+"""
+
+import re
+import time
+from difflib import SequenceMatcher
+from operator import ne
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.phone_numbers import normalize_phone
+from utils.search_index import normalize_text
+
+DEFAULT_THRESHOLD = 0.85
+# Un bloc plus grand (nom très courant, numéro d'agence) n'apporte que du bruit
+MAX_BLOCK_SIZE = 50
+# Poids des champs dans la note d'une paire
+FIELD_WEIGHTS = {'name': 0.5, 'phone': 0.3, 'passport': 0.4}
+# Note d'une paire qui ne partage qu'un seul champ comparable
+SINGLE_FIELD_FACTOR = 0.8
+
+_PASSPORT_JUNK = re.compile(r'[^0-9A-Z]')
+_PLACEHOLDER_NAMES = frozenset({'', 'غير محدد', 'nan', 'none'})
+_MIN_PASSPORT_LENGTH = 5
+_MAX_CODE_TYPOS = 2
+
+
+def name_key(full_name: Any) -> str:
+    """Nom normalisé, mots triés ('' pour un nom absent ou générique)"""
+    text = normalize_text(full_name)
+    if text in _PLACEHOLDER_NAMES:
+        return ''
+    return ' '.join(sorted(text.split()))
+
+
+def passport_key(passport_number: Any) -> str:
+    """Numéro de passeport comparable ('' si absent ou trop court)"""
+    key = _PASSPORT_JUNK.sub('', str(passport_number or '').upper())
+    return key if len(key) >= _MIN_PASSPORT_LENGTH and key != 'NAN' else ''
+
+
+class DedupeRecord:
+    """Champs d'un client utilisés pour le blocage et la comparaison"""
+
+    __slots__ = ('client_id', 'full_name', 'whatsapp_number', 'name', 'phone', 'passport')
+
+    def __init__(self, client_id: str, full_name: Any, whatsapp_number: Any, phone_clean: Any, passport_number: Any):
+        self.client_id = client_id
+        self.full_name = full_name or ''
+        self.whatsapp_number = whatsapp_number or ''
+        self.name = name_key(full_name)
+        self.phone = (phone_clean or normalize_phone(whatsapp_number)).lstrip('+')
+        self.passport = passport_key(passport_number)
+
+    @classmethod
+    def from_index_row(cls, row: tuple) -> 'DedupeRecord':
+        """Ligne de DatabaseManager.iter_search_index_rows"""
+        client_id, full_name, phone, phone_clean, _status, _nationality, passport = row
+        return cls(client_id, full_name, phone, phone_clean, passport)
+
+    def blocking_keys(self) -> List[str]:
+        # client_id est facultatif (TEXT UNIQUE): un client sans identifiant ne peut être
+        # ni désigné ni fusionné, il n'entre dans aucun bloc
+        if not self.client_id:
+            return []
+        keys = []
+        if self.phone:
+            keys.append('t:' + self.phone)
+        if self.passport:
+            keys.append('p:' + self.passport)
+        if self.name:
+            keys.append('n:' + self.name)
+        return keys
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'client_id': self.client_id, 'full_name': self.full_name, 'whatsapp_number': self.whatsapp_number}
+
+
+def _code_similarity(a: str, b: str) -> float:
+    """Numéro ou passeport: identique, ou au plus deux chiffres/lettres substitués (faute de frappe)"""
+    if a == b:
+        return 1.0
+    if len(a) != len(b):
+        return 0.0
+    mismatches = sum(map(ne, a, b))
+    return 1.0 - mismatches / len(a) if mismatches <= _MAX_CODE_TYPOS else 0.0
+
+
+def score_pair(a: DedupeRecord, b: DedupeRecord, threshold: float = 0.0) -> Tuple[float, List[str]]:
+    """
+    Noter la ressemblance de deux clients
+
+    Les champs à comparaison exacte passent d'abord: si la paire ne peut pas
+    atteindre `threshold` même avec des noms identiques, la similarité des noms
+    (la plus coûteuse) n'est pas calculée et la note retournée est 0.
+
+    Returns:
+        (note entre 0 et 1, champs concordants parmi 'name', 'phone', 'passport')
+    """
+    similarities = {}
+    total_weight = weighted = 0.0
+    if a.phone and b.phone:
+        similarities['phone'] = value = _code_similarity(a.phone, b.phone)
+        total_weight += FIELD_WEIGHTS['phone']
+        weighted += FIELD_WEIGHTS['phone'] * value
+    if a.passport and b.passport:
+        similarities['passport'] = value = _code_similarity(a.passport, b.passport)
+        total_weight += FIELD_WEIGHTS['passport']
+        weighted += FIELD_WEIGHTS['passport'] * value
+    compare_names = bool(a.name and b.name)
+    field_count = len(similarities) + compare_names
+    if not field_count:
+        return 0.0, []
+
+    factor = SINGLE_FIELD_FACTOR if field_count == 1 else 1.0
+    if compare_names:
+        total_weight += FIELD_WEIGHTS['name']
+        if (weighted + FIELD_WEIGHTS['name']) / total_weight * factor < threshold:
+            return 0.0, []
+        if a.name == b.name:
+            similarities['name'] = 1.0
+        else:
+            matcher = SequenceMatcher(None, a.name, b.name)
+            similarities['name'] = matcher.ratio() if matcher.real_quick_ratio() > 0.5 else 0.0
+        weighted += FIELD_WEIGHTS['name'] * similarities['name']
+
+    score = weighted / total_weight * factor
+    return round(score, 3), [field for field, value in similarities.items() if value >= 0.9]
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+
+    def find(self, item: str) -> str:
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a: str, b: str) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class DuplicateFinder:
+    """Recherche des doublons sur la table clients (complète ou limitée à des clients donnés)"""
+
+    def __init__(self, db_manager, threshold: float = DEFAULT_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE):
+        self.db_manager = db_manager
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+
+    def find_duplicates(self, client_ids: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Rechercher les grappes de doublons
+
+        Args:
+            client_ids: Mode incrémental: ne comparer que ces clients (entre eux et
+                        avec le reste de la table); None pour toute la table
+            limit: Nombre maximal de grappes retournées (les plus sûres d'abord)
+
+        Returns:
+            {'clusters': [...], 'stats': {...}}
+        """
+        started = time.perf_counter()
+        stats = {'records': 0, 'blocks': 0, 'skipped_blocks': 0, 'comparisons': 0, 'pairs': 0}
+
+        focus = None
+        wanted_keys = None
+        if client_ids is not None:
+            focus = set(client_ids)
+            wanted_keys = set()
+            for rows in self.db_manager.iter_search_index_rows(list(focus)):
+                for row in rows:
+                    wanted_keys.update(DedupeRecord.from_index_row(row).blocking_keys())
+
+        blocks: Dict[str, List[DedupeRecord]] = {}
+        if wanted_keys is None or wanted_keys:
+            for rows in self.db_manager.iter_search_index_rows():
+                for row in rows:
+                    stats['records'] += 1
+                    record = DedupeRecord.from_index_row(row)
+                    for key in record.blocking_keys():
+                        if wanted_keys is None or key in wanted_keys:
+                            blocks.setdefault(key, []).append(record)
+
+        pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        compared = set()
+        for key, members in blocks.items():
+            if len(members) < 2:
+                continue
+            if len(members) > self.max_block_size:
+                stats['skipped_blocks'] += 1
+                continue
+            stats['blocks'] += 1
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    first_id, second_id = first.client_id, second.client_id
+                    if first_id == second_id:
+                        continue
+                    pair_key = (first_id, second_id) if first_id < second_id else (second_id, first_id)
+                    if pair_key in compared:
+                        continue
+                    if focus is not None and first_id not in focus and second_id not in focus:
+                        continue
+                    compared.add(pair_key)
+                    score, matched = score_pair(first, second, self.threshold)
+                    if score >= self.threshold:
+                        pairs[pair_key] = {'client_ids': list(pair_key), 'score': score, 'matched': matched,
+                                           'records': (first, second)}
+        stats['comparisons'] = len(compared)
+        stats['pairs'] = len(pairs)
+
+        clusters = self._build_clusters(pairs.values())
+        stats['clusters'] = len(clusters)
+        stats['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return {'clusters': clusters[:limit] if limit else clusters, 'stats': stats,
+                'threshold': self.threshold, 'incremental': focus is not None}
+
+    @staticmethod
+    def _build_clusters(pairs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        union = _UnionFind()
+        members: Dict[str, DedupeRecord] = {}
+        pairs = list(pairs)
+        for pair in pairs:
+            first, second = pair['records']
+            members[first.client_id] = first
+            members[second.client_id] = second
+            union.union(first.client_id, second.client_id)
+
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for pair in pairs:
+            root = union.find(pair['client_ids'][0])
+            cluster = grouped.setdefault(root, {'client_ids': set(), 'pairs': []})
+            cluster['client_ids'].update(pair['client_ids'])
+            cluster['pairs'].append({key: pair[key] for key in ('client_ids', 'score', 'matched')})
+
+        clusters = []
+        for cluster in grouped.values():
+            client_ids = sorted(cluster['client_ids'])
+            clusters.append({
+                'client_ids': client_ids,
+                'members': [members[client_id].as_dict() for client_id in client_ids],
+                'score': max(pair['score'] for pair in cluster['pairs']),
+                'pairs': sorted(cluster['pairs'], key=lambda pair: -pair['score']),
+            })
+        clusters.sort(key=lambda cluster: (-cluster['score'], cluster['client_ids'][0]))
+        return clusters
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèles de messages WhatsApp précompilés
+
+Un MessageTemplate découpe son texte une seule fois en segments fixes et en
+variables ({client_name}, {date}, ...): le rendu n'est plus qu'une jointure,
+ce qui compte lorsqu'une campagne produit des milliers de messages.
+"""
+
+from string import Formatter
+from typing import Any, Dict, List, Mapping, Tuple
+
+
+class MessageTemplate:
+    """Modèle {variable} compilé une fois, rendu sans reformatage du texte"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._parts: List[Tuple[str, str]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                raise ValueError(f"Variable de modèle non supportée: {{{field}}}")
+            self._parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self._parts if field)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """Rendre le modèle (KeyError si une variable manque)"""
+        return ''.join(literal + (str(values[field]) if field else '') for literal, field in self._parts)
+
+
+# Textes des notifications de changement de statut ({client_name}, {date}, {status})
+STATUS_MESSAGE_TEXTS: Dict[str, str] = {
+    'تم التقديم في السيستام': """
+🛂 *تحديث حالة التأشيرة*
+
+مرحباً {client_name}،
+
+تم تسجيل طلب التأشيرة الخاص بك في النظام بنجاح.
+
+📋 *الحالة الحالية:* تم التقديم في السيستام
+📅 *التاريخ:* {date}
+
+سيتم متابعة طلبك وإعلامك بأي تحديثات.
+
+شكراً لثقتكم بنا.
+
+---
+شركة تونس للاستشارات والخدمات
+📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
+            """,
+
+    'تم التقديم إلى السفارة': """
+🛂 *تحديث حالة التأشيرة*
+
+مرحباً {client_name}،
+
+تم تقديم جواز سفرك إلى السفارة.
+
+📋 *الحالة الحالية:* تم التقديم إلى السفارة
+📅 *التاريخ:* {date}
+
+سنقوم باعلامكم فورا استلام جوازكم.
+
+شكراً لصبركم.
+
+---
+شركة تونس للاستشارات والخدمات
+📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
+            """,
+
+    'تمت الموافقة على التأشيرة': """
+🎉 *تهانينا!*
+
+مرحباً {client_name}،
+
+🎊 *تمت الموافقة على طلب التأشيرة الخاص بك!*
+
+📋 *الحالة الحالية:* تمت الموافقة على التأشيرة
+📅 *التاريخ:* {date}
+
+يمكنكم الآن تسليم جواز السفر اذا لم يكون متوفر لنا
+
+شكراً لثقتكم بنا.
+
+---
+شركة تونس للاستشارات والخدمات
+📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
+            """,
+
+    'التأشيرة غير موافق عليها': """
+😔 *تحديث حالة التأشيرة*
+
+مرحباً {client_name}،
+
+للأسف، لم يتم قبول طلب التأشيرة.
+
+📋 *الحالة الحالية:* التأشيرة غير موافق عليها
+📅 *التاريخ:* {date}
+
+يمكنكم مراجعة الأسباب معنا أو إعادة التقديم.
+
+نحن هنا لمساعدتكم.
+
+---
+شركة تونس للاستشارات والخدمات
+📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
+            """,
+
+    'اكتملت العملية': """
+✅ *اكتملت العملية*
+
+مرحباً {client_name}،
+
+تم اصدار التاشيرة وسوف يتصل بك مندوب الشركة فورا وصول جواز سفركم للاستلام.
+
+📋 *الحالة الحالية:* اكتملت العملية
+📅 *التاريخ:* {date}
+
+شكراً لثقتكم بنا.
+
+---
+شركة تونس للاستشارات والخدمات
+📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
+            """
+}
+
+DEFAULT_STATUS_MESSAGE_TEXT = """
+🛂 *تحديث حالة التأشيرة*
+
+مرحباً {client_name}،
+
+تم تحديث حالة التأشيرة الخاصة بك.
+
+📋 *الحالة الحالية:* {status}
+📅 *التاريخ:* {date}
+
+شكراً لثقتكم بنا.
+
+---
+شركة تونس للاستشارات والخدمات
+        """
+
+STATUS_TEMPLATES: Dict[str, MessageTemplate] = {
+    status: MessageTemplate(text) for status, text in STATUS_MESSAGE_TEXTS.items()
+}
+DEFAULT_STATUS_TEMPLATE = MessageTemplate(DEFAULT_STATUS_MESSAGE_TEXT)
+
+
+def get_status_template(status: str) -> MessageTemplate:
+    """Modèle de notification pour un statut de visa"""
+    return STATUS_TEMPLATES.get(status, DEFAULT_STATUS_TEMPLATE)
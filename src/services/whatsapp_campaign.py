@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Campagnes WhatsApp: notifier tous les clients d'un segment
+
+Les destinataires sont lus par lots (requête indexée sur visa_status /
+nationality / responsible_employee, colonnes utiles uniquement), les messages
+sont rendus à partir de modèles précompilés, les numéros en double sont
+écartés et chaque lot est inséré dans l'outbox en une transaction. Le mode
+dry_run produit la liste des messages en CSV sans rien mettre en file.
+"""
+
+import csv
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+from services.message_templates import MessageTemplate, get_status_template
+from utils.phone_numbers import normalize_phone
+
+# Variables disponibles dans le texte d'une campagne
+CAMPAIGN_VARIABLES = frozenset({'client_name', 'client_id', 'status', 'nationality', 'employee', 'date'})
+CSV_COLUMNS = ('client_id', 'full_name', 'phone_number', 'message')
+
+
+class CampaignMetrics:
+    """Compteurs cumulés des campagnes (exportés sur /metrics)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'campaigns': 0, 'rendered': 0, 'queued': 0, 'duplicates': 0, 'skipped': 0}
+        self.last_throughput = 0.0
+
+    def record(self, summary: Dict[str, Any]) -> None:
+        with self._lock:
+            self.counters['campaigns'] += 1
+            for key in ('rendered', 'queued', 'duplicates', 'skipped'):
+                self.counters[key] += summary.get(key, 0)
+            self.last_throughput = summary.get('messages_per_second', 0.0)
+
+
+campaign_metrics = CampaignMetrics()
+
+
+def campaign_collector():
+    """Collecteur /metrics des campagnes WhatsApp"""
+    return [
+        ('tca_whatsapp_campaign_messages_total', 'counter', 'Messages de campagne par étape',
+         [({'stage': stage}, count) for stage, count in campaign_metrics.counters.items()]),
+        ('tca_whatsapp_campaign_throughput', 'gauge', 'Débit de la dernière campagne (messages/s)',
+         [({}, campaign_metrics.last_throughput)]),
+    ]
+
+
+class WhatsAppCampaign:
+    """Sélection des destinataires, rendu par lots et mise en file d'une campagne"""
+
+    def __init__(self, db_manager, outbox=None, batch_size: int = 500):
+        self.db_manager = db_manager
+        self.outbox = outbox
+        self.batch_size = batch_size
+
+    @staticmethod
+    def compile_message(message: Optional[str]) -> Callable[[Dict[str, Any]], str]:
+        """
+        Préparer la fonction de rendu d'une campagne
+
+        Sans texte, chaque client reçoit la notification de son statut actuel.
+
+        Raises:
+            ValueError: Texte vide ou variable inconnue
+        """
+        if message is None:
+            return lambda values: get_status_template(values['status']).render(values)
+        if not message.strip():
+            raise ValueError("Le texte du message est vide")
+        template = MessageTemplate(message)
+        unknown = template.fields - CAMPAIGN_VARIABLES
+        if unknown:
+            raise ValueError(f"Variables inconnues: {', '.join(sorted(unknown))}")
+        return template.render
+
+    @staticmethod
+    def phone_key(row) -> Optional[str]:
+        """Numéro E.164 sans le + servant au dédoublonnage (whatsapp_number_clean, sinon le numéro saisi)"""
+        return normalize_phone(row['whatsapp_number_clean'] or row['whatsapp_number']).lstrip('+') or None
+
+    def iter_messages(self, segment: Dict[str, List[str]], message: Optional[str] = None,
+                      summary: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Produire les messages d'un segment par lots
+
+        Args:
+            segment: Filtres {'visa_status': [...], 'nationality': [...], 'responsible_employee': [...]}
+            message: Texte à variables {client_name}, {status}, ... (None: notification de statut)
+            summary: Dict complété avec selected / rendered / duplicates / skipped
+        """
+        render = self.compile_message(message)
+        summary = summary if summary is not None else {}
+        for key in ('selected', 'rendered', 'duplicates', 'skipped'):
+            summary.setdefault(key, 0)
+
+        date = datetime.now().strftime("%Y-%m-%d %H:%M")
+        seen = set()
+        for rows in self.db_manager.iter_campaign_recipients(segment, batch_size=self.batch_size):
+            batch = []
+            for row in rows:
+                summary['selected'] += 1
+                phone = self.phone_key(row)
+                if phone is None:
+                    summary['skipped'] += 1
+                    continue
+                if phone in seen:
+                    summary['duplicates'] += 1
+                    continue
+                seen.add(phone)
+                values = {
+                    'client_name': row['full_name'] or 'عميلنا العزيز',
+                    'client_id': row['client_id'] or '',
+                    'status': row['visa_status'] or '',
+                    'nationality': row['nationality'] or '',
+                    'employee': row['responsible_employee'] or '',
+                    'date': date,
+                }
+                batch.append({'client_id': row['client_id'], 'full_name': row['full_name'],
+                              'phone_number': '+' + phone, 'message': render(values)})
+            summary['rendered'] += len(batch)
+            if batch:
+                yield batch
+
+    def run(self, segment: Dict[str, List[str]], message: Optional[str] = None,
+            campaign_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Mettre en file les messages d'une campagne
+
+        Un même campaign_id relancé n'ajoute pas de doublons tant que les
+        premiers messages sont en attente.
+
+        Raises:
+            ValueError: Message invalide
+            RuntimeError: Aucune outbox configurée
+        """
+        if self.outbox is None:
+            raise RuntimeError("Outbox WhatsApp non configurée")
+        campaign_id = campaign_id or uuid.uuid4().hex
+        summary: Dict[str, Any] = {'campaign_id': campaign_id, 'queued': 0}
+        started = time.perf_counter()
+        for batch in self.iter_messages(segment, message, summary):
+            for item in batch:
+                item['dedup_key'] = f"campaign:{campaign_id}:{item['phone_number']}"
+            ids = self.outbox.enqueue_many(batch)
+            summary['queued'] += sum(1 for message_id in ids if message_id is not None)
+        self._finish(summary, started)
+        print(f"📣 Campagne {campaign_id}: {summary['queued']} message(s) en file "
+              f"({summary['messages_per_second']:.0f} msg/s)")
+        return summary
+
+    def dry_run(self, segment: Dict[str, List[str]], output: TextIO, message: Optional[str] = None) -> Dict[str, Any]:
+        """Écrire la liste des messages en CSV (rien n'est mis en file)"""
+        summary: Dict[str, Any] = {'dry_run': True}
+        started = time.perf_counter()
+        writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for batch in self.iter_messages(segment, message, summary):
+            writer.writerows(batch)
+        self._finish(summary, started, record=False)
+        return summary
+
+    @staticmethod
+    def _finish(summary: Dict[str, Any], started: float, record: bool = True) -> None:
+        elapsed = time.perf_counter() - started
+        summary['elapsed_ms'] = round(elapsed * 1000, 1)
+        summary['messages_per_second'] = round(summary['rendered'] / elapsed, 1) if elapsed > 0 else 0.0
+        if record:
+            campaign_metrics.record(summary)
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Outbox WhatsApp persistante et dispatcher en arrière-plan
+
+Les requêtes HTTP n'envoient plus les messages elles-mêmes: elles les insèrent
+dans la table whatsapp_outbox (créée par DatabaseManager.init_database) puis
+rendent la main. Un thread dispatcher réclame les messages dus, les envoie via
+le transport configuré (voir whatsapp_transports) en respectant un débit
+maximal (token bucket) et reprogramme les échecs temporaires avec un délai
+exponentiel.
+
+Cycle de vie d'un message:
+    pending -> sending -> sent
+                       -> pending (échec temporaire, next_attempt_at repoussé)
+                       -> failed  (échec définitif ou tentatives épuisées)
+
+Un message identique déjà en attente (même dedup_key) n'est pas ajouté deux fois.
+Le bail d'un lot couvre son envoi au débit configuré et chaque message le
+renouvelle avant l'envoi; un message repris par un autre dispatcher (bail
+expiré) n'est pas renvoyé.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.whatsapp_transports import TransportError, WhatsAppTransport, create_transport
+from utils.metrics import instrumented_connect
+
+STATUSES = ('pending', 'sending', 'sent', 'failed')
+
+
+class TokenBucket:
+    """Limiteur de débit: `rate` jetons par seconde, rafale maximale `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Prendre un jeton; retourne 0 si accordé, sinon le temps d'attente en secondes"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Attendre un jeton (False si stop_event est levé pendant l'attente)"""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class WhatsAppOutbox:
+    """Accès à la table whatsapp_outbox"""
+
+    def __init__(self, db_path: str, max_attempts: int = 5, base_delay: float = 5.0,
+                 max_delay: float = 900.0, lease_seconds: float = 120.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Durée après laquelle un message resté en 'sending' (processus arrêté) est repris
+        self.lease_seconds = lease_seconds
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Appelé après chaque ajout (réveil du dispatcher)"""
+        self._listeners.append(callback)
+
+    @staticmethod
+    def make_dedup_key(phone_number: str, message: str) -> str:
+        return hashlib.sha1(f'{phone_number}\n{message}'.encode('utf-8')).hexdigest()
+
+    def enqueue(self, phone_number: str, message: str, client_id: str = None,
+                dedup_key: str = None) -> Optional[int]:
+        """Ajouter un message (None si un message identique est déjà en attente)"""
+        ids = self.enqueue_many([{'phone_number': phone_number, 'message': message,
+                                  'client_id': client_id, 'dedup_key': dedup_key}])
+        return ids[0]
+
+    def enqueue_many(self, messages: Iterable[Dict[str, Any]]) -> List[Optional[int]]:
+        """
+        Ajouter plusieurs messages dans une seule transaction
+
+        Args:
+            messages: dicts {'phone_number', 'message', 'client_id'?, 'dedup_key'?}
+
+        Returns:
+            Identifiant de chaque message (None pour un doublon ignoré)
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+
+        now = time.time()
+        timestamp = datetime.now().isoformat()
+        conn = instrumented_connect(self.db_path)
+        cursor = conn.cursor()
+        ids: List[Optional[int]] = []
+        try:
+            for item in messages:
+                dedup_key = item.get('dedup_key') or self.make_dedup_key(item['phone_number'], item['message'])
+                # L'index unique partiel (dedup_key des messages en attente) écarte les doublons
+                cursor.execute('''
+                    INSERT OR IGNORE INTO whatsapp_outbox (
+                        client_id, phone_number, message, dedup_key, status, attempts,
+                        max_attempts, next_attempt_at, created_at, updated_at
+                    ) VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?)
+                ''', (item.get('client_id'), item['phone_number'], item['message'], dedup_key,
+                      self.max_attempts, now, timestamp, timestamp))
+                ids.append(cursor.lastrowid if cursor.rowcount else None)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if any(message_id is not None for message_id in ids):
+            for callback in self._listeners:
+                callback()
+        return ids
+
+    def claim_batch(self, limit: int = 20, lease_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Réserver les messages dus (passage en 'sending' sous verrou d'écriture)
+
+        Args:
+            lease_seconds: Durée du bail du lot (défaut: self.lease_seconds); le
+                dispatcher la dimensionne sur le temps d'envoi du lot au débit autorisé
+        """
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        now = time.time()
+        conn = instrumented_connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            # Reprendre les messages dont le bail a expiré (processus arrêté pendant l'envoi)
+            cursor.execute('''
+                UPDATE whatsapp_outbox SET status = 'pending'
+                WHERE status = 'sending' AND next_attempt_at <= ?
+            ''', (now,))
+            cursor.execute('''
+                SELECT id, client_id, phone_number, message, attempts, max_attempts
+                FROM whatsapp_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            ''', (now, limit))
+            columns = [description[0] for description in cursor.description]
+            claimed = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if claimed:
+                placeholders = ', '.join('?' * len(claimed))
+                cursor.execute(f'''
+                    UPDATE whatsapp_outbox
+                    SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?, updated_at = ?
+                    WHERE id IN ({placeholders})
+                ''', [now + lease_seconds, datetime.now().isoformat()] + [m['id'] for m in claimed])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        for message in claimed:
+            message['attempts'] += 1
+        return claimed
+
+    def renew_lease(self, message: Dict[str, Any]) -> bool:
+        """
+        Prolonger le bail d'un message réservé, juste avant son envoi
+
+        `attempts`, incrémenté à chaque réservation, sert de jeton: si le bail a
+        expiré et qu'un autre dispatcher a repris le message, la mise à jour ne
+        touche aucune ligne et le message ne doit pas être envoyé une seconde fois.
+        """
+        conn = instrumented_connect(self.db_path)
+        try:
+            cursor = conn.execute('''
+                UPDATE whatsapp_outbox SET next_attempt_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'sending' AND attempts = ?
+            ''', (time.time() + self.lease_seconds, datetime.now().isoformat(), message['id'], message['attempts']))
+            renewed = cursor.rowcount > 0
+            conn.commit()
+        finally:
+            conn.close()
+        return renewed
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Délai avant la tentative suivante: exponentiel plafonné, avec gigue de 0 à 20 %"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        return delay * (1 + random.random() * 0.2)
+
+    def mark_sent(self, message_id: int, provider_message_id: str = None, transport: str = None) -> None:
+        timestamp = datetime.now().isoformat()
+        self._execute('''
+            UPDATE whatsapp_outbox
+            SET status = 'sent', provider_message_id = ?, transport = ?, last_error = NULL,
+                sent_at = ?, updated_at = ?
+            WHERE id = ?
+        ''', (provider_message_id, transport, timestamp, timestamp, message_id))
+
+    def mark_failed(self, message: Dict[str, Any], error: str, retryable: bool = True,
+                    transport: str = None) -> str:
+        """Enregistrer un échec; retourne le nouveau statut ('pending' si reprogrammé, sinon 'failed')"""
+        exhausted = message['attempts'] >= message.get('max_attempts', self.max_attempts)
+        status = 'pending' if retryable and not exhausted else 'failed'
+        next_attempt = time.time() + self.backoff_delay(message['attempts']) if status == 'pending' else time.time()
+        self._execute('''
+            UPDATE whatsapp_outbox
+            SET status = ?, last_error = ?, transport = ?, next_attempt_at = ?, updated_at = ?
+            WHERE id = ?
+        ''', (status, error[:500], transport, next_attempt, datetime.now().isoformat(), message['id']))
+        return status
+
+    def retry(self, message_id: int) -> bool:
+        """Remettre un message échoué en file (nouvelle série de tentatives)"""
+        conn = instrumented_connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                UPDATE OR IGNORE whatsapp_outbox
+                SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'failed'
+            ''', (time.time(), datetime.now().isoformat(), message_id))
+            retried = cursor.rowcount > 0
+            conn.commit()
+        finally:
+            conn.close()
+        if retried:
+            for callback in self._listeners:
+                callback()
+        return retried
+
+    def stats(self) -> Dict[str, int]:
+        """Nombre de messages par statut"""
+        conn = instrumented_connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT status, COUNT(*) FROM whatsapp_outbox GROUP BY status').fetchall()
+        finally:
+            conn.close()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def list_messages(self, status: str = None, client_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Derniers messages (suivi de livraison)"""
+        conditions, params = [], []
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if client_id:
+            conditions.append('client_id = ?')
+            params.append(client_id)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        conn = instrumented_connect(self.db_path)
+        try:
+            cursor = conn.execute(f'''
+                SELECT id, client_id, phone_number, message, status, attempts, max_attempts,
+                       last_error, transport, provider_message_id, created_at, updated_at, sent_at
+                FROM whatsapp_outbox {where_clause}
+                ORDER BY id DESC LIMIT ?
+            ''', params + [limit])
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def _execute(self, query: str, params: tuple) -> None:
+        conn = instrumented_connect(self.db_path)
+        try:
+            conn.execute(query, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class OutboxDispatcher:
+    """Thread qui vide l'outbox via un transport, au débit autorisé par le token bucket"""
+
+    def __init__(self, outbox: WhatsAppOutbox, transport: WhatsAppTransport,
+                 bucket: Optional[TokenBucket] = None, batch_size: int = 20,
+                 poll_interval: float = 5.0):
+        self.outbox = outbox
+        self.transport = transport
+        self.bucket = bucket or TokenBucket(rate=1.0, capacity=5)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.counters = {'sent': 0, 'failed': 0, 'retried': 0, 'lease_lost': 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        outbox.add_listener(self.wake)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Démarrer le thread (sans effet s'il tourne déjà)"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='whatsapp-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self) -> None:
+        """Réveiller le dispatcher (nouveau message) et le démarrer au premier besoin"""
+        self._wake.set()
+        if not self.is_running and not self._stop.is_set():
+            self.start()
+
+    def batch_lease_seconds(self) -> float:
+        """Bail d'un lot: attente du débit pour tout le lot, plus le bail d'un envoi"""
+        return self.batch_size / self.bucket.rate + self.outbox.lease_seconds
+
+    def run_once(self) -> int:
+        """Traiter un lot de messages dus; retourne le nombre de messages traités"""
+        batch = self.outbox.claim_batch(self.batch_size, lease_seconds=self.batch_lease_seconds())
+        for message in batch:
+            if not self.bucket.acquire(self._stop):
+                break
+            # Bail renouvelé par message: un transport lent n'expose pas la fin du lot
+            if not self.outbox.renew_lease(message):
+                self.counters['lease_lost'] += 1
+                print(f"⚠️ WhatsApp outbox #{message['id']}: bail repris par un autre dispatcher, envoi ignoré")
+                continue
+            self._deliver(message)
+        return len(batch)
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        try:
+            provider_id = self.transport.send(message['phone_number'], message['message'])
+        except TransportError as e:
+            status = self.outbox.mark_failed(message, str(e), retryable=e.retryable,
+                                             transport=self.transport.name)
+            self.counters['retried' if status == 'pending' else 'failed'] += 1
+            print(f"⚠️ WhatsApp outbox #{message['id']}: {e} ({status})")
+        except Exception as e:
+            status = self.outbox.mark_failed(message, f'{type(e).__name__}: {e}', retryable=True,
+                                             transport=self.transport.name)
+            self.counters['retried' if status == 'pending' else 'failed'] += 1
+            print(f"❌ WhatsApp outbox #{message['id']}: {e} ({status})")
+        else:
+            self.outbox.mark_sent(message['id'], provider_id, transport=self.transport.name)
+            self.counters['sent'] += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"❌ Erreur du dispatcher WhatsApp: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                self._wake.wait(self.poll_interval)
+
+
+def outbox_collector(dispatcher: 'OutboxDispatcher') -> Callable:
+    """Collecteur /metrics: messages par statut et compteurs du dispatcher"""
+    def collect():
+        stats = dispatcher.outbox.stats()
+        return [
+            ('tca_whatsapp_outbox_messages', 'gauge', 'Messages WhatsApp dans l\'outbox par statut',
+             [({'status': status}, count) for status, count in stats.items()]),
+            ('tca_whatsapp_dispatch_total', 'counter', 'Envois WhatsApp traités par le dispatcher',
+             [({'result': result}, count) for result, count in dispatcher.counters.items()]),
+        ]
+    return collect
+
+
+# Dispatcher de l'application (configuré par init_whatsapp_outbox)
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def get_outbox() -> Optional[WhatsAppOutbox]:
+    """Outbox active, ou None si l'application ne l'a pas configurée (scripts)"""
+    return _dispatcher.outbox if _dispatcher is not None else None
+
+
+def get_dispatcher() -> Optional[OutboxDispatcher]:
+    return _dispatcher
+
+
+def init_whatsapp_outbox(app, db_path_provider: Callable[[], str]) -> None:
+    """
+    Configurer l'outbox et son dispatcher pour l'application
+
+    Le dispatcher démarre au premier message ajouté (aucun thread ni accès à
+    la base au démarrage), ou immédiatement avec WHATSAPP_DISPATCHER_AUTOSTART
+    pour reprendre les messages laissés en attente par un processus précédent.
+    """
+    global _dispatcher
+    from utils.metrics import registry as metrics_registry
+
+    config = app.config
+    if not config.get('WHATSAPP_OUTBOX_ENABLED', True):
+        return
+    if _dispatcher is not None:
+        _dispatcher.stop(timeout=1.0)
+
+    class _LazyOutbox(WhatsAppOutbox):
+        # Le chemin de la base n'est résolu qu'au premier accès
+        @property
+        def db_path(self):
+            return db_path_provider()
+
+        @db_path.setter
+        def db_path(self, value):
+            pass
+
+    outbox = _LazyOutbox(None, max_attempts=int(config.get('WHATSAPP_MAX_ATTEMPTS', 5)),
+                         base_delay=float(config.get('WHATSAPP_RETRY_BASE_SECONDS', 5)))
+    bucket = TokenBucket(rate=float(config.get('WHATSAPP_RATE_PER_SECOND', 1.0)),
+                         capacity=float(config.get('WHATSAPP_RATE_BURST', 5)))
+    _dispatcher = OutboxDispatcher(outbox, create_transport(config), bucket=bucket)
+    metrics_registry.register_collector(outbox_collector(_dispatcher), name='whatsapp_outbox')
+
+    if config.get('WHATSAPP_DISPATCHER_AUTOSTART'):
+        _dispatcher.start()
@@ -4,12 +4,14 @@
 Service WhatsApp pour l'envoi de notifications automatiques
 """
 
-import requests
 import json
 import subprocess
 import webbrowser
 from typing import Optional, Dict, Any
 
+from services.message_templates import get_status_template
+from utils.phone_numbers import normalize_phone
+
 class WhatsAppService:
     """Service pour l'envoi de messages WhatsApp"""
     
@@ -140,39 +142,17 @@ class WhatsAppService:
     
     def _clean_phone_number(self, phone_number: str) -> Optional[str]:
         """
-        SOLUTION UNIVERSELLE: Nettoyer le numéro pour WhatsApp
-        Supporte tous les formats internationaux avec préfixe +
+        Nettoyer le numéro pour WhatsApp (format E.164, voir utils.phone_numbers)
         
         Args:
             phone_number: Numéro de téléphone brut
             
         Returns:
-            Numéro au format WhatsApp avec préfixe +
+            Numéro au format WhatsApp avec préfixe +, ou None s'il est inexploitable
         """
-        if not phone_number:
-            return None
-        
-        # Supprimer les espaces et caractères spéciaux sauf +
-        clean_number = phone_number.strip()
-        
-        # Supprimer TOUS les caractères non numériques sauf +
-        digits_only = ''.join(c for c in clean_number if c.isdigit() or c == '+')
-        
-        if not digits_only:
-            return None
-        
-        print(f"🔍 Nettoyage: {phone_number} → {digits_only}")
-        
-        # Si le numéro commence par +, le garder tel quel
-        if digits_only.startswith('+'):
-            final_number = digits_only
-            print(f"✅ Numéro avec préfixe +: {final_number}")
-            return final_number
-        
-        # Si pas de préfixe +, l'ajouter
-        final_number = '+' + digits_only
-        print(f"✅ Numéro avec préfixe + ajouté: {final_number}")
-        return final_number
+        final_number = normalize_phone(phone_number)
+        print(f"🔍 Nettoyage: {phone_number} → {final_number or 'invalide'}")
+        return final_number or None
     
     def get_visa_status_message(self, status: str, client_name: str) -> str:
         """
@@ -185,116 +165,9 @@ class WhatsAppService:
         Returns:
             Message formaté
         """
-        messages = {
-            'تم التقديم في السيستام': f"""
-🛂 *تحديث حالة التأشيرة*
-
-مرحباً {client_name}،
-
-تم تسجيل طلب التأشيرة الخاص بك في النظام بنجاح.
-
-📋 *الحالة الحالية:* تم التقديم في السيستام
-📅 *التاريخ:* {self._get_current_date()}
-
-سيتم متابعة طلبك وإعلامك بأي تحديثات.
-
-شكراً لثقتكم بنا.
-
----
-شركة تونس للاستشارات والخدمات
-📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
-            """,
-            
-            'تم التقديم إلى السفارة': f"""
-🛂 *تحديث حالة التأشيرة*
-
-مرحباً {client_name}،
-
-تم تقديم جواز سفرك إلى السفارة.
-
-📋 *الحالة الحالية:* تم التقديم إلى السفارة
-📅 *التاريخ:* {self._get_current_date()}
-
-سنقوم باعلامكم فورا استلام جوازكم.
-
-شكراً لصبركم.
-
----
-شركة تونس للاستشارات والخدمات
-📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
-            """,
-            
-            'تمت الموافقة على التأشيرة': f"""
-🎉 *تهانينا!*
-
-مرحباً {client_name}،
-
-🎊 *تمت الموافقة على طلب التأشيرة الخاص بك!*
-
-📋 *الحالة الحالية:* تمت الموافقة على التأشيرة
-📅 *التاريخ:* {self._get_current_date()}
-
-يمكنكم الآن تسليم جواز السفر اذا لم يكون متوفر لنا
-
-شكراً لثقتكم بنا.
-
----
-شركة تونس للاستشارات والخدمات
-📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
-            """,
-            
-            'التأشيرة غير موافق عليها': f"""
-😔 *تحديث حالة التأشيرة*
-
-مرحباً {client_name}،
-
-للأسف، لم يتم قبول طلب التأشيرة.
-
-📋 *الحالة الحالية:* التأشيرة غير موافق عليها
-📅 *التاريخ:* {self._get_current_date()}
-
-يمكنكم مراجعة الأسباب معنا أو إعادة التقديم.
-
-نحن هنا لمساعدتكم.
-
----
-شركة تونس للاستشارات والخدمات
-📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
-            """,
-            
-            'اكتملت العملية': f"""
-✅ *اكتملت العملية*
-
-مرحباً {client_name}،
-
-تم اصدار التاشيرة وسوف يتصل بك مندوب الشركة فورا وصول جواز سفركم للاستلام.
-
-📋 *الحالة الحالية:* اكتملت العملية
-📅 *التاريخ:* {self._get_current_date()}
-
-شكراً لثقتكم بنا.
-
----
-شركة تونس للاستشارات والخدمات
-📱 Facebook: https://www.facebook.com/share/1D4dHp2z74/?mibextid=wwXIfr
-            """
-        }
-        
-        return messages.get(status, f"""
-🛂 *تحديث حالة التأشيرة*
-
-مرحباً {client_name}،
-
-تم تحديث حالة التأشيرة الخاصة بك.
-
-📋 *الحالة الحالية:* {status}
-📅 *التاريخ:* {self._get_current_date()}
-
-شكراً لثقتكم بنا.
-
----
-شركة تونس للاستشارات والخدمات
-        """)
+        return get_status_template(status).render(
+            {'client_name': client_name, 'status': status, 'date': self._get_current_date()}
+        )
     
     def _get_current_date(self) -> str:
         """Obtenir la date actuelle formatée"""
@@ -340,5 +213,49 @@ class WhatsAppService:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def queue_visa_status_notifications(self, changes) -> int:
+        """
+        Mettre en file les notifications d'un lot de changements de statut
+
+        Les messages sont ajoutés à l'outbox en une transaction et envoyés par
+        son dispatcher. Sans outbox configurée (scripts hors application),
+        l'envoi se fait directement comme auparavant.
+
+        Args:
+            changes: Liste de (client, ancien statut, nouveau statut)
+
+        Returns:
+            Nombre de messages ajoutés (les doublons déjà en attente sont ignorés)
+        """
+        from services.whatsapp_outbox import get_outbox
+
+        outbox = get_outbox()
+        if outbox is None:
+            results = [self.send_visa_status_notification(client, old, new) for client, old, new in changes]
+            return sum(1 for result in results if result.get('success'))
+
+        messages = []
+        for client, old_status, new_status in changes:
+            phone_number = normalize_phone(client.get('whatsapp_number', ''))
+            if old_status == new_status or not phone_number:
+                continue
+            client_name = client.get('full_name', 'عميلنا العزيز')
+            messages.append({
+                'client_id': client.get('client_id'),
+                'phone_number': phone_number,
+                'message': self.get_visa_status_message(new_status, client_name),
+                # Le message contient l'heure: dédoublonner sur (client, statut)
+                'dedup_key': f"status:{client.get('client_id')}:{new_status}"
+            })
+
+        queued = sum(1 for message_id in outbox.enqueue_many(messages) if message_id is not None)
+        if queued:
+            print(f"📬 {queued} notification(s) WhatsApp en file d'attente")
+        return queued
+
+    def queue_visa_status_notification(self, client_data: Dict[str, Any], old_status: str, new_status: str) -> bool:
+        """Mettre en file la notification d'un changement de statut (True si ajoutée)"""
+        return self.queue_visa_status_notifications([(client_data, old_status, new_status)]) > 0
+
 # Instance globale du service
 whatsapp_service = WhatsAppService()
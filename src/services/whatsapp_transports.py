@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transports WhatsApp utilisés par le dispatcher de l'outbox
+
+- DesktopLinkTransport: comportement historique (ouverture de WhatsApp Web / Desktop
+  avec le message pré-rempli), utilisable uniquement sur un poste avec navigateur
+- HttpGatewayTransport: passerelle HTTP (API WhatsApp Business ou fournisseur tiers)
+- StubTransport: transport local en mémoire pour les tests et les benchmarks
+
+Un transport lève TransportError(retryable=True) pour une erreur temporaire
+(réseau, 429, 5xx): le message est alors reprogrammé avec un délai croissant.
+"""
+
+import os
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, List, Optional
+
+
+class TransportError(Exception):
+    """Échec d'envoi; retryable indique si une nouvelle tentative a un sens"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class WhatsAppTransport:
+    """Interface commune des transports"""
+
+    name = 'base'
+
+    def send(self, phone_number: str, message: str) -> Optional[str]:
+        """
+        Envoyer un message
+
+        Returns:
+            Identifiant du message chez le fournisseur (si disponible)
+
+        Raises:
+            TransportError: en cas d'échec
+        """
+        raise NotImplementedError
+
+
+class DesktopLinkTransport(WhatsAppTransport):
+    """Ouvrir WhatsApp Web (ou Desktop) avec le message pré-rempli sur le poste du serveur"""
+
+    name = 'desktop'
+
+    def send(self, phone_number: str, message: str) -> Optional[str]:
+        import webbrowser
+
+        # Sur un serveur sans affichage, webbrowser bloque ou échoue: inutile de réessayer
+        if os.name != 'nt' and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+            raise TransportError("Aucun affichage disponible pour ouvrir WhatsApp Web", retryable=False)
+
+        url = (f"https://web.whatsapp.com/send?phone={phone_number.lstrip('+')}"
+               f"&text={urllib.parse.quote(message)}")
+        try:
+            opened = webbrowser.open_new(url)
+        except Exception as e:
+            raise TransportError(f"Ouverture du navigateur impossible: {e}", retryable=False)
+        if not opened:
+            raise TransportError("Aucun navigateur disponible", retryable=False)
+        return None
+
+
+class HttpGatewayTransport(WhatsAppTransport):
+    """Envoi via une passerelle HTTP: POST JSON {to, message} avec jeton Bearer"""
+
+    name = 'http'
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0):
+        if not url:
+            raise ValueError("URL de la passerelle WhatsApp manquante (WHATSAPP_GATEWAY_URL)")
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self._session = None
+
+    def send(self, phone_number: str, message: str) -> Optional[str]:
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        try:
+            response = self._session.post(self.url, json={'to': phone_number, 'message': message},
+                                          headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise TransportError(f"Passerelle injoignable: {e}", retryable=True)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransportError(f"Passerelle indisponible (HTTP {response.status_code})", retryable=True)
+        if response.status_code >= 400:
+            raise TransportError(f"Message refusé (HTTP {response.status_code}): {response.text[:200]}",
+                                 retryable=False)
+
+        try:
+            payload = response.json()
+        except ValueError:
+            return None
+        return str(payload.get('message_id') or payload.get('id') or '') or None
+
+
+class StubTransport(WhatsAppTransport):
+    """Transport en mémoire: enregistre les messages, peut simuler des échecs et de la latence"""
+
+    name = 'stub'
+
+    def __init__(self, fail_first: int = 0, latency_ms: float = 0.0, retryable: bool = True):
+        self.sent: List[Dict[str, Any]] = []
+        self.fail_first = fail_first
+        self.latency_ms = latency_ms
+        self.retryable = retryable
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def send(self, phone_number: str, message: str) -> Optional[str]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.attempts += 1
+            if self.attempts <= self.fail_first:
+                raise TransportError("Échec simulé", retryable=self.retryable)
+            self.sent.append({'to': phone_number, 'message': message, 'at': time.time()})
+            return f'stub-{len(self.sent)}'
+
+
+def create_transport(config: Dict[str, Any]) -> WhatsAppTransport:
+    """Construire le transport choisi par WHATSAPP_TRANSPORT (desktop, http, stub)"""
+    name = (config.get('WHATSAPP_TRANSPORT') or 'desktop').lower()
+    if name == 'http':
+        return HttpGatewayTransport(config.get('WHATSAPP_GATEWAY_URL'),
+                                    token=config.get('WHATSAPP_GATEWAY_TOKEN'),
+                                    timeout=float(config.get('WHATSAPP_GATEWAY_TIMEOUT', 10)))
+    if name == 'stub':
+        return StubTransport()
+    if name == 'desktop':
+        return DesktopLinkTransport()
+    raise ValueError(f"Transport WhatsApp inconnu: {name}")
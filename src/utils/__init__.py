@@ -4,6 +4,12 @@
 Package des utilitaires pour le système de suivi des visas TCA
 """
 
-from .excel_handler import ExcelHandler
+__all__ = ['ExcelHandler']
 
-__all__ = ['ExcelHandler']
\ No newline at end of file
+
+def __getattr__(name):
+    # ExcelHandler importe pandas: chargement seulement à la première utilisation
+    if name == 'ExcelHandler':
+        from .excel_handler import ExcelHandler
+        return ExcelHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,9 +3,57 @@ import numpy as np
 from typing import Dict, List, Any, Optional
 import hashlib
 import json
+import time
 from datetime import datetime
 import os
 
+from .import_sources import normalize_import_columns, read_import_frame
+
+# Modes de profilage: 'full' (statistiques exactes) ou 'sample' (échantillon + distincts approximés)
+PROFILE_MODES = ('full', 'sample')
+SAMPLE_ROWS = 5000
+
+
+class HyperLogLog:
+    """
+    Nombre approximatif de valeurs distinctes (HyperLogLog)
+    
+    2^precision registres d'un octet (4 Ko par défaut), erreur type 1.04/√m
+    (1.6 % pour precision=12). Les valeurs sont hachées par pandas en bloc;
+    deux estimateurs se fusionnent (lots d'un import par morceaux).
+    """
+    
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def add_series(self, series: pd.Series) -> None:
+        """Ajouter les valeurs non nulles d'une colonne"""
+        values = series.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False, categorize=False).to_numpy(dtype=np.uint64)
+        precision = np.uint64(self.precision)
+        buckets = (hashes >> (np.uint64(64) - precision)).astype(np.intp)
+        # 32 bits suivant l'index du registre: rang = position du premier bit à 1
+        remainder = ((hashes << precision) >> np.uint64(32)).astype(np.float64)
+        with np.errstate(divide='ignore'):
+            ranks = np.where(remainder > 0, 32 - np.floor(np.log2(remainder)), 33).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+    
+    def merge(self, other: 'HyperLogLog') -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+    
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Petites cardinalités: comptage linéaire, plus précis
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
 
 class AdvancedExcelAnalyzer:
     """Analyseur avancé de fichiers Excel pour détecter les problèmes et optimiser l'import"""
@@ -14,38 +62,39 @@ class AdvancedExcelAnalyzer:
         self.analysis_results = {}
         self.errors = []
         self.warnings = []
+        # Calculs partagés entre les étapes de l'analyse en cours (voir _build_profile)
+        self._profile: Dict[str, Any] = {}
         
-    def analyze_file(self, file_path: str) -> Dict[str, Any]:
-        """Analyse complète d'un fichier Excel"""
+    def analyze_file(self, file_path: str, mode: str = 'full') -> Dict[str, Any]:
+        """Analyse complète d'un fichier d'import (Excel, CSV ou Parquet)"""
+        started = time.perf_counter()
         try:
-            # Charger le fichier Excel
-            df = pd.read_excel(file_path)
-            # Normaliser: supprimer colonnes 'Unnamed' et garder colonnes métiers/arabes si présentes
-            try:
-                df = df.loc[:, [col for col in df.columns if not (isinstance(col, str) and col.strip().lower().startswith('unnamed:'))]]
-                target_names = [
-                    'ملاحظة', 'ملاحضة',
-                    'اختيار الموظف مسؤول', 'اختيار الموظف', 'اختار الموظف',
-                    'الخلاصة',
-                    'من طرف',
-                    'حالة تتبع التأشيرة',
-                    'الجنسية',
-                    'حالة جواز السفر',
-                    'رقم جواز السفر',
-                    'تاريخ استلام للسفارة', 'تاريخ استلام المعملة',
-                    'تاريخ التقديم',
-                    'رقم الواتساب',
-                    'الاسم الكامل',
-                    'معرف العميل'
-                ]
-                def norm(s: str) -> str:
-                    return ' '.join(str(s).strip().split())
-                targets_norm = set(norm(n) for n in target_names)
-                keep_cols = [col for col in df.columns if norm(col) in targets_norm]
-                if keep_cols:
-                    df = df.loc[:, keep_cols]
-            except Exception:
-                pass
+            # Charger le fichier
+            df = read_import_frame(file_path)
+        except Exception as e:
+            return self._failure(file_path, e)
+        read_ms = round((time.perf_counter() - started) * 1000, 1)
+        
+        result = self.analyze_frame(df, file_path, mode=mode)
+        if result['success']:
+            result['timings']['read_ms'] = read_ms
+        return result
+    
+    def analyze_frame(self, df: pd.DataFrame, file_path: str, mode: str = 'full',
+                      sample_rows: int = SAMPLE_ROWS) -> Dict[str, Any]:
+        """
+        Analyser un DataFrame déjà chargé (partagé avec l'importeur: une seule lecture du fichier)
+        
+        Args:
+            mode: 'full' pour des statistiques exactes; 'sample' pour profiler un
+                  échantillon de `sample_rows` lignes (distincts estimés par
+                  HyperLogLog sur toute la colonne, valeurs nulles et doublons exacts)
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode}")
+        started = time.perf_counter()
+        try:
+            self._profile = self._build_profile(df, mode, sample_rows)
             
             # Analyse de base
             basic_analysis = self._analyze_basic_structure(df)
@@ -79,26 +128,81 @@ class AdvancedExcelAnalyzer:
                 'statistics': {
                     'total_rows': len(df),
                     'total_columns': len(df.columns),
-                    'data_density': ((df.size - df.isnull().sum().sum()) / df.size * 100),
-                    'memory_usage_mb': round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
+                    'data_density': ((df.size - self._profile['null_cells']) / df.size * 100) if df.size else 0,
+                    'memory_usage_mb': round(self._profile['memory'].sum() / (1024 * 1024), 2),
+                    'profile_mode': mode,
+                    'profiled_rows': len(self._profile['frame'])
                 },
                 'recommendations': self._generate_recommendations(df),
                 'errors': self.errors,
-                'warnings': self.warnings
+                'warnings': self.warnings,
+                'timings': {'analyze_ms': round((time.perf_counter() - started) * 1000, 1)}
             }
             
             return self.analysis_results
             
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'file_info': {
-                    'filename': os.path.basename(file_path),
-                    'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                    'analysis_date': datetime.now().isoformat()
-                }
+            return self._failure(file_path, e)
+        finally:
+            self._profile = {}
+    
+    @staticmethod
+    def _failure(file_path: str, error: Exception) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': str(error),
+            'file_info': {
+                'filename': os.path.basename(file_path),
+                'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
+                'analysis_date': datetime.now().isoformat()
             }
+        }
+    
+    def _build_profile(self, df: pd.DataFrame, mode: str, sample_rows: int) -> Dict[str, Any]:
+        """
+        Calculs communs à toutes les étapes, faits une seule fois
+        
+        Valeurs nulles, lignes complètes et doublons restent exacts (opérations
+        vectorisées). En mode 'sample', les statistiques par valeur (types,
+        fréquences, valeurs aberrantes, mémoire) portent sur un échantillon et
+        les distincts sont estimés par HyperLogLog.
+        """
+        sampled = mode == 'sample' and len(df) > sample_rows
+        frame = df.sample(n=sample_rows, random_state=0).sort_index() if sampled else df
+        null_mask = df.isnull()
+        null_counts = null_mask.sum()
+        
+        memory = frame.memory_usage(deep=True)
+        if sampled:
+            memory = (memory * (len(df) / len(frame))).round()
+        
+        unique_counts = {}
+        for col in df.columns:
+            if mode == 'sample':
+                estimator = HyperLogLog()
+                estimator.add_series(df[col])
+                # L'estimation ne peut dépasser le nombre de valeurs non nulles
+                unique_counts[col] = min(estimator.count(), int(len(df) - null_counts[col]))
+            else:
+                unique_counts[col] = df[col].nunique()
+        
+        type_counts = {}
+        for col in frame.columns:
+            col_data = frame[col].dropna()
+            type_counts[col] = col_data.map(type).nunique() if len(col_data) > 0 else 0
+        
+        return {
+            'frame': frame,
+            'sampled': sampled,
+            'null_counts': null_counts,
+            'null_cells': int(null_counts.sum()),
+            'complete_rows': int((~null_mask.any(axis=1)).sum()),
+            'memory': memory,
+            'unique_counts': unique_counts,
+            'approximate_unique': mode == 'sample',
+            'type_counts': type_counts,
+            'duplicated_rows': int(df.duplicated().sum())
+        }
     
     def _analyze_basic_structure(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyse la structure de base du DataFrame"""
@@ -115,21 +219,26 @@ class AdvancedExcelAnalyzer:
     def _analyze_columns(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyse détaillée des colonnes"""
         column_details = {}
+        profile = self._profile
         
         for col in df.columns:
-            col_data = df[col]
+            # Statistiques par valeur sur l'échantillon en mode 'sample'
+            col_data = profile['frame'][col]
+            null_count = int(profile['null_counts'][col])
+            unique_count = profile['unique_counts'][col]
             col_info = {
                 'name': col,
                 'dtype': str(col_data.dtype),
-                'null_count': col_data.isnull().sum(),
-                'non_null_count': col_data.notnull().sum(),
-                'null_percentage': round((col_data.isnull().sum() / len(df)) * 100, 2),
-                'unique_count': col_data.nunique(),
-                'unique_percentage': round((col_data.nunique() / len(df)) * 100, 2),
+                'null_count': null_count,
+                'non_null_count': len(df) - null_count,
+                'null_percentage': round((null_count / len(df)) * 100, 2),
+                'unique_count': unique_count,
+                'unique_count_approximate': profile['approximate_unique'],
+                'unique_percentage': round((unique_count / len(df)) * 100, 2),
                 'is_numeric': pd.api.types.is_numeric_dtype(col_data),
                 'is_datetime': pd.api.types.is_datetime64_any_dtype(col_data),
                 'is_string': pd.api.types.is_string_dtype(col_data),
-                'memory_usage': round(col_data.memory_usage(deep=True) / 1024, 2)  # KB
+                'memory_usage': round(profile['memory'][col] / 1024, 2)  # KB
             }
             
             # Analyse selon le type de données
@@ -190,23 +299,24 @@ class AdvancedExcelAnalyzer:
     def _analyze_data_quality(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyse de la qualité des données"""
         total_cells = df.size
-        null_cells = df.isnull().sum().sum()
+        null_cells = self._profile['null_cells']
+        complete_rows = self._profile['complete_rows']
         
         return {
             'null_cells': null_cells,
             'null_percentage': round((null_cells / total_cells) * 100, 2),
-            'complete_rows': df.dropna().shape[0],
-            'complete_rows_percentage': round((df.dropna().shape[0] / len(df)) * 100, 2),
+            'complete_rows': complete_rows,
+            'complete_rows_percentage': round((complete_rows / len(df)) * 100, 2),
             'data_consistency_score': self._calculate_consistency_score(df),
             'potential_issues': self._detect_data_issues(df)
         }
     
     def _analyze_duplicates(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyse des doublons"""
-        complete_duplicates = df.duplicated().sum()
+        complete_duplicates = self._profile['duplicated_rows']
         
         # Chercher des doublons partiels (basés sur les colonnes clés)
-        key_columns = [col for col in df.columns if any(keyword in col.lower() 
+        key_columns = [col for col in df.columns if any(keyword in str(col).lower() 
                       for keyword in ['id', 'name', 'client', 'phone', 'email'])]
         
         partial_duplicates = 0
@@ -224,7 +334,7 @@ class AdvancedExcelAnalyzer:
     
     def _analyze_memory_usage(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyse de l'utilisation mémoire"""
-        memory_usage = df.memory_usage(deep=True)
+        memory_usage = self._profile['memory']
         total_memory = memory_usage.sum()
         
         return {
@@ -247,15 +357,13 @@ class AdvancedExcelAnalyzer:
     def _calculate_consistency_score(self, df: pd.DataFrame) -> float:
         """Calcule un score de cohérence des données"""
         # Score basé sur le pourcentage de données non nulles et la cohérence des types
-        null_score = 100 - ((df.isnull().sum().sum() / df.size) * 100)
+        null_score = 100 - ((self._profile['null_cells'] / df.size) * 100)
         type_consistency = 0
         
-        # Vérifier la cohérence des types dans chaque colonne
+        # Vérifier la cohérence des types dans chaque colonne (types comptés une fois dans le profil)
         for col in df.columns:
-            col_data = df[col].dropna()
-            if len(col_data) > 0:
-                # Compter les types uniques
-                unique_types = col_data.apply(type).nunique()
+            unique_types = self._profile['type_counts'][col]
+            if unique_types > 0:
                 if unique_types == 1:
                     type_consistency += 100
                 else:
@@ -270,9 +378,7 @@ class AdvancedExcelAnalyzer:
         issues = []
         
         for col in df.columns:
-            col_data = df[col].dropna()
-            
-            if len(col_data) == 0:
+            if self._profile['null_counts'][col] == len(df):
                 issues.append({
                     'type': 'empty_column',
                     'column': col,
@@ -282,7 +388,7 @@ class AdvancedExcelAnalyzer:
                 continue
             
             # Vérifier les incohérences de type
-            unique_types = col_data.apply(type).nunique()
+            unique_types = self._profile['type_counts'][col]
             if unique_types > 1:
                 issues.append({
                     'type': 'type_inconsistency',
@@ -292,6 +398,7 @@ class AdvancedExcelAnalyzer:
                 })
             
             # Vérifier les valeurs extrêmes pour les colonnes numériques
+            col_data = self._profile['frame'][col].dropna()
             if pd.api.types.is_numeric_dtype(col_data):
                 outliers_count = self._count_outliers(col_data)
                 if outliers_count > len(col_data) * 0.1:  # Plus de 10% de valeurs aberrantes
@@ -333,17 +440,17 @@ class AdvancedExcelAnalyzer:
             recommendations.append("Fichier volumineux : envisagez un traitement par lots")
         
         # Recommandations basées sur les valeurs manquantes
-        null_percentage = (df.isnull().sum().sum() / df.size) * 100
+        null_percentage = (self._profile['null_cells'] / df.size) * 100
         if null_percentage > 30:
             recommendations.append("Beaucoup de valeurs manquantes : nettoyez les données avant l'import")
         
         # Recommandations basées sur les doublons
-        duplicates = df.duplicated().sum()
+        duplicates = self._profile['duplicated_rows']
         if duplicates > len(df) * 0.1:
             recommendations.append("Nombreux doublons : nettoyez les données avant l'import")
         
         # Recommandations basées sur la mémoire
-        memory_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+        memory_mb = self._profile['memory'].sum() / (1024 * 1024)
         if memory_mb > 100:
             recommendations.append("Utilisation mémoire élevée : surveillez les ressources système")
         
@@ -15,20 +15,29 @@ class CacheManager:
     def __init__(self):
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._default_ttl = 300  # 5 minutes par défaut
-        
+        # Compteurs pour le taux de succès exposé dans /metrics
+        self._hits = 0
+        self._misses = 0
+        # Version des données clients: incrémentée à chaque écriture,
+        # elle fait partie des clés des fragments de templates
+        self._data_version = 0
+
     def get(self, key: str) -> Optional[Any]:
         """Récupérer une valeur du cache"""
         if key not in self._cache:
+            self._misses += 1
             return None
-            
+
         cache_entry = self._cache[key]
-        
+
         # Vérifier si le cache a expiré
         if time.time() > cache_entry['expires_at']:
             del self._cache[key]
+            self._misses += 1
             return None
-            
+
         cache_entry['last_accessed'] = time.time()
+        self._hits += 1
         return cache_entry['data']
     
     def set(self, key: str, data: Any, ttl: Optional[int] = None) -> None:
@@ -79,13 +88,28 @@ class CacheManager:
             if current_time > entry['expires_at']:
                 expired_entries += 1
         
+        lookups = self._hits + self._misses
+
         return {
             'total_entries': total_entries,
             'active_entries': total_entries - expired_entries,
             'expired_entries': expired_entries,
-            'cache_keys': list(self._cache.keys())
+            'cache_keys': list(self._cache.keys()),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0
         }
     
+    @property
+    def data_version(self) -> int:
+        """Version courante des données clients"""
+        return self._data_version
+
+    def bump_data_version(self) -> int:
+        """Signaler une modification des données (les fragments existants deviennent obsolètes)"""
+        self._data_version += 1
+        return self._data_version
+
     def has_key(self, key: str) -> bool:
         """Vérifier si une clé existe et n'est pas expirée"""
         if key not in self._cache:
@@ -109,13 +133,11 @@ def cache_statistics(func):
         # Essayer de récupérer depuis le cache
         cached_result = cache_manager.get(cache_key)
         if cached_result is not None:
-            print(f"📊 Statistiques récupérées depuis le cache: {func.__name__}")
             return cached_result
         
         # Calculer et mettre en cache
         result = func(*args, **kwargs)
         cache_manager.set(cache_key, result, ttl=180)  # 3 minutes pour les stats
-        print(f"📊 Statistiques calculées et mises en cache: {func.__name__}")
         
         return result
     
@@ -130,29 +152,56 @@ def cache_client_data(func):
         # Essayer de récupérer depuis le cache
         cached_result = cache_manager.get(cache_key)
         if cached_result is not None:
-            print(f"👥 Données clients récupérées depuis le cache: {func.__name__}")
             return cached_result
         
         # Calculer et mettre en cache
         result = func(*args, **kwargs)
         cache_manager.set(cache_key, result, ttl=120)  # 2 minutes pour les données clients
-        print(f"👥 Données clients calculées et mises en cache: {func.__name__}")
         
         return result
     
     return wrapper
 
+# Entrées dérivées des données clients (fragments de templates et statistiques des API)
+CLIENT_DERIVED_PREFIXES = ('clients_', 'stats_', 'fragment_', 'dashboard_stats', 'chart_data')
+
 def invalidate_client_cache():
     """Invalider le cache des clients après une modification"""
+    cache_manager.bump_data_version()
     keys_to_delete = []
-    for key in cache_manager._cache.keys():
-        if key.startswith('clients_') or key.startswith('stats_'):
+    for key in list(cache_manager._cache.keys()):
+        if key.startswith(CLIENT_DERIVED_PREFIXES):
             keys_to_delete.append(key)
     
     for key in keys_to_delete:
         cache_manager.delete(key)
+
+# Abonnés aux modifications de clients (index de recherche en mémoire, ...)
+_client_change_listeners = []
+
+def register_client_change_listener(callback) -> None:
+    """Abonner `callback(client_ids)` aux écritures sur la table clients"""
+    if callback not in _client_change_listeners:
+        _client_change_listeners.append(callback)
+
+def notify_client_change(client_ids=None) -> None:
+    """
+    Signaler des clients ajoutés, modifiés ou supprimés (après validation)
+    
+    Invalide aussi les caches dérivés des clients: la fraîcheur des fragments et
+    du tableau de bord ne dépend pas de l'appelant de DatabaseManager.
     
-    print(f"🗑️ Cache invalidé: {len(keys_to_delete)} entrées supprimées")
+    Args:
+        client_ids: Identifiants concernés; None pour un changement global
+                    (import en masse, suppression de tous les clients)
+    """
+    invalidate_client_cache()
+    ids = None if client_ids is None else [cid for cid in client_ids if cid]
+    for callback in list(_client_change_listeners):
+        try:
+            callback(ids)
+        except Exception as e:
+            print(f"⚠️ Erreur d'un abonné aux modifications clients: {e}")
 
 def get_cache_info():
     """Obtenir les informations du cache pour le debugging"""
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Résolution des en-têtes d'un fichier d'import vers les champs clients
+
+Les en-têtes d'une feuille sont résolus une fois par fichier (et mis en cache
+par liste d'en-têtes): chaque en-tête est normalisé (minuscules, espaces et
+'_' unifiés, diacritiques arabes retirés, variantes d'alef/ya/ta marbuta et
+ض/ظ confondues, d'où « ملاحضة » = « ملاحظة »), cherché parmi les alias connus,
+puis rapproché par similarité (difflib) s'il n'est pas reconnu.
+
+Le résultat est un ColumnMapping positionnel (champ -> indice de colonne):
+l'extraction d'une ligne n'est qu'une lecture par indice, sans traitement de
+chaînes par ligne.
+"""
+
+import re
+import threading
+from difflib import get_close_matches
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Champ client -> en-têtes reconnus (le premier est l'en-tête du modèle d'import)
+FIELD_ALIASES = {
+    'client_id': ['معرف العميل', 'رقم العميل', 'معرف ال', 'client_id', 'id', 'code', 'code_client'],
+    'full_name': ['الاسم الكامل', 'الاسم', 'full_name', 'name', 'nom', 'nom_complet'],
+    'whatsapp_number': ['رقم الواتساب', 'واتساب', 'رقم الهاتف', 'الهاتف', 'whatsapp_number', 'phone',
+                        'telephone', 'tel', 'portable'],
+    'application_date': ['تاريخ التقديم', 'application_date', 'file_date', 'date_dossier', 'تاريخ الملف'],
+    'transaction_date': ['تاريخ استلام للسفارة', 'تاريخ استلام المعملة', 'تاريخ الاستلام', 'transaction_date',
+                         'reception_date', 'date_reception'],
+    'passport_number': ['رقم جواز السفر', 'رقم الجواز', 'جواز', 'passport_number', 'passeport'],
+    'passport_status': ['حالة جواز السفر', 'passport_status'],
+    'nationality': ['الجنسية', 'بلد', 'nationality', 'nationalite', 'pays'],
+    'visa_status': ['حالة تتبع التأشيرة', 'الحالة', 'visa_status', 'status', 'statut'],
+    'processed_by': ['من طرف', 'المعالج', 'processed_by', 'handled_by'],
+    'summary': ['الخلاصة', 'summary', 'resume'],
+    'notes': ['ملاحظة', 'ملاحظات', 'notes', 'remarques'],
+    'responsible_employee': ['اختيار الموظف', 'اختيار الموظف مسؤول', 'اختار الموظف', 'الموظف',
+                             'responsible_employee', 'employee', 'employe'],
+}
+CLIENT_FIELDS = tuple(FIELD_ALIASES)
+
+# Similarité minimale d'un en-tête inconnu avec un alias (difflib, 0 à 1)
+FUZZY_CUTOFF = 0.85
+# Listes d'en-têtes distinctes gardées en cache par résolveur
+MAX_CACHED_HEADERS = 64
+
+_ARABIC_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u0640]')  # diacritiques et tatweel
+_HEADER_FOLDING = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي',
+                                 'ؤ': 'و', 'ئ': 'ي', 'ض': 'ظ', '_': ' ', '-': ' '})
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_header(header: Any) -> str:
+    """Forme comparable d'un en-tête (casse, espaces, diacritiques et variantes arabes ignorés)"""
+    text = _ARABIC_MARKS.sub('', str(header).lower()).translate(_HEADER_FOLDING)
+    return _SPACES.sub(' ', text).strip()
+
+
+class ColumnMapping:
+    """Correspondance positionnelle champ -> colonne d'une feuille"""
+
+    __slots__ = ('headers', 'positions', 'matches', 'unmatched', '_items')
+
+    def __init__(self, headers: Sequence[Any], positions: Dict[str, int], matches: Dict[str, str]):
+        self.headers = tuple(headers)
+        self.positions = positions          # champ -> indice de colonne
+        self.matches = matches              # champ -> 'exact', 'variant' ou 'fuzzy'
+        used = set(positions.values())
+        self.unmatched = [(position, header) for position, header in enumerate(self.headers) if position not in used]
+        self._items = tuple(positions.items())
+
+    @classmethod
+    def positional(cls, headers: Sequence[Any], fields: Sequence[str]) -> 'ColumnMapping':
+        """Correspondance par ordre des colonnes (fichier sans en-têtes reconnus)"""
+        positions = {field: position for position, field in enumerate(fields[:len(headers)])}
+        return cls(headers, positions, {field: 'position' for field in positions})
+
+    def __bool__(self) -> bool:
+        return bool(self.positions)
+
+    def header(self, field: str) -> Optional[Any]:
+        """En-tête (libellé de colonne) associé au champ, None si absent du fichier"""
+        position = self.positions.get(field)
+        return None if position is None else self.headers[position]
+
+    def column_labels(self) -> Dict[str, Any]:
+        """Champ -> libellé de colonne (accès colonne par colonne à un DataFrame)"""
+        return {field: self.headers[position] for field, position in self._items}
+
+    def extract(self, row: Sequence[Any]) -> Dict[str, Any]:
+        """Valeurs brutes d'une ligne (tuple dans l'ordre des colonnes) par champ"""
+        return {field: row[position] for field, position in self._items}
+
+    def describe(self) -> Dict[str, Any]:
+        """Résumé lisible pour les rapports d'import"""
+        return {
+            'fields': {field: str(self.headers[position]) for field, position in self._items},
+            'matches': dict(self.matches),
+            'unmatched': [str(header) for _position, header in self.unmatched],
+        }
+
+
+class ColumnResolver:
+    """Résolveur d'en-têtes: index des alias normalisés précalculé, résultats en cache"""
+
+    def __init__(self, aliases: Dict[str, List[str]], fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.fields = tuple(aliases)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # Alias normalisé -> (champ, rang de l'alias dans sa liste); le premier champ déclaré l'emporte
+        self._exact: Dict[str, Tuple[str, int]] = {}
+        self._variants: Dict[str, Tuple[str, int]] = {}
+        for field, names in aliases.items():
+            for rank, name in enumerate(names):
+                self._exact.setdefault(' '.join(str(name).lower().split()), (field, rank))
+                self._variants.setdefault(normalize_header(name), (field, rank))
+        self._variant_keys = list(self._variants)
+        self._cache: Dict[Tuple[str, ...], ColumnMapping] = {}
+        self._lock = threading.Lock()
+
+    def _match(self, header: Any) -> Optional[Tuple[str, int, str]]:
+        exact = self._exact.get(' '.join(str(header).lower().split()))
+        if exact:
+            return exact[0], exact[1], 'exact'
+        key = normalize_header(header)
+        if not key or key.startswith('unnamed:'):
+            return None
+        variant = self._variants.get(key)
+        if variant:
+            return variant[0], variant[1], 'variant'
+        close = get_close_matches(key, self._variant_keys, n=1, cutoff=self.fuzzy_cutoff)
+        if close:
+            field, rank = self._variants[close[0]]
+            return field, rank, 'fuzzy'
+        return None
+
+    def resolve(self, headers: Iterable[Any]) -> ColumnMapping:
+        """
+        Résoudre les en-têtes d'une feuille
+
+        Un champ reconnu par plusieurs colonnes garde la meilleure: correspondance
+        exacte, puis variante, puis approchée; à égalité, l'alias le mieux classé
+        puis la colonne la plus à gauche.
+        """
+        headers = tuple(headers)
+        cache_key = tuple(str(header) for header in headers)
+        with self._lock:
+            mapping = self._cache.get(cache_key)
+        if mapping is not None:
+            return mapping
+
+        quality = {'exact': 0, 'variant': 1, 'fuzzy': 2}
+        best: Dict[str, Tuple[Tuple[int, int, int], int, str]] = {}
+        for position, header in enumerate(headers):
+            match = self._match(header)
+            if match is None:
+                continue
+            field, rank, how = match
+            score = (quality[how], rank, position)
+            if field not in best or score < best[field][0]:
+                best[field] = (score, position, how)
+
+        ordered = [field for field in self.fields if field in best]
+        mapping = ColumnMapping(headers, {field: best[field][1] for field in ordered},
+                                {field: best[field][2] for field in ordered})
+        with self._lock:
+            if len(self._cache) >= MAX_CACHED_HEADERS:
+                self._cache.clear()
+            self._cache[cache_key] = mapping
+        return mapping
+
+
+# Résolveur des champs clients (partagé par la lecture, l'analyse et les importeurs)
+client_column_resolver = ColumnResolver(FIELD_ALIASES)
+
+
+def resolve_columns(headers: Iterable[Any]) -> ColumnMapping:
+    """Résoudre des en-têtes vers les champs clients (voir ColumnResolver.resolve)"""
+    return client_column_resolver.resolve(headers)
@@ -5,58 +5,42 @@ Gestionnaire Excel pour le système de suivi des visas TCA
 """
 
 import pandas as pd
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime
 import os
 
+from models.client import ClientValidator
+from utils.column_resolver import CLIENT_FIELDS, resolve_columns
+from utils.import_sources import DEFAULT_CHUNK_ROWS, iter_import_frames, read_import_frame
+from utils.phone_numbers import normalize_phone_series
+from utils.value_normalizer import option_normalizer
+
 class ExcelHandler:
     """Gestionnaire pour les opérations Excel"""
     
+    # Valeur d'un champ dont la colonne est absente du fichier
+    FIELD_DEFAULTS = {'visa_status': 'التقديم'}
+    # Import brut (/import-excel-raw): champ -> (options reconnues, valeur par défaut)
+    RAW_IMPORT_OPTIONS = {
+        'passport_status': (('موجود', 'غير موجود'), 'غير موجود'),
+        'nationality': (('ليبي', 'تونسي', 'أخرى'), 'أخرى'),
+        'visa_status': (('التقديم', 'جواز في السفارة', 'استلام الجواز', 'تمت الموافقة على التأشيرة',
+                         'التأشيرة غير موافق عليها', 'اكتملت العملية'), 'التقديم'),
+        'responsible_employee': (('اميرة', 'محمد', 'سفيان', 'اميمة', 'ايلاف', 'انيس', 'وليد'), 'اميرة'),
+    }
+    
     def __init__(self):
         """Initialiser le gestionnaire Excel"""
         pass
     
     def read_excel_file(self, file_path: str) -> Optional[pd.DataFrame]:
-        """Lire un fichier Excel"""
+        """Lire un fichier d'import (Excel, CSV ou Parquet)"""
         try:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
             
-            # Lire le fichier Excel
-            df = pd.read_excel(file_path)
-            # Nettoyage colonnes: supprimer 'Unnamed:*' et garder uniquement les colonnes métiers demandées si présentes
-            try:
-                # Supprimer les colonnes Unnamed si présentes
-                df = df.loc[:, [col for col in df.columns if not (isinstance(col, str) and col.strip().lower().startswith('unnamed:'))]]
-                # Définir les colonnes à garder (avec variantes possibles)
-                target_names = [
-                    'ملاحظة', 'ملاحضة',
-                    'اختيار الموظف مسؤول', 'اختيار الموظف', 'اختار الموظف',
-                    'الخلاصة',
-                    'من طرف',
-                    'حالة تتبع التأشيرة',
-                    'الجنسية',
-                    'حالة جواز السفر',
-                    'رقم جواز السفر',
-                    'تاريخ استلام للسفارة', 'تاريخ استلام المعملة',
-                    'تاريخ التقديم',
-                    'رقم الواتساب',
-                    'الاسم الكامل',
-                    'معرف العميل'
-                ]
-                def norm(s: str) -> str:
-                    return ' '.join(str(s).strip().split())
-                targets_norm = set(norm(n) for n in target_names)
-                keep_cols = []
-                for col in df.columns:
-                    col_s = str(col)
-                    if norm(col_s) in targets_norm:
-                        keep_cols.append(col)
-                if keep_cols:
-                    df = df.loc[:, keep_cols]
-            except Exception:
-                pass
-            return df
+            # Colonnes 'Unnamed:*' supprimées, colonnes métiers conservées si présentes
+            return read_import_frame(file_path)
             
         except Exception as e:
             print(f"Erreur lors de la lecture du fichier Excel: {e}")
@@ -85,39 +69,91 @@ class ExcelHandler:
             return {}
     
     def extract_client_data(self, file_path: str) -> List[Dict[str, Any]]:
-        """Extraire les données clients d'un fichier Excel"""
+        """Extraire les données clients d'un fichier d'import"""
+        clients_data = []
+        for batch in self.iter_client_batches(file_path):
+            clients_data.extend(batch)
+        return clients_data
+    
+    def iter_client_batches(self, file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[Dict[str, Any]]]:
+        """Extraire les clients par lots (CSV et Parquet lus par morceaux)"""
         try:
-            df = self.read_excel_file(file_path)
-            if df is None:
-                return []
-            
-            clients_data = []
-            
-            for index, row in df.iterrows():
-                client_data = {
-                    'client_id': self._safe_str(row.get('معرف العميل', '')),
-                    'full_name': self._safe_str(row.get('الاسم الكامل', '')),
-                    'whatsapp_number': self._safe_str(row.get('رقم الواتساب', '')),
-                    'application_date': self._safe_str(row.get('تاريخ التقديم', '')),
-                    'transaction_date': self._safe_str(row.get('تاريخ استلام للسفارة', '')),
-                    'passport_number': self._safe_str(row.get('رقم جواز السفر', '')),
-                    'passport_status': self._safe_str(row.get('حالة جواز السفر', '')),
-                    'nationality': self._safe_str(row.get('الجنسية', '')),
-                    'visa_status': self._safe_str(row.get('حالة تتبع التأشيرة', 'التقديم')),
-                    'processed_by': self._safe_str(row.get('من طرف', '')),
-                    'summary': self._safe_str(row.get('الخلاصة', '')),
-                    'notes': self._safe_str(row.get('ملاحضة', '')),
-                    'responsible_employee': self._safe_str(row.get('اختيار الموظف', '')),
-                    'original_row_number': index + 1
-                }
-                
-                clients_data.append(client_data)
-            
-            return clients_data
-            
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
+            for df in iter_import_frames(file_path, chunk_rows):
+                yield self.clients_from_frame(df)
         except Exception as e:
             print(f"Erreur lors de l'extraction des données: {e}")
-            return []
+    
+    def clients_from_frame(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convertir un DataFrame d'import en clients (colonne par colonne, sans iterrows)"""
+        # En-têtes résolus une fois par fichier (mapping en cache d'un morceau à l'autre)
+        positions = resolve_columns(df.columns).positions
+        columns = {}
+        for field in CLIENT_FIELDS:
+            if field in positions:
+                columns[field] = [self._safe_str(value) for value in df.iloc[:, positions[field]].tolist()]
+            else:
+                default = self.FIELD_DEFAULTS.get(field, '')
+                columns[field] = [default] * len(df)
+        
+        # Numéros normalisés pour toute la colonne en une passe
+        if 'whatsapp_number' in positions:
+            columns['whatsapp_number_clean'] = normalize_phone_series(df.iloc[:, positions['whatsapp_number']]).tolist()
+        else:
+            columns['whatsapp_number_clean'] = [''] * len(df)
+        columns['original_row_number'] = [index + 1 for index in df.index]
+        ClientValidator.normalize_columns(columns)
+        
+        fields = list(columns)
+        return [dict(zip(fields, values)) for values in zip(*columns.values())]
+    
+    def import_clients_raw(self, file_path: str) -> Dict[str, Any]:
+        """
+        Lire un fichier pour l'import brut (toutes les colonnes, sans validation)
+        
+        Les colonnes à options sont normalisées en bloc (RAW_IMPORT_OPTIONS); les
+        colonnes non reconnues sont ajoutées aux notes ('colonne: valeur').
+        
+        Returns:
+            {'success', 'clients' (client_id vide si absent), 'total_rows', 'original_columns'}
+        """
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
+            df = read_import_frame(file_path, business_only=False)
+            mapping = resolve_columns(df.columns)
+            
+            columns = {}
+            for field in CLIENT_FIELDS:
+                if field in mapping.positions:
+                    columns[field] = [self._safe_str(value) for value in df.iloc[:, mapping.positions[field]].tolist()]
+                else:
+                    columns[field] = [''] * len(df)
+            for field, (options, default) in self.RAW_IMPORT_OPTIONS.items():
+                columns[field] = option_normalizer(options, default).normalize_column(columns[field])
+            columns['full_name'] = [name or 'غير محدد' for name in columns['full_name']]
+            
+            # Colonnes non reconnues conservées dans les notes
+            extras = [(str(header), [self._safe_str(value) for value in df.iloc[:, position].tolist()])
+                      for position, header in mapping.unmatched]
+            if extras:
+                notes = columns['notes']
+                for row, values in enumerate(zip(*(values for _header, values in extras))):
+                    extra = ' | '.join(f"{header}: {value}" for (header, _values), value in zip(extras, values) if value)
+                    if extra:
+                        notes[row] = f"{notes[row]} | {extra}" if notes[row] else extra
+            
+            fields = list(columns)
+            return {
+                'success': True,
+                'clients': [dict(zip(fields, values)) for values in zip(*columns.values())],
+                'total_rows': len(df),
+                'original_columns': [str(column) for column in df.columns],
+            }
+        except Exception as e:
+            print(f"Erreur lors de la lecture pour l'import brut: {e}")
+            return {'success': False, 'error': str(e)}
     
     def export_to_excel(self, data: List[Dict[str, Any]], output_path: str) -> bool:
         """Exporter des données vers Excel"""
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de fragments de templates Jinja pour les pages lourdes (liste des clients, tableau de bord)
+
+Usage dans un template:
+
+    {% cache 'clients_table', page, per_page, search_term %}
+        ... boucle sur les clients ...
+    {% endcache %}
+
+La clé d'un fragment combine son nom, la version des données clients
+(cache_manager.data_version, incrémentée par invalidate_client_cache, que
+notify_client_change appelle après chaque écriture de DatabaseManager) et les
+paramètres passés au tag. Une page inchangée est donc servie sans itérer sur
+les lignes; toute écriture rend les fragments existants obsolètes.
+
+Les fragments qui ne dépendent pas des données (listes d'options fixes)
+utilisent versioned=false pour survivre aux invalidations:
+
+    {% cache 'status_filter', status_filter, versioned=false %} ... {% endcache %}
+
+Une vue qui rend une page dégradée (données par défaut après une erreur)
+passe fragment_cache_bypass=True pour ne pas mettre ce rendu en cache.
+"""
+
+import hashlib
+from typing import Any, Callable, Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from utils.cache_manager import CacheManager, cache_manager
+
+
+class FragmentCache:
+    """Stockage des fragments rendus (et des valeurs associées) dans le cache_manager"""
+
+    def __init__(self, cache: CacheManager = cache_manager, ttl: int = 120,
+                 max_bytes: int = 4 * 1024 * 1024, enabled: bool = True):
+        self.cache = cache
+        self.ttl = ttl
+        # Les fragments plus gros (ex: per_page=all) ne sont pas conservés
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def configure(self, config: dict) -> None:
+        """Appliquer la configuration de l'application Flask"""
+        self.enabled = bool(config.get('FRAGMENT_CACHE_ENABLED', self.enabled))
+        self.ttl = int(config.get('FRAGMENT_CACHE_TTL', self.ttl))
+        self.max_bytes = int(config.get('FRAGMENT_CACHE_MAX_BYTES', self.max_bytes))
+
+    def make_key(self, name: str, keys: tuple, versioned: bool = True) -> str:
+        """Clé = (fragment, version des données, paramètres)"""
+        version = self.cache.data_version if versioned else 'static'
+        digest = hashlib.sha1(repr(keys).encode('utf-8')).hexdigest()[:16]
+        return f"fragment_{name}_{version}_{digest}"
+
+    def get_value(self, name: str, *keys: Any, versioned: bool = True) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return self.cache.get(self.make_key(name, keys, versioned))
+
+    def set_value(self, name: str, value: Any, *keys: Any, versioned: bool = True) -> None:
+        if self.enabled:
+            self.cache.set(self.make_key(name, keys, versioned), value, ttl=self.ttl)
+
+    def cached_value(self, name: str, producer: Callable[[], Any], *keys: Any,
+                     versioned: bool = True) -> Any:
+        """Valeur calculée une fois par version des données (ex: statistiques du tableau de bord)"""
+        value = self.get_value(name, *keys, versioned=versioned)
+        if value is None:
+            value = producer()
+            self.set_value(name, value, *keys, versioned=versioned)
+        return value
+
+    def render(self, name: str, keys: tuple, versioned: bool, caller: Callable[[], str]) -> str:
+        """Rendre un fragment ou le relire depuis le cache"""
+        if not self.enabled:
+            return caller()
+
+        key = self.make_key(name, keys, versioned)
+        html = self.cache.get(key)
+        if html is None:
+            html = caller()
+            if len(html) <= self.max_bytes:
+                self.cache.set(key, html, ttl=self.ttl)
+        return html
+
+
+# Instance globale (partage le cache_manager du reste de l'application)
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """Tag {% cache nom, clé1, clé2, ..., versioned=true %}...{% endcache %}"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=fragment_cache)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        versioned = nodes.Const(True)
+
+        while parser.stream.skip_if('comma'):
+            if parser.stream.current.type == 'name' and parser.stream.look().type == 'assign':
+                option = next(parser.stream)
+                if option.value != 'versioned':
+                    parser.fail(f"Option inconnue pour cache: {option.value}", option.lineno)
+                next(parser.stream)
+                versioned = parser.parse_expression()
+            else:
+                args.append(parser.parse_expression())
+
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render_fragment', [nodes.List(args), versioned, nodes.ContextReference()]),
+            [], [], body
+        ).set_lineno(lineno)
+
+    def _render_fragment(self, args: list, versioned: bool, context, caller: Callable[[], str]) -> str:
+        if context.get('fragment_cache_bypass'):
+            return caller()
+        name, keys = args[0], tuple(args[1:])
+        return self.environment.fragment_cache.render(name, keys, versioned, caller)
+
+
+def init_fragment_cache(app) -> None:
+    """Activer le tag {% cache %} dans les templates de l'application"""
+    fragment_cache.configure(app.config)
+    app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture des fichiers d'import clients: Excel, CSV et Parquet
+
+Les trois formats produisent les mêmes DataFrames (colonnes 'Unnamed'
+retirées, colonnes reconnues par column_resolver conservées si présentes). CSV et Parquet
+sont lus en texte, par morceaux: un gros fichier passe par lots jusqu'aux
+insertions sans être chargé en entier. openpyxl ne lit un classeur qu'en
+bloc; le DataFrame Excel est découpé ensuite. L'index des morceaux continue
+d'un morceau à l'autre (numéro de ligne dans le fichier).
+
+pandas n'est importé qu'à la lecture: app.py importe IMPORT_EXTENSIONS au démarrage.
+Le format Parquet utilise pyarrow (requirements.txt), moteur de pd.read_parquet.
+"""
+
+import os
+from typing import TYPE_CHECKING, Iterator
+
+from .column_resolver import resolve_columns
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+IMPORT_FORMATS = {'.xlsx': 'excel', '.xls': 'excel', '.csv': 'csv', '.parquet': 'parquet'}
+IMPORT_EXTENSIONS = tuple(IMPORT_FORMATS)
+DEFAULT_CHUNK_ROWS = 5000
+
+
+def normalize_import_columns(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Supprimer les colonnes 'Unnamed' et garder les colonnes métiers (résolues en champs clients) si présentes"""
+    try:
+        df = df.loc[:, [col for col in df.columns if not (isinstance(col, str) and col.strip().lower().startswith('unnamed:'))]]
+        mapping = resolve_columns(df.columns)
+        if mapping:
+            df = df.iloc[:, sorted(mapping.positions.values())]
+    except Exception:
+        pass
+    return df
+
+
+def import_format(file_path: str) -> str:
+    """
+    Format d'un fichier d'import d'après son extension
+
+    Raises:
+        ValueError: Extension non prise en charge
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"Format de fichier non pris en charge: {extension or file_path}")
+    return IMPORT_FORMATS[extension]
+
+
+def _read_csv(file_path: str, **kwargs):
+    import pandas as pd
+
+    # Tout en texte: pas d'inférence de types (numéros et identifiants intacts);
+    # seule une cellule vide est une valeur manquante ('None', 'NA' restent du texte)
+    return pd.read_csv(file_path, dtype=str, encoding='utf-8-sig', keep_default_na=False, na_values=[''],
+                       **kwargs)
+
+
+def read_import_frame(file_path: str, business_only: bool = True) -> 'pd.DataFrame':
+    """
+    Lire un fichier d'import en entier (analyse et import partagent ce DataFrame)
+
+    Args:
+        business_only: Ne garder que les colonnes reconnues (False: toutes sauf 'Unnamed')
+    """
+    import pandas as pd
+
+    file_format = import_format(file_path)
+    if file_format == 'csv':
+        df = _read_csv(file_path)
+    elif file_format == 'parquet':
+        df = pd.read_parquet(file_path)
+    else:
+        df = pd.read_excel(file_path)
+    if not business_only:
+        return df.loc[:, [col for col in df.columns if not str(col).strip().lower().startswith('unnamed:')]]
+    return normalize_import_columns(df)
+
+
+def iter_import_frames(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator['pd.DataFrame']:
+    """Lire un fichier d'import par morceaux de `chunk_rows` lignes"""
+    import pandas as pd
+
+    file_format = import_format(file_path)
+    if file_format == 'csv':
+        for chunk in _read_csv(file_path, chunksize=chunk_rows):
+            yield normalize_import_columns(chunk)
+        return
+
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:  # requirements.txt installe pyarrow; autre moteur (fastparquet): lecture en bloc
+            pq = None
+        if pq is not None:
+            offset = 0
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+                chunk = batch.to_pandas()
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield normalize_import_columns(chunk)
+            return
+
+    df = read_import_frame(file_path)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Outils d'initialisation différée pour le démarrage rapide de l'application
+
+- LazyObject: construit un service (contrôleur, gestionnaire) au premier usage
+- RouteRegistry: enregistre les routes au niveau du module puis les installe
+  sur l'application créée par la fabrique, en conservant les noms d'endpoint
+- LazySequence: liste de lignes chargée seulement si le template la parcourt
+"""
+
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class LazyObject:
+    """Proxy qui crée l'objet réel au premier accès à un attribut (thread-safe)"""
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get_instance(self) -> Any:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_instance(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get_instance(), name, value)
+
+    def __repr__(self) -> str:
+        if self._instance is None:
+            return f'<LazyObject non initialisé: {self._factory!r}>'
+        return repr(self._instance)
+
+
+class RouteRegistry:
+    """Routes, context processors et globals Jinja déclarés avant la création de l'application"""
+
+    def __init__(self):
+        self._routes: List[Tuple[str, Callable, dict]] = []
+        self._context_processors: List[Callable] = []
+        self._template_globals: List[Tuple[Callable, Optional[str]]] = []
+
+    def route(self, rule: str, **options: Any) -> Callable:
+        """Même signature que Flask.route"""
+        def decorator(view: Callable) -> Callable:
+            self._routes.append((rule, view, options))
+            return view
+        return decorator
+
+    def context_processor(self, func: Callable) -> Callable:
+        self._context_processors.append(func)
+        return func
+
+    def template_global(self, name: Optional[str] = None) -> Callable:
+        def decorator(func: Callable) -> Callable:
+            self._template_globals.append((func, name))
+            return func
+        return decorator
+
+    def init_app(self, app) -> None:
+        """Installer les routes sur l'application (endpoint = nom de la vue, comme @app.route)"""
+        for rule, view, options in self._routes:
+            options = dict(options)
+            endpoint = options.pop('endpoint', None)
+            app.add_url_rule(rule, endpoint, view, **options)
+        for func in self._context_processors:
+            app.context_processor(func)
+        for func, name in self._template_globals:
+            app.add_template_global(func, name)
+
+
+class LazySequence:
+    """Liste chargée au premier parcours (les fragments servis depuis le cache n'y touchent pas)"""
+
+    def __init__(self, loader: Callable[[], List[Any]]):
+        self._loader = loader
+        self._items: Optional[List[Any]] = None
+
+    def _load(self) -> List[Any]:
+        if self._items is None:
+            self._items = list(self._loader())
+        return self._items
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._items is not None
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __bool__(self) -> bool:
+        return bool(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
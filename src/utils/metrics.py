@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation des performances pour le système de suivi des visas TCA
+
+- Histogrammes de latence par route Flask
+- Chronométrage de chaque requête SQL via un curseur SQLite instrumenté
+- Journal des requêtes lentes au-delà d'un seuil configurable
+- Exposition au format texte Prometheus (endpoint /metrics, sur configuration et jeton)
+"""
+
+import hashlib
+import hmac
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+slow_query_logger = logging.getLogger('tca.slow_query')
+
+# Bornes (en secondes) adaptées à une application SQLite locale
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label_value(value: Any) -> str:
+    """Échapper une valeur de label selon le format Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Construire la partie {label="valeur",...} d'un échantillon"""
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    """Formater une valeur numérique pour Prometheus"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Compteur monotone avec labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Incrémenter le compteur"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """Lire la valeur courante"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        """Rendu au format texte Prometheus"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Histogramme cumulatif avec labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # clé de labels -> [compteurs par bucket, somme, nombre]
+        self._values: Dict[Tuple, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Enregistrer une observation"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = entry
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def get_count(self, **labels) -> int:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        entry = self._values.get(key)
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        """Rendu au format texte Prometheus (buckets cumulés)"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        for key, bucket_counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """Registre des métriques de l'application"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]] = []
+        # Collecteurs nommés: un nouvel enregistrement remplace le précédent
+        self._named_collectors: Dict[str, Callable] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, labelnames)
+        return self._metrics[name]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metrics[name]
+
+    def register_collector(self, collector: Callable, name: Optional[str] = None) -> None:
+        """
+        Enregistrer un collecteur évalué à chaque lecture de /metrics.
+
+        Le collecteur retourne des tuples (nom, type, aide, [(labels, valeur), ...]).
+        Avec `name`, il remplace le collecteur déjà enregistré sous ce nom (fermetures
+        recréées à chaque create_app).
+        """
+        if name is not None:
+            self._named_collectors[name] = collector
+        elif collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Générer l'exposition complète au format texte Prometheus"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        # Regrouper par famille: plusieurs collecteurs peuvent alimenter la même métrique
+        families: Dict[str, List[Any]] = {}
+        for collector in self._collectors + list(self._named_collectors.values()):
+            try:
+                collected = list(collector())
+            except Exception as e:
+                slow_query_logger.warning("Collecteur de métriques en échec: %s", e)
+                continue
+            for name, metric_type, documentation, samples in collected:
+                family = families.setdefault(name, [metric_type, documentation, []])
+                family[2].extend(samples)
+        for name, (metric_type, documentation, samples) in families.items():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                label_str = _format_labels(list(labels.keys()), list(labels.values()))
+                lines.append(f'{name}{label_str} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Remettre à zéro toutes les métriques (utile pour les benchmarks)"""
+        for metric in self._metrics.values():
+            metric.reset()
+
+
+# Registre global
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'tca_http_request_duration_seconds', 'Latence des requêtes HTTP par route',
+    ('method', 'route', 'status')
+)
+SQL_LATENCY = registry.histogram(
+    'tca_sql_query_duration_seconds', 'Durée d\'exécution des requêtes SQL', ('statement',)
+)
+SQL_ROWS = registry.counter(
+    'tca_sql_rows_returned_total', 'Nombre de lignes retournées par les requêtes SQL', ('statement',)
+)
+SQL_SLOW_QUERIES = registry.counter(
+    'tca_sql_slow_queries_total', 'Requêtes SQL au-delà du seuil de lenteur', ('statement',)
+)
+
+# Configuration du journal des requêtes lentes
+_settings = {
+    'slow_query_threshold': 0.2,  # secondes
+}
+_recent_slow_queries: deque = deque(maxlen=100)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# Listes IN de paramètres ou de littéraux: une seule empreinte quelle que soit leur longueur
+_IN_LIST_RE = re.compile(r"\bIN \(\s*(?:\?|-?\d+(?:\.\d+)?|'[^']*')(?:\s*,\s*(?:\?|-?\d+(?:\.\d+)?|'[^']*'))*\s*\)",
+                         re.IGNORECASE)
+# VALUES (?, ?), (?, ?), ... des insertions multi-lignes
+_REPEATED_TUPLE_RE = re.compile(r'(\((?:\?\s*,\s*)*\?\))(?:\s*,\s*\1)+')
+_STATEMENT_MAX_LENGTH = 120
+_STATEMENT_HEAD_LENGTH = 100
+
+METRICS_TOKEN_HEADER = 'X-Metrics-Token'
+
+
+def configure(slow_query_threshold_ms: Optional[float] = None) -> None:
+    """Configurer le seuil du journal des requêtes lentes (en millisecondes)"""
+    if slow_query_threshold_ms is not None:
+        _settings['slow_query_threshold'] = float(slow_query_threshold_ms) / 1000.0
+
+
+def get_slow_query_threshold_ms() -> float:
+    return _settings['slow_query_threshold'] * 1000.0
+
+
+def get_recent_slow_queries() -> List[Dict[str, Any]]:
+    """Dernières requêtes lentes (plus récentes en premier)"""
+    return list(reversed(_recent_slow_queries))
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(sql: str) -> str:
+    """
+    Empreinte compacte d'une requête SQL, utilisée comme label
+
+    Les listes IN (?, ?, ...) et les tuples VALUES répétés sont réduits à une
+    forme unique; au-delà de _STATEMENT_MAX_LENGTH caractères, le début de la
+    requête est suivi d'un condensé de la requête entière, pour que deux requêtes
+    de même projection mais de clauses WHERE différentes restent distinctes.
+    """
+    statement = _WHITESPACE_RE.sub(' ', sql).strip()
+    statement = _IN_LIST_RE.sub('IN (?…)', statement)
+    statement = _REPEATED_TUPLE_RE.sub(r'\1, …', statement)
+    if len(statement) > _STATEMENT_MAX_LENGTH:
+        digest = hashlib.sha1(statement.encode('utf-8')).hexdigest()[:10]
+        statement = f'{statement[:_STATEMENT_HEAD_LENGTH]}… #{digest}'
+    return statement
+
+
+def record_query(statement: str, duration: float, rows: int = 0) -> None:
+    """Enregistrer l'exécution d'une requête SQL (empreinte déjà normalisée)"""
+    SQL_LATENCY.observe(duration, statement=statement)
+    if rows:
+        SQL_ROWS.inc(rows, statement=statement)
+    if duration >= _settings['slow_query_threshold']:
+        SQL_SLOW_QUERIES.inc(statement=statement)
+        _recent_slow_queries.append({
+            'statement': statement,
+            'duration_ms': round(duration * 1000, 2),
+            'timestamp': time.time()
+        })
+        slow_query_logger.warning("Requête lente (%.1f ms): %s", duration * 1000, statement)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Curseur SQLite qui chronomètre chaque requête et compte les lignes retournées"""
+
+    _statement = ''
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._statement = normalize_statement(sql)
+            record_query(self._statement, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._statement = normalize_statement(sql)
+            record_query(self._statement, time.perf_counter() - start)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            SQL_ROWS.inc(1, statement=self._statement)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if rows:
+            SQL_ROWS.inc(len(rows), statement=self._statement)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if rows:
+            SQL_ROWS.inc(len(rows), statement=self._statement)
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connexion SQLite dont les curseurs sont instrumentés"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def instrumented_connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Équivalent de sqlite3.connect() retournant une connexion instrumentée"""
+    kwargs.setdefault('factory', InstrumentedConnection)
+    return sqlite3.connect(db_path, **kwargs)
+
+
+def cache_collector(name: str, cache_obj) -> Callable:
+    """Créer un collecteur exposant les statistiques de succès/échecs d'un cache"""
+    def collect():
+        stats = cache_obj.get_stats()
+        hits = stats.get('hits', 0)
+        misses = stats.get('misses', 0)
+        labels = {'cache': name}
+        return [
+            ('tca_cache_hits_total', 'counter', 'Lectures du cache réussies', [(labels, hits)]),
+            ('tca_cache_misses_total', 'counter', 'Lectures du cache manquées', [(labels, misses)]),
+            ('tca_cache_hit_ratio', 'gauge', 'Taux de succès du cache', [(labels, stats.get('hit_ratio', 0.0))]),
+            ('tca_cache_entries', 'gauge', 'Entrées actives dans le cache', [(labels, stats.get('active_entries', 0))]),
+        ]
+    return collect
+
+
+def _is_authorized(request, token: Optional[str]) -> bool:
+    """Vérifier le jeton d'accès aux métriques (X-Metrics-Token ou Authorization: Bearer)"""
+    if not token:
+        return False
+    provided = request.headers.get(METRICS_TOKEN_HEADER, '')
+    authorization = request.headers.get('Authorization', '')
+    if not provided and authorization.startswith('Bearer '):
+        provided = authorization[len('Bearer '):].strip()
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+def init_app_metrics(app, path: str = '/metrics') -> None:
+    """
+    Installer le middleware de chronométrage des routes et l'endpoint /metrics.
+
+    Les métriques sont toujours collectées; leur exposition (texte des requêtes SQL,
+    inventaire des routes) n'est installée que si METRICS_ENABLED, et exige
+    METRICS_TOKEN, comme le profilage.
+
+    Args:
+        app: Application Flask
+        path: Chemin de l'endpoint d'exposition
+    """
+    from flask import Response, g, jsonify, request
+
+    configure(slow_query_threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS'))
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request_latency(response):
+        start = getattr(g, '_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=request.method, route=route, status=str(response.status_code)
+            )
+        return response
+
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    token = app.config.get('METRICS_TOKEN')
+
+    def forbidden():
+        return Response('Métriques non autorisées\n', status=403, content_type='text/plain; charset=utf-8')
+
+    def metrics_endpoint():
+        if not _is_authorized(request, token):
+            return forbidden()
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def slow_queries_endpoint():
+        if not _is_authorized(request, token):
+            return forbidden()
+        return jsonify({
+            'threshold_ms': get_slow_query_threshold_ms(),
+            'queries': get_recent_slow_queries()
+        })
+
+    app.add_url_rule(path, 'metrics', metrics_endpoint)
+    app.add_url_rule(f'{path}/slow-queries', 'metrics_slow_queries', slow_queries_endpoint)
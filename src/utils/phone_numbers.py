@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalisation des numéros WhatsApp au format E.164 (+<indicatif><numéro>)
+
+Règles (identiques en version scalaire et vectorisée pandas):
+- indicatif présent (+, 00 ou 218/216 en tête avec la bonne longueur): conservé,
+  le 0 national éventuellement laissé après l'indicatif est retiré
+- 0 + 9 chiffres ou 9 chiffres: numéro libyen (+218)
+- 8 chiffres: numéro tunisien (+216)
+- 10 à 15 chiffres sans indicatif reconnu: indicatif supposé déjà présent
+- sinon (vide, 'nan', trop court): chaîne vide
+
+La colonne whatsapp_number_rev contient les chiffres du numéro normalisé à
+l'envers: la recherche par fin de numéro devient une recherche par préfixe,
+servie par un index (voir suffix_range).
+
+Exécution directe: rattrapage des colonnes normalisées d'une base existante
+    python src/utils/phone_numbers.py [--db visa_system.db] [--all]
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# (indicatif, longueur du numéro national sans le 0)
+COUNTRY_NUMBERING = (('218', 9), ('216', 8))
+LIBYA_CODE, TUNISIA_CODE = '218', '216'
+MIN_SUFFIX_DIGITS = 6
+
+_NON_DIGITS = re.compile(r'\D')
+_MISSING_VALUES = frozenset({'', 'nan', 'none', 'null'})
+_PHONE_QUERY = re.compile(r'^\+?[\d\s-]+$')
+
+
+def normalize_phone(raw: Any) -> str:
+    """Normaliser un numéro saisi ou importé ('' si inexploitable)"""
+    if raw is None:
+        return ''
+    text = str(raw).strip()
+    if text.lower() in _MISSING_VALUES:
+        return ''
+    # Nombres lus depuis Excel: 218912345678.0
+    if text.endswith('.0'):
+        text = text[:-2]
+
+    digits = _NON_DIGITS.sub('', text)
+    international = text.startswith('+') or digits.startswith('00')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    length = len(digits)
+
+    for code, national_length in COUNTRY_NUMBERING:
+        if digits.startswith(code):
+            if length == len(code) + national_length:
+                return '+' + digits
+            if length == len(code) + 1 + national_length and digits[len(code)] == '0':
+                return '+' + code + digits[len(code) + 1:]
+
+    if international:
+        return '+' + digits if 8 <= length <= 15 else ''
+    if length == 10 and digits[0] == '0':
+        return '+' + LIBYA_CODE + digits[1:]
+    if length == 9 and digits[0] != '0':
+        return '+' + LIBYA_CODE + digits
+    if length == 8 and digits[0] != '0':
+        return '+' + TUNISIA_CODE + digits
+    if 10 <= length <= 15 and digits[0] != '0':
+        return '+' + digits
+    return ''
+
+
+def normalize_phone_series(series):
+    """
+    Normaliser une colonne pandas entière (imports)
+
+    Les valeurs distinctes sont normalisées une seule fois puis redistribuées
+    par leurs codes (pd.factorize): les mêmes règles que normalize_phone, sans
+    boucle par ligne. Les opérations .str de pandas sur des objets Python sont
+    plus lentes que cette approche pour des colonnes de numéros.
+
+    Returns:
+        Série de chaînes ('' pour les numéros inexploitables), même index
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    normalized = np.array([normalize_phone(value) for value in uniques] + [''], dtype=object)
+    # Code -1 (valeur manquante) -> dernière case ('')
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+
+def reversed_digits(normalized: str) -> Optional[str]:
+    """Valeur de whatsapp_number_rev pour un numéro normalisé (None si vide)"""
+    digits = normalized.lstrip('+')
+    return digits[::-1] if digits else None
+
+
+def phone_columns(raw: Any) -> Tuple[str, Optional[str]]:
+    """(whatsapp_number_clean, whatsapp_number_rev) d'un numéro brut"""
+    normalized = normalize_phone(raw)
+    return normalized, reversed_digits(normalized)
+
+
+def phone_search_digits(term: str) -> Optional[str]:
+    """
+    Chiffres à rechercher en fin de numéro si le terme ressemble à un numéro
+
+    Un terme avec préfixe (+, 00 ou 0 national) est d'abord normalisé
+    (0912345678 trouve +218912345678); sinon les chiffres saisis (6 ou plus)
+    sont cherchés tels quels en fin de numéro.
+    """
+    text = (term or '').strip()
+    if not _PHONE_QUERY.match(text):
+        return None
+    digits = _NON_DIGITS.sub('', text)
+    if len(digits) < MIN_SUFFIX_DIGITS:
+        return None
+    if text.startswith('+') or digits.startswith('0'):
+        normalized = normalize_phone(text)
+        if normalized:
+            return normalized.lstrip('+')
+    return digits
+
+
+def suffix_range(digits: str) -> Tuple[str, str]:
+    """Bornes [bas, haut) sur whatsapp_number_rev pour les numéros finissant par `digits`"""
+    low = digits[::-1]
+    return low, low[:-1] + chr(ord(low[-1]) + 1)
+
+
+def backfill_phone_numbers(db_path: str, batch_size: int = 2000, only_missing: bool = True) -> Dict[str, int]:
+    """
+    Renseigner whatsapp_number_clean / whatsapp_number_rev pour les clients existants
+
+    Lots par pagination sur id, une transaction par lot.
+
+    Args:
+        only_missing: ne traiter que les lignes sans whatsapp_number_rev
+    """
+    from utils.metrics import instrumented_connect
+
+    stats = {'scanned': 0, 'updated': 0, 'invalid': 0}
+    condition = "AND whatsapp_number_rev IS NULL" if only_missing else ''
+    last_id = 0
+    conn = instrumented_connect(db_path)
+    try:
+        while True:
+            rows = conn.execute(f'''
+                SELECT id, whatsapp_number, whatsapp_number_clean, whatsapp_number_rev FROM clients
+                WHERE id > ? {condition} ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, raw, clean, rev in rows:
+                stats['scanned'] += 1
+                new_clean, new_rev = phone_columns(raw)
+                if not new_clean:
+                    stats['invalid'] += 1
+                if (new_clean, new_rev) != ((clean or ''), rev):
+                    updates.append((new_clean, new_rev, row_id))
+            if updates:
+                conn.executemany('UPDATE clients SET whatsapp_number_clean = ?, whatsapp_number_rev = ? WHERE id = ?',
+                                 updates)
+                conn.commit()
+                stats['updated'] += len(updates)
+    finally:
+        conn.close()
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from database.database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description='Normaliser les numéros WhatsApp existants (E.164)')
+    parser.add_argument('--db', default=None, help='Base SQLite (défaut: base de l\'application)')
+    parser.add_argument('--all', action='store_true', help='Recalculer aussi les lignes déjà normalisées')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    # DatabaseManager ajoute les colonnes et index manquants
+    db_path = DatabaseManager(args.db).db_path
+    result = backfill_phone_numbers(db_path, batch_size=args.batch_size, only_missing=not args.all)
+    print(f"📱 {result['scanned']} numéro(s) analysé(s), {result['updated']} mis à jour, "
+          f"{result['invalid']} inexploitable(s)")
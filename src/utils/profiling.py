@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profilage à la demande pour le système de suivi des visas TCA
+
+- ?__profile=1 : retourne les statistiques cProfile de la requête (réservé à l'administrateur)
+- Profileur par échantillonnage optionnel qui écrit des piles « collapsed »
+  (format flamegraph) dans un fichier local, un fichier par worker
+
+Rien n'est installé quand la configuration est désactivée: aucun coût en production.
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILE_PARAM = '__profile'
+TOKEN_HEADER = 'X-Profile-Token'
+TOKEN_PARAM = '__token'
+
+_SORT_KEYS = {'cumulative', 'tottime', 'calls', 'ncalls', 'time', 'filename', 'name'}
+
+
+class SamplingProfiler:
+    """Profileur par échantillonnage des threads du processus"""
+
+    def __init__(self, output_path: str, interval: float = 0.01, dump_interval: float = 60.0):
+        """
+        Args:
+            output_path: Fichier de sortie ({pid} est remplacé par le PID du worker)
+            interval: Période d'échantillonnage en secondes
+            dump_interval: Période d'écriture du fichier en secondes
+        """
+        self.output_path = output_path
+        self.interval = interval
+        self.dump_interval = dump_interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def resolved_output_path(self) -> str:
+        return self.output_path.replace('{pid}', str(os.getpid()))
+
+    def start(self) -> None:
+        """Démarrer le thread d'échantillonnage"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tca-sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Arrêter l'échantillonnage et écrire les dernières piles"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.dump()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        next_dump = time.monotonic() + self.dump_interval
+        while not self._stop.wait(self.interval):
+            self.sample(exclude_ident=own_ident)
+            if time.monotonic() >= next_dump:
+                self.dump()
+                next_dump = time.monotonic() + self.dump_interval
+
+    def sample(self, exclude_ident: Optional[int] = None) -> None:
+        """Capturer la pile courante de chaque thread"""
+        frames = sys._current_frames()
+        collapsed = []
+        for ident, frame in frames.items():
+            if ident == exclude_ident:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            collapsed.append(';'.join(reversed(parts)))
+        with self._lock:
+            self.stacks.update(collapsed)
+            self.samples += 1
+
+    def dump(self) -> Optional[str]:
+        """Écrire les piles agrégées au format « pile nombre » (flamegraph.pl, speedscope)"""
+        with self._lock:
+            lines = [f'{stack} {count}' for stack, count in self.stacks.most_common()]
+        if not lines:
+            return None
+        path = self.resolved_output_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+        return path
+
+
+sampling_profiler: Optional[SamplingProfiler] = None
+
+
+def _is_authorized(request, token: Optional[str]) -> bool:
+    """Vérifier le jeton administrateur (en-tête ou paramètre)"""
+    if not token:
+        return False
+    provided = request.headers.get(TOKEN_HEADER) or request.args.get(TOKEN_PARAM) or ''
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+def init_profiling(app) -> None:
+    """
+    Installer les outils de profilage selon la configuration de l'application.
+
+    Configuration:
+        PROFILING_ENABLED: active ?__profile=1 (exige PROFILING_TOKEN)
+        PROFILING_TOKEN: jeton administrateur attendu dans X-Profile-Token ou __token
+        SAMPLING_PROFILER_ENABLED: démarre le profileur par échantillonnage
+        SAMPLING_PROFILER_INTERVAL_MS, SAMPLING_PROFILER_DUMP_SECONDS, SAMPLING_PROFILER_OUTPUT
+    """
+    global sampling_profiler
+
+    if app.config.get('SAMPLING_PROFILER_ENABLED'):
+        sampling_profiler = SamplingProfiler(
+            output_path=app.config.get('SAMPLING_PROFILER_OUTPUT', 'profiles/stacks-{pid}.collapsed'),
+            interval=float(app.config.get('SAMPLING_PROFILER_INTERVAL_MS', 10)) / 1000.0,
+            dump_interval=float(app.config.get('SAMPLING_PROFILER_DUMP_SECONDS', 60))
+        )
+        sampling_profiler.start()
+
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    from flask import Response, g, request
+
+    token = app.config.get('PROFILING_TOKEN')
+    # Un seul profileur cProfile peut être actif à la fois dans le processus
+    profile_lock = threading.Lock()
+
+    @app.before_request
+    def _start_request_profile():
+        if request.args.get(PROFILE_PARAM) != '1':
+            return None
+        if not _is_authorized(request, token):
+            return Response('Profilage non autorisé\n', status=403, content_type='text/plain; charset=utf-8')
+        if not profile_lock.acquire(blocking=False):
+            return Response('Un profilage est déjà en cours\n', status=429, content_type='text/plain; charset=utf-8')
+        g._profiler = cProfile.Profile()
+        g._profiler_started = time.perf_counter()
+        g._profiler.enable()
+        return None
+
+    @app.after_request
+    def _finish_request_profile(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop('_profiler_started')) * 1000
+        profile_lock.release()
+
+        sort_key = request.args.get('__profile_sort', 'cumulative')
+        if sort_key not in _SORT_KEYS:
+            sort_key = 'cumulative'
+        try:
+            limit = max(1, int(request.args.get('__profile_limit', 60)))
+        except ValueError:
+            limit = 60
+
+        output = io.StringIO()
+        output.write(f'{request.method} {request.full_path} -> {response.status_code} en {elapsed_ms:.1f} ms\n\n')
+        stats = pstats.Stats(profiler, stream=output)
+        stats.strip_dirs().sort_stats(sort_key).print_stats(limit)
+        return Response(output.getvalue(), status=200, content_type='text/plain; charset=utf-8')
+
+    @app.teardown_request
+    def _release_profile_lock(exc):
+        # Si la vue a levé une exception, after_request n'a pas été appelé
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profile_lock.release()
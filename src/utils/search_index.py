@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index de recherche instantanée en mémoire (autocomplétion de /api/search-instant)
+
+Chaque client est représenté par une chaîne normalisée (identifiant, nom sans
+diacritiques ni variantes d'alef, numéro saisi, numéro E.164, passeport). Les
+trigrammes de ces chaînes pointent vers des listes compactes de positions
+(array('I')); une requête lit la liste la plus courte de ses trigrammes puis
+vérifie la sous-chaîne, sans accès à la base. Un terme numérique suit la
+règle de la recherche SQL (DatabaseManager._search_condition): correspondances
+ancrées (fin de numéro, début d'identifiant ou de passeport) s'il y en a,
+sous-chaîne sinon.
+
+Mise à jour: DatabaseManager signale les clients modifiés (notify_client_change);
+ils sont relus en une requête groupée à la recherche suivante. Un changement
+global (import, suppression totale) déclenche une reconstruction en arrière-plan,
+pendant laquelle la recherche repasse par SQLite.
+"""
+
+import heapq
+import re
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.phone_numbers import phone_search_digits
+
+FIELD_SEPARATOR = '\x1f'
+HAYSTACK_SEPARATOR = '\x00'
+
+_ARABIC_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u0640]')  # diacritiques et tatweel
+_ARABIC_FOLDING = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي',
+                                 'ؤ': 'و', 'ئ': 'ي'})
+_SPACES = re.compile(r'\s+')
+_LEADING_DIGITS = re.compile(r'\d+')
+_NO_CLIENT_ID = -(1 << 62)
+
+
+def normalize_text(value: Any) -> str:
+    """Minuscules, sans diacritiques arabes ni tatweel, variantes d'alef/ya/ta marbuta unifiées"""
+    if not value:
+        return ''
+    text = _ARABIC_MARKS.sub('', str(value).lower()).translate(_ARABIC_FOLDING)
+    return _SPACES.sub(' ', text).strip()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)} - {''}
+
+
+def _anchored_match(haystack: str, term: str, digits: str) -> bool:
+    """
+    Correspondance ancrée d'un terme numérique (même règle que DatabaseManager._search_condition):
+    fin du numéro E.164, début de client_id (avec ou sans CLI) ou du passeport
+    """
+    client_id, _name, _phone, phone_clean, passport = haystack.split(HAYSTACK_SEPARATOR)
+    return (phone_clean.endswith(digits) or client_id.startswith(term) or client_id.startswith('cli' + term)
+            or passport.startswith(term))
+
+
+def _order_key(client_id: str) -> int:
+    """Même ordre que SQL: identifiants vides en dernier, puis numéro de CLIxxxx décroissant"""
+    if not client_id:
+        return _NO_CLIENT_ID
+    match = _LEADING_DIGITS.match(client_id[3:])
+    return int(match.group()) if match else 0
+
+
+class _IndexData:
+    """Structures d'un index construit (remplacées en bloc lors d'une reconstruction)"""
+
+    __slots__ = ('records', 'haystacks', 'order', 'status_codes', 'nationality_codes',
+                 'labels', 'label_codes', 'slots', 'postings', 'dead')
+
+    def __init__(self):
+        self.records: List[Optional[str]] = []      # client_id, nom, numéro, passeport
+        self.haystacks: List[Optional[str]] = []    # texte normalisé (None: position supprimée)
+        self.order = array('q')
+        self.status_codes = array('H')
+        self.nationality_codes = array('H')
+        self.labels: List[str] = []                 # statuts et nationalités (peu de valeurs distinctes)
+        self.label_codes: Dict[str, int] = {}
+        self.slots: Dict[str, int] = {}             # client_id -> position active
+        self.postings: Dict[str, array] = {}
+        self.dead = 0
+
+    def _label(self, value: str) -> int:
+        code = self.label_codes.get(value)
+        if code is None:
+            code = self.label_codes[value] = len(self.labels)
+            self.labels.append(value)
+        return code
+
+    def add(self, row: tuple) -> None:
+        client_id, full_name, phone, phone_clean, status, nationality, passport = \
+            ('' if value is None else str(value) for value in row)
+        slot = len(self.haystacks)
+        if client_id:
+            self.remove(client_id)
+            self.slots[client_id] = slot
+
+        haystack = HAYSTACK_SEPARATOR.join((client_id.lower(), normalize_text(full_name), phone.lower(),
+                                            phone_clean, passport.lower()))
+        self.records.append(FIELD_SEPARATOR.join((client_id, full_name, phone, passport)))
+        self.haystacks.append(haystack)
+        self.order.append(_order_key(client_id))
+        self.status_codes.append(self._label(status))
+        self.nationality_codes.append(self._label(nationality))
+
+        postings = self.postings
+        for gram in _trigrams(haystack):
+            if HAYSTACK_SEPARATOR in gram:
+                continue
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(slot)
+
+    def remove(self, client_id: str) -> None:
+        slot = self.slots.pop(client_id, None)
+        if slot is not None:
+            # Les listes de trigrammes gardent la position; la vérification l'écarte
+            self.haystacks[slot] = None
+            self.records[slot] = None
+            self.dead += 1
+
+    def result(self, slot: int) -> Dict[str, Any]:
+        client_id, full_name, phone, passport = self.records[slot].split(FIELD_SEPARATOR)
+        return {
+            'client_id': client_id,
+            'full_name': full_name,
+            'whatsapp_number': phone,
+            'visa_status': self.labels[self.status_codes[slot]],
+            'nationality': self.labels[self.nationality_codes[slot]],
+            'passport_number': passport,
+        }
+
+
+class ClientSearchIndex:
+    """Index de recherche des clients, résident en mémoire et mis à jour au fil des écritures"""
+
+    # Au-delà, une reconstruction complète coûte moins que la relecture client par client
+    MAX_PENDING = 5000
+    # Proportion de positions supprimées qui déclenche un compactage (reconstruction)
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._data: Optional[_IndexData] = None
+        self._pending: set = set()
+        # Incrémentée à chaque changement global: une construction commencée avant est périmée
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._build_thread: Optional[threading.Thread] = None
+        self.stats = {'builds': 0, 'build_seconds': 0.0, 'queries': 0, 'refreshed': 0}
+
+    @property
+    def is_ready(self) -> bool:
+        return self._data is not None
+
+    def build(self) -> None:
+        """
+        Construire l'index complet (sans bloquer les recherches, qui passent par SQL entre-temps)
+
+        Les lignes sont lues hors verrou; si un changement global (import,
+        suppression totale) survient pendant la lecture, l'instantané est écarté
+        et la lecture recommence.
+        """
+        started = time.perf_counter()
+        while True:
+            with self._lock:
+                generation = self._generation
+            data = _IndexData()
+            for rows in self.db_manager.iter_search_index_rows():
+                for row in rows:
+                    data.add(row)
+            with self._lock:
+                if self._generation == generation:
+                    self._data = data
+                    # Les écritures ciblées signalées pendant la construction sont relues à la prochaine recherche
+                    break
+        elapsed = time.perf_counter() - started
+        self.stats['builds'] += 1
+        self.stats['build_seconds'] = round(elapsed, 3)
+        print(f"🔎 Index de recherche: {len(data.slots)} clients en {elapsed:.2f}s")
+
+    def ensure_built(self) -> None:
+        """Lancer la construction en arrière-plan si l'index n'est pas prêt"""
+        with self._lock:
+            if self._data is not None or (self._build_thread and self._build_thread.is_alive()):
+                return
+            self._build_thread = threading.Thread(target=self._build_safely, name='search-index', daemon=True)
+            self._build_thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Attendre la fin d'une construction en cours (benchmarks, scripts)"""
+        thread = self._build_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.is_ready
+
+    def _build_safely(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            print(f"❌ Construction de l'index de recherche impossible: {e}")
+
+    def on_client_change(self, client_ids: Optional[List[str]]) -> None:
+        """Abonné de notify_client_change: mémoriser les clients à relire"""
+        with self._lock:
+            if client_ids is None or len(self._pending) + len(client_ids) > self.MAX_PENDING:
+                self._data = None
+                self._pending.clear()
+                self._generation += 1
+            else:
+                self._pending.update(client_ids)
+        if self._data is None:
+            self.ensure_built()
+
+    def _refresh_pending(self) -> None:
+        with self._lock:
+            if not self._pending or self._data is None:
+                return
+            client_ids = list(self._pending)
+            self._pending.clear()
+            data = self._data
+            found = set()
+            for rows in self.db_manager.iter_search_index_rows(client_ids):
+                for row in rows:
+                    data.add(row)
+                    found.add(row[0])
+            for client_id in client_ids:
+                if client_id not in found:
+                    data.remove(client_id)
+            self.stats['refreshed'] += len(client_ids)
+            if data.dead > self.COMPACT_RATIO * max(1, len(data.haystacks)):
+                self._data = None
+        if self._data is None:
+            self.ensure_built()
+
+    def search(self, term: str, limit: int = 20) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Rechercher un terme dans les identifiants, noms, numéros et passeports
+
+        Returns:
+            (meilleurs résultats triés comme la recherche SQL, nombre total), ou
+            None si l'index n'est pas prêt (l'appelant interroge alors SQLite)
+        """
+        self._refresh_pending()
+        with self._lock:
+            data = self._data
+            if data is None:
+                self.ensure_built()
+                return None
+
+            needles = {normalize_text(term)}
+            phone_digits = phone_search_digits(term)
+            if phone_digits:
+                needles.add(phone_digits)
+
+            matched = set()
+            haystacks = data.haystacks
+            for needle in needles:
+                if len(needle) < 2:
+                    continue
+                if len(needle) < 3:
+                    candidates: Iterable[int] = range(len(haystacks))
+                else:
+                    postings = [data.postings.get(gram) for gram in _trigrams(needle)]
+                    if any(posting is None for posting in postings):
+                        continue
+                    candidates = min(postings, key=len)
+                for slot in candidates:
+                    haystack = haystacks[slot]
+                    if haystack is not None and needle in haystack:
+                        matched.add(slot)
+
+            if phone_digits:
+                # Terme numérique: les correspondances ancrées seules, s'il y en a (comme la recherche SQL)
+                term_key = term.strip().lower()
+                anchored = {slot for slot in matched if _anchored_match(haystacks[slot], term_key, phone_digits)}
+                if anchored:
+                    matched = anchored
+
+            top = heapq.nlargest(limit, matched, key=data.order.__getitem__)
+            self.stats['queries'] += 1
+            return [data.result(slot) for slot in top], len(matched)
+
+    def describe(self) -> Dict[str, Any]:
+        """Taille de l'index (entrées, trigrammes, mémoire approximative en octets)"""
+        with self._lock:
+            data = self._data
+            if data is None:
+                return {'ready': False}
+            strings = sum(sys.getsizeof(s) for s in data.records if s is not None) + \
+                sum(sys.getsizeof(s) for s in data.haystacks if s is not None)
+            postings = sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in data.postings.items()) + \
+                sys.getsizeof(data.postings)
+            slots = sys.getsizeof(data.slots) + sum(sys.getsizeof(key) for key in data.slots)
+            arrays = sum(sys.getsizeof(a) for a in (data.records, data.haystacks, data.order,
+                                                    data.status_codes, data.nationality_codes))
+            return {
+                'ready': True,
+                'clients': len(data.slots),
+                'dead_slots': data.dead,
+                'trigrams': len(data.postings),
+                'postings': sum(len(value) for value in data.postings.values()),
+                'approx_bytes': strings + postings + slots + arrays,
+            }
+
+
+# Index de l'application (configuré par init_search_index)
+client_search_index: Optional[ClientSearchIndex] = None
+
+
+def search_index_collector():
+    """Collecteur /metrics de l'index de recherche"""
+    index = client_search_index
+    if index is None:
+        return []
+    return [
+        ('tca_search_index_ready', 'gauge', 'Index de recherche en mémoire prêt', [({}, 1 if index.is_ready else 0)]),
+        ('tca_search_index_queries_total', 'counter', 'Recherches servies par l\'index',
+         [({}, index.stats['queries'])]),
+        ('tca_search_index_build_seconds', 'gauge', 'Durée de la dernière construction',
+         [({}, index.stats['build_seconds'])]),
+    ]
+
+
+def init_search_index(app, db_manager) -> None:
+    """Créer l'index, l'abonner aux écritures et le construire en arrière-plan (SEARCH_INDEX_PRELOAD)"""
+    global client_search_index
+    from utils.cache_manager import register_client_change_listener
+    from utils.metrics import registry as metrics_registry
+
+    if not app.config.get('SEARCH_INDEX_ENABLED', True):
+        return
+    if client_search_index is None:
+        client_search_index = ClientSearchIndex(db_manager)
+        register_client_change_listener(client_search_index.on_client_change)
+        metrics_registry.register_collector(search_index_collector)
+    if app.config.get('SEARCH_INDEX_PRELOAD', True):
+        client_search_index.ensure_built()
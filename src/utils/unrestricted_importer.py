@@ -6,13 +6,49 @@ import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import os
+import time
 import uuid
-from .advanced_excel_analyzer import AdvancedExcelAnalyzer
+from .advanced_excel_analyzer import AdvancedExcelAnalyzer, read_import_frame
+from .column_resolver import ColumnMapping, resolve_columns
+from .value_normalizer import option_normalizer
+from .phone_numbers import phone_columns
 
 
 class UnrestrictedImporter:
     """Importeur sans restrictions qui accepte tous les types de données"""
     
+    # Enregistrements insérés par transaction
+    INSERT_BATCH_SIZE = 1000
+    # Champ client (column_resolver) -> clé de l'enregistrement préparé
+    RECORD_KEYS = {
+        'client_id': 'client_id',
+        'full_name': 'full_name',
+        'whatsapp_number': 'phone',
+        'application_date': 'file_date',
+        'transaction_date': 'reception_date',
+        'passport_number': 'passport_number',
+        'passport_status': 'passport_status',
+        'nationality': 'nationality',
+        'visa_status': 'status',
+        'processed_by': 'handled_by',
+        'summary': 'summary',
+        'notes': 'notes',
+        'responsible_employee': 'employee',
+    }
+    # Colonnes écrites par l'import (ordre des valeurs de _client_record_values)
+    RECORD_COLUMNS = (
+        'client_id', 'full_name', 'whatsapp_number', 'whatsapp_number_clean', 'whatsapp_number_rev',
+        'application_date', 'transaction_date', 'passport_number', 'passport_status',
+        'passport_status_normalized', 'nationality', 'visa_status', 'visa_status_normalized',
+        'processed_by', 'summary', 'notes', 'responsible_employee', 'original_row_number',
+        'import_timestamp', 'is_duplicate', 'has_empty_fields', 'has_errors', 'original_data',
+        'created_at', 'updated_at',
+    )
+    RECORD_INSERT_SQL = (f"INSERT INTO clients ({', '.join(RECORD_COLUMNS)}) "
+                         f"VALUES ({', '.join(['?'] * len(RECORD_COLUMNS))})")
+    # Fichier sans en-têtes reconnus: premières colonnes lues par position
+    POSITIONAL_FIELDS = ('client_id', 'full_name', 'whatsapp_number')
+    
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.analyzer = AdvancedExcelAnalyzer()
@@ -23,19 +59,43 @@ class UnrestrictedImporter:
             'empty_ids_generated': 0,
             'empty_names_accepted': 0,
             'processing_time': 0,
+            'stage_times': {},
             'errors': []
         }
+        # Identifiants insérés (recherche incrémentale des doublons après l'import)
+        self.imported_client_ids: List[str] = []
+        # Prochain numéro CLIxxxx pour les identifiants manquants (lu à la première génération)
+        self._next_client_number: Optional[int] = None
+        
+    def perform_unrestricted_import(self, excel_path: str, profile_mode: str = 'sample') -> Dict[str, Any]:
+        """
+        Effectue un import complet sans restrictions
         
-    def perform_unrestricted_import(self, excel_path: str) -> Dict[str, Any]:
-        """Effectue un import complet sans restrictions"""
+        Le fichier est lu une seule fois: le même DataFrame sert à l'analyse
+        (profil échantillonné par défaut, 'full' pour des statistiques exactes)
+        et à l'import. La durée de chaque étape est dans import_stats['stage_times'].
+        """
         start_time = datetime.now()
+        stage_times = self.import_stats['stage_times'] = {}
+        
+        def stage_done(name: str, started: float) -> float:
+            now = time.perf_counter()
+            stage_times[name] = round(now - started, 3)
+            return now
         
         try:
             print(f"🔄 Début de l'import sans restrictions pour: {excel_path}")
             
-            # Étape 1: Analyser le fichier
+            # Étape 1: Charger les données (lecture unique)
+            print("📂 Chargement des données...")
+            stage_start = time.perf_counter()
+            df = read_import_frame(excel_path)
+            stage_start = stage_done('read', stage_start)
+            
+            # Étape 2: Analyser le DataFrame chargé
             print("📊 Analyse du fichier Excel...")
-            analysis_result = self.analyzer.analyze_file(excel_path)
+            analysis_result = self.analyzer.analyze_frame(df, excel_path, mode=profile_mode)
+            stage_start = stage_done('analyze', stage_start)
             
             if not analysis_result['success']:
                 return {
@@ -44,44 +104,17 @@ class UnrestrictedImporter:
                     'import_stats': self.import_stats
                 }
             
-            # Étape 2: Charger les données
-            print("📂 Chargement des données...")
-            df = pd.read_excel(excel_path)
-            # Normaliser: supprimer colonnes 'Unnamed' et garder colonnes métiers/arabes si présentes
-            try:
-                df = df.loc[:, [col for col in df.columns if not (isinstance(col, str) and col.strip().lower().startswith('unnamed:'))]]
-                target_names = [
-                    'ملاحظة', 'ملاحضة',
-                    'اختيار الموظف مسؤول', 'اختيار الموظف', 'اختار الموظف',
-                    'الخلاصة',
-                    'من طرف',
-                    'حالة تتبع التأشيرة',
-                    'الجنسية',
-                    'حالة جواز السفر',
-                    'رقم جواز السفر',
-                    'تاريخ استلام للسفارة', 'تاريخ استلام المعملة',
-                    'تاريخ التقديم',
-                    'رقم الواتساب',
-                    'الاسم الكامل',
-                    'معرف العميل'
-                ]
-                def norm(s: str) -> str:
-                    return ' '.join(str(s).strip().split())
-                targets_norm = set(norm(n) for n in target_names)
-                keep_cols = [col for col in df.columns if norm(col) in targets_norm]
-                if keep_cols:
-                    df = df.loc[:, keep_cols]
-            except Exception:
-                pass
             self.import_stats['total_processed'] = len(df)
             
             # Étape 3: Préparer les données
             print("🔧 Préparation des données...")
             prepared_data = self._prepare_data_for_import(df)
+            stage_start = stage_done('prepare', stage_start)
             
             # Étape 4: Insérer dans la base de données
             print("💾 Insertion dans la base de données...")
             import_result = self._insert_data_into_db(prepared_data)
+            stage_done('insert', stage_start)
             
             # Calculer le temps de traitement
             end_time = datetime.now()
@@ -90,7 +123,8 @@ class UnrestrictedImporter:
             # Générer le rapport final
             final_report = self._generate_final_report(analysis_result, import_result)
             
-            print(f"✅ Import terminé avec succès en {self.import_stats['processing_time']:.2f} secondes")
+            print(f"✅ Import terminé avec succès en {self.import_stats['processing_time']:.2f} secondes "
+                  f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in stage_times.items())})")
             
             return {
                 'success': True,
@@ -128,15 +162,20 @@ class UnrestrictedImporter:
         
         print(f"🔧 Préparation de {total_rows} enregistrements...")
         
-        for index, row in df.iterrows():
+        # En-têtes résolus une seule fois pour tout le fichier
+        mapping, extra_columns = self._resolve_record_columns(df)
+        normalized = self._normalized_status_columns(df, dict(mapping))
+        
+        for row_number, (index, row) in enumerate(zip(df.index, df.itertuples(index=False, name=None))):
             try:
                 # Protection contre les boucles infinies - limiter le temps par enregistrement
-                import time
                 start_time = time.time()
                 
                 # Créer un enregistrement client
-                client_record = self._create_client_record(row, index)
+                client_record = self._create_client_record(row, index, mapping, extra_columns)
                 if client_record:
+                    for key, values in normalized.items():
+                        client_record[key] = values[row_number]
                     prepared_records.append(client_record)
                 
                 # Si le traitement prend trop de temps, passer à l'enregistrement suivant
@@ -151,11 +190,44 @@ class UnrestrictedImporter:
         
         return prepared_records
     
-    def _create_client_record(self, row: pd.Series, row_index: int) -> Optional[Dict[str, Any]]:
-        """Crée un enregistrement client à partir d'une ligne Excel"""
+    def _resolve_record_columns(self, df: pd.DataFrame) -> tuple:
+        """
+        Correspondance positionnelle des colonnes du fichier vers les clés d'enregistrement
+        
+        Returns:
+            (liste (clé, indice de colonne), colonnes supplémentaires (clé, indice)
+            lues par position quand aucun en-tête n'est reconnu)
+        """
+        mapping = resolve_columns(df.columns)
+        extra_columns = []
+        if not mapping:
+            mapping = ColumnMapping.positional(df.columns, self.POSITIONAL_FIELDS)
+            extra_columns = [(f'field_{position + 1}', position) for position, _header in mapping.unmatched]
+        else:
+            print(f"🧭 Colonnes reconnues: {mapping.describe()['fields']}")
+        record_columns = [(self.RECORD_KEYS[field], position) for field, position in mapping.positions.items()]
+        return record_columns, extra_columns
+    
+    def _normalized_status_columns(self, df: pd.DataFrame, record_columns: Dict[str, int]) -> Dict[str, List[str]]:
+        """Statuts normalisés colonne par colonne (chaque valeur distincte résolue une fois)"""
+        from models.client import Client
+        
+        normalized = {}
+        for key, target, options in (('status', 'status_normalized', Client.VISA_STATUS_OPTIONS),
+                                     ('passport_status', 'passport_status_normalized', Client.PASSPORT_STATUS_OPTIONS)):
+            if key in record_columns:
+                normalized[target] = option_normalizer(tuple(options)).normalize_column(
+                    df.iloc[:, record_columns[key]].tolist())
+        return normalized
+    
+    def _create_client_record(self, row: tuple, row_index: int, mapping: List[tuple],
+                              extra_columns: List[tuple]) -> Optional[Dict[str, Any]]:
+        """Crée un enregistrement client à partir d'une ligne du fichier"""
         try:
             # Nettoyer et préparer les données
-            client_data = self._extract_client_data(row)
+            client_data = self._extract_client_data(row, mapping)
+            if extra_columns:
+                client_data.update(self._extract_client_data(row, extra_columns))
             
             # Générer un ID client si nécessaire
             if not client_data.get('client_id'):
@@ -179,94 +251,38 @@ class UnrestrictedImporter:
             print(f"⚠️ Erreur lors de la création de l'enregistrement: {str(e)}")
             return None
     
-    def _extract_client_data(self, row: pd.Series) -> Dict[str, Any]:
-        """Extrait les données client de la ligne Excel"""
+    @staticmethod
+    def _extract_client_data(row: tuple, mapping: List[tuple]) -> Dict[str, Any]:
+        """Extrait les valeurs non vides d'une ligne selon la correspondance (clé, indice de colonne)"""
         client_data = {}
-        
-        # Mapping des colonnes avec gestion flexible - incluant les colonnes arabes spécifiques
-        column_mapping = {
-            'client_id': ['client_id', 'id', 'معرف_العميل', 'رقم_العميل', 'code', 'code_client', 'معرف ال', 'معرف_العميل'],
-            'full_name': ['full_name', 'name', 'nom', 'الاسم_الكامل', 'الاسم', 'nom_complet', 'الاسم الكامل', 'الاسم'],
-            'phone': ['phone', 'telephone', 'tel', 'الهاتف', 'رقم_الهاتف', 'portable', 'رقم الواتساب', 'واتساب'],
-            'nationality': ['nationality', 'nationalite', 'pays', 'الجنسية', 'بلد'],
-            'passport_number': ['passport_number', 'passeport', 'رقم_الجواز', 'جواز'],
-            'birth_date': ['birth_date', 'date_naissance', 'تاريخ_الولادة', 'naissance'],
-            'visa_type': ['visa_type', 'type_visa', 'نوع_التأشيرة', 'التأشيرة'],
-            'visa_duration': ['visa_duration', 'duree_visa', 'مدة_التأشيرة'],
-            'employee': ['employee', 'employe', 'الموظف', 'المعالج', 'من طرف', 'اختار الموظف'],
-            'embassy': ['embassy', 'ambassade', 'السفارة'],
-            'file_date': ['file_date', 'date_dossier', 'تاريخ_الملف', 'تاريخ التقديم'],
-            'reception_date': ['reception_date', 'date_reception', 'تاريخ_الاستلام', 'تاريخ استلام للسفارة'],
-            'status': ['status', 'statut', 'الحالة', 'حالة تتبع التأشيرة'],
-            'notes': ['notes', 'remarques', 'ملاحظات', 'ملاحظة']
-        }
-        
-        # Parcourir les mappings
-        for standard_field, possible_columns in column_mapping.items():
-            for col in row.index:
-                if str(col).lower().strip() in [possible.lower() for possible in possible_columns]:
-                    value = row[col]
-                    if pd.notna(value) and str(value).strip():
-                        client_data[standard_field] = str(value).strip()
-                        break
-        
-        # Si aucune correspondance trouvée, utiliser les colonnes par index
-        if not client_data:
-            client_data = self._extract_by_position(row)
-        
-        return client_data
-    
-    def _extract_by_position(self, row: pd.Series) -> Dict[str, Any]:
-        """Extrait les données par position si aucune correspondance de noms"""
-        client_data = {}
-        
-        try:
-            # Essayer d'utiliser les premières colonnes par position
-            if len(row) > 0:
-                first_col = row.iloc[0]
-                if pd.notna(first_col):
-                    client_data['client_id'] = str(first_col).strip()
-            
-            if len(row) > 1:
-                second_col = row.iloc[1]
-                if pd.notna(second_col):
-                    client_data['full_name'] = str(second_col).strip()
-            
-            if len(row) > 2:
-                third_col = row.iloc[2]
-                if pd.notna(third_col):
-                    client_data['phone'] = str(third_col).strip()
-            
-            # Ajouter les autres colonnes comme données supplémentaires
-            for i, value in enumerate(row):
-                if pd.notna(value) and i >= 3:
-                    field_name = f'field_{i+1}'
-                    client_data[field_name] = str(value).strip()
-                    
-        except Exception as e:
-            print(f"⚠️ Erreur lors de l'extraction par position: {str(e)}")
-            
+        for key, position in mapping:
+            value = row[position]
+            if pd.notna(value):
+                text = str(value).strip()
+                if text:
+                    client_data[key] = text
         return client_data
     
     def _generate_client_id(self, client_data: Dict[str, Any], row_index: int) -> str:
         """Génère un ID client unique au format CLI standard (CLI001, CLI002, etc.)"""
-        try:
-            # Utiliser le système de génération d'ID standard du contrôleur
-            from controllers.client_controller import ClientController
-            from database.database_manager import DatabaseManager
-            
-            # Initialiser le contrôleur pour utiliser sa méthode de génération
-            db_manager = DatabaseManager()
-            client_controller = ClientController(db_manager)
-            
-            # Utiliser la méthode standard de génération d'ID
-            return client_controller.generate_client_id()
-            
-        except Exception as e:
-            # Fallback: générer un ID CLI simple
-            import time
-            timestamp = int(time.time()) % 100000
-            return f"CLI{timestamp % 1000:03d}"
+        # Le prochain numéro n'est lu qu'une fois par import, puis incrémenté localement
+        if self._next_client_number is None:
+            try:
+                # Utiliser le système de génération d'ID standard du contrôleur
+                from controllers.client_controller import ClientController
+                from database.database_manager import DatabaseManager
+                
+                client_controller = ClientController(DatabaseManager(self.db_path))
+                self._next_client_number = int(client_controller.generate_client_id()[3:])
+                
+            except Exception as e:
+                # Fallback: générer un ID CLI simple
+                timestamp = int(time.time()) % 100000
+                return f"CLI{timestamp % 1000:03d}"
+        
+        client_id = f"CLI{self._next_client_number:04d}"
+        self._next_client_number += 1
+        return client_id
     
     def _set_default_values(self, client_data: Dict[str, Any]) -> Dict[str, Any]:
         """Définit les valeurs par défaut pour les champs manquants"""
@@ -322,8 +338,18 @@ class UnrestrictedImporter:
         return client_data
     
     def _insert_data_into_db(self, prepared_records: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Insère les données préparées dans la base de données"""
+        """
+        Insère les données préparées dans la base de données
+        
+        Les identifiants existants sont lus une fois (ensemble en mémoire) et les
+        enregistrements sont insérés par lots de INSERT_BATCH_SIZE (executemany,
+        une transaction par lot). Les migrations garantissent les colonnes écrites.
+        """
         try:
+            from database.database_manager import DatabaseManager
+            
+            # Schéma à jour (migrations en attente appliquées à la première ouverture)
+            DatabaseManager(self.db_path)
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -332,48 +358,37 @@ class UnrestrictedImporter:
             
             print(f"💾 Insertion de {len(prepared_records)} enregistrements dans la base de données...")
             
-            for record_index, record in enumerate(prepared_records):
-                try:
+            # Identifiants existants (archivés compris): une seule lecture pour tout l'import
+            existing_ids = {row[0] for row in cursor.execute(
+                f"SELECT client_id FROM {DatabaseManager.CLIENT_TIERS['all']}")}
+            
+            for batch_start in range(0, len(prepared_records), self.INSERT_BATCH_SIZE):
+                batch = prepared_records[batch_start:batch_start + self.INSERT_BATCH_SIZE]
+                rows = []
+                for record_index, record in enumerate(batch, start=batch_start):
                     # Vérifier si l'ID existe déjà et générer un ID unique
                     original_id = record['client_id']
                     retry_count = 0
                     max_retries = 5  # Réduit de 10 à 5 pour éviter les boucles trop longues
                     
-                    while retry_count < max_retries:
-                        try:
-                            cursor.execute("SELECT COUNT(*) FROM clients WHERE client_id = ?", (record['client_id'],))
-                            exists = cursor.fetchone()[0] > 0
-                            
-                            if not exists:
-                                break
-                                
-                            # Générer un nouvel ID pour le doublon avec une approche plus simple
-                            import time
-                            timestamp_suffix = str(int(time.time() * 1000) % 1000)
-                            record['client_id'] = f"{original_id[:8]}{timestamp_suffix}"
-                            retry_count += 1
-                            
-                            if retry_count >= max_retries:
-                                # Fallback ultime : ID avec timestamp et index
-                                record['client_id'] = f"CLI{record_index}{int(time.time()) % 10000}"
-                                break
-                        except Exception as inner_e:
-                            # En cas d'erreur SQL, sortir de la boucle
-                            print(f"⚠️ Erreur SQL lors de la vérification d'ID: {str(inner_e)}")
+                    while record['client_id'] in existing_ids:
+                        # Générer un nouvel ID pour le doublon avec une approche plus simple
+                        timestamp_suffix = str(int(time.time() * 1000) % 1000)
+                        record['client_id'] = f"{original_id[:8]}{timestamp_suffix}"
+                        retry_count += 1
+                        
+                        if retry_count >= max_retries:
+                            # Fallback ultime : ID avec timestamp et index
+                            record['client_id'] = f"CLI{record_index}{int(time.time()) % 10000}"
                             break
                     
                     if original_id != record['client_id']:
                         duplicates_imported += 1
-                    
-                    # Insérer l'enregistrement
-                    self._insert_client_record(cursor, record)
-                    successfully_imported += 1
-                    
-                except Exception as e:
-                    print(f"⚠️ Erreur lors de l'insertion de l'enregistrement: {str(e)}")
-                    continue
+                    existing_ids.add(record['client_id'])
+                    rows.append((record, self._client_record_values(record)))
+                
+                successfully_imported += self._insert_batch(conn, rows)
             
-            conn.commit()
             conn.close()
             
             # Mettre à jour les statistiques
@@ -393,33 +408,52 @@ class UnrestrictedImporter:
                 'error': str(e)
             }
     
-    def _insert_client_record(self, cursor: sqlite3.Cursor, record: Dict[str, Any]) -> None:
-        """Insère un enregistrement client dans la base de données (adapté au schéma existant)."""
-        # Lire les colonnes existantes de la table
-        db_columns = [row[1] for row in cursor.execute('PRAGMA table_info(clients)')]
-
-        # Mapper nos champs vers le schéma actuel observé
+    def _insert_batch(self, conn: sqlite3.Connection, rows: List[tuple]) -> int:
+        """Insérer un lot en une transaction; en cas de contrainte violée, rejouer ligne par ligne"""
+        if not rows:
+            return 0
+        try:
+            conn.executemany(self.RECORD_INSERT_SQL, [tuple(values.values()) for _record, values in rows])
+            inserted = [record for record, _values in rows]
+        except sqlite3.Error:
+            conn.rollback()
+            inserted = []
+            for record, values in rows:
+                try:
+                    conn.execute(self.RECORD_INSERT_SQL, tuple(values.values()))
+                    inserted.append(record)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Erreur lors de l'insertion de l'enregistrement: {str(e)}")
+        conn.commit()
+        self.imported_client_ids.extend(record['client_id'] for record in inserted)
+        return len(inserted)
+    
+    def _client_record_values(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Valeurs à insérer pour un enregistrement (clés dans l'ordre de RECORD_COLUMNS)"""
+        # Mapper nos champs vers le schéma (colonnes garanties par les migrations)
         now_date = datetime.now().strftime('%Y-%m-%d')
         now_ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        # Préparer les valeurs potentielles
+        # Préparer les valeurs
         phone_raw = record.get('phone', '')
-        phone_digits = ''.join(c for c in str(phone_raw) if c.isdigit()) if phone_raw else ''
+        phone_clean, phone_rev = phone_columns(phone_raw)
 
-        candidate_values = {
+        return {
             'client_id': record.get('client_id', ''),
             'full_name': record.get('full_name', ''),
             'whatsapp_number': phone_raw,
-            'whatsapp_number_clean': phone_digits,
+            'whatsapp_number_clean': phone_clean,
+            'whatsapp_number_rev': phone_rev,
             'application_date': record.get('file_date', now_date),
             'transaction_date': record.get('reception_date', now_date),
             'passport_number': record.get('passport_number', ''),
-            'passport_status': record.get('status', ''),  # si différent, sera corrigé par app plus tard
-            'passport_status_normalized': record.get('status', ''),
+            'passport_status': record.get('passport_status', record.get('status', '')),
+            'passport_status_normalized': (record.get('passport_status_normalized')
+                                           or record.get('passport_status', record.get('status', ''))),
             'nationality': record.get('nationality', ''),
             'visa_status': record.get('status', 'قيد الانتظار'),
-            'visa_status_normalized': record.get('status', 'قيد الانتظار'),
-            'processed_by': record.get('employee', record.get('handled_by', '')),
+            'visa_status_normalized': record.get('status_normalized') or record.get('status', 'قيد الانتظار'),
+            'processed_by': record.get('handled_by', record.get('employee', '')),
             'summary': record.get('summary', ''),
             'notes': record.get('notes', ''),
             'responsible_employee': record.get('employee', ''),
@@ -432,16 +466,6 @@ class UnrestrictedImporter:
             'created_at': now_ts,
             'updated_at': now_ts,
         }
-
-        # Ne garder que les colonnes présentes dans la table
-        insert_cols = [col for col in candidate_values.keys() if col in db_columns]
-        insert_vals = [candidate_values[col] for col in insert_cols]
-
-        # Construire et exécuter la requête dynamiquement
-        placeholders = ', '.join(['?'] * len(insert_cols))
-        columns_sql = ', '.join(insert_cols)
-        query = f"INSERT INTO clients ({columns_sql}) VALUES ({placeholders})"
-        cursor.execute(query, insert_vals)
     
     def _generate_final_report(self, analysis_result: Dict[str, Any], import_result: Dict[str, Any]) -> str:
         """Génère un rapport final détaillé"""
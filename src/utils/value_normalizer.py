@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalisation des valeurs à options fixes (statuts, nationalités, employés)
+
+Une colonne importée ne contient que quelques valeurs distinctes: chacune est
+résolue une fois, puis la colonne entière est traduite par un dictionnaire.
+
+Résolution d'une valeur:
+1. dictionnaire exact précalculé (option telle quelle, puis forme normalisée:
+   minuscules, sans diacritiques, variantes d'alef/ya/ta marbuta unifiées)
+2. inclusion: l'option la plus longue contenue dans la valeur, sinon la
+   première option qui contient la valeur
+3. similarité (difflib) pour les fautes de frappe
+4. valeur par défaut, ou la valeur nettoyée si aucun défaut n'est donné
+
+Les résultats des étapes 2 à 4 sont gardés en cache par normaliseur.
+"""
+
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from utils.search_index import normalize_text
+
+# Similarité minimale pour rattacher une valeur inconnue à une option
+FUZZY_CUTOFF = 0.8
+# Valeurs distinctes gardées en cache par normaliseur
+MAX_CACHED_VALUES = 4096
+
+
+def _clean(value: Any) -> str:
+    """Texte nettoyé d'une cellule ('' pour None/NaN)"""
+    if value is None or value != value:
+        return ''
+    return str(value).strip()
+
+
+class OptionNormalizer:
+    """Rattache des valeurs saisies librement à une liste d'options"""
+
+    def __init__(self, options: Sequence[str], default: Optional[str] = None, fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.options = tuple(options)
+        self.default = default
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._exact: Dict[str, str] = {option: option for option in self.options}
+        self._folded: Dict[str, str] = {}
+        for option in self.options:
+            self._folded.setdefault(normalize_text(option), option)
+        self._folded_keys = [key for key in self._folded if key]
+        self._cache: Dict[str, str] = {}
+
+    def normalize(self, value: Any) -> str:
+        """Option correspondant à une valeur (voir l'ordre de résolution du module)"""
+        text = _clean(value)
+        if not text:
+            return self.default if self.default is not None else ''
+        option = self._exact.get(text)
+        if option is not None:
+            return option
+        option = self._cache.get(text)
+        if option is None:
+            option = self._resolve(text)
+            if len(self._cache) >= MAX_CACHED_VALUES:
+                self._cache.clear()
+            self._cache[text] = option
+        return option
+
+    def _resolve(self, text: str) -> str:
+        folded = normalize_text(text)
+        option = self._folded.get(folded)
+        if option is not None:
+            return option
+        if folded:
+            contained = [key for key in self._folded_keys if key in folded]
+            if contained:
+                return self._folded[max(contained, key=len)]
+            for key in self._folded_keys:
+                if folded in key:
+                    return self._folded[key]
+            close = get_close_matches(folded, self._folded_keys, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return self._folded[close[0]]
+        return self.default if self.default is not None else text
+
+    def normalize_column(self, values: Iterable[Any]) -> List[str]:
+        """Normaliser une colonne entière (chaque valeur distincte n'est résolue qu'une fois)"""
+        values = list(values)
+        mapping = {}
+        for value in values:
+            # NaN n'est égal à rien: regroupé sous None
+            key = value if value == value else None
+            if key not in mapping:
+                mapping[key] = self.normalize(key)
+        return [mapping[value if value == value else None] for value in values]
+
+    def normalize_series(self, series):
+        """Normaliser une colonne pandas (valeurs distinctes résolues puis Series.map)"""
+        uniques = series.dropna().unique()
+        mapping = {value: self.normalize(value) for value in uniques}
+        return series.map(mapping).fillna(self.normalize(None))
+
+
+@lru_cache(maxsize=64)
+def option_normalizer(options: tuple, default: Optional[str] = None) -> OptionNormalizer:
+    """Normaliseur partagé pour une liste d'options (cache par options et défaut)"""
+    return OptionNormalizer(options, default)
@@ -0,0 +1,161 @@
+// جدول العملاء الافتراضي (Virtualized)
+// يجلب الصفوف من /api/clients/query على شكل كتل، ولا يعرض إلا الصفوف الظاهرة على الشاشة
+// مع الاحتفاظ بعدد محدود من الكتل في الذاكرة
+
+(function (global) {
+    'use strict';
+
+    function VirtualClientTable(options) {
+        this.container = options.container;          // عنصر قابل للتمرير (ارتفاع ثابت)
+        this.tbody = options.tbody;
+        this.apiUrl = options.apiUrl;
+        this.columns = options.columns;              // أسماء الأعمدة المطلوبة من الخادم
+        this.renderCell = options.renderCell || null;
+        this.onMeta = options.onMeta || function () {};
+        this.onError = options.onError || function () {};
+        this.rowHeight = options.rowHeight || 44;
+        this.blockSize = options.blockSize || 100;
+        this.maxBlocks = options.maxBlocks || 6;
+        this.overscan = options.overscan || 10;
+        this.sort = options.sort || 'client_id';
+        this.order = options.order || 'desc';
+
+        this.params = {};
+        this.total = 0;
+        this.blocks = new Map();                     // رقم الكتلة -> صفوف (ترتيب LRU)
+        this.pending = new Map();
+        this.generation = 0;
+        this.renderScheduled = false;
+
+        const self = this;
+        this.container.addEventListener('scroll', function () { self.scheduleRender(); }, { passive: true });
+        global.addEventListener('resize', function () { self.scheduleRender(); });
+    }
+
+    VirtualClientTable.prototype.buildUrl = function (extra) {
+        const query = new URLSearchParams();
+        Object.keys(this.params).forEach(key => {
+            if (this.params[key]) query.set(key, this.params[key]);
+        });
+        query.set('fields', this.columns.join(','));
+        query.set('sort', this.sort);
+        query.set('order', this.order);
+        Object.keys(extra).forEach(key => query.set(key, extra[key]));
+        return this.apiUrl + '?' + query.toString();
+    };
+
+    // تغيير المرشحات أو الترتيب: إعادة التحميل من البداية
+    VirtualClientTable.prototype.load = function (params) {
+        if (params) this.params = params;
+        this.generation += 1;
+        this.blocks.clear();
+        this.pending.clear();
+        this.container.scrollTop = 0;
+        const generation = this.generation;
+
+        return fetch(this.buildUrl({ offset: 0, limit: this.blockSize, total: 1, facets: 1 }))
+            .then(response => response.json())
+            .then(data => {
+                if (generation !== this.generation) return;
+                if (!data.success) throw new Error(data.error || 'فشل في تحميل البيانات');
+                this.total = data.total || 0;
+                this.storeBlock(0, data.rows);
+                this.onMeta({ total: this.total, facets: data.facets || {} });
+                this.render();
+            })
+            .catch(error => this.onError(error));
+    };
+
+    VirtualClientTable.prototype.setSort = function (sort, order) {
+        this.sort = sort;
+        this.order = order;
+        return this.load();
+    };
+
+    VirtualClientTable.prototype.storeBlock = function (index, rows) {
+        this.blocks.delete(index);
+        this.blocks.set(index, rows);
+        // إخراج أقدم الكتل للحفاظ على ذاكرة ثابتة
+        while (this.blocks.size > this.maxBlocks) {
+            this.blocks.delete(this.blocks.keys().next().value);
+        }
+    };
+
+    VirtualClientTable.prototype.fetchBlock = function (index) {
+        if (this.blocks.has(index) || this.pending.has(index)) return;
+        const generation = this.generation;
+        const request = fetch(this.buildUrl({ offset: index * this.blockSize, limit: this.blockSize, total: 0 }))
+            .then(response => response.json())
+            .then(data => {
+                if (generation !== this.generation) return;
+                if (!data.success) throw new Error(data.error || 'فشل في تحميل البيانات');
+                this.storeBlock(index, data.rows);
+                this.scheduleRender();
+            })
+            .catch(error => this.onError(error))
+            .finally(() => this.pending.delete(index));
+        this.pending.set(index, request);
+    };
+
+    VirtualClientTable.prototype.scheduleRender = function () {
+        if (this.renderScheduled) return;
+        this.renderScheduled = true;
+        global.requestAnimationFrame(() => {
+            this.renderScheduled = false;
+            this.render();
+        });
+    };
+
+    VirtualClientTable.prototype.rowAt = function (index) {
+        const block = this.blocks.get(Math.floor(index / this.blockSize));
+        return block ? block[index % this.blockSize] : undefined;
+    };
+
+    VirtualClientTable.prototype.spacer = function (height) {
+        const tr = document.createElement('tr');
+        tr.className = 'virtual-spacer';
+        const td = document.createElement('td');
+        td.colSpan = this.columns.length;
+        td.style.height = height + 'px';
+        td.style.padding = '0';
+        td.style.border = '0';
+        tr.appendChild(td);
+        return tr;
+    };
+
+    VirtualClientTable.prototype.render = function () {
+        const viewport = this.container.clientHeight || 600;
+        const first = Math.max(0, Math.floor(this.container.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(this.total, Math.ceil((this.container.scrollTop + viewport) / this.rowHeight) + this.overscan);
+
+        // جلب الكتل الناقصة للنافذة الظاهرة فقط
+        for (let block = Math.floor(first / this.blockSize); block <= Math.floor(Math.max(first, last - 1) / this.blockSize); block++) {
+            if (block * this.blockSize < this.total) this.fetchBlock(block);
+        }
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(this.spacer(first * this.rowHeight));
+        for (let index = first; index < last; index++) {
+            const values = this.rowAt(index);
+            const tr = document.createElement('tr');
+            tr.className = 'virtual-row';
+            tr.style.height = this.rowHeight + 'px';
+            this.columns.forEach((column, position) => {
+                const td = document.createElement('td');
+                if (values === undefined) {
+                    td.textContent = position === 0 ? '…' : '';
+                } else if (this.renderCell) {
+                    this.renderCell(td, column, values[position]);
+                } else {
+                    td.textContent = values[position] == null ? '-' : values[position];
+                }
+                tr.appendChild(td);
+            });
+            fragment.appendChild(tr);
+        }
+        fragment.appendChild(this.spacer(Math.max(0, (this.total - last) * this.rowHeight)));
+        this.tbody.replaceChildren(fragment);
+    };
+
+    global.VirtualClientTable = VirtualClientTable;
+})(window);
@@ -12,17 +12,8 @@ if current_dir not in sys.path:
 # Forcer l'environnement Vercel
 os.environ['VERCEL'] = 'true'
 
-# Essayer d'importer Flask avec gestion d'erreur
-try:
-    from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
-    print("✅ Flask importé avec succès")
-except ImportError as e:
-    print(f"❌ Erreur d'import Flask: {e}")
-    print("📦 Installation de Flask...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "Flask==2.3.3"])
-    from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
-    print("✅ Flask installé et importé")
+# Flask est installé par installCommand (vercel.json): jamais de pip install au démarrage
+from flask import Flask, jsonify
 
 # Importer l'application principale
 try:
@@ -30,6 +21,7 @@ try:
     print("✅ Application principale importée")
 except Exception as e:
     print(f"❌ Erreur import application: {e}")
+    import_error = str(e)
     # Créer une application minimale si l'import échoue
     flask_app = Flask(__name__)
     flask_app.config['SECRET_KEY'] = 'vercel-emergency-key'
@@ -40,7 +32,7 @@ except Exception as e:
     
     @flask_app.route('/health')
     def emergency_health():
-        return jsonify({"status": "emergency", "error": str(e)})
+        return jsonify({"status": "emergency", "error": import_error})
 
 # Exporter l'application pour Vercel
 app = flask_app